@@ -72,6 +72,7 @@ def main():
         unit_tests.test__intrusion_policy(fmc=fmc1)
         unit_tests.test__access_control_policy(fmc=fmc1)
         unit_tests.test__acp_rule(fmc=fmc1)
+        unit_tests.test__bulk(fmc=fmc1)
         unit_tests.test__port_object_group(fmc=fmc1)
         unit_tests.test__url_category(fmc=fmc1)
         unit_tests.test__ports(fmc=fmc1)
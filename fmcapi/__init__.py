@@ -2,7 +2,26 @@
 
 import logging
 from .fmc import FMC
+from .fmc import PagingError
+from .asyncfmc import AsyncFMC
 from .api_objects import *
+from .snapshot import Snapshot
+from .snapshot import SnapshotFMC
+from .plan import Plan
+from .deployment import DeploymentPipeline
+from .onboarding import DeviceOnboarding
+from .collector import HitCountCollector
+from .timeseries import HitCountStore
+from .matching import RuleExpander
+from .matching import MatchEngine
+from .matching import IntervalIndex
+from .matching import GroupExpander
+from .shadowing import RuleAnalyzer
+from .reorder import RuleReorderAdvisor
+from .prefixes import PrefixTrie
+from .prefixes import NetworkIndex
+from .duplicates import DuplicateObjectFinder
+from .compaction import NetworkGroupCompactor
 
 logging.debug("In the fmcapi __init__.py file.")
 
@@ -1,6 +1,7 @@
 """Update Packages Classes."""
 
 import logging
+from .bulkobjects import BulkObjects
 from .policy_services.accesspolicies import AccessPolicies  # Needs loaded before Device
 from .policy_services.accesspolicies import (
     AccessControlPolicy,
@@ -158,6 +159,7 @@ from .update_packages.upgradepackage import Upgrades
 logging.debug("In the api_objects __init__.py file.")
 
 __all__ = [
+    "BulkObjects",
     "AdvancedSettings",
     "IPSecSettings",
     "Endpoints",
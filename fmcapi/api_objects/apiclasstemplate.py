@@ -1,5 +1,6 @@
 """Super class(es) that is inherited by all API objects."""
 from .helper_functions import syntax_correcter
+from .helper_functions import json_matches
 import logging
 import json
 
@@ -14,6 +15,8 @@ class APIClassTemplate(object):
     REQUIRED_FOR_DELETE = ["id"]
     REQUIRED_FOR_GET = [""]
     FILTER_BY_NAME = False
+    BULK_METHODS = []
+    IGNORED_FOR_APPLY = ["id", "links", "metadata"]
     URL = ""
     URL_SUFFIX = ""
     VALID_CHARACTERS_FOR_NAME = """[.\w\d_\-]"""
@@ -42,6 +45,8 @@ class APIClassTemplate(object):
         logging.debug("In __init__() for APIClassTemplate class.")
         self.VALID_FOR_KWARGS = self.VALID_FOR_KWARGS + self.GLOBAL_VALID_FOR_KWARGS
         self.fmc = fmc
+        # Fields passed here are compared by apply() even when they hold their default value.
+        self.kwargs_set = set(kwargs)
         self.limit = self.fmc.limit
         self.description = "Created by fmcapi."
         self.overridable = False
@@ -112,9 +117,10 @@ class APIClassTemplate(object):
 
         If no self.name or self.id exists then return a full listing of all
         objects of this type otherwise return requested name/id values.  Set "expanded=true" results for specific object
-        to gather additional detail.
+        to gather additional detail.  A full listing has the objects of every page in its "items"; its "paging" and
+        "links" are those of the first page.
 
-        :return: requests response
+        :return: requests response, or None if the GET or any page of it failed.
         """
         logging.debug("In get() for APIClassTemplate class.")
         self.parse_kwargs(**kwargs)
@@ -159,6 +165,9 @@ class APIClassTemplate(object):
                     if "offset" in self.__dict__:
                         url = f"{url}&offset={self.offset}"
                 response = self.fmc.send_to_api(method="get", url=url)
+                if response is None:
+                    logging.error(f"GET query for {self.name} failed.")
+                    return None
                 if "items" not in response:
                     response["items"] = []
                 for item in response["items"]:
@@ -185,7 +194,6 @@ class APIClassTemplate(object):
                     "GET query for object with no name or id set.  "
                     "Returning full list of these object types instead."
                 )
-                url = f"{self.URL}?expanded=true&limit={self.limit}"
                 if self.dry_run:
                     logging.info(
                         "Dry Run enabled.  Not actually sending to FMC.  Here is what would have been sent:"
@@ -193,7 +201,12 @@ class APIClassTemplate(object):
                     logging.info("\tMethod = GET")
                     logging.info(f"\tURL = {self.URL}")
                     return False
-                response = self.fmc.send_to_api(method="get", url=url)
+                response = self.fmc.send_to_api(
+                    method="get", url=f"{self.URL}?expanded=true&limit={self.limit}"
+                )
+            if response is None:
+                logging.error("GET failed.  No data in API response.")
+                return None
             if "items" not in response:
                 response["items"] = []
             return response
@@ -203,6 +216,37 @@ class APIClassTemplate(object):
             )
             return False
 
+    def iter_items(self, **kwargs):
+        """
+        Yield every object of this type, page by page as the pages arrive from the FMC.
+
+        Unlike get() with no name or id set, the full listing is never held in memory at once.
+
+        :return: (generator) items
+        """
+        logging.debug("In iter_items() for APIClassTemplate class.")
+        self.parse_kwargs(**kwargs)
+        if self.fmc.serverVersion < self.FIRST_SUPPORTED_FMC_VERSION:
+            logging.error(
+                f"Your FMC version, {self.fmc.serverVersion} does not support GET of this feature."
+            )
+            return
+        if not self.valid_for_get():
+            logging.warning(
+                "iter_items() method failed due to failure to pass valid_for_get() test."
+            )
+            return
+        url = f"{self.URL}?expanded=true&limit={self.limit}"
+        if self.dry_run:
+            logging.info(
+                "Dry Run enabled.  Not actually sending to FMC.  Here is what would have been sent:"
+            )
+            logging.info("\tMethod = GET")
+            logging.info(f"\tURL = {url}")
+            return
+        for page in self.fmc.iter_pages(url=url):
+            yield from page.get("items", [])
+
     def valid_for_post(self):
         """
         Use REQUIRED_FOR_POST to ensure all necessary variables exist prior to submitting to API.
@@ -248,6 +292,7 @@ class APIClassTemplate(object):
                 )
                 if response:
                     self.parse_kwargs(**response)
+                    self.invalidate_cache()
                     if "name" in self.__dict__ and "id" in self.__dict__:
                         logging.info(
                             f'POST success. Object with name: "{self.name}" and id: "{id}" created in FMC.'
@@ -305,6 +350,7 @@ class APIClassTemplate(object):
                 method="put", url=url, json_data=self.format_data()
             )
             self.parse_kwargs(**response)
+            self.invalidate_cache()
             if "name" in self.__dict__:
                 logging.info(
                     f'PUT success. Object with name: "{self.name}" and id: "{self.id}" updated in FMC.'
@@ -362,6 +408,7 @@ class APIClassTemplate(object):
             if not response:
                 return None
             self.parse_kwargs(**response)
+            self.invalidate_cache()
             if "name" in self.name:
                 logging.info(
                     f'DELETE success. Object with name: "{self.name}" and id: "{self.id}" deleted in FMC.'
@@ -374,3 +421,350 @@ class APIClassTemplate(object):
                 "delete() method failed due to failure to pass valid_for_delete() test."
             )
             return False
+
+    def apply(self, current=None, **kwargs):
+        """
+        Make the FMC match this object, sending a POST or PUT only if something actually differs.
+
+        The object's current state is taken from 'current', else the FMC's object cache, else a GET.  Both sides go
+        through format_data() before being compared so a PUT is only sent when a field differs.  Only the fields this
+        object sets (see desired_state()) are compared; the others keep the FMC's value in the PUT.  Fields in
+        IGNORED_FOR_APPLY and anything the FMC adds that this object doesn't set (metadata, links, ...) are ignored.
+
+        :param current: (dict) The object as returned by the FMC, if the caller already has it.
+        :return: (dict) {"action": "created", "updated", "unchanged" or "failed", "changes": {field: {"from", "to"}}}
+        """
+        logging.debug("In apply() for APIClassTemplate class.")
+        self.parse_kwargs(**kwargs)
+        if current is None:
+            current = self.current_state()
+        if current is None:
+            changes = {
+                key: {"from": None, "to": value}
+                for key, value in self.format_data().items()
+                if key not in self.IGNORED_FOR_APPLY
+            }
+            action = "create"
+            response = None if self.dry_run else self.post()
+        else:
+            self.id = current["id"]
+            desired = self.desired_state()
+            changes = self.changes(current=current, desired=desired)
+            if not changes:
+                logging.info(
+                    f'APPLY: Object with name: "{self.__dict__.get("name")}" and id: "{self.id}" is unchanged.'
+                )
+                return {"action": "unchanged", "changes": {}}
+            # Keep what the FMC has for the fields this object leaves at their defaults.
+            for key, value in self.canonical(current).items():
+                if key not in desired and key not in self.IGNORED_FOR_APPLY:
+                    self.__dict__[key] = value
+            action = "update"
+            response = None if self.dry_run else self.put()
+        logging.info(
+            f'APPLY: {action} object with name: "{self.__dict__.get("name")}".  Changed fields: {list(changes)}.'
+        )
+        if self.dry_run:
+            logging.info(
+                "Dry Run enabled.  Not actually sending to FMC.  Returning the changes that would be sent."
+            )
+            return {"action": action, "changes": changes}
+        return {"action": f"{action}d" if response else "failed", "changes": changes}
+
+    def current_state(self):
+        """
+        Fetch what the FMC currently has for this object, without changing this object.
+
+        :return: (dict) The object as returned by the FMC or None if it doesn't exist.
+        """
+        logging.debug("In current_state() for APIClassTemplate class.")
+        name = self.__dict__.get("name")
+        id = self.__dict__.get("id")
+        if name is None and id is None:
+            return None
+        if self.REQUIRED_FOR_GET == [""]:
+            # A miss loads the whole collection, so the cache's answer is final.
+            return self.fmc.object_cache.get(api_class=type(self), name=name, id=id)
+        if id is not None:
+            return self.fmc.send_to_api(method="get", url=f"{self.URL}/{id}")
+        for item in self.iter_items():
+            if item.get("name") == name:
+                return item
+        return None
+
+    def desired_state(self):
+        """
+        The fields of format_data() this object sets: those passed when it was created and those no longer at the
+        value a new object of this type starts with.  Defaults such as description="Created by fmcapi." are left out
+        so that they don't overwrite what the FMC has.
+
+        :return: (dict) {field: value} without the fields in IGNORED_FOR_APPLY.
+        """
+        logging.debug("In desired_state() for APIClassTemplate class.")
+        defaults = type(self)(fmc=self.fmc).format_data()
+        return {
+            key: value
+            for key, value in self.format_data().items()
+            if key not in self.IGNORED_FOR_APPLY
+            and (
+                key in self.kwargs_set or key not in defaults or value != defaults[key]
+            )
+        }
+
+    def canonical(self, current):
+        """
+        Run the FMC's copy of this object through the same parse_kwargs()/format_data() as this object.
+
+        :param current: (dict) The object as returned by the FMC.
+        :return: (dict) format_data() of the FMC's copy.
+        """
+        logging.debug("In canonical() for APIClassTemplate class.")
+        canonical = type(self)(fmc=self.fmc)
+        canonical.parse_kwargs(**current)
+        return canonical.format_data()
+
+    def changes(self, current, desired=None):
+        """
+        Compare this object with the FMC's copy of it, field by field.
+
+        :param current: (dict) The object as returned by the FMC.
+        :param desired: (dict) desired_state() of this object.  (Default is computed)
+        :return: (dict) {field: {"from": current value, "to": desired value}} for each field that differs.
+        """
+        logging.debug("In changes() for APIClassTemplate class.")
+        if desired is None:
+            desired = self.desired_state()
+        existing = self.canonical(current)
+        return {
+            key: {"from": existing.get(key), "to": value}
+            for key, value in desired.items()
+            if key not in existing or not json_matches(value, existing[key])
+        }
+
+    def invalidate_cache(self):
+        """
+        Drop this object from the FMC's name/id lookup cache after it was created, changed or deleted.
+
+        :return: None
+        """
+        logging.debug("In invalidate_cache() for APIClassTemplate class.")
+        self.fmc.object_cache.invalidate(
+            name=self.__dict__.get("name"), id=self.__dict__.get("id")
+        )
+
+    async def aiter_items(self, **kwargs):
+        """
+        Yield every object of this type, page by page as the pages arrive from the FMC.  Needs an AsyncFMC.
+
+        :return: (async generator) items
+        """
+        logging.debug("In aiter_items() for APIClassTemplate class.")
+        self.parse_kwargs(**kwargs)
+        if self.fmc.serverVersion < self.FIRST_SUPPORTED_FMC_VERSION:
+            logging.error(
+                f"Your FMC version, {self.fmc.serverVersion} does not support GET of this feature."
+            )
+            return
+        if not self.valid_for_get():
+            logging.warning(
+                "aiter_items() method failed due to failure to pass valid_for_get() test."
+            )
+            return
+        url = f"{self.URL}?expanded=true&limit={self.limit}"
+        if self.dry_run:
+            logging.info(
+                "Dry Run enabled.  Not actually sending to FMC.  Here is what would have been sent:"
+            )
+            logging.info("\tMethod = GET")
+            logging.info(f"\tURL = {url}")
+            return
+        async for page in self.fmc.aiter_pages(url=url):
+            for item in page.get("items", []):
+                yield item
+
+    async def aget(self, **kwargs):
+        """
+        Awaitable get().  Needs an AsyncFMC.
+
+        If no self.name or self.id exists then return a full listing of all objects of this type otherwise return
+        requested name/id values.  A full listing is shaped like get()'s.
+
+        :return: requests response, or None if the GET or any page of it failed.
+        """
+        logging.debug("In aget() for APIClassTemplate class.")
+        self.parse_kwargs(**kwargs)
+        if self.fmc.serverVersion < self.FIRST_SUPPORTED_FMC_VERSION:
+            logging.error(
+                f"Your FMC version, {self.fmc.serverVersion} does not support GET of this feature."
+            )
+            return {"items": []}
+        if not self.valid_for_get():
+            logging.warning(
+                "aget() method failed due to failure to pass valid_for_get() test."
+            )
+            return False
+        if self.dry_run:
+            logging.info(
+                "Dry Run enabled.  Not actually sending to FMC.  Here is what would have been sent:"
+            )
+            logging.info("\tMethod = GET")
+            logging.info(f"\tURL = {self.URL}")
+            return False
+        if "id" in self.__dict__:
+            response = await self.fmc.asend_to_api(
+                method="get", url=f"{self.URL}/{self.id}"
+            )
+            if not response:
+                logging.error(
+                    f"Response from FMC GET with 'id', {self.id}, returned none."
+                    f"That 'id' probably was deleted."
+                )
+                return response
+            self.parse_kwargs(**response)
+            logging.info(f'GET success. Object with id: "{self.id}" fetched from FMC.')
+            return response
+        if "name" in self.__dict__:
+            if self.FILTER_BY_NAME:
+                url = f"{self.URL}?name={self.name}&expanded=true"
+            else:
+                url = f"{self.URL}?expanded=true&limit={self.limit}"
+            response = await self.fmc.asend_to_api(method="get", url=url)
+            if response is None:
+                logging.error(f"GET query for {self.name} failed.")
+                return None
+            response.setdefault("items", [])
+            for item in response["items"]:
+                if item.get("name") == self.name:
+                    self.id = item["id"]
+                    self.parse_kwargs(**item)
+                    logging.info(
+                        f'GET success. Object with name: "{self.name}" and id: "{self.id}" '
+                        f"fetched from FMC."
+                    )
+                    return item
+            logging.warning(f"\tGET query for {self.name} is not found.")
+            return response
+        logging.debug(
+            "GET query for object with no name or id set.  "
+            "Returning full list of these object types instead."
+        )
+        response = await self.fmc.asend_to_api(
+            method="get", url=f"{self.URL}?expanded=true&limit={self.limit}"
+        )
+        if response is None:
+            logging.error("GET failed.  No data in API response.")
+            return None
+        response.setdefault("items", [])
+        return response
+
+    async def apost(self, **kwargs):
+        """
+        Awaitable post().  Needs an AsyncFMC.
+
+        :return: requests response
+        """
+        logging.debug("In apost() for APIClassTemplate class.")
+        if self.fmc.serverVersion < self.FIRST_SUPPORTED_FMC_VERSION:
+            logging.error(
+                f"Your FMC version, {self.fmc.serverVersion} does not support POST of this feature."
+            )
+            return False
+        if "id" in self.__dict__:
+            logging.info(
+                "ID value exists for this object.  Redirecting to aput() method."
+            )
+            return await self.aput()
+        if not self.valid_for_post():
+            logging.warning(
+                "apost() method failed due to failure to pass valid_for_post() test."
+            )
+            return False
+        if self.dry_run:
+            logging.info(
+                "Dry Run enabled.  Not actually sending to FMC.  Here is what would have been sent:"
+            )
+            logging.info("\tMethod = POST")
+            logging.info(f"\tURL = {self.URL}")
+            logging.info(f"\tJSON = {self.show_json}")
+            return False
+        response = await self.fmc.asend_to_api(
+            method="post", url=self.URL, json_data=self.format_data()
+        )
+        if response:
+            self.parse_kwargs(**response)
+            self.invalidate_cache()
+            logging.info(
+                f'POST success. Object with id: "{self.__dict__.get("id")}" created in FMC.'
+            )
+        else:
+            logging.warning("POST failure.  No data in API response.")
+        return response
+
+    async def aput(self, **kwargs):
+        """
+        Awaitable put().  Needs an AsyncFMC.
+
+        :return: requests response
+        """
+        logging.debug("In aput() for APIClassTemplate class.")
+        self.parse_kwargs(**kwargs)
+        if self.fmc.serverVersion < self.FIRST_SUPPORTED_FMC_VERSION:
+            logging.error(
+                f"Your FMC version, {self.fmc.serverVersion} does not support PUT of this feature."
+            )
+            return False
+        if not self.valid_for_put():
+            logging.warning(
+                "aput() method failed due to failure to pass valid_for_put() test."
+            )
+            return False
+        url = f"{self.URL}/{self.id}"
+        if self.dry_run:
+            logging.info(
+                "Dry Run enabled.  Not actually sending to FMC.  Here is what would have been sent:"
+            )
+            logging.info("\tMethod = PUT")
+            logging.info(f"\tURL = {url}")
+            logging.info(f"\tJSON = {self.show_json}")
+            return False
+        response = await self.fmc.asend_to_api(
+            method="put", url=url, json_data=self.format_data()
+        )
+        if response:
+            self.parse_kwargs(**response)
+            self.invalidate_cache()
+            logging.info(f'PUT success. Object with id: "{self.id}" updated in FMC.')
+        return response
+
+    async def adelete(self, **kwargs):
+        """
+        Awaitable delete().  Needs an AsyncFMC.
+
+        :return: requests response
+        """
+        logging.debug("In adelete() for APIClassTemplate class.")
+        self.parse_kwargs(**kwargs)
+        if self.fmc.serverVersion < self.FIRST_SUPPORTED_FMC_VERSION:
+            logging.error(
+                f"Your FMC version, {self.fmc.serverVersion} does not support DELETE of this feature."
+            )
+            return False
+        if not self.valid_for_delete():
+            logging.warning(
+                "adelete() method failed due to failure to pass valid_for_delete() test."
+            )
+            return False
+        url = f"{self.URL}/{self.id}"
+        if self.dry_run:
+            logging.info(
+                "Dry Run enabled.  Not actually sending to FMC.  Here is what would have been sent:"
+            )
+            logging.info("\tMethod = DELETE")
+            logging.info(f"\tURL = {url}")
+            return False
+        response = await self.fmc.asend_to_api(method="delete", url=url)
+        if response:
+            self.parse_kwargs(**response)
+            self.invalidate_cache()
+            logging.info(f'DELETE success. Object id: "{self.id}" deleted in FMC.')
+        return response
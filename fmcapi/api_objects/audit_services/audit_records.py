@@ -30,7 +30,10 @@ class AuditRecords(APIClassTemplate):
         super().__init__(fmc, **kwargs)
         logging.debug("In __init__() for AuditRecords class.")
         self.url_parameters = ""
-        self.URL = f"{self.fmc.platform_url}/domain/{self.fmc.uuid}{self.URL_SUFFIX}"
+        self.base_url = (
+            f"{self.fmc.platform_url}/domain/{self.fmc.uuid}{self.URL_SUFFIX}"
+        )
+        self.URL = self.base_url
         self.parse_kwargs(**kwargs)
 
     def parse_kwargs(self, **kwargs):
@@ -55,7 +58,7 @@ class AuditRecords(APIClassTemplate):
             self.url_parameters += f"limit={kwargs['limit']}&"
         if tmp is not self.url_parameters:
             self.url_parameters = self.url_parameters[:-1]
-        self.URL += self.url_parameters
+            self.URL = f"{self.base_url}?{self.url_parameters}"
 
     def get(self):
         """
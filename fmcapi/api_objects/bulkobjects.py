@@ -0,0 +1,210 @@
+"""Bulk POST/PUT/DELETE for any API object whose FMC endpoint supports "bulk=true"."""
+
+from .helper_functions import chunk_json_items
+import logging
+
+logging.debug(f"In the {__name__} module.")
+
+
+class BulkObjects(object):
+    """
+    Create, update or delete many objects of one type with as few API calls as possible.
+
+    Objects are serialized with format_data() and sent in chunks of at most MAX_SIZE_QTY objects and at most the
+    FMC's FMC_MAX_PAYLOAD bytes of JSON.  The FMC rejects a whole chunk when one of its objects is bad, so a rejected
+    chunk is retried one object at a time to find out which objects failed.  post(), put() and delete() return one
+    result per object, in the order the objects were added: {"name": ..., "id": ..., "error": None or (str)}.
+
+    Only types that list the method in their BULK_METHODS can be sent in bulk.
+    """
+
+    MAX_SIZE_QTY = 1000
+    # DELETE sends the ids in the URL rather than in the payload.
+    MAX_DELETE_QTY = 100
+
+    def __init__(self, fmc, objects=None):
+        """
+        Initialize BulkObjects object.
+
+        :param fmc (object):  FMC object
+        :param objects (list): APIClassTemplate objects, all of the same type.  (Default is None, add them later)
+        :return: None
+        """
+        logging.debug("In __init__() for BulkObjects class.")
+        self.fmc = fmc
+        self.objects = []
+        for obj in objects or []:
+            self.add(obj)
+
+    def add(self, obj):
+        """
+        Add an object to the list of objects to send to FMC.
+
+        :param obj: (object) APIClassTemplate object of the same type as the objects already added.
+        :return: None
+        """
+        if self.objects and type(obj) is not type(self.objects[0]):
+            logging.warning(
+                f"Cannot add a {type(obj).__name__} object to a bulk list of {type(self.objects[0]).__name__} "
+                f"objects."
+            )
+            return
+        self.objects.append(obj)
+        logging.debug(f"Adding {obj.__dict__.get('name')} to bulk objects list.")
+
+    def clear(self):
+        """
+        Empty out the list of objects to send to FMC.
+
+        :return: None
+        """
+        logging.info("Clearing bulk objects list.")
+        self.objects = []
+
+    def valid_for_bulk(self, method):
+        """
+        Check that the objects' type supports this bulk method.
+
+        :param method: (str) 'post', 'put' or 'delete'
+        :return: (boolean)
+        """
+        logging.debug("In valid_for_bulk() for BulkObjects class.")
+        if not self.objects:
+            logging.warning(f"No objects to bulk {method.upper()}.")
+            return False
+        if method not in self.objects[0].BULK_METHODS:
+            logging.error(
+                f"The FMC does not support bulk {method.upper()} of {type(self.objects[0]).__name__} objects."
+            )
+            return False
+        return True
+
+    def post(self):
+        """
+        Create all the objects in the FMC.
+
+        :return: (list) Result of each object.
+        """
+        logging.debug("In post() for BulkObjects class.")
+        if not self.valid_for_bulk(method="post"):
+            return False
+        return self.send(method="post", valid=lambda obj: obj.valid_for_post())
+
+    def put(self):
+        """
+        Update all the objects in the FMC.
+
+        :return: (list) Result of each object.
+        """
+        logging.debug("In put() for BulkObjects class.")
+        if not self.valid_for_bulk(method="put"):
+            return False
+        return self.send(method="put", valid=lambda obj: obj.valid_for_put())
+
+    def delete(self):
+        """
+        Delete all the objects from the FMC.
+
+        :return: (list) Result of each object.
+        """
+        logging.debug("In delete() for BulkObjects class.")
+        if not self.valid_for_bulk(method="delete"):
+            return False
+        return self.send(method="delete", valid=lambda obj: obj.valid_for_delete())
+
+    def send(self, method, valid):
+        """
+        Chunk the valid objects, send each chunk and gather the result of each object.
+
+        :param method: (str) 'post', 'put' or 'delete'
+        :param valid: (function) Takes an object and returns whether it can be sent.
+        :return: (list) Result of each object.
+        """
+        results = {}
+        pending = []
+        for obj in self.objects:
+            if valid(obj):
+                pending.append(obj)
+            else:
+                results[id(obj)] = self.result(
+                    obj, error=f"Failed valid_for_{method}() test."
+                )
+        url = f"{self.objects[0].URL}?bulk=true"
+        if method == "delete":
+            chunks = [
+                pending[i : i + self.MAX_DELETE_QTY]
+                for i in range(0, len(pending), self.MAX_DELETE_QTY)
+            ]
+        else:
+            chunks = []
+            offset = 0
+            for chunk in chunk_json_items(
+                [obj.format_data() for obj in pending],
+                max_items=self.MAX_SIZE_QTY,
+                max_bytes=self.fmc.FMC_MAX_PAYLOAD,
+            ):
+                chunks.append(pending[offset : offset + len(chunk)])
+                offset += len(chunk)
+        for chunk in chunks:
+            logging.info(
+                f"Bulk {method.upper()} of {len(chunk)} {type(chunk[0]).__name__} objects."
+            )
+            for obj, result in zip(chunk, self.send_chunk(method, url, chunk)):
+                results[id(obj)] = result
+        self.fmc.object_cache.invalidate_many(items=[obj.__dict__ for obj in pending])
+        return [results[id(obj)] for obj in self.objects]
+
+    def send_chunk(self, method, url, chunk):
+        """
+        Send one chunk in one API call, falling back to one API call per object if the FMC rejects it.
+
+        :param method: (str) 'post', 'put' or 'delete'
+        :param url: (str) Bulk URL of the objects' type.
+        :param chunk: (list) Objects to send.
+        :return: (list) Result of each object in chunk.
+        """
+        if method == "delete":
+            ids = ",".join(obj.id for obj in chunk)
+            response = self.fmc.send_to_api(
+                method="delete", url=f"{url}&filter=ids:{ids}"
+            )
+        else:
+            response = self.fmc.send_to_api(
+                method=method,
+                url=url,
+                json_data=[obj.format_data() for obj in chunk],
+            )
+        if response is not None:
+            items = response.get("items", [])
+            if method != "delete" and len(items) == len(chunk):
+                # The FMC answers with the objects in the order they were sent.
+                for obj, item in zip(chunk, items):
+                    obj.parse_kwargs(**item)
+            return [self.result(obj) for obj in chunk]
+        if len(chunk) == 1:
+            return [self.result(chunk[0], error=f"{method.upper()} failed.")]
+        logging.warning(
+            f"Bulk {method.upper()} of {len(chunk)} objects failed.  Sending them one at a time instead."
+        )
+        results = []
+        for obj in chunk:
+            if getattr(obj, method)():
+                results.append(self.result(obj))
+            else:
+                results.append(self.result(obj, error=f"{method.upper()} failed."))
+        return results
+
+    @staticmethod
+    def result(obj, error=None):
+        """
+        Summarize what happened to one object.
+
+        :param obj: (object) APIClassTemplate object.
+        :param error: (str) Why it failed or None if it succeeded.
+        :return: (dict) name, id and error.
+        """
+        return {
+            "name": obj.__dict__.get("name"),
+            "id": obj.__dict__.get("id"),
+            "error": error,
+        }
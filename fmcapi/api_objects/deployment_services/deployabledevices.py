@@ -14,7 +14,9 @@ class DeployableDevices(
     """
 
     URL_SUFFIX = "/deployment/deployabledevices?expanded=true"
+    # Max seconds, after the last change made through this FMC object, for the FMC to list the devices it affects.
     WAIT_TIME = 15
+    POLL_INTERVAL = 1
 
     def __init__(self, fmc):
         """
@@ -25,11 +27,6 @@ class DeployableDevices(
         """
         logging.debug("In __init__ for DeployableDevices() class.")
 
-        logging.info(
-            f"Waiting {self.WAIT_TIME} seconds to allow the FMC to update the list of deployable devices."
-        )
-        time.sleep(self.WAIT_TIME)
-
         self.fmc = fmc
         self.URL = f"{self.fmc.configuration_url}{self.URL_SUFFIX}"
 
@@ -37,21 +34,34 @@ class DeployableDevices(
         """
         Use GET API call to query FMC for a list of devices that need configuration updates pushed to them.
 
+        The FMC takes a few seconds to list the devices affected by a change.  If changes were made through this FMC
+        object less than WAIT_TIME seconds ago and no device is listed yet, ask again with a doubling interval until
+        one is or WAIT_TIME seconds have passed since the change.  Otherwise the first answer is final.
+
         :return: (list) uuids
         """
         logging.debug("GET method for API for DeployableDevices.")
-        logging.info("Getting a list of deployable devices.")
-        response = self.fmc.send_to_api(method="get", url=self.URL)
-        # Now to parse the response list to get the UUIDs of each device.
-        if "items" not in response:
-            return
-        uuids = []
-        for item in response["items"]:
-            if not item["canBeDeployed"]:
-                pass
-            else:
-                uuids.append(item)
-        return uuids
+        last_write = getattr(self.fmc, "last_write", None)
+        deadline = (last_write or 0) + self.WAIT_TIME
+        interval = self.POLL_INTERVAL
+        while True:
+            logging.info("Getting a list of deployable devices.")
+            response = self.fmc.send_to_api(method="get", url=self.URL)
+            # Now to parse the response list to get the UUIDs of each device.
+            uuids = []
+            for item in (response or {}).get("items", []):
+                if not item["canBeDeployed"]:
+                    pass
+                else:
+                    uuids.append(item)
+            remaining = deadline - time.monotonic()
+            if uuids or remaining <= 0:
+                return uuids
+            logging.info(
+                f"No deployable devices yet.  Checking again in {min(interval, remaining):.0f} seconds."
+            )
+            time.sleep(min(interval, remaining))
+            interval *= 2
 
     def post(self):
         """POST method for API for DeployableDevices not supported."""
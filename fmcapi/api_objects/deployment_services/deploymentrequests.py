@@ -45,6 +45,21 @@ class DeploymentRequests(
         if not self.uuids:
             logging.info("No devices need deployed.")
             return
+        json_data = self.deployment_request(devices=self.uuids)
+        logging.info("Deploying changes to devices.")
+        response = self.fmc.send_to_api(
+            method="post", url=self.URL, json_data=json_data
+        )
+        return response["deviceList"]
+
+    def deployment_request(self, devices):
+        """
+        Build the DeploymentRequest payload for a list of deployable devices.
+
+        :param devices: (list) Deployable devices as returned by DeployableDevices().get().
+        :return: (dict) json_data
+        """
+        logging.debug("In deployment_request() method for DeploymentRequests() class.")
         json_data = {
             "type": "DeploymentRequest",
             "forceDeploy": True,
@@ -52,18 +67,14 @@ class DeploymentRequests(
             "version": str(int(1000000 * datetime.datetime.utcnow().timestamp())),
             "deviceList": [],
         }
-        for device in self.uuids:
+        for device in devices:
             logging.info(f"Adding device {device} to deployment queue.")
             json_data["deviceList"].append(device["device"]["id"])
             # From the list of deployable devices get the version value that is smallest.
             if int(json_data["version"]) > int(device["version"]):
                 logging.info(f"Updating version to {device['version']}")
                 json_data["version"] = device["version"]
-        logging.info("Deploying changes to devices.")
-        response = self.fmc.send_to_api(
-            method="post", url=self.URL, json_data=json_data
-        )
-        return response["deviceList"]
+        return json_data
 
     def put(self):
         """PUT method for API for DeploymentRequests not supported."""
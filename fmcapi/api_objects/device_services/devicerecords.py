@@ -2,7 +2,6 @@
 
 from fmcapi.api_objects.apiclasstemplate import APIClassTemplate
 from fmcapi.api_objects.policy_services.accesspolicies import AccessPolicies
-from fmcapi.api_objects.status_services import TaskStatuses
 import time
 import logging
 import warnings
@@ -123,10 +122,9 @@ class DeviceRecords(APIClassTemplate):
         :return: None
         """
         logging.debug("In acp() for DeviceRecords class.")
-        acp = AccessPolicies(fmc=self.fmc)
-        acp.get(name=name)
-        if "id" in acp.__dict__:
-            self.accessPolicy = {"id": acp.id, "type": acp.type}
+        acp = self.fmc.object_cache.get(api_class=AccessPolicies, name=name)
+        if acp is not None:
+            self.accessPolicy = {"id": acp["id"], "type": acp["type"]}
         else:
             logging.warning(
                 f"Access Control Policy {name} not found.  Cannot set up accessPolicy for DeviceRecords."
@@ -136,60 +134,54 @@ class DeviceRecords(APIClassTemplate):
         """
         Pause configuration script and wait for device registration to complete.
 
+        Task Status for new device registration behaves differently than other tasks.  On new device registration, a
+        task is sent for the initial registration.  After completion the UUID is deleted without any change in task
+        status, so a task that no longer exists is taken as complete.  After registration, discovery of the device
+        begins, but there is no way to check for this with a task status.  The device can't be modified during this
+        time, but a new device registration can begin.
+
+        OTOH, a device HA operation will update its status to "Success" on completion.
+
         :param task: (dict) task["id": (str)]
-        :param wait_time: (int) Seconds to wait before rechecking.
-        :return: None
+        :param wait_time: (int) Seconds before the first recheck.  Later rechecks back off from there.
+        :return: (dict) Last task status or None if the task no longer exists.
         """
-        task_completed_states = ["Success", "SUCCESS", "COMPLETED"]
-        try:
-            status = TaskStatuses(fmc=self.fmc, id=task["id"])
-            current_status = status.get()
-            """
-            Task Status for new device registration behaves differently than other tasks
-            On new device registration, a task is sent for the initial registration. After completion
-            the UUID is deleted without any change in task status. So we check to see if the object no longer exists
-            to assume the registration is complete.  After registration, discovery of the device begins, but there is
-            no way to check for this with a task status.  The device can't be modified during this time, but a new
-            device registration can begin.
-
-            OTOH, a device HA operation will update its status to "Success" on completion.  Hence the two different
-            checks.
-            """
-            while (
-                current_status["status"] is not None
-                and current_status["status"] not in task_completed_states
-            ):
-                # Lot of inconsistencies with the type of data a task can return
-                if "taskType" in current_status.keys():
-                    logging.info(
-                        f"Task: {current_status['taskType']} {current_status['status']} {current_status['id']}"
-                    )
-                    time.sleep(wait_time)
-                    current_status = status.get()
-                else:
-                    logging.info(
-                        f"Task: {current_status['status']} {current_status['id']}"
-                    )
-                    time.sleep(wait_time)
-                    current_status = status.get()
-            logging.info(f"Task: {current_status['status']} {current_status['id']}")
-        except Exception as e:
-            logging.info(type(e), e)
+        logging.debug("In wait_for_task() for DeviceRecords class.")
+        return self.fmc.task_tracker.track(
+            task_id=task["id"], interval=wait_time
+        ).result()
 
     def post(self, **kwargs):
-        """POST to FMC API."""
+        """
+        POST to FMC API and wait for the registration task to finish.
+
+        :param post_wait_time: (int) Max seconds to wait for the registration.  (Default is 300)
+        :param wait: (bool) Set False to return right away and follow self.registration_task (a Future) instead.
+        :return: requests response
+        """
         logging.debug("In post() for DeviceRecords class.")
         response = super().post(**kwargs)
-        #  self.wait_for_task(task=response["metadata"]["task"], wait_time=30)  # Doesn't work yet.
         if "post_wait_time" in kwargs:
             self.post_wait_time = kwargs["post_wait_time"]
         else:
             self.post_wait_time = 300
-        logging.info(
-            f"DeviceRecords registration task submitted.  "
-            f"Waiting {self.post_wait_time} seconds for it to complete."
+        if not response:
+            return response
+        self.registration_task = self.fmc.task_tracker.track_response(
+            response, timeout=self.post_wait_time
         )
-        time.sleep(self.post_wait_time)
+        if self.registration_task is None:
+            logging.info(
+                f"DeviceRecords registration submitted.  "
+                f"Waiting {self.post_wait_time} seconds for it to complete."
+            )
+            time.sleep(self.post_wait_time)
+        elif kwargs.get("wait", True):
+            logging.info(
+                f"DeviceRecords registration task submitted.  "
+                f"Waiting up to {self.post_wait_time} seconds for it to complete."
+            )
+            self.registration_task.result()
         return response
 
 
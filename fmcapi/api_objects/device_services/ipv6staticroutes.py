@@ -84,21 +84,17 @@ class IPv6StaticRoutes(APIClassTemplate):
         logging.info("In networks() for IPv6StaticRoute class.")
         if action == "add":
             # Valid objects are IPHost, IPNetwork and NetworkGroup.
-            # Create a dictionary to contain all three object type.
-            ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-            networkgroup_json = NetworkGroups(fmc=self.fmc).get()
-            items = ipaddresses_json.get("items", []) + networkgroup_json.get(
-                "items", []
-            )
             for network in networks:
-                # Find the matching object name in the dictionary if it exists
-                net1 = list(filter(lambda i: i["name"] == network, items))
-                if len(net1) > 0:
+                # Find the matching object by name in the FMC's object cache if it exists
+                net1 = self.fmc.object_cache.find(
+                    api_classes=[NetworkAddresses, NetworkGroups], name=network
+                )
+                if net1:
                     if "selectedNetworks" in self.__dict__:
                         # Check to see if network already exists
                         exists = list(
                             filter(
-                                lambda i: i["id"] == net1[0]["id"],
+                                lambda i: i["id"] == net1["id"],
                                 self.selectedNetworks,
                             )
                         )
@@ -109,17 +105,17 @@ class IPv6StaticRoutes(APIClassTemplate):
                         else:
                             self.selectedNetworks.append(
                                 {
-                                    "type": net1[0]["type"],
-                                    "id": net1[0]["id"],
-                                    "name": net1[0]["name"],
+                                    "type": net1["type"],
+                                    "id": net1["id"],
+                                    "name": net1["name"],
                                 }
                             )
                     else:
                         self.selectedNetworks = [
                             {
-                                "type": net1[0]["type"],
-                                "id": net1[0]["id"],
-                                "name": net1[0]["name"],
+                                "type": net1["type"],
+                                "id": net1["id"],
+                                "name": net1["name"],
                             }
                         ]
                 else:
@@ -127,18 +123,15 @@ class IPv6StaticRoutes(APIClassTemplate):
                         f'Network "{network}" not found.  Cannot set up device for IPv6StaticRoute.'
                     )
         elif action == "remove":
-            ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-            networkgroup_json = NetworkGroups(fmc=self.fmc).get()
-            items = ipaddresses_json.get("items", []) + networkgroup_json.get(
-                "items", []
-            )
             for network in networks:
-                net1 = list(filter(lambda i: i["name"] == network, items))
-                if len(net1) > 0:
+                net1 = self.fmc.object_cache.find(
+                    api_classes=[NetworkAddresses, NetworkGroups], name=network
+                )
+                if net1:
                     if "selectedNetworks" in self.__dict__:
                         self.selectedNetworks = list(
                             filter(
-                                lambda i: i["id"] != net1[0]["id"],
+                                lambda i: i["id"] != net1["id"],
                                 self.selectedNetworks,
                             )
                         )
@@ -141,3 +141,97 @@ def validate_vlans(start_vlan, end_vlan=""):
         return start_vlan, end_vlan
     else:
         return 1, 4094
+
+
+def chunk_json_items(items, max_items=1000, max_bytes=2048000):
+    """
+    Split 'items' into lists of at most 'max_items' items whose JSON payload is at most 'max_bytes' long.
+
+    The size is that of the JSON array requests sends for json=chunk, not sys.getsizeof() of the Python objects.  An
+    item that is larger than 'max_bytes' on its own is put in a chunk by itself (and logged) since it can't be split.
+
+    :param items: (list) JSON serializable items.
+    :param max_items: (int) Max number of items per chunk.
+    :param max_bytes: (int) Max size of each chunk's JSON array in bytes.
+    :return: (generator) lists of items.
+    """
+    logging.debug("In chunk_json_items() helper_function.")
+    chunk = []
+    chunk_bytes = 2  # The enclosing "[" and "]".
+    for item in items:
+        item_bytes = len(json.dumps(item).encode("utf-8"))
+        separator_bytes = 2 if chunk else 0  # The ", " between items.
+        if chunk and (
+            len(chunk) >= max_items
+            or chunk_bytes + separator_bytes + item_bytes > max_bytes
+        ):
+            yield chunk
+            chunk = []
+            chunk_bytes = 2
+            separator_bytes = 0
+        if chunk_bytes + item_bytes > max_bytes:
+            logging.warning(
+                f"Item is {item_bytes} bytes which is over the {max_bytes} bytes payload limit by itself."
+            )
+        chunk.append(item)
+        chunk_bytes += separator_bytes + item_bytes
+    if chunk:
+        yield chunk
+
+
+def canonical_json(value):
+    """
+    Serialize 'value' so that equal JSON gives equal strings whatever the order of dict keys and list items.
+
+    :param value: JSON serializable value.
+    :return: (str)
+    """
+    if isinstance(value, dict):
+        members = [f"{json.dumps(k)}:{canonical_json(v)}" for k, v in value.items()]
+        return "{" + ",".join(sorted(members)) + "}"
+    if isinstance(value, list):
+        return "[" + ",".join(sorted(canonical_json(v) for v in value)) + "]"
+    return json.dumps(value)
+
+
+def json_matches(desired, current):
+    """
+    Check whether 'current' already holds everything in 'desired'.
+
+    Keys of 'current' that 'desired' doesn't have (metadata, links, the name of an object referenced by id, ...) are
+    ignored, as is the order of list items.
+
+    :param desired: (dict/list/value) What the JSON should be.
+    :param current: (dict/list/value) What the JSON is.
+    :return: (boolean)
+    """
+    return canonical_json(desired) == canonical_json(
+        json_projection(current, shape=desired)
+    )
+
+
+def json_projection(value, shape):
+    """
+    Keep only the parts of 'value' that 'shape' has.
+
+    The dicts of a list are projected on the keys found in any of the dicts of the matching list of 'shape'.
+
+    :param value: (dict/list/value) JSON to project.
+    :param shape: (dict/list/value) JSON whose keys are kept.
+    :return: Projected copy of 'value'.
+    """
+    if isinstance(shape, dict) and isinstance(value, dict):
+        return {k: json_projection(value[k], shape[k]) for k in shape if k in value}
+    if isinstance(shape, list) and isinstance(value, list):
+        item_shape = {}
+        for item in shape:
+            if isinstance(item, dict):
+                for k, v in item.items():
+                    item_shape.setdefault(k, v)
+        if not item_shape:
+            return value
+        return [
+            json_projection(item, item_shape) if isinstance(item, dict) else item
+            for item in value
+        ]
+    return value
@@ -19,6 +19,7 @@ class FQDNS(APIClassTemplate):
     ]
     VALID_FOR_KWARGS = VALID_JSON_DATA + []
     URL_SUFFIX = "/object/fqdns"
+    BULK_METHODS = ["post", "delete"]
     VALID_FOR_DNS_RESOLUTION = ["IPV4_ONLY", "IPV6_ONLY", "IPV4_AND_IPV6"]
     VALID_CHARACTERS_FOR_NAME = """[.\w\d_\- ]"""
     FIRST_SUPPORTED_FMC_VERSION = "6.3.0"
@@ -12,6 +12,7 @@ class Hosts(APIClassTemplate):
     VALID_JSON_DATA = ["id", "name", "type", "value", "description"]
     VALID_FOR_KWARGS = VALID_JSON_DATA + []
     URL_SUFFIX = "/object/hosts"
+    BULK_METHODS = ["post", "delete"]
     REQUIRED_FOR_POST = ["name", "value"]
     REQUIRED_FOR_PUT = ["id", "name", "value"]
 
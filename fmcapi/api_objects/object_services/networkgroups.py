@@ -13,6 +13,7 @@ class NetworkGroups(APIClassTemplate):
     VALID_JSON_DATA = ["id", "name", "type", "objects", "literals"]
     VALID_FOR_KWARGS = VALID_JSON_DATA + []
     URL_SUFFIX = "/object/networkgroups"
+    BULK_METHODS = ["post", "delete"]
 
     # Technically you can have objects OR literals but I'm not set up for "OR" logic, yet.
     REQUIRED_FOR_POST = ["name"]
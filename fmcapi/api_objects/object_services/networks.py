@@ -12,6 +12,7 @@ class Networks(APIClassTemplate):
     VALID_JSON_DATA = ["id", "name", "value", "description"]
     VALID_FOR_KWARGS = VALID_JSON_DATA + []
     URL_SUFFIX = "/object/networks"
+    BULK_METHODS = ["post", "delete"]
     REQUIRED_FOR_POST = ["name", "value"]
 
     def __init__(self, fmc, **kwargs):
@@ -11,6 +11,7 @@ class ProtocolPortObjects(APIClassTemplate):
     VALID_JSON_DATA = ["id", "name", "description", "port", "protocol", "type"]
     VALID_FOR_KWARGS = VALID_JSON_DATA + []
     URL_SUFFIX = "/object/protocolportobjects"
+    BULK_METHODS = ["post", "delete"]
     REQUIRED_FOR_POST = ["name", "port", "protocol"]
 
     def __init__(self, fmc, **kwargs):
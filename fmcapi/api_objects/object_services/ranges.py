@@ -12,6 +12,7 @@ class Ranges(APIClassTemplate):
     VALID_JSON_DATA = ["id", "name", "value", "description"]
     VALID_FOR_KWARGS = VALID_JSON_DATA + []
     URL_SUFFIX = "/object/ranges"
+    BULK_METHODS = ["post", "delete"]
     REQUIRED_FOR_POST = ["name", "value"]
 
     def __init__(self, fmc, **kwargs):
@@ -12,6 +12,7 @@ class URLGroups(APIClassTemplate):
     VALID_JSON_DATA = ["id", "name", "type", "objects", "literals"]
     VALID_FOR_KWARGS = VALID_JSON_DATA + []
     URL_SUFFIX = "/object/urlgroups"
+    BULK_METHODS = ["post", "delete"]
 
     # Technically you can have objects OR literals but I'm not set up for "OR" logic, yet.
     REQUIRED_FOR_POST = ["name", "objects"]
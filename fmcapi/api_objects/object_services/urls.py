@@ -11,6 +11,7 @@ class URLs(APIClassTemplate):
     VALID_JSON_DATA = ["id", "name", "url", "description"]
     VALID_FOR_KWARGS = VALID_JSON_DATA + []
     URL_SUFFIX = "/object/urls"
+    BULK_METHODS = ["post", "delete"]
     REQUIRED_FOR_POST = ["name", "url"]
 
     def __init__(self, fmc, **kwargs):
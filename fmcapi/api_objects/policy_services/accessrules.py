@@ -14,10 +14,12 @@ from fmcapi.api_objects.object_services.networkaddresses import NetworkAddresses
 from fmcapi.api_objects.policy_services.filepolicies import FilePolicies
 from fmcapi.api_objects.object_services.isesecuritygrouptags import ISESecurityGroupTags
 from fmcapi.api_objects.helper_functions import get_networkaddress_type
+from fmcapi.api_objects.helper_functions import chunk_json_items
 from fmcapi.api_objects.object_services.applications import Applications
 from fmcapi.api_objects.object_services.applicationfilters import ApplicationFilters
+from concurrent.futures import ThreadPoolExecutor
 import logging
-import sys
+import re
 import warnings
 
 
@@ -59,6 +61,7 @@ class AccessRules(APIClassTemplate):
         "section",
     ]
     PREFIX_URL = "/policy/accesspolicies"
+    BULK_METHODS = ["post", "put", "delete"]
     REQUIRED_FOR_POST = ["name", "acp_id"]
     REQUIRED_FOR_GET = ["acp_id"]
     VALID_FOR_ACTION = [
@@ -477,16 +480,16 @@ class AccessRules(APIClassTemplate):
         """
         logging.debug("In source_port() for AccessRules class.")
         if action == "add":
-            pport_json = ProtocolPortObjects(fmc=self.fmc)
-            pport_json.get(name=name)
-            if "id" in pport_json.__dict__:
-                item = pport_json
-            else:
-                item = PortObjectGroups(fmc=self.fmc)
-                item.get(name=name)
-            if "id" in item.__dict__:
+            item = self.fmc.object_cache.find(
+                api_classes=[ProtocolPortObjects, PortObjectGroups], name=name
+            )
+            if item:
                 if "sourcePorts" in self.__dict__:
-                    new_port = {"name": item.name, "id": item.id, "type": item.type}
+                    new_port = {
+                        "name": item["name"],
+                        "id": item["id"],
+                        "type": item["type"],
+                    }
                     duplicate = False
                     if "objects" not in self.sourcePorts:
                         self.__dict__["sourcePorts"]["objects"] = []
@@ -502,7 +505,11 @@ class AccessRules(APIClassTemplate):
                 else:
                     self.sourcePorts = {
                         "objects": [
-                            {"name": item.name, "id": item.id, "type": item.type}
+                            {
+                                "name": item["name"],
+                                "id": item["id"],
+                                "type": item["type"],
+                            }
                         ]
                     }
                     logging.info(
@@ -514,11 +521,14 @@ class AccessRules(APIClassTemplate):
                     f"not found.  Cannot add to AccessRules."
                 )
         elif action == "addgroup":
-            item = PortObjectGroups(fmc=self.fmc)
-            item.get(name=name)
-            if "id" in item.__dict__:
+            item = self.fmc.object_cache.get(api_class=PortObjectGroups, name=name)
+            if item:
                 if "sourcePorts" in self.__dict__:
-                    new_port = {"name": item.name, "id": item.id, "type": item.type}
+                    new_port = {
+                        "name": item["name"],
+                        "id": item["id"],
+                        "type": item["type"],
+                    }
                     duplicate = False
                     if "objects" not in self.sourcePorts:
                         self.__dict__["sourcePorts"]["objects"] = []
@@ -534,7 +544,11 @@ class AccessRules(APIClassTemplate):
                 else:
                     self.sourcePorts = {
                         "objects": [
-                            {"name": item.name, "id": item.id, "type": item.type}
+                            {
+                                "name": item["name"],
+                                "id": item["id"],
+                                "type": item["type"],
+                            }
                         ]
                     }
                     logging.info(
@@ -546,14 +560,10 @@ class AccessRules(APIClassTemplate):
                     f"not found.  Cannot add to AccessRules."
                 )
         elif action == "remove":
-            pport_json = ProtocolPortObjects(fmc=self.fmc)
-            pport_json.get(name=name)
-            if "id" in pport_json.__dict__:
-                item = pport_json
-            else:
-                item = PortObjectGroups(fmc=self.fmc)
-                item.get(name=name)
-            if "id" in item.__dict__:
+            item = self.fmc.object_cache.find(
+                api_classes=[ProtocolPortObjects, PortObjectGroups], name=name
+            )
+            if item:
                 if "sourcePorts" in self.__dict__:
                     objects = []
                     for obj in self.sourcePorts["objects"]:
@@ -587,16 +597,16 @@ class AccessRules(APIClassTemplate):
         """
         logging.debug("In destination_port() for AccessRules class.")
         if action == "add":
-            pport_json = ProtocolPortObjects(fmc=self.fmc)
-            pport_json.get(name=name)
-            if "id" in pport_json.__dict__:
-                item = pport_json
-            else:
-                item = PortObjectGroups(fmc=self.fmc)
-                item.get(name=name)
-            if "id" in item.__dict__:
+            item = self.fmc.object_cache.find(
+                api_classes=[ProtocolPortObjects, PortObjectGroups], name=name
+            )
+            if item:
                 if "destinationPorts" in self.__dict__:
-                    new_port = {"name": item.name, "id": item.id, "type": item.type}
+                    new_port = {
+                        "name": item["name"],
+                        "id": item["id"],
+                        "type": item["type"],
+                    }
                     duplicate = False
                     if "objects" not in self.destinationPorts:
                         self.__dict__["destinationPorts"]["objects"] = []
@@ -612,7 +622,11 @@ class AccessRules(APIClassTemplate):
                 else:
                     self.destinationPorts = {
                         "objects": [
-                            {"name": item.name, "id": item.id, "type": item.type}
+                            {
+                                "name": item["name"],
+                                "id": item["id"],
+                                "type": item["type"],
+                            }
                         ]
                     }
                     logging.info(
@@ -624,11 +638,14 @@ class AccessRules(APIClassTemplate):
                     f"not found.  Cannot add to AccessRules."
                 )
         if action == "addgroup":
-            item = PortObjectGroups(fmc=self.fmc)
-            item.get(name=name)
-            if "id" in item.__dict__:
+            item = self.fmc.object_cache.get(api_class=PortObjectGroups, name=name)
+            if item:
                 if "destinationPorts" in self.__dict__:
-                    new_port = {"name": item.name, "id": item.id, "type": item.type}
+                    new_port = {
+                        "name": item["name"],
+                        "id": item["id"],
+                        "type": item["type"],
+                    }
                     duplicate = False
                     if "objects" not in self.destinationPorts:
                         self.__dict__["destinationPorts"]["objects"] = []
@@ -644,7 +661,11 @@ class AccessRules(APIClassTemplate):
                 else:
                     self.destinationPorts = {
                         "objects": [
-                            {"name": item.name, "id": item.id, "type": item.type}
+                            {
+                                "name": item["name"],
+                                "id": item["id"],
+                                "type": item["type"],
+                            }
                         ]
                     }
                     logging.info(
@@ -656,14 +677,10 @@ class AccessRules(APIClassTemplate):
                     f"not found.  Cannot add to AccessRules."
                 )
         elif action == "remove":
-            pport_json = ProtocolPortObjects(fmc=self.fmc)
-            pport_json.get(name=name)
-            if "id" in pport_json.__dict__:
-                item = pport_json
-            else:
-                item = PortObjectGroups(fmc=self.fmc)
-                item.get(name=name)
-            if "id" in item.__dict__:
+            item = self.fmc.object_cache.find(
+                api_classes=[ProtocolPortObjects, PortObjectGroups], name=name
+            )
+            if item:
                 if "destinationPorts" in self.__dict__:
                     objects = []
                     for obj in self.destinationPorts["objects"]:
@@ -716,23 +733,16 @@ class AccessRules(APIClassTemplate):
                     f'Adding literal "{literal}" of type "{type_}" to sourceNetworks for this AccessRules.'
                 )
             else:
-                ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-                networkgroup_json = NetworkGroups(fmc=self.fmc).get()
-                fqdns_json = FQDNS(fmc=self.fmc).get()
-                items = (
-                    ipaddresses_json.get("items", [])
-                    + networkgroup_json.get("items", [])
-                    + fqdns_json.get("items", [])
+                item = self.fmc.object_cache.find(
+                    api_classes=[NetworkAddresses, NetworkGroups, FQDNS], name=name
                 )
                 new_net = None
-                for item in items:
-                    if item["name"] == name:
-                        new_net = {
-                            "name": item["name"],
-                            "id": item["id"],
-                            "type": item["type"],
-                        }
-                        break
+                if item:
+                    new_net = {
+                        "name": item["name"],
+                        "id": item["id"],
+                        "type": item["type"],
+                    }
                 if new_net is None:
                     logging.warning(
                         f'Network "{name}" is not found in FMC.  Cannot add to sourceNetworks.'
@@ -846,26 +856,17 @@ class AccessRules(APIClassTemplate):
                     f"to destinationNetworks for this AccessRules."
                 )
             else:
-                ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-                networkgroup_json = NetworkGroups(fmc=self.fmc).get()
+                api_classes = [NetworkAddresses, NetworkGroups]
                 if self.fmc.serverVersion >= "6.4":
-                    fqdns_json = FQDNS(fmc=self.fmc).get()
-                else:
-                    fqdns_json = {"items": []}
-                items = (
-                    ipaddresses_json.get("items", [])
-                    + networkgroup_json.get("items", [])
-                    + fqdns_json.get("items", [])
-                )
+                    api_classes.append(FQDNS)
+                item = self.fmc.object_cache.find(api_classes=api_classes, name=name)
                 new_net = None
-                for item in items:
-                    if item["name"] == name:
-                        new_net = {
-                            "name": item["name"],
-                            "id": item["id"],
-                            "type": item["type"],
-                        }
-                        break
+                if item:
+                    new_net = {
+                        "name": item["name"],
+                        "id": item["id"],
+                        "type": item["type"],
+                    }
                 if new_net is None:
                     logging.warning(
                         f'Network "{name}" is not found in FMC.  Cannot add to destinationNetworks.'
@@ -1225,6 +1226,7 @@ class Bulk(object):
 
     MAX_SIZE_QTY = 1000
     MAX_SIZE_IN_BYTES = 2048000
+    MAX_DELETE_QTY = 100
     REQUIRED_FOR_POST = []
 
     @property
@@ -1302,26 +1304,155 @@ class Bulk(object):
         """
         Send list of self.items to FMC as a bulk import.
 
-        :return: (str) requests response from FMC
+        Chunks are POSTed one after another, in order, since each chunk is placed relative to the rules already in
+        the ACP (end of section/category or insertBefore/insertAfter) and concurrent chunks would land out of order.
+
+        :return: (dict) {"items": [...], "failed": [...]} The rules created and the rules in chunks the FMC rejected.
+        """
+        logging.debug("In post() for Bulk class.")
+        url = f"{self.URL}{self.URL_SUFFIX}"
+        url = f"{url}&bulk=true" if "?" in url else f"{url}?bulk=true"
+        return self.send(method="post", url=url)
+
+    def put(self, workers=1):
+        """
+        Send list of self.items (which must have an "id") to FMC as a bulk update.
+
+        With insertBefore or insertAfter set the rules are also moved to that position, in the order of self.items.
+        The chunks are then sent one at a time whatever workers is.
+
+        :param workers: (int) Max number of chunks sent concurrently.  (Default is 1)
+        :return: (dict) {"items": [...], "failed": [...]} The rules updated and the rules in chunks the FMC rejected.
+        """
+        logging.debug("In put() for Bulk class.")
+        url = f"{self.URL}{self.URL_SUFFIX}"
+        url = f"{url}&bulk=true" if "?" in url else f"{url}?bulk=true"
+        return self.send(method="put", url=url, workers=workers)
+
+    def delete(self, workers=1):
+        """
+        Delete the rules in self.items (which must have an "id") from the FMC in bulk.
+
+        :param workers: (int) Max number of chunks sent concurrently.  (Default is 1)
+        :return: (dict) {"items": [...], "failed": [...]} The rules deleted and the rules in chunks the FMC rejected.
+        """
+        logging.debug("In delete() for Bulk class.")
+        return self.send(method="delete", url=f"{self.URL}?bulk=true", workers=workers)
+
+    def chunks(self, method):
+        """
+        Break up self.items into chunks of at most MAX_SIZE_QTY rules and MAX_SIZE_IN_BYTES bytes of JSON.
+
+        :param method: (str) 'post', 'put' or 'delete'
+        :return: (list) Lists of items.
+        """
+        if method == "delete":
+            # The ids travel in the URL rather than in the payload.
+            return [
+                self.items[i : i + self.MAX_DELETE_QTY]
+                for i in range(0, len(self.items), self.MAX_DELETE_QTY)
+            ]
+        return list(
+            chunk_json_items(
+                self.items,
+                max_items=self.MAX_SIZE_QTY,
+                max_bytes=self.MAX_SIZE_IN_BYTES,
+            )
+        )
+
+    def send_positioned(self, method, url, chunks, position):
+        """
+        Send the chunks one after another, each placed right after the rules of the previous one.
+
+        With the same insertBefore/insertAfter for every chunk the chunks would land in reverse order.  The index of
+        the last rule of each chunk accepted is taken from its metadata's "ruleIndex" when the FMC returns it and is
+        otherwise worked out from the number of rules sent.
+
+        :param method: (str) 'post' or 'put'
+        :param url: (str) Bulk URL with position set.
+        :param chunks: (list) Lists of items.
+        :param position: (str) 'insertBefore' or 'insertAfter'
+        :return: (list) The FMC's response to each chunk, None for the chunks it rejected.
         """
-        # Build URL
-        self.URL = f"{self.URL}{self.URL_SUFFIX}&bulk=true"
-
-        # Break up the items into MAX_BULK_POST_SIZE chunks.
-        chunks = [
-            self.items[i * self.MAX_SIZE_QTY : (i + 1) * self.MAX_SIZE_QTY]
-            for i in range(
-                (len(self.items) + self.MAX_SIZE_QTY - 1) // self.MAX_SIZE_QTY
+        index = int(self.__dict__[position])
+        responses = []
+        for chunk in chunks:
+            response = self.send_chunk(
+                method,
+                re.sub(rf"([?&]){position}=[^&]*", rf"\g<1>{position}={index}", url),
+                chunk,
             )
-        ]
+            responses.append(response)
+            if response is None:
+                continue
+            items = response.get("items") or [{}]
+            last = items[-1].get("metadata", {}).get("ruleIndex")
+            if last is None:
+                index += len(chunk)
+            else:
+                index = int(last) + 1 if position == "insertBefore" else int(last)
+        return responses
 
-        # Post the chunks
-        for item in chunks:
-            # I'm not sure what to do about the max bytes right now so I'll just throw a warning message.
-            if sys.getsizeof(item, 0) > self.MAX_SIZE_IN_BYTES:
-                logging.warning(
-                    f"This chunk of the post is too large.  Please submit less items to be bulk posted."
+    def send_chunk(self, method, url, chunk):
+        """
+        Send one chunk of items to the FMC.
+
+        :param method: (str) 'post', 'put' or 'delete'
+        :param url: (str) Bulk URL.
+        :param chunk: (list) Items to send.
+        :return: (dict) requests response from FMC or None if the FMC rejected the chunk.
+        """
+        logging.info(f"Bulk {method.upper()} of {len(chunk)} rules.")
+        if method == "delete":
+            ids = ",".join(item["id"] for item in chunk)
+            return self.fmc.send_to_api(method="delete", url=f"{url}&filter=ids:{ids}")
+        return self.fmc.send_to_api(method=method, url=url, json_data=chunk)
+
+    def send(self, method, url, workers=1):
+        """
+        Send all of self.items in chunks and gather the FMC's responses, in order.
+
+        :param method: (str) 'post', 'put' or 'delete'
+        :param url: (str) Bulk URL.
+        :param workers: (int) Max number of chunks sent concurrently.  (Default is 1)
+        :return: (dict) {"items": [...], "failed": [...]}
+        """
+        chunks = self.chunks(method=method)
+        position = None
+        if method != "delete":
+            position = next(
+                (
+                    key
+                    for key in ["insertBefore", "insertAfter"]
+                    if key in self.__dict__
+                ),
+                None,
+            )
+        if position is not None:
+            if workers > 1:
+                logging.info(
+                    f"Bulk {method.upper()} with {position} set sends its chunks one at a time."
+                )
+            responses = self.send_positioned(
+                method=method, url=url, chunks=chunks, position=position
+            )
+        elif workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                # map() hands back the responses in the order of the chunks.
+                responses = list(
+                    executor.map(
+                        lambda chunk: self.send_chunk(method, url, chunk), chunks
+                    )
                 )
-            response = self.fmc.send_to_api(method="post", url=self.URL, json_data=item)
-            logging.info(f"Posting to bulk items.")
-            return response
+        else:
+            responses = [self.send_chunk(method, url, chunk) for chunk in chunks]
+        results = {"items": [], "failed": []}
+        for chunk, response in zip(chunks, responses):
+            if response is None:
+                logging.error(
+                    f"Bulk {method.upper()} of {len(chunk)} rules failed.  See above for the FMC's response."
+                )
+                results["failed"].extend(chunk)
+            else:
+                results["items"].extend(response.get("items", []))
+        return results
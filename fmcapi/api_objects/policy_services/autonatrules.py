@@ -95,13 +95,10 @@ class AutoNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In original_network() for AutoNatRules class.")
-        ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-        items = ipaddresses_json.get("items", [])
+        item = self.fmc.object_cache.find(api_classes=[NetworkAddresses], name=name)
         new_net = None
-        for item in items:
-            if item["name"] == name:
-                new_net = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_net = {"id": item["id"], "type": item["type"]}
         if new_net is None:
             logging.warning(
                 f'Network "{name}" is not found in FMC.  Cannot add to originalNetwork.'
@@ -119,13 +116,10 @@ class AutoNatRules(APIClassTemplate):
         """
         # Auto Nat rules can't use network group objects
         logging.debug("In translated_network() for AutoNatRules class.")
-        ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-        items = ipaddresses_json.get("items", [])
+        item = self.fmc.object_cache.find(api_classes=[NetworkAddresses], name=name)
         new_net = None
-        for item in items:
-            if item["name"] == name:
-                new_net = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_net = {"id": item["id"], "type": item["type"]}
         if new_net is None:
             logging.warning(
                 f'Network "{name}" is not found in FMC.  Cannot add to translatedNetwork.'
@@ -144,13 +138,10 @@ class AutoNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In source_intf() for AutoNatRules class.")
-        intf_obj = InterfaceObjects(fmc=self.fmc).get()
-        items = intf_obj.get("items", [])
+        item = self.fmc.object_cache.find(api_classes=[InterfaceObjects], name=name)
         new_intf = None
-        for item in items:
-            if item["name"] == name:
-                new_intf = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_intf = {"id": item["id"], "type": item["type"]}
         if new_intf is None:
             logging.warning(
                 f'Interface Object "{name}" is not found in FMC.  Cannot add to sourceInterface.'
@@ -173,13 +164,10 @@ class AutoNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In destination_intf() for AutoNatRules class.")
-        intf_obj = InterfaceObjects(fmc=self.fmc).get()
-        items = intf_obj.get("items", [])
+        item = self.fmc.object_cache.find(api_classes=[InterfaceObjects], name=name)
         new_intf = None
-        for item in items:
-            if item["name"] == name:
-                new_intf = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_intf = {"id": item["id"], "type": item["type"]}
         if new_intf is None:
             logging.warning(
                 f'Interface Object "{name}" is not found in FMC.  Cannot add to destinationInterface.'
@@ -202,13 +190,10 @@ class AutoNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In identity_nat() for AutoNatRules class.")
-        ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-        items = ipaddresses_json.get("items", [])
+        item = self.fmc.object_cache.find(api_classes=[NetworkAddresses], name=name)
         new_net = None
-        for item in items:
-            if item["name"] == name:
-                new_net = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_net = {"id": item["id"], "type": item["type"]}
         if new_net is None:
             logging.warning(
                 f'Network "{name}" is not found in FMC.  Cannot add to this AutoNatRule.'
@@ -228,14 +213,12 @@ class AutoNatRules(APIClassTemplate):
         :return: None
         """
         # Network Group Object permitted for patPool
-        ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-        networkgroup_json = NetworkGroups(fmc=self.fmc).get()
-        items = ipaddresses_json.get("items", []) + networkgroup_json.get("items", [])
+        item = self.fmc.object_cache.find(
+            api_classes=[NetworkAddresses, NetworkGroups], name=name
+        )
         new_net = None
-        for item in items:
-            if item["name"] == name:
-                new_net = {"name": item["name"], "id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_net = {"name": item["name"], "id": item["id"], "type": item["type"]}
         if new_net is None:
             logging.warning(
                 f'Network "{name}" is not found in FMC.  Cannot add to patPool.'
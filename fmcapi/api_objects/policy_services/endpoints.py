@@ -89,20 +89,18 @@ class Endpoints(APIClassTemplate):
         :param device_name: (str) Name of device.
         """
         logging.debug("In endpoint() for Endpoints class.")
-        device_json = DeviceRecords(fmc=self.fmc).get()
-        device_ha_json = FTDDeviceHAPairs(fmc=self.fmc).get()
-        items = device_json.get("items", []) + device_ha_json.get("items", [])
         new_device = None
 
         if action == "add":
-            for item in items:
-                if item["name"] == device_name:
-                    new_device = {
-                        "name": item["name"],
-                        "id": item["id"],
-                        "type": item["type"],
-                    }
-                    break
+            item = self.fmc.object_cache.find(
+                api_classes=[DeviceRecords, FTDDeviceHAPairs], name=device_name
+            )
+            if item:
+                new_device = {
+                    "name": item["name"],
+                    "id": item["id"],
+                    "type": item["type"],
+                }
             if new_device is None:
                 logging.warning(
                     f'Device/DeviceHA "{device_name}" is not found in FMC.  Cannot add to Endpoints.'
@@ -163,24 +161,14 @@ class Endpoints(APIClassTemplate):
         :param names: (list) List of Encryption names.
         """
         logging.debug("In endpoint() for Endpoints class.")
-        fqdns_json = FQDNS(fmc=self.fmc).get()
-        host_json = Hosts(fmc=self.fmc).get()
-        net_json = Networks(fmc=self.fmc).get()
-        netg_json = NetworkGroups(fmc=self.fmc).get()
-        items = (
-            fqdns_json.get("items", [])
-            + host_json.get("items", [])
-            + net_json.get("items", [])
-            + netg_json.get("items", [])
-        )
-        new_network = None
-
         if action == "add":
             for name in names:
-                for item in items:
-                    if item["name"] == name:
-                        new_network = {"id": item["id"], "type": item["type"]}
-                        break
+                item = self.fmc.object_cache.find(
+                    api_classes=[FQDNS, Hosts, Networks, NetworkGroups], name=name
+                )
+                new_network = None
+                if item:
+                    new_network = {"id": item["id"], "type": item["type"]}
                 if new_network is None:
                     logging.warning(
                         f'FQDNS/Host/Network/Network Group"{name}" is not found in FMC.'
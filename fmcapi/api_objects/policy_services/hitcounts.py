@@ -31,7 +31,7 @@ class HitCounts(APIClassTemplate):
     ]
     ACP_PREFIX_URL = "/policy/accesspolicies"
     PREFILTER_PREFIX_URL = "/policy/prefilterpolicies"
-    REQUIRED_FOR_PUT = ["acp_id", "device_id"]
+    REQUIRED_FOR_PUT = ["device_id"]
     REQUIRED_FOR_DELETE = ["acp_id", "device_id"]
     REQUIRED_FOR_GET = ["device_id"]
     FIRST_SUPPORTED_FMC_VERSION = "6.4"
@@ -49,7 +49,9 @@ class HitCounts(APIClassTemplate):
         if self.acp_rule_ids:
             filter_string += f"ids:{','.join(self.acp_rule_ids)};"
         if self.fetchZeroHitCount:
-            filter_string += f"fetchZeroHitCount:{self._fetchZeroHitCount};"
+            filter_string += (
+                f"fetchZeroHitCount:{str(self._fetchZeroHitCount).lower()};"
+            )
 
         if filter_string == filter_init:
             filter_string += '"'
@@ -125,10 +127,9 @@ class HitCounts(APIClassTemplate):
         if device_id != "":
             self.device_id = device_id
         elif name != "":
-            device1 = DeviceRecords(fmc=self.fmc)
-            device1.get(name=name)
-            if "id" in device1.__dict__:
-                self.device_id = device1.id
+            device1 = self.fmc.object_cache.get(api_class=DeviceRecords, name=name)
+            if device1 is not None:
+                self.device_id = device1["id"]
             else:
                 logging.warning(
                     f'Device "{name}" not found.  Cannot configure device for HitCounts.'
@@ -154,10 +155,10 @@ class HitCounts(APIClassTemplate):
             self.acp_id = acp_id
             self.URL = f"{self.fmc.configuration_url}{self.ACP_PREFIX_URL}/{self.acp_id}/operational/hitcounts"
         elif name != "":
-            acp1 = AccessPolicies(fmc=self.fmc)
-            acp1.get(name=name)
-            if "id" in acp1.__dict__:
-                self.URL = f"{self.fmc.configuration_url}{self.ACP_PREFIX_URL}/{acp1.id}/operational/hitcounts"
+            acp1 = self.fmc.object_cache.get(api_class=AccessPolicies, name=name)
+            if acp1 is not None:
+                self.acp_id = acp1["id"]
+                self.URL = f"{self.fmc.configuration_url}{self.ACP_PREFIX_URL}/{self.acp_id}/operational/hitcounts"
             else:
                 logging.warning(
                     f'Access Control Policy "{name}" not found.  Cannot configure acp for HitCounts.'
@@ -239,10 +240,9 @@ class HitCounts(APIClassTemplate):
                 f"{self.prefilter_id}/operational/hitcounts"
             )
         elif name != "":
-            ppolicy1 = PreFilterPolicies(fmc=self.fmc)
-            ppolicy1.get(name=name)
-            if "id" in ppolicy1.__dict__:
-                self.prefilter_id = ppolicy1.id
+            ppolicy1 = self.fmc.object_cache.get(api_class=PreFilterPolicies, name=name)
+            if ppolicy1 is not None:
+                self.prefilter_id = ppolicy1["id"]
                 self.URL = (
                     f"{self.fmc.configuration_url}{self.PREFILTER_PREFIX_URL}/"
                     f"{self.prefilter_id}/operational/hitcounts"
@@ -262,7 +262,7 @@ class HitCounts(APIClassTemplate):
         """
         Get HitCounts based on filter criteria.
 
-        :return:
+        :return: (list) hit counts, or False if the GET failed.
         """
         logging.debug("In get() for HitCount class.")
         self.parse_kwargs(**kwargs)
@@ -281,6 +281,9 @@ class HitCounts(APIClassTemplate):
                 logging.info(f"\tURL = {self.URL}")
                 return False
             response = self.fmc.send_to_api(method="get", url=self.URL)
+            if response is None:
+                logging.error("GET of the hit counts failed.")
+                return False
             if "items" not in response:
                 response["items"] = []
             return response["items"]
@@ -291,11 +294,31 @@ class HitCounts(APIClassTemplate):
             return False
 
     def put(self, **kwargs):
-        """Though supported by FMC, API PUT method is not yet working for HitCounts in fmcapi."""
-        logging.info(
-            "Though supported by FMC, API PUT method is not yet working for HitCounts in fmcapi."
-        )
-        pass
+        """
+        Refresh the hit counts: the FMC fetches the current counts from the device.
+
+        :return: requests response
+        """
+        logging.debug("In put() for HitCounts class.")
+        self.parse_kwargs(**kwargs)
+        if self.fmc.serverVersion < self.FIRST_SUPPORTED_FMC_VERSION:
+            logging.error(
+                f"Your FMC version, {self.fmc.serverVersion} does not support PUT of this feature."
+            )
+            return False
+        if not self.device_id or not (self.acp_id or self.prefilter_id):
+            logging.warning(
+                "put() method failed.  Set the device and the AccessPolicy or PreFilter Policy first."
+            )
+            return False
+        if self.dry_run:
+            logging.info(
+                "Dry Run enabled.  Not actually sending to FMC.  Here is what would have been sent:"
+            )
+            logging.info("\tMethod = PUT")
+            logging.info(f"\tURL = {self.URL}")
+            return False
+        return self.fmc.send_to_api(method="put", url=self.URL)
 
     def delete(self, **kwargs):
         """Though supported by FMC, API DELETE method is not yet working for HitCounts in fmcapi."""
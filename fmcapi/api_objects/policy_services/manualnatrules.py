@@ -104,16 +104,10 @@ class ManualNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In original_source() for ManualNatRules class.")
-        ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-        networkgroup_json = NetworkGroups(
-            fmc=self.fmc
-        ).get()  # FIXME, shouldn't this be a part of items?
-        items = ipaddresses_json.get("items", [])
+        item = self.fmc.object_cache.find(api_classes=[NetworkAddresses], name=name)
         new_net = None
-        for item in items:
-            if item["name"] == name:
-                new_net = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_net = {"id": item["id"], "type": item["type"]}
         if new_net is None:
             logging.warning(
                 f'Network "{name}" is not found in FMC.  Cannot add to original_source.'
@@ -130,16 +124,10 @@ class ManualNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In translated_source() for ManualNatRules class.")
-        ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-        networkgroup_json = NetworkGroups(
-            fmc=self.fmc
-        ).get()  # FIXME, shouldn't this be a part of items?
-        items = ipaddresses_json.get("items", [])
+        item = self.fmc.object_cache.find(api_classes=[NetworkAddresses], name=name)
         new_net = None
-        for item in items:
-            if item["name"] == name:
-                new_net = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_net = {"id": item["id"], "type": item["type"]}
         if new_net is None:
             logging.warning(
                 f'Network "{name}" is not found in FMC.  Cannot add to translated_source.'
@@ -158,16 +146,10 @@ class ManualNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In original_destination() for ManualNatRules class.")
-        ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-        networkgroup_json = NetworkGroups(
-            fmc=self.fmc
-        ).get()  # FIXME, shouldn't this be a part of items?
-        items = ipaddresses_json.get("items", [])
+        item = self.fmc.object_cache.find(api_classes=[NetworkAddresses], name=name)
         new_net = None
-        for item in items:
-            if item["name"] == name:
-                new_net = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_net = {"id": item["id"], "type": item["type"]}
         if new_net is None:
             logging.warning(
                 f'Network "{name}" is not found in FMC.  Cannot add to original_destination.'
@@ -186,16 +168,10 @@ class ManualNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In translated_destination() for ManualNatRules class.")
-        ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-        networkgroup_json = NetworkGroups(
-            fmc=self.fmc
-        ).get()  # FIXME, shouldn't this be a part of items?
-        items = ipaddresses_json.get("items", [])
+        item = self.fmc.object_cache.find(api_classes=[NetworkAddresses], name=name)
         new_net = None
-        for item in items:
-            if item["name"] == name:
-                new_net = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_net = {"id": item["id"], "type": item["type"]}
         if new_net is None:
             logging.warning(
                 f'Network "{name}" is not found in FMC.  Cannot add to translated_destination.'
@@ -214,14 +190,12 @@ class ManualNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In original_source_port() for ManualNatRules class.")
-        ports_json = ProtocolPortObjects(fmc=self.fmc).get()
-        portgroup_json = PortObjectGroups(fmc=self.fmc).get()
-        items = ports_json.get("items", []) + portgroup_json.get("items", [])
+        item = self.fmc.object_cache.find(
+            api_classes=[ProtocolPortObjects, PortObjectGroups], name=name
+        )
         new_port = None
-        for item in items:
-            if item["name"] == name:
-                new_port = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_port = {"id": item["id"], "type": item["type"]}
         if new_port is None:
             logging.warning(
                 f'Port "{name}" is not found in FMC.  Cannot add to original_source_port.'
@@ -240,14 +214,12 @@ class ManualNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In translated_source_port() for ManualNatRules class.")
-        ports_json = ProtocolPortObjects(fmc=self.fmc).get()
-        portgroup_json = PortObjectGroups(fmc=self.fmc).get()
-        items = ports_json.get("items", []) + portgroup_json.get("items", [])
+        item = self.fmc.object_cache.find(
+            api_classes=[ProtocolPortObjects, PortObjectGroups], name=name
+        )
         new_port = None
-        for item in items:
-            if item["name"] == name:
-                new_port = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_port = {"id": item["id"], "type": item["type"]}
         if new_port is None:
             logging.warning(
                 f'Port "{name}" is not found in FMC.  Cannot add to translated_source_port.'
@@ -266,14 +238,12 @@ class ManualNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In original_destination_port() for ManualNatRules class.")
-        ports_json = ProtocolPortObjects(fmc=self.fmc).get()
-        portgroup_json = PortObjectGroups(fmc=self.fmc).get()
-        items = ports_json.get("items", []) + portgroup_json.get("items", [])
+        item = self.fmc.object_cache.find(
+            api_classes=[ProtocolPortObjects, PortObjectGroups], name=name
+        )
         new_port = None
-        for item in items:
-            if item["name"] == name:
-                new_port = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_port = {"id": item["id"], "type": item["type"]}
         if new_port is None:
             logging.warning(
                 f'Port "{name}" is not found in FMC.  Cannot add to original_destination_port.'
@@ -292,14 +262,12 @@ class ManualNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In translated_destination_port() for ManualNatRules class.")
-        ports_json = ProtocolPortObjects(fmc=self.fmc).get()
-        portgroup_json = PortObjectGroups(fmc=self.fmc).get()
-        items = ports_json.get("items", []) + portgroup_json.get("items", [])
+        item = self.fmc.object_cache.find(
+            api_classes=[ProtocolPortObjects, PortObjectGroups], name=name
+        )
         new_port = None
-        for item in items:
-            if item["name"] == name:
-                new_port = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_port = {"id": item["id"], "type": item["type"]}
         if new_port is None:
             logging.warning(
                 f'Port "{name}" is not found in FMC.  Cannot add to translated_destination_port.'
@@ -318,13 +286,10 @@ class ManualNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In source_intf() for ManualNatRules class.")
-        intf_obj = InterfaceObjects(fmc=self.fmc).get()
-        items = intf_obj.get("items", [])
+        item = self.fmc.object_cache.find(api_classes=[InterfaceObjects], name=name)
         new_intf = None
-        for item in items:
-            if item["name"] == name:
-                new_intf = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_intf = {"id": item["id"], "type": item["type"]}
         if new_intf is None:
             logging.warning(
                 f'Interface Object "{name}" is not found in FMC.  Cannot add to sourceInterface.'
@@ -341,13 +306,10 @@ class ManualNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In destination_intf() for ManualNatRules class.")
-        intf_obj = InterfaceObjects(fmc=self.fmc).get()
-        items = intf_obj.get("items", [])
+        item = self.fmc.object_cache.find(api_classes=[InterfaceObjects], name=name)
         new_intf = None
-        for item in items:
-            if item["name"] == name:
-                new_intf = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_intf = {"id": item["id"], "type": item["type"]}
         if new_intf is None:
             logging.warning(
                 f'Interface Object "{name}" is not found in FMC.  Cannot add to destinationInterface.'
@@ -364,14 +326,12 @@ class ManualNatRules(APIClassTemplate):
         :return: None
         """
         logging.debug("In identity_nat() for ManualNatRules class.")
-        ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-        networkgroup_json = NetworkGroups(fmc=self.fmc).get()
-        items = ipaddresses_json.get("items", []) + networkgroup_json.get("items", [])
+        item = self.fmc.object_cache.find(
+            api_classes=[NetworkAddresses, NetworkGroups], name=name
+        )
         new_net = None
-        for item in items:
-            if item["name"] == name:
-                new_net = {"id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_net = {"id": item["id"], "type": item["type"]}
         if new_net is None:
             logging.warning(
                 f'Network "{name}" is not found in FMC.  Cannot add to this ManualNatRules.'
@@ -390,14 +350,12 @@ class ManualNatRules(APIClassTemplate):
         :param options: (dict) key/value of options.
         :return: None
         """
-        ipaddresses_json = NetworkAddresses(fmc=self.fmc).get()
-        networkgroup_json = NetworkGroups(fmc=self.fmc).get()
-        items = ipaddresses_json.get("items", []) + networkgroup_json.get("items", [])
+        item = self.fmc.object_cache.find(
+            api_classes=[NetworkAddresses, NetworkGroups], name=name
+        )
         new_net = None
-        for item in items:
-            if item["name"] == name:
-                new_net = {"name": item["name"], "id": item["id"], "type": item["type"]}
-                break
+        if item:
+            new_net = {"name": item["name"], "id": item["id"], "type": item["type"]}
         if new_net is None:
             logging.warning(
                 f'Network "{name}" is not found in FMC.  Cannot add to patPool.'
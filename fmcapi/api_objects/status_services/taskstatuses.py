@@ -12,6 +12,19 @@ class TaskStatuses(APIClassTemplate):
     REQUIRED_FOR_GET = ["id"]
     URL_SUFFIX = "/job/taskstatuses"
     VALID_CHARACTERS_FOR_NAME = """[.\w\d_\- ]"""
+    COMPLETED_STATES = ["Success", "SUCCESS", "COMPLETED", "Deployed", "DEPLOYED"]
+    FAILED_STATES = [
+        "Failed",
+        "FAILED",
+        "FAILURE",
+        "Error",
+        "ERROR",
+        "Cancelled",
+        "CANCELLED",
+    ]
+    POLL_INTERVAL = 2
+    MAX_POLL_INTERVAL = 30
+    TIMEOUT = 1800
 
     def __init__(self, fmc, **kwargs):
         """
@@ -25,6 +38,27 @@ class TaskStatuses(APIClassTemplate):
         logging.debug("In __init__() for TaskStatuses class.")
         self.parse_kwargs(**kwargs)
 
+    def wait(self, timeout=None, interval=None, max_interval=None):
+        """
+        Block until the task completes, fails or 'timeout' seconds pass.
+
+        The task is followed by the FMC's TaskTracker: the first poll is immediate and the time between polls then
+        doubles from 'interval' up to 'max_interval', so short tasks are noticed quickly and long ones don't flood the
+        FMC with GETs.  Use self.fmc.task_tracker.track() directly to follow many tasks at once.
+
+        :param timeout: (int) Max seconds to wait.  (Default is TIMEOUT)
+        :param interval: (int) Seconds before the second poll.  (Default is POLL_INTERVAL)
+        :param max_interval: (int) Max seconds between polls.  (Default is MAX_POLL_INTERVAL)
+        :return: (dict) Last task status returned by the FMC or None if the task no longer exists.
+        """
+        logging.debug("In wait() for TaskStatuses class.")
+        return self.fmc.task_tracker.track(
+            task_id=self.id,
+            timeout=timeout,
+            interval=interval,
+            max_interval=max_interval,
+        ).result()
+
     def post(self):
         """POST method for API for TaskStatuses not supported."""
         logging.info("POST method for API for TaskStatuses not supported.")
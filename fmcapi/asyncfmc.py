@@ -0,0 +1,417 @@
+"""
+Establish and manage an asyncio connection to FMC.
+
+This module (asyncfmc.py) provides AsyncFMC, the asyncio counterpart of the FMC class in fmc.py.  It is used as an
+"async with" context manager and gives every APIClassTemplate based object awaitable aget(), apost(), aput() and
+adelete() methods so that one event loop can keep many API calls in flight over a single login.  It needs the
+optional aiohttp package (pip3 install fmcapi[async]).
+"""
+
+import asyncio
+import collections
+import json
+import logging
+import time
+from .fmc import FMC
+from .fmc import Pager
+from .fmc import PagingError
+from .fmc import Token
+from .api_objects import DeployableDevices
+from .api_objects import DeploymentRequests
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncFMC(FMC):
+    """Establish and maintain an asyncio connection to Firepower Management Center."""
+
+    logging.debug("In the AsyncFMC() class.")
+
+    def __init__(self, *args, **kwargs):
+        """
+        Instantiate some variables prior to calling the __aenter__() method.
+
+        Takes the same parameters as FMC().
+
+        :return: None
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "AsyncFMC requires the aiohttp package.  Install it with: pip3 install fmcapi[async]"
+            )
+        super().__init__(*args, **kwargs)
+        logging.debug("In the AsyncFMC __init__() class method.")
+        self.async_session = None
+
+    async def __aenter__(self):
+        """
+        Get a token from the FMC as well as the Global UUID.  With this information set up the base_url variable.
+
+        :return: self
+        """
+        logging.debug("In the AsyncFMC __aenter__() class method.")
+        self.async_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=self.pool_maxsize,
+                ssl=self.VERIFY_CERT,
+                force_close=not self.keep_alive,
+            )
+        )
+        # The synchronous session is still used by helper methods that look up other objects by name.
+        self.session = self.build_session()
+        self.mytoken = AsyncToken(
+            host=self.host,
+            username=self.username,
+            password=self.password,
+            domain=self.domain,
+            verify_cert=self.VERIFY_CERT,
+            session=self.session,
+            async_session=self.async_session,
+        )
+        await self.mytoken.agenerate_tokens()
+        self.uuid = self.mytoken.uuid
+        self.build_urls()
+
+        response = await self.asend_to_api(
+            method="get", url=f"{self.platform_url}/info/serverversion"
+        )
+        if response and "items" in response:
+            self.vdbVersion = response["items"][0]["vdbVersion"]
+            self.sruVersion = response["items"][0]["sruVersion"]
+            self.serverVersion = response["items"][0]["serverVersion"]
+            self.geoVersion = response["items"][0]["geoVersion"]
+        logging.info(f"This FMC's version is {self.serverVersion}")
+
+        return self
+
+    async def __aexit__(self, *args):
+        """
+        If autodeploy == True, push changes to FMC upon exit of "async with" contract.
+
+        :param args:
+        :return: None
+        """
+        logging.debug("In the AsyncFMC __aexit__() class method.")
+
+        if self.autodeploy:
+            await self.adeploy()
+        else:
+            logging.info(
+                "Auto deploy changes set to False.  Use the Deploy button in FMC to push changes to FTDs."
+            )
+        await self.async_session.close()
+        self.session.close()
+
+    async def adeploy(self):
+        """
+        Submit a deployment for every device whose configuration is not up-to-date.
+
+        :return: (list) List of devices.
+        """
+        logging.debug("In the AsyncFMC adeploy() class method.")
+        # Same polling as DeployableDevices.get(), on the event loop.
+        deadline = (self.last_write or 0) + DeployableDevices.WAIT_TIME
+        interval = DeployableDevices.POLL_INTERVAL
+        while True:
+            response = await self.asend_to_api(
+                method="get",
+                url=f"{self.configuration_url}{DeployableDevices.URL_SUFFIX}",
+            )
+            devices = [
+                item
+                for item in (response or {}).get("items", [])
+                if item["canBeDeployed"]
+            ]
+            remaining = deadline - time.monotonic()
+            if devices or remaining <= 0:
+                break
+            await asyncio.sleep(min(interval, remaining))
+            interval *= 2
+        if not devices:
+            logging.info("No devices need deployed.")
+            return
+        deployment = DeploymentRequests(fmc=self)
+        logging.info("Deploying changes to devices.")
+        response = await self.asend_to_api(
+            method="post",
+            url=deployment.URL,
+            json_data=deployment.deployment_request(devices=devices),
+        )
+        return response["deviceList"]
+
+    async def asend_to_api(self, method="", url="", headers="", json_data=None):
+        """
+        Send API call to FMC.
+
+        A GET whose response is paged has the remaining pages fetched concurrently and appended, in order, to the
+        first page's "items".  Use aiter_pages() to process large collections one page at a time instead.
+
+        :param method (str): GET, POST, PUT, or DELETE
+        :param url (str): URL for API call.
+        :param headers (str):  String of header variables.
+        :param json_data (str):  JSON formatted string as payload. (Default is None)
+        :return: JSON response from FMC
+        """
+        logging.debug("In the AsyncFMC asend_to_api() class method.")
+
+        if method != "get":
+            return await self.asend_request(
+                method=method, url=url, headers=headers, json_data=json_data
+            )
+        json_response = None
+        try:
+            async for page in self.aiter_pages(url=url, headers=headers):
+                if json_response is None:
+                    json_response = page
+                else:
+                    json_response.setdefault("items", []).extend(page.get("items", []))
+        except PagingError as err:
+            logging.error(f"GET of {url} is incomplete --> {str(err)}")
+            return None
+        return json_response
+
+    async def asend_request(self, method="", url="", headers="", json_data=None):
+        """
+        Send a single API call to FMC, retrying on "too many connections" and expired tokens.
+
+        :param method (str): GET, POST, PUT, or DELETE
+        :param url (str): URL for API call.
+        :param headers (str):  String of header variables.
+        :param json_data (str):  JSON formatted string as payload. (Default is None)
+        :return: JSON response from FMC (Not paged.)
+        """
+        logging.debug("In the AsyncFMC asend_request() class method.")
+
+        if method not in ["get", "post", "put", "delete"]:
+            logging.error("No request method given.  Returning nothing.")
+            return
+        if headers == "":
+            # These values for headers works for most API requests.
+            headers = {
+                "Content-Type": "application/json",
+                "X-auth-access-token": await self.mytoken.aget_token(),
+            }
+        logging.debug(
+            f"Being sent to FMC's API:\n\tHEADERS={headers}\n\tURL={url}\n\tMETHOD={method}\n\t"
+            f"JSON_DATA={json_data}"
+        )
+        status_code = 429
+        attempt = 0
+        while status_code == 429:
+            wait = self.rate_limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with self.async_session.request(
+                method.upper(),
+                url,
+                json=json_data if method in ["post", "put"] else None,
+                headers=headers,
+            ) as response:
+                status_code = response.status
+                retry_after = response.headers.get("Retry-After")
+                text = await response.text()
+            if status_code == 429:
+                wait = self.too_many_connections_backoff(
+                    attempt=attempt, retry_after=retry_after
+                )
+                logging.warning(
+                    f"Too many connections to the FMC.  Waiting {wait:.2f} seconds and trying again."
+                )
+                self.rate_limiter.throttle(wait)
+                attempt += 1
+            else:
+                self.rate_limiter.recover()
+            if status_code == 401:
+                logging.warning("Token has expired. Trying to refresh.")
+                headers = {
+                    "Content-Type": "application/json",
+                    "X-auth-access-token": await self.mytoken.arenew_token(
+                        expired_token=headers.get("X-auth-access-token")
+                    ),
+                }
+                status_code = 429
+            if status_code == 422:
+                logging.warning(
+                    "Either:\n\t1. Payload too large.  FMC can only handle a payload of "
+                    f"{self.FMC_MAX_PAYLOAD} bytes.\n\t2.The payload contains an unprocessable or "
+                    f"unreadable entity such as a invalid attribut name or incorrect JSON syntax "
+                )
+        try:
+            json_response = json.loads(text)
+        except ValueError:
+            json_response = None
+        if status_code > 301 or json_response is None or "error" in json_response:
+            logging.error(f"Error in {method.upper()} operation --> {status_code}")
+            logging.error(f"json_response -->\t{json_response}")
+            return None
+        if method != "get":
+            self.last_write = time.monotonic()
+        return json_response
+
+    def aiter_pages(self, url="", headers=""):
+        """
+        Yield the pages of a GET, in order, as they arrive.
+
+        :param url (str): URL for API call.
+        :param headers (str):  String of header variables.
+        :return: (AsyncPager) Async iterable of the JSON response of each page.
+        """
+        logging.debug("In the AsyncFMC aiter_pages() class method.")
+        return AsyncPager(fmc=self, url=url, headers=headers)
+
+
+class AsyncPager(Pager):
+    """
+    Walk the pages of one paged GET on the event loop.
+
+    Same page math as Pager but pages after the first are fetched by up to paging_workers concurrent tasks.
+    """
+
+    logging.debug("In the AsyncPager class.")
+
+    def __aiter__(self):
+        """
+        Yield the JSON response of each page, in order, as they arrive.
+
+        :return: (async generator) JSON response of each page.
+        """
+        logging.debug("In the AsyncPager __aiter__() class method.")
+        return self.aiter_all_pages()
+
+    async def aiter_all_pages(self):
+        """
+        Yield the JSON response of each page, in order, as they arrive.
+
+        :return: (async generator) JSON response of each page.  Raises PagingError if a page after the first fails.
+        """
+        first_page = await self.fmc.asend_request(
+            method="get", url=self.url, headers=self.headers
+        )
+        if first_page is None:
+            return
+        yield self.count(first_page)
+        if "next" not in first_page.get("paging", {}):
+            return
+        urls = self.page_urls(first_page=first_page)
+        if urls is None:
+            next_url = first_page["paging"]["next"][0]
+            page_counter = 0
+            while next_url and page_counter <= self.fmc.MAX_PAGING_REQUESTS:
+                page = await self.fmc.asend_request(
+                    method="get", url=next_url, headers=self.headers
+                )
+                if not page:
+                    raise PagingError(f"GET of page {next_url} failed.")
+                yield self.count(page)
+                next_url = page.get("paging", {}).get("next", [None])[0]
+                page_counter += 1
+            return
+        in_flight = collections.deque()
+        try:
+            for url in urls:
+                if len(in_flight) >= self.fmc.paging_workers:
+                    yield self.count(await self.aresult(*in_flight.popleft()))
+                in_flight.append(
+                    (
+                        url,
+                        asyncio.ensure_future(
+                            self.fmc.asend_request(
+                                method="get", url=url, headers=self.headers
+                            )
+                        ),
+                    )
+                )
+            while in_flight:
+                yield self.count(await self.aresult(*in_flight.popleft()))
+        finally:
+            # The consumer may stop early, or a page failed.  Don't fetch pages nobody will read.
+            for url, task in in_flight:
+                task.cancel()
+
+    @staticmethod
+    async def aresult(url, task):
+        """
+        Wait for a page.
+
+        :param url (str): URL of the page.
+        :param task (Task): asend_request() of the page.
+        :return: (dict) JSON response of the page.  Raises PagingError if the GET failed.
+        """
+        page = await task
+        if not page:
+            raise PagingError(f"GET of page {url} failed.")
+        return page
+
+
+class AsyncToken(Token):
+    """The token is the validation object used with the FMC.  This one is generated and refreshed on the event loop."""
+
+    logging.debug("In the AsyncToken class.")
+
+    GENERATE_TOKENS_ON_INIT = False
+
+    def __init__(self, *args, async_session=None, **kwargs):
+        """
+        Initialize variables used in the AsyncToken class.
+
+        Takes the same parameters as Token() plus the aiohttp session used for token requests.  Tokens are not
+        requested until agenerate_tokens() is awaited.
+
+        :param async_session (object): aiohttp.ClientSession to send token requests through.
+        :return: None
+        """
+        super().__init__(*args, **kwargs)
+        logging.debug("In the AsyncToken __init__() class method.")
+        self.async_session = async_session
+        self.async_lock = asyncio.Lock()
+
+    async def agenerate_tokens(self):
+        """
+        Create new or refresh expired tokens.
+
+        :return: None
+        """
+        logging.debug("In the AsyncToken agenerate_tokens() class method.")
+
+        url, headers, auth = self.token_request()
+        if auth:
+            auth = aiohttp.BasicAuth(*auth)
+        async with self.async_session.post(url, headers=headers, auth=auth) as response:
+            logging.debug(
+                "Response from token post:\n"
+                f"\turl: {url}\n"
+                f"\theaders: {headers}\n"
+                f"\tresponse: {response.status}"
+            )
+            self.set_tokens(response.headers)
+
+    async def aget_token(self):
+        """
+        Check validity of current token.  If needed make a new or refresh.  Then return access_token.
+
+        :return self.access_token
+        """
+        logging.debug("In the AsyncToken aget_token() class method.")
+        async with self.async_lock:
+            if self.is_expired():
+                self.expire()
+                await self.agenerate_tokens()
+            return self.access_token
+
+    async def arenew_token(self, expired_token=None):
+        """
+        Replace a token the FMC has rejected.
+
+        Only the first task to hit a 401 with a given token generates new tokens; the rest get the renewed token.
+
+        :param expired_token (str): The access token the FMC rejected.
+        :return self.access_token
+        """
+        logging.debug("In the AsyncToken arenew_token() class method.")
+        async with self.async_lock:
+            if expired_token is None or expired_token == self.access_token:
+                await self.agenerate_tokens()
+            return self.access_token
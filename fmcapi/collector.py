@@ -0,0 +1,330 @@
+"""
+Collect the hit counts of every access and prefilter rule on every device, concurrently and incrementally.
+
+This module (collector.py) provides HitCountCollector.  HitCounts fetches the counts of one policy on one device; the
+collector finds every (policy, device) pair from the policy assignments, fetches the pairs concurrently and stores
+the counts in a local SQLite file keyed by the lastFetchTimeStamp the FMC reports for them.  A later collect() first
+asks the FMC for one count per pair and skips the pairs whose lastFetchTimeStamp is the one already stored.
+"""
+
+import datetime
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .api_objects import AccessPolicies
+from .api_objects import DeviceGroupRecords
+from .api_objects import HitCounts
+from .api_objects import PolicyAssignments
+
+
+class HitCountCollector(object):
+    """
+    Local SQLite store of hit counts, filled from the FMC.
+
+    The "fetches" table has one row per (policy, device, lastFetchTimeStamp) with the number of rules fetched.  The
+    "hitcounts" table has one row per rule of each of those fetches.  Each lastFetchTimeStamp of a pair is kept, so
+    the table is a history of the counts.
+    """
+
+    logging.debug("In the HitCountCollector class.")
+
+    WORKERS = 8
+    # Policy assignment targets hit counts can be fetched for.  Device groups are expanded to their members.
+    DEVICE_TYPES = ["Device", "DeviceHAPair", "DeviceCluster"]
+
+    def __init__(self, fmc, path="fmcapi_hitcounts.sqlite3", workers=WORKERS):
+        """
+        Open (or create) a hit count store.
+
+        :param fmc (object): FMC object
+        :param path (str): Filename (and optional path) of the SQLite file.  (Default is fmcapi_hitcounts.sqlite3)
+        :param workers (int): Max number of (policy, device) pairs fetched concurrently.  (Default is 8)
+        :return: None
+        """
+        logging.debug("In the HitCountCollector __init__() class method.")
+        self.fmc = fmc
+        self.path = path
+        self.workers = workers
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS fetches (policy_id TEXT, policy_type TEXT, policy_name TEXT, "
+                "device_id TEXT, device_name TEXT, last_fetch TEXT, items INTEGER, collected_at TEXT, "
+                "PRIMARY KEY (policy_id, device_id, last_fetch))"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS hitcounts (policy_id TEXT, device_id TEXT, last_fetch TEXT, "
+                "rule_id TEXT, rule_name TEXT, hit_count INTEGER, first_hit TEXT, last_hit TEXT, "
+                "PRIMARY KEY (policy_id, device_id, last_fetch, rule_id))"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Close the SQLite file.
+
+        :return: None
+        """
+        logging.debug("In the HitCountCollector close() class method.")
+        self.connection.close()
+
+    def pairs(self):
+        """
+        Find every (policy, device) pair hit counts can be fetched for.
+
+        Each device an AccessPolicy is assigned to is paired with that AccessPolicy and with the PrefilterPolicy the
+        AccessPolicy uses.
+
+        :return: (list) {"policy": {"id", "type", "name"}, "device": {"id", "type", "name"}}
+        """
+        logging.debug("In the HitCountCollector pairs() class method.")
+        pairs = []
+        seen = set()
+        for assignment in PolicyAssignments(fmc=self.fmc).iter_items():
+            policy = assignment.get("policy", {})
+            if policy.get("type") != "AccessPolicy":
+                continue
+            policies = [policy]
+            prefilter = self.prefilter_policy(acp_id=policy["id"])
+            if prefilter is not None:
+                policies.append(prefilter)
+            for device in self.devices(targets=assignment.get("targets", [])):
+                for item in policies:
+                    if (item["id"], device["id"]) in seen:
+                        continue
+                    seen.add((item["id"], device["id"]))
+                    pairs.append(
+                        {
+                            "policy": {
+                                "id": item["id"],
+                                "type": item.get("type"),
+                                "name": item.get("name"),
+                            },
+                            "device": {
+                                "id": device["id"],
+                                "type": device.get("type"),
+                                "name": device.get("name"),
+                            },
+                        }
+                    )
+        return pairs
+
+    def prefilter_policy(self, acp_id):
+        """
+        Find the PrefilterPolicy an AccessPolicy uses.
+
+        :param acp_id (str): UUID of the AccessPolicy.
+        :return: (dict) {"id", "type", "name"} of the PrefilterPolicy or None.
+        """
+        acp = self.fmc.object_cache.get(api_class=AccessPolicies, id=acp_id) or {}
+        if "prefilterPolicySetting" not in acp:
+            # Not every FMC version returns the setting when listing the policies.
+            acp1 = AccessPolicies(fmc=self.fmc, id=acp_id)
+            acp1.get()
+            acp = acp1.__dict__
+        setting = acp.get("prefilterPolicySetting")
+        if not setting or "id" not in setting:
+            return None
+        return dict(setting, type="PrefilterPolicy")
+
+    def devices(self, targets):
+        """
+        Expand policy assignment targets to devices.
+
+        :param targets (list): "targets" of a PolicyAssignments item.
+        :return: (list) Devices, HA pairs and clusters.
+        """
+        devices = []
+        for target in targets:
+            if target.get("type") in self.DEVICE_TYPES:
+                devices.append(target)
+            elif target.get("type") == "DeviceGroup":
+                group = self.fmc.object_cache.get(
+                    api_class=DeviceGroupRecords, id=target["id"]
+                )
+                devices.extend((group or {}).get("members", []))
+        return devices
+
+    def collect(self, pairs=None, refresh=False, fetch_zero=True):
+        """
+        Fetch the hit counts of each pair that changed since the last collect() and store them.
+
+        :param pairs (list): Pairs as returned by pairs().  (Default is all of pairs())
+        :param refresh (bool): Have the FMC fetch the current counts from each device first (PUT).  (Default is False)
+        :param fetch_zero (bool): Include rules that were never hit.  (Default is True)
+        :return: (list) One entry per pair: {"policy", "device", "status", "lastFetchTimeStamp", "items", "seconds",
+            "error"}.  "status" is fetched, unchanged, empty or failed.
+        """
+        logging.debug("In the HitCountCollector collect() class method.")
+        if pairs is None:
+            pairs = self.pairs()
+        logging.info(
+            f"Collecting hit counts of {len(pairs)} policy and device pairs, {self.workers} at a time."
+        )
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(
+                executor.map(
+                    lambda pair: self.fetch(
+                        pair=pair, refresh=refresh, fetch_zero=fetch_zero
+                    ),
+                    pairs,
+                )
+            )
+
+    def fetch(self, pair, refresh=False, fetch_zero=True):
+        """
+        Fetch and store the hit counts of one pair unless its lastFetchTimeStamp is already stored.
+
+        :param pair (dict): Pair as returned by pairs().
+        :param refresh (bool): Have the FMC fetch the current counts from the device first.
+        :param fetch_zero (bool): Include rules that were never hit.
+        :return: (dict) How the fetch went.
+        """
+        start = time.monotonic()
+        result = {
+            "policy": pair["policy"],
+            "device": pair["device"],
+            "status": "failed",
+            "lastFetchTimeStamp": None,
+            "items": 0,
+            "seconds": None,
+            "error": None,
+        }
+        kwargs = {"device_id": pair["device"]["id"]}
+        if pair["policy"].get("type") == "PrefilterPolicy":
+            kwargs["prefilter_id"] = pair["policy"]["id"]
+        else:
+            kwargs["acp_id"] = pair["policy"]["id"]
+        hitcounts = HitCounts(fmc=self.fmc, **kwargs)
+        hitcounts.fetchZeroHitCount = fetch_zero
+        try:
+            if refresh:
+                response = hitcounts.put()
+                if not response:
+                    raise ValueError("Refresh of the hit counts failed.")
+                if "id" in response.get("metadata", {}).get("task", {}):
+                    self.fmc.task_tracker.track_response(response).result()
+            # One count is enough to learn the lastFetchTimeStamp of the whole pair.
+            probe = self.fmc.send_request(
+                method="get",
+                url=hitcounts.URL.replace(f"&limit={hitcounts.limit}", "&limit=1"),
+            )
+            if probe is None:
+                raise ValueError("No response from the FMC.")
+            if not probe.get("items"):
+                result["status"] = "empty"
+                return result
+            last_fetch = probe["items"][0].get("lastFetchTimeStamp")
+            result["lastFetchTimeStamp"] = last_fetch
+            if last_fetch is not None and last_fetch == self.latest(
+                policy_id=pair["policy"]["id"], device_id=pair["device"]["id"]
+            ):
+                result["status"] = "unchanged"
+                return result
+            items = hitcounts.get()
+            if items is False:
+                raise ValueError("GET of the hit counts failed.")
+            self.store(pair=pair, last_fetch=last_fetch, items=items)
+            result["status"] = "fetched"
+            result["items"] = len(items)
+        except Exception as e:
+            logging.error(
+                f"Unable to collect hit counts of {pair['policy'].get('name')} on {pair['device'].get('name')}: {e}"
+            )
+            result["error"] = str(e)
+        finally:
+            result["seconds"] = time.monotonic() - start
+        return result
+
+    def store(self, pair, last_fetch, items):
+        """
+        Store one fetch of a pair.
+
+        :param pair (dict): Pair as returned by pairs().
+        :param last_fetch (str): lastFetchTimeStamp of the fetch.
+        :param items (list): Hit counts as returned by HitCounts().get().
+        :return: None
+        """
+        rows = [
+            (
+                pair["policy"]["id"],
+                pair["device"]["id"],
+                last_fetch,
+                item.get("rule", {}).get("id"),
+                item.get("rule", {}).get("name"),
+                item.get("hitCount", 0),
+                item.get("firstHitTimeStamp"),
+                item.get("lastHitTimeStamp"),
+            )
+            for item in items
+        ]
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO fetches VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    pair["policy"]["id"],
+                    pair["policy"].get("type"),
+                    pair["policy"].get("name"),
+                    pair["device"]["id"],
+                    pair["device"].get("name"),
+                    last_fetch,
+                    len(items),
+                    datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                ),
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO hitcounts VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def latest(self, policy_id, device_id):
+        """
+        Return the newest lastFetchTimeStamp stored for a pair.
+
+        :param policy_id (str): UUID of the policy.
+        :param device_id (str): UUID of the device.
+        :return: (str) lastFetchTimeStamp or None.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT last_fetch FROM fetches WHERE policy_id = ? AND device_id = ? "
+                "ORDER BY collected_at DESC LIMIT 1",
+                (policy_id, device_id),
+            ).fetchone()
+        return row[0] if row else None
+
+    def counts(self, policy_id, device_id, last_fetch=None):
+        """
+        Read back the hit counts of a pair.
+
+        :param policy_id (str): UUID of the policy.
+        :param device_id (str): UUID of the device.
+        :param last_fetch (str): lastFetchTimeStamp of the fetch.  (Default is the newest)
+        :return: (list) {"rule_id", "rule_name", "hitCount", "firstHitTimeStamp", "lastHitTimeStamp"}
+        """
+        logging.debug("In the HitCountCollector counts() class method.")
+        if last_fetch is None:
+            last_fetch = self.latest(policy_id=policy_id, device_id=device_id)
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT rule_id, rule_name, hit_count, first_hit, last_hit FROM hitcounts "
+                "WHERE policy_id = ? AND device_id = ? AND last_fetch = ?",
+                (policy_id, device_id, last_fetch),
+            ).fetchall()
+        return [
+            {
+                "rule_id": row[0],
+                "rule_name": row[1],
+                "hitCount": row[2],
+                "firstHitTimeStamp": row[3],
+                "lastHitTimeStamp": row[4],
+            }
+            for row in rows
+        ]
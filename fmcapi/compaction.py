@@ -0,0 +1,172 @@
+"""
+Rewrite NetworkGroups with the fewest entries that still match the same addresses.
+
+This module (compaction.py) provides NetworkGroupCompactor.  Groups built up one unnamed_networks('add', ...) at a
+time end up with thousands of host literals.  The compactor merges the literals and the Host, Network and Range
+members of a group into the smallest set of CIDR prefixes covering exactly the same addresses, optionally drops the
+ones a nested group already covers, and proposes (or PUTs) the rewritten group.
+"""
+
+import json
+import logging
+from .api_objects import NetworkGroups
+from .api_objects.helper_functions import get_networkaddress_type
+from .matching import GroupExpander
+from .matching import RuleExpander
+
+
+class NetworkGroupCompactor(object):
+    """
+    Propose and apply CIDR compaction of NetworkGroups.
+
+    Nested NetworkGroups, FQDN members and anything that can't be parsed are kept as they are.  A member object
+    whose value is exactly one of the new prefixes is kept as the object rather than turned into a literal.
+    """
+
+    logging.debug("In the NetworkGroupCompactor class.")
+
+    # Objects and literals folded into the CIDR cover.
+    NETWORK_TYPES = ["Host", "Network", "Range"]
+
+    def __init__(self, fmc):
+        """
+        Initialize NetworkGroupCompactor object.
+
+        :param fmc (object): FMC object.  Groups and objects are read through fmc.group_expander.
+        :return: None
+        """
+        logging.debug("In the NetworkGroupCompactor __init__() class method.")
+        self.fmc = fmc
+        self.groups = fmc.group_expander
+
+    @staticmethod
+    def size(group):
+        """
+        Count the entries of a group and the bytes of its JSON payload.
+
+        :param group (dict): NetworkGroup.
+        :return: (dict) {"entries", "objects", "literals", "bytes"}
+        """
+        objects = len(group.get("objects", []))
+        literals = len(group.get("literals", []))
+        return {
+            "entries": objects + literals,
+            "objects": objects,
+            "literals": literals,
+            "bytes": len(json.dumps(group)),
+        }
+
+    def propose(self, group, drop_nested=False):
+        """
+        Work out the compacted version of a group.
+
+        :param group (dict): NetworkGroup as returned by the FMC.
+        :param drop_nested (bool): Leave out the prefixes a nested NetworkGroup already covers.  The group then
+            depends on the nested group keeping those addresses.  (Default is False)
+        :return: (dict) {"group": {"id", "name"}, "before": size(), "after": size(), "changed": bool, "data": the
+            rewritten group to PUT}
+        """
+        logging.debug("In the NetworkGroupCompactor propose() class method.")
+        before = NetworkGroups(fmc=self.fmc, **group).format_data()
+        ranges = []
+        exact = {}
+        kept_objects = []
+        kept_literals = []
+        nested = []
+        for literal in group.get("literals", []):
+            address = RuleExpander.address_range(literal.get("value"))
+            if address is None:
+                kept_literals.append(literal)
+            else:
+                ranges.append(address)
+        for reference in group.get("objects", []):
+            member = self.groups.lookup(reference)
+            address = None
+            if member is not None and member.get("type") in self.NETWORK_TYPES:
+                address = RuleExpander.address_range(member.get("value"))
+            if address is None:
+                kept_objects.append(reference)
+                if member is not None and member.get("type") == "NetworkGroup":
+                    nested.extend(self.groups.expand(member["id"])["ranges"])
+                continue
+            ranges.append(address)
+            exact.setdefault(address, reference)
+        nested = RuleExpander.merge(nested)
+        new_objects = list(kept_objects)
+        new_literals = list(kept_literals)
+        for network in GroupExpander.prefixes(RuleExpander.merge(ranges)):
+            address = RuleExpander.address_range(str(network))
+            if drop_nested and RuleExpander.contains(nested, [address]):
+                continue
+            if address in exact:
+                new_objects.append(exact[address])
+                continue
+            value = (
+                str(network.network_address)
+                if network.prefixlen == network.max_prefixlen
+                else str(network)
+            )
+            new_literals.append(
+                {"type": get_networkaddress_type(value=value), "value": value}
+            )
+        after = dict(before)
+        after.pop("objects", None)
+        after.pop("literals", None)
+        if new_objects:
+            after["objects"] = new_objects
+        if new_literals:
+            after["literals"] = new_literals
+        sizes = {"before": self.size(before), "after": self.size(after)}
+        return {
+            "group": {"id": group.get("id"), "name": group.get("name")},
+            "before": sizes["before"],
+            "after": sizes["after"],
+            "changed": sizes["after"]["entries"] < sizes["before"]["entries"],
+            "data": after,
+        }
+
+    def compact(self, group_ids=None, apply=False, drop_nested=False):
+        """
+        Propose, and optionally apply, the compaction of NetworkGroups.
+
+        :param group_ids (list): UUIDs of the groups.  (Default is every NetworkGroup)
+        :param apply (bool): PUT the groups that get fewer entries.  (Default is False)
+        :param drop_nested (bool): See propose().  (Default is False)
+        :return: (list) One propose() result per group that gets fewer entries, with "applied" (bool) added.
+        """
+        logging.debug("In the NetworkGroupCompactor compact() class method.")
+        if group_ids is None:
+            groups = list(NetworkGroups(fmc=self.fmc).iter_items())
+        else:
+            groups = []
+            for group_id in group_ids:
+                group = NetworkGroups(fmc=self.fmc, id=group_id)
+                group.get()
+                groups.append(group.format_data())
+        proposals = []
+        for group in groups:
+            proposal = self.propose(group, drop_nested=drop_nested)
+            if not proposal["changed"]:
+                continue
+            proposal["applied"] = bool(apply) and self.apply(proposal)
+            proposals.append(proposal)
+        logging.info(
+            f"{len(proposals)} of {len(groups)} NetworkGroups can be compacted from "
+            f"{sum(p['before']['entries'] for p in proposals)} to {sum(p['after']['entries'] for p in proposals)} "
+            f"entries."
+        )
+        return proposals
+
+    def apply(self, proposal):
+        """
+        PUT a compacted group.
+
+        :param proposal (dict): From propose().
+        :return: (bool) True if the FMC accepted it.
+        """
+        logging.debug("In the NetworkGroupCompactor apply() class method.")
+        response = NetworkGroups(fmc=self.fmc, **proposal["data"]).put()
+        if not response:
+            logging.error(f"Compacting {proposal['group']['name']} failed.")
+            return False
+        return True
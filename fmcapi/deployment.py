@@ -0,0 +1,199 @@
+"""
+Deploy pending changes to FMC managed devices in waves and follow each deployment to the end.
+
+This module (deployment.py) provides DeploymentPipeline.  Unlike DeploymentRequests().post(), which submits one
+deployment for every deployable device and returns, the pipeline deploys the devices one device group (wave) at a
+time, a bounded number of devices at once, tracks each device's deployment task through TaskStatuses until it
+finishes and records how long each device took.
+"""
+
+import datetime
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from .api_objects import DeployableDevices
+from .api_objects import DeploymentRequests
+from .api_objects import DeviceGroupRecords
+from .api_objects import TaskStatuses
+
+
+class DeploymentPipeline(object):
+    """
+    Deploy to the devices that need it, wave by wave.
+
+    Each device group named in 'groups' is a wave, in order, and the deployable devices that are in none of them form
+    a last wave.  Within a wave up to 'max_concurrent' devices are deployed at once, each with its own deployment
+    request so that each gets its own task and timing.
+    """
+
+    logging.debug("In the DeploymentPipeline class.")
+
+    MAX_CONCURRENT = 4
+
+    def __init__(
+        self,
+        fmc,
+        groups=None,
+        max_concurrent=MAX_CONCURRENT,
+        stop_on_failure=True,
+        timeout=TaskStatuses.TIMEOUT,
+    ):
+        """
+        Initialize DeploymentPipeline object.
+
+        :param fmc (object): FMC object
+        :param groups (list): Names of DeviceGroupRecords, one wave each, in the order they are deployed.
+        (Default is None: every deployable device in one wave)
+        :param max_concurrent (int): Max number of devices deploying at once.  (Default is 4)
+        :param stop_on_failure (bool): Don't start the next wave if a device of this one failed.  (Default is True)
+        :param timeout (int): Max seconds to follow each device's deployment task.  (Default is 1800)
+        :return: None
+        """
+        logging.debug("In the DeploymentPipeline __init__() class method.")
+        self.fmc = fmc
+        self.groups = list(groups) if groups is not None else []
+        self.max_concurrent = max_concurrent
+        self.stop_on_failure = stop_on_failure
+        self.timeout = timeout
+        self.timings = []
+
+    def waves(self, devices):
+        """
+        Split the deployable devices into waves.
+
+        :param devices (list): Deployable devices as returned by DeployableDevices().get().
+        :return: (list) Lists of deployable devices.  Empty waves are left out.
+        """
+        logging.debug("In the DeploymentPipeline waves() class method.")
+        remaining = list(devices)
+        waves = []
+        for name in self.groups:
+            group = DeviceGroupRecords(fmc=self.fmc, name=name)
+            group.get()
+            if "id" not in group.__dict__:
+                logging.warning(f"Device group {name} not found.  Skipping its wave.")
+                continue
+            members = [member["id"] for member in group.__dict__.get("members", [])]
+            wave = [device for device in remaining if device["device"]["id"] in members]
+            remaining = [device for device in remaining if device not in wave]
+            if wave:
+                waves.append(wave)
+        if remaining:
+            waves.append(remaining)
+        return waves
+
+    def run(self):
+        """
+        Deploy to every deployable device, wave by wave, and wait for each deployment to finish.
+
+        :return: (list) One entry per device: {"name", "id", "wave", "task", "status", "message", "started_at",
+            "seconds"}.  "status" is succeeded, failed, timed out, finished (the FMC dropped the task) or skipped.
+        """
+        logging.debug("In the DeploymentPipeline run() class method.")
+        self.timings = []
+        devices = DeployableDevices(fmc=self.fmc).get()
+        if not devices:
+            logging.info("No devices need deployed.")
+            return self.timings
+        waves = self.waves(devices=devices)
+        for number, wave in enumerate(waves, start=1):
+            logging.info(
+                f"Deploying wave {number} of {len(waves)}: {len(wave)} devices, {self.max_concurrent} at a time."
+            )
+            with ThreadPoolExecutor(max_workers=self.max_concurrent) as executor:
+                results = list(
+                    executor.map(lambda device: self.deploy(device, number), wave)
+                )
+            self.timings.extend(results)
+            failed = [
+                result
+                for result in results
+                if result["status"] in ["failed", "timed out"]
+            ]
+            if failed and self.stop_on_failure and number < len(waves):
+                logging.error(
+                    f"{len(failed)} devices of wave {number} did not deploy.  Not deploying the remaining waves."
+                )
+                for later, skipped in enumerate(waves[number:], start=number + 1):
+                    self.timings.extend(
+                        self.timing(device, later, status="skipped")
+                        for device in skipped
+                    )
+                break
+        return self.timings
+
+    def deploy(self, device, wave):
+        """
+        Deploy to one device and follow its task until it finishes.
+
+        :param device (dict): Deployable device as returned by DeployableDevices().get().
+        :param wave (int): Number of the wave the device is in.
+        :return: (dict) Timing of the device.
+        """
+        started_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        start = time.monotonic()
+        request = DeploymentRequests(fmc=self.fmc)
+        logging.info(f"Deploying changes to {device['device'].get('name')}.")
+        response = self.fmc.send_to_api(
+            method="post",
+            url=request.URL,
+            json_data=request.deployment_request(devices=[device]),
+        )
+        if response is None:
+            return self.timing(
+                device, wave, status="failed", message="Deployment request failed."
+            )
+        task = response.get("metadata", {}).get("task", {})
+        if "id" not in task:
+            return self.timing(
+                device,
+                wave,
+                status="finished",
+                message="The FMC returned no task to follow.",
+                started_at=started_at,
+                seconds=time.monotonic() - start,
+            )
+        final = TaskStatuses(fmc=self.fmc, id=task["id"]).wait(timeout=self.timeout)
+        if final is None:
+            status = "finished"
+        elif final.get("status") in TaskStatuses.COMPLETED_STATES:
+            status = "succeeded"
+        elif final.get("status") in TaskStatuses.FAILED_STATES:
+            status = "failed"
+        else:
+            status = "timed out"
+        return self.timing(
+            device,
+            wave,
+            task=task["id"],
+            status=status,
+            message=(final or {}).get("message"),
+            started_at=started_at,
+            seconds=time.monotonic() - start,
+        )
+
+    @staticmethod
+    def timing(
+        device,
+        wave,
+        task=None,
+        status=None,
+        message=None,
+        started_at=None,
+        seconds=None,
+    ):
+        """
+        Describe how the deployment to one device went.
+
+        :return: (dict) name, id, wave, task, status, message, started_at and seconds.
+        """
+        return {
+            "name": device["device"].get("name"),
+            "id": device["device"].get("id"),
+            "wave": wave,
+            "task": task,
+            "status": status,
+            "message": message,
+            "started_at": started_at,
+            "seconds": seconds,
+        }
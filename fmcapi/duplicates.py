@@ -0,0 +1,253 @@
+"""
+Find objects that differ only by name.
+
+This module (duplicates.py) provides DuplicateObjectFinder.  It streams the Hosts, Networks, Ranges, FQDNS, port
+and ICMP objects of a domain once, hashes what each object matches (its format_data() without id, name and
+description, with addresses, ports and DNS names normalized) and groups the objects that share a hash.  A Host
+1.1.1.1, a Network 1.1.1.1/32 and a Range 1.1.1.1-1.1.1.1 land in the same group.  The groups, rules and NAT rules
+that use each duplicate are counted so the object to keep can be picked.
+"""
+
+import hashlib
+import ipaddress
+import json
+import logging
+from .api_objects import AccessPolicies
+from .api_objects import AccessRules
+from .api_objects import AutoNatRules
+from .api_objects import FQDNS
+from .api_objects import FTDNatPolicies
+from .api_objects import Hosts
+from .api_objects import ICMPv4Objects
+from .api_objects import ICMPv6Objects
+from .api_objects import ManualNatRules
+from .api_objects import NetworkGroups
+from .api_objects import Networks
+from .api_objects import PortObjectGroups
+from .api_objects import PreFilterPolicies
+from .api_objects import PreFilterRules
+from .api_objects import ProtocolPortObjects
+from .api_objects import Ranges
+from .matching import RuleExpander
+from .prefixes import NetworkIndex
+
+
+class DuplicateObjectFinder(object):
+    """
+    Group the objects of a domain by what they match and report the groups with more than one object.
+
+    Only the hash and the id, name and type of each object are kept while streaming, so memory grows with the
+    number of objects, not with their size.
+    """
+
+    logging.debug("In the DuplicateObjectFinder class.")
+
+    API_CLASSES = [
+        Hosts,
+        Networks,
+        Ranges,
+        FQDNS,
+        ProtocolPortObjects,
+        ICMPv4Objects,
+        ICMPv6Objects,
+    ]
+    # Left out of the hash: they don't change what an object matches.
+    IGNORED_FIELDS = [
+        "id",
+        "name",
+        "description",
+        "metadata",
+        "links",
+        "overrides",
+        "overridable",
+        "overrideTargetId",
+    ]
+    NETWORK_TYPES = ["Host", "Network", "Range"]
+
+    def __init__(self, fmc, api_classes=None):
+        """
+        Initialize DuplicateObjectFinder object.
+
+        :param fmc (object): FMC object
+        :param api_classes (list): APIClassTemplate subclasses to scan.  (Default is API_CLASSES)
+        :return: None
+        """
+        logging.debug("In the DuplicateObjectFinder __init__() class method.")
+        self.fmc = fmc
+        self.api_classes = api_classes if api_classes is not None else self.API_CLASSES
+        self.groups = {}
+
+    def canonical(self, api_class, item):
+        """
+        Describe what an object matches, independently of its name and of how its value is written.
+
+        :param api_class (class): APIClassTemplate subclass the object was read with.
+        :param item (dict): The object as returned by the FMC.
+        :return: (dict) Canonical value.
+        """
+        data = api_class(fmc=self.fmc, **item).format_data()
+        data = {
+            key: value
+            for key, value in data.items()
+            if key not in self.IGNORED_FIELDS and value not in [None, ""]
+        }
+        object_type = item.get("type", data.get("type"))
+        if object_type in self.NETWORK_TYPES:
+            networks = NetworkIndex.networks(data.get("value"))
+            if networks:
+                return {
+                    "kind": "network",
+                    "value": [
+                        str(network)
+                        for version in [4, 6]
+                        for network in ipaddress.collapse_addresses(
+                            n for n in networks if n.version == version
+                        )
+                    ],
+                }
+        elif object_type == "ProtocolPortObject":
+            port = RuleExpander.port_range(data)
+            if port is not None:
+                return {"kind": "port", "value": list(port)}
+        elif object_type == "FQDN":
+            return {
+                "kind": "fqdn",
+                "value": str(data.get("value", "")).strip().lower().rstrip("."),
+                "dnsResolution": data.get("dnsResolution", "IPV4_AND_IPV6"),
+            }
+        data.pop("type", None)
+        return {"kind": object_type, "value": data}
+
+    @staticmethod
+    def digest(canonical):
+        """
+        Hash a canonical value.
+
+        :param canonical (dict): From canonical().
+        :return: (str) Hex digest.
+        """
+        return hashlib.blake2b(
+            json.dumps(canonical, sort_keys=True).encode(), digest_size=16
+        ).hexdigest()
+
+    def scan(self):
+        """
+        Stream every object of each of api_classes once and group them by hash.
+
+        :return: (int) Number of objects scanned.
+        """
+        logging.debug("In the DuplicateObjectFinder scan() class method.")
+        self.groups = {}
+        scanned = 0
+        for api_class in self.api_classes:
+            for item in api_class(fmc=self.fmc).iter_items():
+                canonical = self.canonical(api_class=api_class, item=item)
+                group = self.groups.setdefault(
+                    self.digest(canonical), {"value": canonical, "objects": []}
+                )
+                group["objects"].append(
+                    {
+                        "id": item.get("id"),
+                        "name": item.get("name"),
+                        "type": item.get("type"),
+                    }
+                )
+                scanned += 1
+        logging.info(f"Scanned {scanned} objects, {len(self.groups)} distinct values.")
+        return scanned
+
+    @staticmethod
+    def referenced(value, ids, found):
+        """
+        Collect the ids in ids that a group, rule, ... refers to anywhere in its fields.
+
+        :param value (object): The item, or one of its fields.
+        :param ids (set): ids looked for.
+        :param found (set): Where the ids found are added.
+        :return: None
+        """
+        if isinstance(value, dict):
+            if value.get("id") in ids and "type" in value:
+                found.add(value["id"])
+            for field in value.values():
+                if isinstance(field, (dict, list)):
+                    DuplicateObjectFinder.referenced(field, ids, found)
+        elif isinstance(value, list):
+            for field in value:
+                DuplicateObjectFinder.referenced(field, ids, found)
+
+    def containers(self):
+        """
+        Stream every item that can refer to objects: groups, access, prefilter and NAT rules.
+
+        :return: (generator) items
+        """
+        yield from NetworkGroups(fmc=self.fmc).iter_items()
+        yield from PortObjectGroups(fmc=self.fmc).iter_items()
+        for acp in self.fmc.object_cache.load(AccessPolicies):
+            yield from AccessRules(fmc=self.fmc, acp_id=acp["id"]).iter_items()
+        for prefilter in self.fmc.object_cache.load(PreFilterPolicies):
+            yield from PreFilterRules(
+                fmc=self.fmc, prefilter_id=prefilter["id"]
+            ).iter_items()
+        for nat in self.fmc.object_cache.load(FTDNatPolicies):
+            for api_class, suffix in [
+                (ManualNatRules, "manualnatrules"),
+                (AutoNatRules, "autonatrules"),
+            ]:
+                rules = api_class(fmc=self.fmc)
+                rules.nat_id = nat["id"]
+                rules.URL = f"{self.fmc.configuration_url}{rules.PREFIX_URL}/{nat['id']}/{suffix}"
+                yield from rules.iter_items()
+
+    def references(self, ids):
+        """
+        Count the groups and rules that refer to each object.
+
+        :param ids (set): ids of the objects.
+        :return: (dict) id to number of groups and rules using it.
+        """
+        logging.debug("In the DuplicateObjectFinder references() class method.")
+        counts = dict.fromkeys(ids, 0)
+        for container in self.containers():
+            found = set()
+            self.referenced(container, ids, found)
+            found.discard(container.get("id"))
+            for id in found:
+                counts[id] += 1
+        return counts
+
+    def find(self, references=True):
+        """
+        Scan the objects and list the merge candidates.
+
+        :param references (bool): Count the references to each duplicate.  (Default is True)
+        :return: (list) {"value": canonical value, "objects": [{"id", "name", "type", "references"}], "keep": the
+            object to keep, "merge": the objects to replace with it}, largest groups first.  The object kept is the
+            most used one.
+        """
+        logging.debug("In the DuplicateObjectFinder find() class method.")
+        self.scan()
+        candidates = [
+            group for group in self.groups.values() if len(group["objects"]) > 1
+        ]
+        counts = {}
+        if references:
+            counts = self.references(
+                {item["id"] for group in candidates for item in group["objects"]}
+            )
+        for group in candidates:
+            for item in group["objects"]:
+                item["references"] = counts.get(item["id"], 0) if references else None
+            ordered = sorted(
+                group["objects"],
+                key=lambda item: (-(item["references"] or 0), str(item["name"])),
+            )
+            group["keep"] = ordered[0]
+            group["merge"] = ordered[1:]
+        candidates.sort(key=lambda group: -len(group["objects"]))
+        logging.info(
+            f"Found {len(candidates)} values shared by "
+            f"{sum(len(group['objects']) for group in candidates)} objects."
+        )
+        return candidates
@@ -6,11 +6,21 @@ The "toolbox" is the FMC class and the "tools" are its methods.  Note: There exi
 FMC API too.  Just Google for it as it gets updated with each release of code.
 """
 
+import asyncio
+import collections
 import datetime
+import email.utils
+import random
+import re
 import requests
+import threading
 import time
 import json
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.exceptions import InsecureRequestWarning
+from requests.packages.urllib3.util.retry import Retry
 import logging
 from logging.handlers import RotatingFileHandler
 import warnings
@@ -18,6 +28,7 @@ from .api_objects import AuditRecords
 from .api_objects import ServerVersion
 from .api_objects import DeployableDevices
 from .api_objects import DeploymentRequests
+from .api_objects import TaskStatuses
 
 # Disable annoying HTTP warnings
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
@@ -41,6 +52,16 @@ class FMC(object):
     MAX_PAGING_REQUESTS = 2000
     TOO_MANY_CONNECTIONS_TIMEOUT = 30
     FMC_MAX_PAYLOAD = 2048000
+    POOL_CONNECTIONS = 10
+    POOL_MAXSIZE = 10
+    MAX_RETRIES = 3
+    RETRY_BACKOFF_FACTOR = 0.5
+    RATE_LIMIT_PER_MINUTE = 120
+    RATE_LIMIT_BURST = 10
+    TOO_MANY_CONNECTIONS_BACKOFF = 1
+    PAGING_WORKERS = 4
+    OBJECT_CACHE_TTL = 300
+    OBJECT_CACHE_SIZE = 100000
 
     def __init__(
         self,
@@ -53,6 +74,16 @@ class FMC(object):
         logging_level="INFO",
         debug=False,
         limit=1000,
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_retries=MAX_RETRIES,
+        keep_alive=True,
+        adapter=None,
+        paging_workers=PAGING_WORKERS,
+        rate_limit=RATE_LIMIT_PER_MINUTE,
+        rate_limit_burst=RATE_LIMIT_BURST,
+        object_cache_ttl=OBJECT_CACHE_TTL,
+        object_cache_size=OBJECT_CACHE_SIZE,
     ):
         """
         Instantiate some variables prior to calling the __enter__() method.
@@ -67,6 +98,18 @@ class FMC(object):
         :param logging_level (str): The desired logging level. (Default is INFO)
         :param debug (bool): True to enable debug logging. (Default is False)
         :param limit (int): Sets up max data to gather per "page". (Default is 1000)
+        :param pool_connections (int): Number of per-host connection pools to cache. (Default is 10)
+        :param pool_maxsize (int): Max number of connections kept open per pool. (Default is 10)
+        :param max_retries (int): Retries on connection/read failures (not on HTTP errors). (Default is 3)
+        :param keep_alive (bool): Reuse TCP/TLS connections between API calls. (Default is True)
+        :param adapter (object): Optional requests transport adapter (for example an HTTP/2 or pipelining capable
+        adapter) to mount instead of the default pooled HTTPAdapter. (Default is None)
+        :param paging_workers (int): Max number of pages fetched concurrently on paged GETs. (Default is 4)
+        :param rate_limit (int): Max number of API calls sent per minute. (Default is 120)
+        :param rate_limit_burst (int): Max number of API calls sent back to back. (Default is 10)
+        :param object_cache_ttl (int): Seconds a name/id lookup result is trusted before the FMC is asked again.
+        (Default is 300)
+        :param object_cache_size (int): Max number of objects kept for name/id lookups. (Default is 100000)
         :return: None
         """
         self.debug = debug
@@ -112,8 +155,22 @@ class FMC(object):
         self.geoVersion = None
         self.configuration_url = None
         self.platform_url = None
-        self.page_counter = None
-        self.more_items = []
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.keep_alive = keep_alive
+        self.adapter = adapter
+        self.paging_workers = paging_workers
+        self.rate_limiter = RateLimiter(rate=rate_limit, per=60, burst=rate_limit_burst)
+        self.object_cache = ObjectCache(
+            fmc=self, ttl=object_cache_ttl, maxsize=object_cache_size
+        )
+        self.session = None
+        self.task_tracker = TaskTracker(fmc=self)
+        self._group_expander = None
+        # time.monotonic() of the last successful POST/PUT/DELETE.  Deployment only waits for the FMC to notice
+        # changes that were actually made.
+        self.last_write = None
 
     def __enter__(self):
         """
@@ -122,12 +179,14 @@ class FMC(object):
         :return: self
         """
         logging.debug("In the FMC __enter__() class method.")
+        self.session = self.build_session()
         self.mytoken = Token(
             host=self.host,
             username=self.username,
             password=self.password,
             domain=self.domain,
             verify_cert=self.VERIFY_CERT,
+            session=self.session,
         )
         self.uuid = self.mytoken.uuid
         self.build_urls()
@@ -155,6 +214,79 @@ class FMC(object):
             logging.info(
                 "Auto deploy changes set to False.  Use the Deploy button in FMC to push changes to FTDs."
             )
+        if self.session:
+            logging.info(
+                f"Closing HTTP session.  Connection stats: {self.connection_stats}"
+            )
+            self.session.close()
+        logging.debug(f"Object cache stats: {self.object_cache.stats}")
+
+    def build_session(self):
+        """
+        Build the requests Session (and its connection pool) shared by the Token and all API objects.
+
+        :return: requests.Session
+        """
+        logging.debug("In the FMC build_session() class method.")
+        session = requests.Session()
+        session.verify = self.VERIFY_CERT
+        if self.adapter is None:
+            self.adapter = HTTPAdapter(
+                pool_connections=self.pool_connections,
+                pool_maxsize=self.pool_maxsize,
+                max_retries=Retry(
+                    total=self.max_retries,
+                    backoff_factor=self.RETRY_BACKOFF_FACTOR,
+                    raise_on_status=False,
+                ),
+            )
+        session.mount("https://", self.adapter)
+        session.mount("http://", self.adapter)
+        if self.keep_alive:
+            session.headers["Connection"] = "keep-alive"
+        else:
+            session.headers["Connection"] = "close"
+        return session
+
+    @property
+    def group_expander(self):
+        """
+        GroupExpander shared by the analytics tools using this FMC, created on first use.
+
+        :return: (GroupExpander)
+        """
+        with self.object_cache.lock:
+            if self._group_expander is None:
+                # Imported here so the FMC class doesn't depend on the analytics modules.
+                from .matching import GroupExpander
+
+                self._group_expander = GroupExpander(fmc=self)
+        return self._group_expander
+
+    @property
+    def connection_stats(self):
+        """
+        Connection reuse statistics of the pooled HTTP session.
+
+        :return: (dict) Totals plus per connection pool counts of requests sent and connections opened.
+        """
+        stats = {"requests": 0, "connections": 0, "reused": 0, "pools": {}}
+        poolmanager = getattr(self.adapter, "poolmanager", None)
+        if poolmanager is None:
+            return stats
+        for key in poolmanager.pools.keys():
+            pool = poolmanager.pools[key]
+            requests_sent = getattr(pool, "num_requests", 0)
+            connections = getattr(pool, "num_connections", 0)
+            stats["pools"][f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "requests": requests_sent,
+                "connections": connections,
+                "reused": max(requests_sent - connections, 0),
+            }
+            stats["requests"] += requests_sent
+            stats["connections"] += connections
+        stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+        return stats
 
     def build_urls(self):
         """
@@ -175,18 +307,48 @@ class FMC(object):
         """
         Send API call to FMC.
 
+        A GET whose response is paged has the remaining pages fetched concurrently and appended, in order, to the
+        first page's "items".  Use iter_pages() to process large collections one page at a time instead.
+
         :param method (str): GET, POST, PUT, or DELETE
         :param url (str): URL for API call.
         :param headers (str):  String of header variables.
         :param json_data (str):  JSON formatted string as payload. (Default is None)
-        :param more_items (str):  Used for paging in query.
-        :return: JSON response from FMC
+        :param more_items (str):  Unused.  Kept for backwards compatibility.  Paging state now lives in a Pager.
+        :return: JSON response from FMC, or None if the GET or any of its pages failed.
         """
         logging.debug("In the FMC send_to_api() class method.")
 
-        if not more_items:
-            self.more_items = []
-            self.page_counter = 0
+        if method != "get":
+            return self.send_request(
+                method=method, url=url, headers=headers, json_data=json_data
+            )
+        pages = iter(self.iter_pages(url=url, headers=headers))
+        json_response = next(pages, None)
+        try:
+            for page in pages:
+                json_response.setdefault("items", []).extend(page.get("items", []))
+        except PagingError as err:
+            logging.error(f"GET of {url} is incomplete --> {str(err)}")
+            return None
+        return json_response
+
+    def send_request(
+        self, method="", url="", headers="", json_data=None, raise_for_status=False
+    ):
+        """
+        Send a single API call to FMC, retrying on "too many connections" and expired tokens.
+
+        :param method (str): GET, POST, PUT, or DELETE
+        :param url (str): URL for API call.
+        :param headers (str):  String of header variables.
+        :param json_data (str):  JSON formatted string as payload. (Default is None)
+        :param raise_for_status (bool):  Raise the requests.exceptions.HTTPError of a failed call instead of returning
+        None.  (Default is False)
+        :return: JSON response from FMC (Not paged.)
+        """
+        logging.debug("In the FMC send_request() class method.")
+
         if headers == "":
             # These values for headers works for most API requests.
             headers = {
@@ -198,24 +360,28 @@ class FMC(object):
         json_response = None
         logging.debug(
             f"Being sent to FMC's API:\n\tHEADERS={headers}\n\tURL={url}\n\tMETHOD={method}\n\t"
-            f"MORE_ITEMS={more_items}\n\tJSON_DATA={json_data}"
+            f"JSON_DATA={json_data}"
         )
+        if self.session is None:
+            self.session = self.build_session()
+        attempt = 0
         try:
             while status_code == 429:
+                self.rate_limiter.acquire()
                 if method == "get":
-                    response = requests.get(
+                    response = self.session.get(
                         url, headers=headers, verify=self.VERIFY_CERT
                     )
                 elif method == "post":
-                    response = requests.post(
+                    response = self.session.post(
                         url, json=json_data, headers=headers, verify=self.VERIFY_CERT
                     )
                 elif method == "put":
-                    response = requests.put(
+                    response = self.session.put(
                         url, json=json_data, headers=headers, verify=self.VERIFY_CERT
                     )
                 elif method == "delete":
-                    response = requests.delete(
+                    response = self.session.delete(
                         url, headers=headers, verify=self.VERIFY_CERT
                     )
                 else:
@@ -231,17 +397,24 @@ class FMC(object):
 
                 status_code = response.status_code
                 if status_code == 429:
+                    wait = self.too_many_connections_backoff(
+                        attempt=attempt,
+                        retry_after=response.headers.get("Retry-After"),
+                    )
                     logging.warning(
-                        f"Too many connections to the FMC.  Waiting {self.TOO_MANY_CONNECTIONS_TIMEOUT} "
-                        f"seconds and trying again."
+                        f"Too many connections to the FMC.  Waiting {wait:.2f} seconds and trying again."
                     )
-                    time.sleep(self.TOO_MANY_CONNECTIONS_TIMEOUT)
+                    self.rate_limiter.throttle(wait)
+                    attempt += 1
+                else:
+                    self.rate_limiter.recover()
                 if status_code == 401:
                     logging.warning("Token has expired. Trying to refresh.")
-                    self.mytoken.access_token = self.mytoken.get_token()
                     headers = {
                         "Content-Type": "application/json",
-                        "X-auth-access-token": self.mytoken.access_token,
+                        "X-auth-access-token": self.mytoken.renew_token(
+                            expired_token=headers.get("X-auth-access-token")
+                        ),
                     }
                     status_code = 429
                 if status_code == 422:
@@ -258,35 +431,61 @@ class FMC(object):
             logging.error(f"json_response -->\t{json_response}")
             if response:
                 response.close()
+            if raise_for_status:
+                raise
             return None
         if response:
             response.close()
-        try:
-            if (
-                "next" in json_response["paging"]
-                and self.page_counter <= self.MAX_PAGING_REQUESTS
-            ):
-                self.more_items += json_response["items"]
-                logging.debug(
-                    f"Paging:  Offset:{json_response['paging']['offset']}, "
-                    f"Limit:{json_response['paging']['limit']}, "
-                    f"Count:{json_response['paging']['count']}, "
-                    f"Gathered_Items:{len(self.more_items)}."
-                )
-                self.page_counter += 1
-                return self.send_to_api(
-                    method=method,
-                    url=json_response["paging"]["next"][0],
-                    json_data=json_data,
-                    more_items=self.more_items,
-                )
-            else:
-                json_response["items"] += self.more_items
-                self.more_items = []
-                return json_response
-        except KeyError:
-            # Used only when the response only has "one page" of results.
-            return json_response
+        if method != "get":
+            self.last_write = time.monotonic()
+        return json_response
+
+    def too_many_connections_backoff(self, attempt=0, retry_after=None):
+        """
+        Work out how long to wait after the FMC answered 429.
+
+        Honor the FMC's Retry-After header when it sends one, otherwise use exponential back off with full jitter
+        capped at TOO_MANY_CONNECTIONS_TIMEOUT seconds.
+
+        :param attempt (int): Number of 429s already received for this request.
+        :param retry_after (str): Value of the response's Retry-After header, if any.
+        :return: (float) seconds
+        """
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    retry_at = email.utils.parsedate_to_datetime(retry_after)
+                    return max(
+                        0.0,
+                        (
+                            retry_at - datetime.datetime.now(retry_at.tzinfo)
+                        ).total_seconds(),
+                    )
+                except (TypeError, ValueError):
+                    logging.debug(f"Unable to parse Retry-After value {retry_after}.")
+        return random.uniform(
+            0,
+            min(
+                self.TOO_MANY_CONNECTIONS_TIMEOUT,
+                self.TOO_MANY_CONNECTIONS_BACKOFF * 2**attempt,
+            ),
+        )
+
+    def iter_pages(self, url="", headers=""):
+        """
+        Yield the pages of a GET, in order, as they arrive.
+
+        Pages after the first are fetched concurrently so at most paging_workers pages are held in memory at once.
+        If any page after the first fails the Pager raises PagingError rather than silently skipping it.
+
+        :param url (str): URL for API call.
+        :param headers (str):  String of header variables.
+        :return: (Pager) Iterable of the JSON response of each page.
+        """
+        logging.debug("In the FMC iter_pages() class method.")
+        return Pager(fmc=self, url=url, headers=headers)
 
     def serverversion(self):
         """Dispose of this method after 20210101.  Use ServerVersion() instead."""
@@ -353,6 +552,707 @@ class FMC(object):
         return tmp.get()
 
 
+class PagingError(ValueError):
+    """A page of a paged GET failed, so the collection read so far is incomplete."""
+
+
+class Pager(object):
+    """
+    Walk the pages of one paged GET.
+
+    All paging state lives on the Pager rather than on the FMC object, so any number of threads can page through
+    different collections over the same FMC session at once.  Iterating a Pager yields each page's JSON response, in
+    order.  Pages after the first are fetched concurrently by a bounded pool of workers.
+    """
+
+    logging.debug("In the Pager class.")
+
+    def __init__(self, fmc, url="", headers=""):
+        """
+        Initialize variables used in the Pager class.
+
+        :param fmc (object): FMC object whose send_request() is used to fetch each page.
+        :param url (str): URL of the first page.
+        :param headers (str):  String of header variables.
+        :return: None
+        """
+        logging.debug("In the Pager __init__() class method.")
+        self.fmc = fmc
+        self.url = url
+        self.headers = headers
+        self.page_counter = 0
+        self.item_counter = 0
+
+    def __iter__(self):
+        """
+        Yield the JSON response of each page, in order, as they arrive.
+
+        :return: (generator) JSON response of each page.
+        """
+        logging.debug("In the Pager __iter__() class method.")
+        first_page = self.fmc.send_request(
+            method="get", url=self.url, headers=self.headers
+        )
+        if first_page is None:
+            return
+        yield self.count(first_page)
+        if "next" in first_page.get("paging", {}):
+            for page in self.iter_remaining_pages(first_page=first_page):
+                yield self.count(page)
+
+    def count(self, page):
+        """
+        Record a fetched page in this Pager's counters.
+
+        :param page (dict): JSON response of a page.
+        :return: page
+        """
+        self.page_counter += 1
+        self.item_counter += len(page.get("items", []))
+        logging.debug(
+            f"Paging:  Page:{self.page_counter}, Gathered_Items:{self.item_counter}."
+        )
+        return page
+
+    def iter_remaining_pages(self, first_page):
+        """
+        Yield every page after first_page, in order, fetching them concurrently.
+
+        The offsets are computed up front from first_page's paging "count" and "limit".  No more than paging_workers
+        pages are in flight at once and every page request is paced by the FMC's rate_limiter.
+
+        :param first_page (dict): JSON response of the first page.
+        :return: (generator) JSON response of each page.  Raises PagingError if a page fails.
+        """
+        logging.debug("In the Pager iter_remaining_pages() class method.")
+        urls = self.page_urls(first_page=first_page)
+        if urls is None:
+            # No usable page math, walk the "next" links instead.
+            yield from self.iter_next_pages(next_url=first_page["paging"]["next"][0])
+            return
+        workers = max(1, min(self.fmc.paging_workers, len(urls)))
+        logging.debug(
+            f"Paging:  Fetching {len(urls)} more pages with up to {workers} workers."
+        )
+        executor = ThreadPoolExecutor(max_workers=workers)
+        in_flight = collections.deque()
+        try:
+            for url in urls:
+                if len(in_flight) >= workers:
+                    yield self.result(*in_flight.popleft())
+                in_flight.append(
+                    (
+                        url,
+                        executor.submit(
+                            self.fmc.send_request,
+                            method="get",
+                            url=url,
+                            headers=self.headers,
+                        ),
+                    )
+                )
+            while in_flight:
+                yield self.result(*in_flight.popleft())
+        finally:
+            # The consumer may stop early, or a page failed.  Don't fetch pages nobody will read.
+            for url, future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def result(url, future):
+        """
+        Wait for a page.
+
+        :param url (str): URL of the page.
+        :param future (Future): send_request() of the page.
+        :return: (dict) JSON response of the page.  Raises PagingError if the GET failed.
+        """
+        page = future.result()
+        if not page:
+            raise PagingError(f"GET of page {url} failed.")
+        return page
+
+    def page_urls(self, first_page):
+        """
+        Compute the URL of every page after first_page from its paging "offset", "limit" and "count".
+
+        :param first_page (dict): JSON response of the first page.
+        :return: (list) urls, or None when the paging info can't be used and "next" links must be followed.
+        """
+        paging = first_page["paging"]
+        limit = int(paging.get("limit", len(first_page.get("items", []))))
+        offset = int(paging.get("offset", 0))
+        count = int(paging.get("count", 0))
+        if limit <= 0 or count <= offset + limit:
+            return None
+        logging.debug(f"Paging:  Offset:{offset}, Limit:{limit}, Count:{count}.")
+        return [
+            self.page_url(url=paging["next"][0], offset=page_offset, limit=limit)
+            for page_offset in range(offset + limit, count, limit)
+        ][: self.fmc.MAX_PAGING_REQUESTS]
+
+    def iter_next_pages(self, next_url):
+        """
+        Yield pages one at a time by following each page's "next" link.
+
+        :param next_url (str): URL of the page to start from.
+        :return: (generator) JSON response of each page.  Raises PagingError if a page fails.
+        """
+        logging.debug("In the Pager iter_next_pages() class method.")
+        page_counter = 0
+        while next_url and page_counter <= self.fmc.MAX_PAGING_REQUESTS:
+            page = self.fmc.send_request(
+                method="get", url=next_url, headers=self.headers
+            )
+            if not page:
+                raise PagingError(f"GET of page {next_url} failed.")
+            yield page
+            next_url = page.get("paging", {}).get("next", [None])[0]
+            page_counter += 1
+
+    @staticmethod
+    def page_url(url, offset, limit):
+        """
+        Set the offset and limit query parameters of a paged URL.
+
+        :param url (str): A paged URL, typically a "next" link from FMC.
+        :param offset (int): Offset of the wanted page.
+        :param limit (int): Number of items per page.
+        :return: (str) url
+        """
+        for key, value in (("offset", offset), ("limit", limit)):
+            if re.search(rf"[?&]{key}=", url):
+                url = re.sub(rf"([?&]){key}=[^&]*", rf"\g<1>{key}={value}", url)
+            elif "?" in url:
+                url = f"{url}&{key}={value}"
+            else:
+                url = f"{url}?{key}={value}"
+        return url
+
+
+class RateLimiter(object):
+    """
+    Client side token bucket that paces API calls to the FMC.
+
+    The bucket refills at "rate" requests per "per" seconds and holds at most "burst" tokens.  Every caller reserves
+    a token before sending a request and sleeps for however long the reservation says, so threads (or coroutines via
+    reserve()) sharing one FMC stay under the FMC's limit together.  When the FMC answers 429 anyway the bucket is
+    paused for the back off time and its rate is halved (adaptive), then the rate creeps back up with each success.
+    """
+
+    logging.debug("In the RateLimiter class.")
+
+    def __init__(self, rate=120, per=60, burst=10):
+        """
+        Initialize variables used in the RateLimiter class.
+
+        :param rate (int): Max number of requests per "per" seconds.  (Default is 120)
+        :param per (int): Length of the rate window in seconds.  (Default is 60)
+        :param burst (int): Max number of requests that may be sent back to back.  (Default is 10)
+        :return: None
+        """
+        logging.debug("In the RateLimiter __init__() class method.")
+        self.max_rate = rate / per
+        self.min_rate = self.max_rate / 16
+        self.rate = self.max_rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token from the bucket.
+
+        :return: (float) Seconds the caller must wait before sending its request.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + max(0.0, now - self.updated) * self.rate
+            )
+            self.updated = max(self.updated, now)
+            self.tokens -= 1
+            return (self.updated - now) + max(0.0, -self.tokens) / self.rate
+
+    def acquire(self):
+        """
+        Take a token from the bucket, sleeping until it is available.
+
+        :return: None
+        """
+        wait = self.reserve()
+        if wait > 0:
+            logging.debug(f"Rate limiter pacing request for {wait:.2f} seconds.")
+            time.sleep(wait)
+
+    def throttle(self, seconds):
+        """
+        The FMC answered 429.  Stop handing out tokens for "seconds" and halve the rate.
+
+        :param seconds (float): How long to pause all callers.
+        :return: None
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.updated = max(self.updated, now + seconds)
+            self.tokens = min(self.tokens, 0)
+            self.rate = max(self.min_rate, self.rate / 2)
+            logging.info(
+                f"Rate limiter paused for {seconds:.2f} seconds and slowed to "
+                f"{self.rate * 60:.0f} requests per minute."
+            )
+
+    def recover(self):
+        """
+        A request succeeded.  Step the rate back up towards its configured maximum.
+
+        :return: None
+        """
+        with self.lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 60)
+
+
+class ObjectCache(object):
+    """
+    Name/id lookup cache shared by all the API objects of one FMC.
+
+    Helper methods such as AccessRules.source_network() need to turn an object's name into its id and type.  Rather
+    than each call downloading whole collections, the first lookup in a collection (for example NetworkGroups) loads
+    it once and every item is cached under (collection, "name", name) and (collection, "id", id).  Entries expire
+    after "ttl" seconds and once more than "maxsize" objects are cached the least recently used ones of other
+    collections are evicted.  The collection being loaded is never evicted, even when it alone holds more than
+    "maxsize" objects, so it isn't downloaded again on each miss.  A successful POST, PUT or DELETE through any API
+    object invalidates the entries of that object.
+    """
+
+    logging.debug("In the ObjectCache class.")
+
+    # Each object is cached under its name and under its id.
+    KEYS_PER_ITEM = 2
+
+    def __init__(self, fmc, ttl=300, maxsize=100000):
+        """
+        Initialize variables used in the ObjectCache class.
+
+        :param fmc (object): FMC object used to load collections.
+        :param ttl (int): Seconds an entry is trusted.  (Default is 300)
+        :param maxsize (int): Max number of objects kept.  (Default is 100000)
+        :return: None
+        """
+        logging.debug("In the ObjectCache __init__() class method.")
+        self.fmc = fmc
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.loaded = {}
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.lock = threading.RLock()
+        self.listeners = []
+
+    def find(self, api_classes, name=None, id=None):
+        """
+        Look up an object by name or id in each collection, in order, and return the first match.
+
+        :param api_classes (list): APIClassTemplate subclasses to search, for example [NetworkAddresses, FQDNS].
+        :param name (str): Name of the object.
+        :param id (str): UUID of the object.
+        :return: (dict) The object as returned by the FMC or None if it is not found.
+        """
+        logging.debug("In the ObjectCache find() class method.")
+        for api_class in api_classes:
+            item = self.get(api_class=api_class, name=name, id=id)
+            if item is not None:
+                return item
+        return None
+
+    def get(self, api_class, name=None, id=None):
+        """
+        Look up an object by name or id in one collection, loading the collection on a miss.
+
+        :param api_class (class): APIClassTemplate subclass whose collection is searched.
+        :param name (str): Name of the object.
+        :param id (str): UUID of the object.
+        :return: (dict) The object as returned by the FMC or None if it is not found.
+        """
+        collection = api_class.__name__
+        key = (collection, "id", id) if id else (collection, "name", name)
+        with self.lock:
+            item = self.lookup(key)
+            if item is not None:
+                self.hits += 1
+                return item
+            self.misses += 1
+            if self.loaded.get(collection, 0) > time.monotonic():
+                # The whole collection is cached and fresh so the object doesn't exist.
+                return None
+        items = self.load(api_class)
+        field, value = key[1:]
+        for item in items:
+            if item.get(field) == value:
+                return item
+        return None
+
+    def lookup(self, key):
+        """
+        Return the cached item for key, dropping it if it has expired.
+
+        :param key (tuple): (collection, "name" or "id", value)
+        :return: (dict) Cached item or None.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, item = entry
+        if expires <= time.monotonic():
+            del self.entries[key]
+            self.loaded.pop(key[0], None)
+            return None
+        self.entries.move_to_end(key)
+        return item
+
+    def load(self, api_class):
+        """
+        GET the whole collection of api_class and cache each of its items.
+
+        The collection is only marked as completely cached, so that a miss means the object doesn't exist, when
+        every page arrived.  An empty answer isn't trusted either since the first page may have failed.
+
+        :param api_class (class): APIClassTemplate subclass whose collection is loaded.
+        :return: (list) Items of the collection.  Only those that arrived if a page failed.
+        """
+        logging.debug(f"ObjectCache loading the {api_class.__name__} collection.")
+        collection = api_class.__name__
+        items = []
+        complete = True
+        try:
+            for item in api_class(fmc=self.fmc).iter_items():
+                items.append(item)
+        except PagingError as err:
+            logging.warning(f"ObjectCache could not load {collection}: {str(err)}")
+            complete = False
+        with self.lock:
+            self.loads += 1
+            expires = time.monotonic() + self.ttl
+            for item in items:
+                self.store(collection=collection, item=item, expires=expires)
+            if complete and items:
+                self.loaded[collection] = expires
+            self.evict(keep=collection)
+        return items
+
+    def store(self, collection, item, expires):
+        """
+        Cache item by name and id.
+
+        :param collection (str): Name of the APIClassTemplate subclass the item belongs to.
+        :param item (dict): The object as returned by the FMC.
+        :param expires (float): time.monotonic() at which the entry goes stale.
+        :return: None
+        """
+        for field in ("name", "id"):
+            if field in item:
+                key = (collection, field, item[field])
+                self.entries[key] = (expires, item)
+                self.entries.move_to_end(key)
+
+    def evict(self, keep=None):
+        """
+        Drop the least recently used entries while more than maxsize objects are cached.
+
+        :param keep (str): Collection that is never evicted, typically the one just loaded.
+        :return: None
+        """
+        excess = len(self.entries) - self.maxsize * self.KEYS_PER_ITEM
+        if excess <= 0:
+            return
+        for key in list(self.entries):
+            if excess <= 0:
+                break
+            if key[0] == keep:
+                continue
+            del self.entries[key]
+            excess -= 1
+            # The collection is no longer completely cached so a miss must reload it.
+            self.loaded.pop(key[0], None)
+
+    def invalidate(self, name=None, id=None):
+        """
+        Forget an object that has been created, changed or deleted.
+
+        Entries matching the name or id are dropped from every collection (a Hosts object is also cached under
+        NetworkAddresses).  An object renamed by a PUT is found through its id so its old name is dropped too.  Every
+        collection is marked as incomplete since a POST adds an object no cached collection knows about.
+
+        :param name (str): Name of the object.
+        :param id (str): UUID of the object.
+        :return: None
+        """
+        logging.debug("In the ObjectCache invalidate() class method.")
+        self.invalidate_many(items=[{"name": name, "id": id}])
+
+    def invalidate_many(self, items):
+        """
+        Forget many objects at once, for example after a bulk POST.  Same as invalidate() but in one pass.
+
+        :param items (list): Dicts with the "name" and/or "id" of each object.
+        :return: None
+        """
+        logging.debug("In the ObjectCache invalidate_many() class method.")
+        names = {item["name"] for item in items if item.get("name")}
+        ids = {item["id"] for item in items if item.get("id")}
+        with self.lock:
+            if ids:
+                for _, item in self.entries.values():
+                    if item.get("id") in ids and "name" in item:
+                        names.add(item["name"])
+            for key in list(self.entries):
+                item = self.entries[key][1]
+                if item.get("id") in ids or item.get("name") in names:
+                    del self.entries[key]
+            self.loaded.clear()
+        for listener in list(self.listeners):
+            listener(items)
+
+    def subscribe(self, listener):
+        """
+        Have listener called with the items of each invalidate_many() (and so invalidate()) call.
+
+        Local indexes built from cached collections (for example NetworkIndex) use this to learn which objects changed.
+
+        :param listener (callable): Called with a list of dicts with the "name" and/or "id" of each changed object.
+        :return: None
+        """
+        logging.debug("In the ObjectCache subscribe() class method.")
+        with self.lock:
+            self.listeners.append(listener)
+
+    def clear(self):
+        """
+        Forget everything.
+
+        :return: None
+        """
+        logging.debug("In the ObjectCache clear() class method.")
+        with self.lock:
+            self.entries.clear()
+            self.loaded.clear()
+
+    @property
+    def stats(self):
+        """
+        Report how well the cache is doing.
+
+        :return: (dict) Number of entries, hits, misses and collection loads.
+        """
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+        }
+
+
+class TaskTracker(object):
+    """
+    Follow any number of FMC tasks (device registration, HA pairing, upgrades, deployments, ...) at once.
+
+    track() hands back a concurrent.futures.Future per task id.  One background thread polls every tracked task, each
+    on its own doubling interval so short tasks are noticed quickly and long ones cost few GETs.  A future resolves
+    with the task's last status once the status is one of TaskStatuses.COMPLETED_STATES or FAILED_STATES, with None
+    if the FMC answers 404 for the task (device registration tasks are deleted when they finish) and with the last
+    status seen if the task times out.  Any other failed GET (5xx, timeout, ...) is retried at the next poll; a task
+    that times out without one successful GET raises the last error instead.  The thread exits when no task is left
+    and is started again by the next track().
+    """
+
+    logging.debug("In the TaskTracker class.")
+
+    def __init__(self, fmc):
+        """
+        Initialize variables used in the TaskTracker class.
+
+        :param fmc (object): FMC object used to poll the tasks.
+        :return: None
+        """
+        logging.debug("In the TaskTracker __init__() class method.")
+        self.fmc = fmc
+        self.tasks = {}
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def track(self, task_id, timeout=None, interval=None, max_interval=None):
+        """
+        Start following a task.  Tracking a task id already being followed returns the same future.
+
+        :param task_id (str): id of the task.
+        :param timeout (int): Max seconds to follow it.  (Default is TaskStatuses.TIMEOUT)
+        :param interval (int): Seconds between the first and second poll.  (Default is TaskStatuses.POLL_INTERVAL)
+        :param max_interval (int): Max seconds between polls.  (Default is TaskStatuses.MAX_POLL_INTERVAL)
+        :return: (Future) Resolves with the task's last status (dict) or None.
+        """
+        logging.debug("In the TaskTracker track() class method.")
+        with self.condition:
+            if task_id in self.tasks:
+                return self.tasks[task_id]["future"]
+            now = time.monotonic()
+            self.tasks[task_id] = {
+                "future": Future(),
+                "next_poll": now,
+                "interval": interval or TaskStatuses.POLL_INTERVAL,
+                "max_interval": max_interval or TaskStatuses.MAX_POLL_INTERVAL,
+                "deadline": now + (timeout or TaskStatuses.TIMEOUT),
+            }
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name="fmcapi-task-tracker", daemon=True
+                )
+                self.thread.start()
+            self.condition.notify()
+            return self.tasks[task_id]["future"]
+
+    def track_response(self, response, **kwargs):
+        """
+        Start following the task an API call answered with (in its ["metadata"]["task"]).
+
+        :param response (dict): Response of a POST or PUT.
+        :param kwargs: Any of the track() parameters.
+        :return: (Future) See track().  None if the response has no task.
+        """
+        task_id = (response or {}).get("metadata", {}).get("task", {}).get("id")
+        if task_id is None:
+            logging.warning("The response has no task to follow.")
+            return None
+        return self.track(task_id=task_id, **kwargs)
+
+    async def atrack(self, task_id, **kwargs):
+        """
+        Await a task on the event loop instead of blocking on its future.
+
+        :param task_id (str): id of the task.
+        :param kwargs: Any of the other track() parameters.
+        :return: (dict) The task's last status or None.
+        """
+        return await asyncio.wrap_future(self.track(task_id=task_id, **kwargs))
+
+    @property
+    def pending(self):
+        """
+        :return: (list) ids of the tasks still being followed.
+        """
+        with self.condition:
+            return list(self.tasks)
+
+    def run(self):
+        """
+        Poll the tasks that are due until none is left.
+
+        :return: None
+        """
+        logging.debug("In the TaskTracker run() class method.")
+        while True:
+            with self.condition:
+                if not self.tasks:
+                    self.thread = None
+                    return
+                now = time.monotonic()
+                due = [
+                    task_id
+                    for task_id, task in self.tasks.items()
+                    if task["next_poll"] <= now
+                ]
+                if not due:
+                    next_poll = min(task["next_poll"] for task in self.tasks.values())
+                    # track() wakes us up early when a new task arrives.
+                    self.condition.wait(next_poll - now)
+                    continue
+            for task_id in due:
+                self.poll(task_id=task_id)
+
+    def poll(self, task_id):
+        """
+        GET one task's status and either resolve its future or schedule its next poll.
+
+        :param task_id (str): id of the task.
+        :return: None
+        """
+        with self.condition:
+            task = self.tasks[task_id]
+        try:
+            response = self.fmc.send_request(
+                method="get",
+                url=f"{self.fmc.configuration_url}{TaskStatuses.URL_SUFFIX}/{task_id}",
+                raise_for_status=True,
+            )
+        except requests.exceptions.RequestException as e:
+            status_code = getattr(e.response, "status_code", None)
+            if status_code == 404:
+                logging.info(f"Task {task_id} no longer exists.")
+                self.resolve(task_id=task_id, result=None)
+                return
+            logging.warning(f"GET of task {task_id} failed.  Trying again --> {e}")
+            task["error"] = e
+            self.schedule(task_id=task_id, task=task)
+            return
+        except Exception as e:
+            self.resolve(task_id=task_id, exception=e)
+            return
+        task["last_status"] = response
+        status = response.get("status")
+        logging.info(f"Task: {response.get('taskType', '')} {status} {task_id}")
+        if (
+            status in TaskStatuses.COMPLETED_STATES
+            or status in TaskStatuses.FAILED_STATES
+        ):
+            self.resolve(task_id=task_id, result=response)
+            return
+        self.schedule(task_id=task_id, task=task)
+
+    def schedule(self, task_id, task):
+        """
+        Plan a task's next poll, or stop following it if it timed out.
+
+        :param task_id (str): id of the task.
+        :param task (dict): The task's entry in self.tasks.
+        :return: None
+        """
+        now = time.monotonic()
+        if now >= task["deadline"]:
+            if "last_status" in task:
+                status = task["last_status"].get("status")
+                logging.warning(
+                    f"Task {task_id} still {status}.  No longer following it."
+                )
+                self.resolve(task_id=task_id, result=task["last_status"])
+            else:
+                logging.error(f"Task {task_id} could not be polled.  Giving up.")
+                self.resolve(task_id=task_id, exception=task["error"])
+            return
+        with self.condition:
+            task["next_poll"] = now + min(task["interval"], task["deadline"] - now)
+            task["interval"] = min(task["interval"] * 2, task["max_interval"])
+
+    def resolve(self, task_id, result=None, exception=None):
+        """
+        Stop following a task and resolve its future.
+
+        :param task_id (str): id of the task.
+        :param result (dict): The task's last status or None.
+        :param exception (Exception): Why the task could not be polled, if it couldn't.
+        :return: None
+        """
+        with self.condition:
+            future = self.tasks.pop(task_id)["future"]
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+
 class Token(object):
     """The token is the validation object used with the FMC."""
 
@@ -364,6 +1264,7 @@ class Token(object):
         TOKEN_LIFETIME * 0.95
     )  # Refresh token at 95% refresh time.
     API_PLATFORM_VERSION = "api/fmc_platform/v1"
+    GENERATE_TOKENS_ON_INIT = True
 
     def __init__(
         self,
@@ -372,6 +1273,7 @@ class Token(object):
         password="Admin123",
         domain=None,
         verify_cert=False,
+        session=None,
     ):
         """
         Initialize variables used in the Token class.
@@ -381,6 +1283,8 @@ class Token(object):
         :param password (str): FMC user's password (Default is Admin123)
         :param domain (str):  UUID of domain.  Default is None which implies Global domain.
         :param verify_cert (bool):  Validate cert  (Default is False)
+        :param session (object):  requests.Session to send token requests through.  (Default is None which creates
+        a new Session)
         :return: None
         """
         logging.debug("In the Token __init__() class method.")
@@ -391,11 +1295,14 @@ class Token(object):
         self.__domain = domain
         self.uuid = None
         self.verify_cert = verify_cert
+        self.session = session if session is not None else requests.Session()
         self.token_refreshes = 0
         self.access_token = None
         self.refresh_token = None
         self.token_creation_time = None
-        self.generate_tokens()
+        self.lock = threading.RLock()
+        if self.GENERATE_TOKENS_ON_INIT:
+            self.generate_tokens()
 
     def generate_tokens(self):
         """
@@ -405,6 +1312,28 @@ class Token(object):
         """
         logging.debug("In the Token generate_tokens() class method.")
 
+        url, headers, auth = self.token_request()
+        if auth:
+            auth = requests.auth.HTTPBasicAuth(*auth)
+        response = self.session.post(
+            url, headers=headers, auth=auth, verify=self.verify_cert
+        )
+        logging.debug(
+            "Response from token post:\n"
+            f"\turl: {url}\n"
+            f"\theaders: {headers}\n"
+            f"\tresponse: {response}"
+        )
+        self.set_tokens(response.headers)
+
+    def token_request(self):
+        """
+        Build the request that creates new or refreshes expired tokens.
+
+        :return: (tuple) url, headers and (username, password) auth, which is None when refreshing.
+        """
+        logging.debug("In the Token token_request() class method.")
+
         if self.token_refreshes <= self.MAX_REFRESHES and self.access_token is not None:
             headers = {
                 "Content-Type": "application/json",
@@ -416,40 +1345,28 @@ class Token(object):
                 f"Refreshing tokens, {self.token_refreshes} out of {self.MAX_REFRESHES} refreshes, "
                 f"from {url}."
             )
-            response = requests.post(url, headers=headers, verify=self.verify_cert)
-            logging.debug(
-                "Response from refreshtoken() post:\n"
-                f"\turl: {url}\n"
-                f"\theaders: {headers}\n"
-                f"\tresponse: {response}"
-            )
             self.token_refreshes += 1
-        else:
-            self.token_refreshes = 0
-            self.token_creation_time = (
-                datetime.datetime.now()
-            )  # Can't trust that your clock is in sync with FMC's.
-            headers = {"Content-Type": "application/json"}
-            url = (
-                f"https://{self.__host}/{self.API_PLATFORM_VERSION}/auth/generatetoken"
-            )
-            logging.info(f"Requesting new tokens from {url}.")
-            response = requests.post(
-                url,
-                headers=headers,
-                auth=requests.auth.HTTPBasicAuth(self.__username, self.__password),
-                verify=self.verify_cert,
-            )
-            logging.debug(
-                "Response from generatetoken() post:\n"
-                f"\turl: {url}\n"
-                f"\theaders: {headers}\n"
-                f"\tresponse: {response}"
-            )
-        self.access_token = response.headers.get("X-auth-access-token")
-        self.refresh_token = response.headers.get("X-auth-refresh-token")
-        self.uuid = response.headers.get("DOMAIN_UUID")
-        all_domain = json.loads(response.headers.get("DOMAINS"))
+            return url, headers, None
+        self.token_refreshes = 0
+        self.token_creation_time = (
+            datetime.datetime.now()
+        )  # Can't trust that your clock is in sync with FMC's.
+        headers = {"Content-Type": "application/json"}
+        url = f"https://{self.__host}/{self.API_PLATFORM_VERSION}/auth/generatetoken"
+        logging.info(f"Requesting new tokens from {url}.")
+        return url, headers, (self.__username, self.__password)
+
+    def set_tokens(self, response_headers):
+        """
+        Store the tokens and domain UUID from the headers of a token response.
+
+        :param response_headers (dict): Headers of the generatetoken/refreshtoken response.
+        :return: None
+        """
+        self.access_token = response_headers.get("X-auth-access-token")
+        self.refresh_token = response_headers.get("X-auth-refresh-token")
+        self.uuid = response_headers.get("DOMAIN_UUID")
+        all_domain = json.loads(response_headers.get("DOMAINS"))
         if self.__domain is not None:
             for domain in all_domain:
                 if "global/" + self.__domain.lower() == domain["name"].lower():
@@ -460,6 +1377,28 @@ class Token(object):
                         "Domain name entered not found in FMC, falling back to Global"
                     )
 
+    def is_expired(self):
+        """
+        Check whether the access token is due to be replaced.
+
+        :return: (boolean)
+        """
+        return datetime.datetime.now() > (
+            self.token_creation_time
+            + datetime.timedelta(seconds=self.TOKEN_REFRESH_TIME)
+        )
+
+    def expire(self):
+        """
+        Forget the current tokens so the next token request generates new ones.
+
+        :return: None
+        """
+        logging.info("Token expired.  Generating a new token.")
+        self.token_refreshes = 0
+        self.access_token = None
+        self.refresh_token = None
+
     def get_token(self):
         """
         Check validity of current token.  If needed make a new or refresh.  Then return access_token.
@@ -467,14 +1406,26 @@ class Token(object):
         :return self.access_token
         """
         logging.debug("In the Token get_token() class method.")
-        if datetime.datetime.now() > (
-            self.token_creation_time
-            + datetime.timedelta(seconds=self.TOKEN_REFRESH_TIME)
-        ):
-            logging.info("Token expired.  Generating a new token.")
-            self.token_refreshes = 0
-            self.access_token = None
-            self.refresh_token = None
-            self.generate_tokens()
+        # Paged GETs call this from several threads at once so only one of them may regenerate the token.
+        with self.lock:
+            if self.is_expired():
+                self.expire()
+                self.generate_tokens()
 
-        return self.access_token
+            return self.access_token
+
+    def renew_token(self, expired_token=None):
+        """
+        Replace a token the FMC has rejected.
+
+        Many threads can hit a 401 with the same token.  Only the first one generates new tokens; the rest get the
+        already renewed token.
+
+        :param expired_token (str): The access token the FMC rejected.
+        :return self.access_token
+        """
+        logging.debug("In the Token renew_token() class method.")
+        with self.lock:
+            if expired_token is None or expired_token == self.access_token:
+                self.generate_tokens()
+            return self.access_token
@@ -0,0 +1,1181 @@
+"""
+Work out what traffic access and prefilter rules match, offline.
+
+This module (matching.py) provides RuleExpander, which turns the objects and literals of a rule (as returned by
+AccessRules or PreFilterRules with expanded=true) into plain ranges of numbers: IP addresses, (protocol, port) pairs,
+VLAN tags and zone ids.  Two expanded rules can then be compared without asking the FMC anything more.  GroupExpander
+flattens nested NetworkGroups and PortObjectGroups for it, expanding each group only once, and IntervalIndex finds
+the rules whose ranges overlap a given one without comparing every pair.  MatchEngine compiles the expanded rules of
+an AccessPolicy into numpy arrays and finds the rule each of a batch of flows would match.
+MatchEngine needs the optional numpy package (pip3 install fmcapi[analytics]).
+"""
+
+import bisect
+import csv
+import ipaddress
+import logging
+import threading
+import time
+from .api_objects import AccessPolicies
+from .api_objects import AccessRules
+from .api_objects import FQDNS
+from .api_objects import Hosts
+from .api_objects import ICMPv4Objects
+from .api_objects import ICMPv6Objects
+from .api_objects import NetworkGroups
+from .api_objects import Networks
+from .api_objects import PortObjectGroups
+from .api_objects import ProtocolPortObjects
+from .api_objects import Ranges
+from .api_objects import VlanGroupTags
+from .api_objects import VlanTags
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class RuleExpander(object):
+    """
+    Expand the match criteria of rules into sorted, merged (low, high) ranges.
+
+    Addresses are integers in one space: IPv6 addresses as they are and IPv4 addresses mapped into ::ffff:0:0/96.
+    Ports are (protocol, low, high) with protocol None for any protocol.  A criterion that is not set, or that uses
+    an object that cannot be expanded (FQDN, geolocation, an object not found, ...), expands to None, meaning "any".
+    Treating what can't be expanded as "any" keeps every comparison on the safe side: rules are never reported as
+    disjoint when they might not be.
+    """
+
+    logging.debug("In the RuleExpander class.")
+
+    NETWORK_TYPES = {
+        "Host": Hosts,
+        "Network": Networks,
+        "Range": Ranges,
+        "NetworkGroup": NetworkGroups,
+        "FQDN": FQDNS,
+    }
+    PORT_TYPES = {
+        "ProtocolPortObject": ProtocolPortObjects,
+        "PortObjectGroup": PortObjectGroups,
+        "ICMPV4Object": ICMPv4Objects,
+        "ICMPV6Object": ICMPv6Objects,
+    }
+    VLAN_TYPES = {"VlanTag": VlanTags, "VlanGroupTag": VlanGroupTags}
+    PROTOCOLS = {"TCP": 6, "UDP": 17, "ICMP": 1, "IPV6-ICMP": 58, "ICMPV6": 58}
+    IPV4_MAPPED = 0xFFFF00000000
+    MAX_ADDRESS = 2**128 - 1
+    # Rule field: kind of criterion.  Zones of AccessRules, interfaces of PreFilterRules.
+    DIMENSIONS = {
+        "sourceZones": "zone",
+        "destinationZones": "zone",
+        "sourceInterfaces": "zone",
+        "destinationInterfaces": "zone",
+        "sourceNetworks": "network",
+        "destinationNetworks": "network",
+        "sourcePorts": "port",
+        "destinationPorts": "port",
+        "vlanTags": "vlan",
+    }
+
+    def __init__(self, fmc):
+        """
+        Initialize RuleExpander object.
+
+        :param fmc (object): FMC object.  Objects the rules refer to are looked up through fmc.object_cache and
+            groups are expanded by fmc.group_expander.
+        :return: None
+        """
+        logging.debug("In the RuleExpander __init__() class method.")
+        self.fmc = fmc
+        self.groups = fmc.group_expander if fmc is not None else GroupExpander()
+
+    def expand(self, rule):
+        """
+        Expand every criterion of a rule.
+
+        :param rule (dict): Rule as returned by the FMC.
+        :return: (dict) DIMENSIONS field to its ranges (zone ids for zones) or None for any.
+        """
+        logging.debug("In the RuleExpander expand() class method.")
+        criteria = {}
+        for field, kind in self.DIMENSIONS.items():
+            value = rule.get(field)
+            if not value:
+                criteria[field] = None
+            elif kind == "zone":
+                criteria[field] = self.zones(value)
+            elif kind == "network":
+                criteria[field] = self.networks(value)
+            elif kind == "port":
+                criteria[field] = self.ports(value)
+            else:
+                criteria[field] = self.vlans(value)
+        return criteria
+
+    def lookup(self, types, item):
+        """
+        Fetch the full object an {"id", "type"} reference points to.
+
+        :param types (dict): Object type to APIClassTemplate subclass.
+        :param item (dict): Reference.
+        :return: (dict) The object or None.
+        """
+        if "id" not in item or item.get("type") not in types:
+            return None
+        return self.fmc.object_cache.get(api_class=types[item["type"]], id=item["id"])
+
+    @staticmethod
+    def merge(ranges):
+        """
+        Sort ranges and merge the ones that overlap or touch.
+
+        :param ranges (list): (low, high) tuples.  Port ranges are (protocol, low, high).
+        :return: (list) Merged ranges.
+        """
+        merged = []
+        # Any protocol (None) sorts first.
+        for item in sorted(
+            ranges, key=lambda r: tuple(-1 if x is None else x for x in r)
+        ):
+            if (
+                merged
+                and merged[-1][:-2] == item[:-2]
+                and item[-2] <= merged[-1][-1] + 1
+            ):
+                if item[-1] > merged[-1][-1]:
+                    merged[-1] = merged[-1][:-1] + (item[-1],)
+            else:
+                merged.append(tuple(item))
+        return merged
+
+    @staticmethod
+    def intersects(a, b):
+        """
+        Tell whether two sets of merged ranges have a value in common.
+
+        :param a (list): Ranges from expand().  None is any.
+        :param b (list): Ranges from expand().  None is any.
+        :return: (bool)
+        """
+        if a is None or b is None:
+            return True
+        if a and isinstance(a[0], str):
+            # Zone ids.
+            return bool(set(a) & set(b))
+        for x in a:
+            for y in b:
+                if (
+                    len(x) == 3
+                    and x[0] is not None
+                    and y[0] is not None
+                    and x[0] != y[0]
+                ):
+                    continue
+                if x[-2] <= y[-1] and y[-2] <= x[-1]:
+                    return True
+        return False
+
+    @classmethod
+    def overlaps(cls, a, b):
+        """
+        Tell whether some traffic could match both of two rules.
+
+        :param a (dict): Criteria of a rule from expand().
+        :param b (dict): Criteria of a rule from expand().
+        :return: (bool) False only when the rules provably match no traffic in common.
+        """
+        return all(
+            cls.intersects(a.get(field), b.get(field)) for field in cls.DIMENSIONS
+        )
+
+    @staticmethod
+    def contains(outer, inner):
+        """
+        Tell whether every value of one set of merged ranges is in another.
+
+        :param outer (list): Ranges from expand().  None is any.
+        :param inner (list): Ranges from expand().  None is any.
+        :return: (bool) True only when provably so.  A range covered by two touching ranges of different protocols
+            (one of them any protocol) is not recognized.
+        """
+        if outer is None:
+            return True
+        if inner is None:
+            return False
+        if inner and isinstance(inner[0], str):
+            # Zone ids.
+            return set(inner) <= set(outer)
+        for x in inner:
+            if not any(
+                (len(y) == 2 or y[0] is None or y[0] == x[0])
+                and y[-2] <= x[-2]
+                and x[-1] <= y[-1]
+                for y in outer
+            ):
+                return False
+        return True
+
+    @classmethod
+    def covers(cls, a, b):
+        """
+        Tell whether all the traffic one rule matches is also matched by another.
+
+        :param a (dict): Criteria of the covering rule from expand().
+        :param b (dict): Criteria of the covered rule from expand().
+        :return: (bool)
+        """
+        return all(cls.contains(a.get(field), b.get(field)) for field in cls.DIMENSIONS)
+
+    def zones(self, value):
+        """
+        Expand security zones (or interface groups) to zone ids.
+
+        An interface is in one security zone only, so different zones match different traffic.  Interface groups can
+        share interfaces with zones, so a criterion using one is any.
+
+        :param value (dict): {"objects": [...]}
+        :return: (list) Sorted zone ids or None.
+        """
+        objects = value.get("objects", [])
+        if not objects or any(item.get("type") != "SecurityZone" for item in objects):
+            return None
+        return sorted({item["id"] for item in objects})
+
+    def networks(self, value):
+        """
+        Expand network objects, groups and literals to address ranges.
+
+        :param value (dict): {"objects": [...], "literals": [...]}
+        :return: (list) Merged (low, high) ranges or None.
+        """
+        expanded = self.groups.flatten(kind="network", value=value)
+        if expanded["unresolved"] or not expanded["ranges"]:
+            return None
+        return expanded["ranges"]
+
+    @classmethod
+    def address_range(cls, value):
+        """
+        Turn a host, network or range value into a range of addresses.
+
+        :param value (str): "10.0.0.1", "10.0.0.0/8", "10.0.0.1-10.0.0.9" or the IPv6 equivalents.
+        :return: (tuple) (low, high) or None if the value can't be parsed.
+        """
+        try:
+            if "-" in str(value):
+                first, last = str(value).split("-", 1)
+                low = cls.address_number(ipaddress.ip_address(first.strip()))
+                high = cls.address_number(ipaddress.ip_address(last.strip()))
+            else:
+                network = ipaddress.ip_network(str(value).strip(), strict=False)
+                low = cls.address_number(network.network_address)
+                high = cls.address_number(network.broadcast_address)
+        except ValueError:
+            logging.debug(f"Unable to parse address {value}.")
+            return None
+        return (low, high)
+
+    @classmethod
+    def address_number(cls, address):
+        """
+        Place an IPv4 or IPv6 address in the one address space.
+
+        :param address (object): ipaddress.IPv4Address or IPv6Address.
+        :return: (int)
+        """
+        if address.version == 4:
+            return cls.IPV4_MAPPED + int(address)
+        return int(address)
+
+    def ports(self, value):
+        """
+        Expand port objects, groups and literals to (protocol, low, high) ranges.
+
+        ICMP types are treated as the ports of the ICMP protocols.
+
+        :param value (dict): {"objects": [...], "literals": [...]}
+        :return: (list) Merged ranges or None.
+        """
+        expanded = self.groups.flatten(kind="port", value=value)
+        if expanded["unresolved"] or not expanded["ranges"]:
+            return None
+        return expanded["ranges"]
+
+    @classmethod
+    def port_range(cls, item):
+        """
+        Turn a port object or literal into a (protocol, low, high) range.
+
+        :param item (dict): ProtocolPortObject, ICMP object or literal.
+        :return: (tuple) Range or None if it can't be parsed.
+        """
+        item_type = str(item.get("type", "")).upper()
+        protocol = str(item.get("protocol", "")).upper()
+        if "ICMPV6" in item_type:
+            protocol = "58"
+        elif "ICMPV4" in item_type:
+            protocol = "1"
+        protocol = cls.PROTOCOLS.get(protocol, protocol)
+        try:
+            protocol = int(protocol) if protocol not in ["", "ALL"] else None
+            if protocol in [1, 58]:
+                value = item.get("icmpType")
+                ports = (0, 255) if value in [None, "", "Any"] else (int(value),) * 2
+            else:
+                value = str(item.get("port", "")).strip()
+                if not value or value.lower() == "any":
+                    ports = (0, 65535)
+                elif "-" in value:
+                    ports = tuple(int(port) for port in value.split("-", 1))
+                else:
+                    ports = (int(value),) * 2
+        except ValueError:
+            logging.debug(f"Unable to parse port {item}.")
+            return None
+        return (protocol,) + ports
+
+    def vlans(self, value, seen=None):
+        """
+        Expand VLAN tag objects, groups and literals to tag ranges.
+
+        :param value (dict): {"objects": [...], "literals": [...]}
+        :param seen (set): ids of the groups being expanded, to stop at cycles.
+        :return: (list) Merged (low, high) ranges or None.
+        """
+        seen = set() if seen is None else seen
+        ranges = []
+        for literal in value.get("literals", []):
+            ranges.append((int(literal["startTag"]), int(literal["endTag"])))
+        for item in value.get("objects", []):
+            obj = self.lookup(self.VLAN_TYPES, item)
+            if obj is None:
+                return None
+            if obj.get("type") == "VlanGroupTag":
+                if obj["id"] in seen:
+                    continue
+                seen.add(obj["id"])
+                expanded = self.vlans(obj, seen=seen)
+                if expanded is None:
+                    return None
+                ranges.extend(expanded)
+                continue
+            data = obj.get("data", {})
+            ranges.append((int(data["startTag"]), int(data["endTag"])))
+        return self.merge(ranges) if ranges else None
+
+
+class GroupExpander(object):
+    """
+    Flatten NetworkGroups and PortObjectGroups, nested groups included, into merged ranges, each group only once.
+
+    The result of each group is kept by group id and reused by every group (or rule) that contains it, so expanding
+    every group of a domain is one pass over the groups.  The groups each object is a member of are noted: when
+    fmc.object_cache reports an object as changed, the results of the groups containing it, directly or not, are
+    dropped.  A group that contains itself, directly or not, is expanded without the member that closes the cycle
+    and the cycle is logged and kept in "cycles".  Everything is forgotten after fmc.object_cache.ttl seconds so
+    changes made outside fmcapi are picked up.
+
+    Ranges are the ones RuleExpander uses: (low, high) addresses and (protocol, low, high) ports.  Members that can't
+    be expanded (FQDN, an object not found, ...) are listed in "unresolved" instead.
+    """
+
+    logging.debug("In the GroupExpander class.")
+
+    GROUP_TYPES = {"NetworkGroup": "network", "PortObjectGroup": "port"}
+    TYPES = dict(RuleExpander.NETWORK_TYPES, **RuleExpander.PORT_TYPES)
+    IPV4_LAST = RuleExpander.IPV4_MAPPED + 2**32 - 1
+
+    def __init__(self, fmc=None, items=None):
+        """
+        Initialize GroupExpander object.
+
+        :param fmc (object): FMC object.  Objects are loaded, a collection at a time, through fmc.object_cache.
+        :param items (list): Groups and objects to expand instead, as returned by the FMC.  Changes are then only
+            seen through update().
+        :return: None
+        """
+        logging.debug("In the GroupExpander __init__() class method.")
+        self.fmc = fmc
+        self.lock = threading.RLock()
+        self.items = {}
+        self.loaded = set()
+        self.results = {}
+        self.parents = {}
+        self.cycles = []
+        self.stale = []
+        self.expires = None
+        self.expansions = 0
+        if items is not None:
+            self.items = {item["id"]: item for item in items if "id" in item}
+            self.loaded = set(self.TYPES.values())
+        elif fmc is not None:
+            fmc.object_cache.subscribe(self.changed)
+
+    def lookup(self, reference):
+        """
+        Find the object an {"id", "type"} reference points to, loading its whole collection the first time.
+
+        :param reference (dict): Reference.
+        :return: (dict) The object or None.
+        """
+        item = self.items.get(reference.get("id"))
+        if item is not None or self.fmc is None:
+            return item
+        api_class = self.TYPES.get(reference.get("type"))
+        if api_class is None:
+            return None
+        if api_class not in self.loaded:
+            self.load(api_class)
+            item = self.items.get(reference.get("id"))
+            if item is not None:
+                return item
+        item = self.fmc.object_cache.get(api_class=api_class, id=reference.get("id"))
+        if item is not None:
+            self.items[item["id"]] = item
+        return item
+
+    def load(self, api_class):
+        """
+        Load a whole collection, once.
+
+        :param api_class (class): APIClassTemplate subclass.
+        :return: None
+        """
+        if self.fmc is None or api_class in self.loaded:
+            return
+        self.loaded.add(api_class)
+        if self.expires is None:
+            self.expires = time.monotonic() + self.fmc.object_cache.ttl
+        for item in self.fmc.object_cache.load(api_class):
+            self.items.setdefault(item.get("id"), item)
+
+    def expand(self, group_id):
+        """
+        Flatten one group.
+
+        :param group_id (str): UUID of a NetworkGroup or PortObjectGroup.
+        :return: (dict) {"ranges": merged ranges, "unresolved": references and literals that couldn't be expanded}
+            or None if the group isn't found.
+        """
+        self.sync()
+        with self.lock:
+            group = self.items.get(group_id)
+            for group_type in self.GROUP_TYPES:
+                if group is None:
+                    group = self.lookup({"id": group_id, "type": group_type})
+            if group is None or group.get("type") not in self.GROUP_TYPES:
+                return None
+            return self.visit(group=group, path={})[0]
+
+    def flatten(self, kind, value):
+        """
+        Flatten the objects and literals of a rule criterion, or of anything shaped like a group.
+
+        :param kind (str): "network" or "port".
+        :param value (dict): {"objects": [...], "literals": [...]}
+        :return: (dict) {"ranges", "unresolved"} as for expand().
+        """
+        self.sync()
+        with self.lock:
+            return self.contents(kind=kind, value=value, path={}, owner=None)[0]
+
+    def expand_all(self):
+        """
+        Flatten every NetworkGroup and PortObjectGroup.
+
+        :return: (dict) Group id to {"ranges", "unresolved"}.
+        """
+        logging.debug("In the GroupExpander expand_all() class method.")
+        self.sync()
+        with self.lock:
+            for group_type in self.GROUP_TYPES:
+                self.load(self.TYPES[group_type])
+            return {
+                id: self.visit(group=item, path={})[0]
+                for id, item in list(self.items.items())
+                if item.get("type") in self.GROUP_TYPES
+            }
+
+    def visit(self, group, path):
+        """
+        Flatten a group, reusing its kept result.
+
+        :param group (dict): NetworkGroup or PortObjectGroup.
+        :param path (dict): ids of the groups being expanded to their depth, to stop at cycles.
+        :return: (tuple) ({"ranges", "unresolved"}, depth of the shallowest group being expanded it contains).  The
+            result is only kept when the group contains none of the groups it is being expanded for, as it is
+            incomplete otherwise.
+        """
+        id = group["id"]
+        if id in self.results:
+            return self.results[id], len(path)
+        depth = len(path)
+        path[id] = depth
+        self.expansions += 1
+        result, low = self.contents(
+            kind=self.GROUP_TYPES[group["type"]], value=group, path=path, owner=id
+        )
+        del path[id]
+        if low >= depth:
+            self.results[id] = result
+        return result, low
+
+    def contents(self, kind, value, path, owner):
+        """
+        Flatten the objects and literals of a group.
+
+        :param kind (str): "network" or "port".
+        :param value (dict): {"objects": [...], "literals": [...]}
+        :param path (dict): See visit().
+        :param owner (str): id of the group, noted as a parent of each of its members.  None for a rule criterion.
+        :return: (tuple) See visit().
+        """
+        ranges = []
+        unresolved = []
+        low = len(path)
+        for literal in value.get("literals", []):
+            item = self.parse(kind=kind, item=literal)
+            if item is None:
+                unresolved.append(literal)
+            else:
+                ranges.append(item)
+        for reference in value.get("objects", []):
+            id = reference.get("id")
+            if owner is not None:
+                self.parents.setdefault(id, set()).add(owner)
+            if id in path:
+                low = min(low, path[id])
+                self.cycle(path=path, id=id)
+                continue
+            member = self.lookup(reference)
+            if member is None:
+                unresolved.append(reference)
+            elif member.get("type") in self.GROUP_TYPES:
+                result, member_low = self.visit(group=member, path=path)
+                low = min(low, member_low)
+                ranges.extend(result["ranges"])
+                unresolved.extend(result["unresolved"])
+            else:
+                item = self.parse(kind=kind, item=member)
+                if item is None:
+                    unresolved.append(reference)
+                else:
+                    ranges.append(item)
+        return {"ranges": RuleExpander.merge(ranges), "unresolved": unresolved}, low
+
+    @staticmethod
+    def parse(kind, item):
+        """
+        Turn one object or literal into a range.
+
+        :param kind (str): "network" or "port".
+        :param item (dict): Object or literal.
+        :return: (tuple) Range or None.
+        """
+        if kind == "network":
+            return RuleExpander.address_range(item.get("value"))
+        return RuleExpander.port_range(item)
+
+    def cycle(self, path, id):
+        """
+        Note a group that contains itself.
+
+        :param path (dict): See visit().
+        :param id (str): id of the group met again.
+        :return: None
+        """
+        cycle = list(path)[path[id] :] + [id]
+        if cycle in self.cycles:
+            return
+        self.cycles.append(cycle)
+        names = [self.items.get(member, {}).get("name", member) for member in cycle]
+        logging.warning(f"Group {' -> '.join(names)} contains itself.")
+
+    @classmethod
+    def prefixes(cls, ranges):
+        """
+        Turn address ranges into the fewest prefixes that cover exactly the same addresses.
+
+        :param ranges (list): Merged (low, high) ranges from expand().
+        :return: (list) ipaddress.IPv4Network and IPv6Network, IPv4 first.
+        """
+        ipv4 = []
+        ipv6 = []
+        for low, high in ranges:
+            if low < RuleExpander.IPV4_MAPPED:
+                ipv6.append((low, min(high, RuleExpander.IPV4_MAPPED - 1)))
+            if low <= cls.IPV4_LAST and high >= RuleExpander.IPV4_MAPPED:
+                ipv4.append(
+                    (
+                        max(low, RuleExpander.IPV4_MAPPED) - RuleExpander.IPV4_MAPPED,
+                        min(high, cls.IPV4_LAST) - RuleExpander.IPV4_MAPPED,
+                    )
+                )
+            if high > cls.IPV4_LAST:
+                ipv6.append((max(low, cls.IPV4_LAST + 1), high))
+        networks = []
+        for address, parts in [
+            (ipaddress.IPv4Address, ipv4),
+            (ipaddress.IPv6Address, ipv6),
+        ]:
+            for low, high in parts:
+                networks.extend(
+                    ipaddress.summarize_address_range(address(low), address(high))
+                )
+        return networks
+
+    def update(self, changes):
+        """
+        Apply changed and deleted objects.
+
+        :param changes (dict): Object id to the object as it is now, or None if it was deleted.
+        :return: (set) ids of the objects changed and of every group containing one of them.
+        """
+        logging.debug("In the GroupExpander update() class method.")
+        with self.lock:
+            for id, item in changes.items():
+                if item is None:
+                    self.items.pop(id, None)
+                else:
+                    self.items[id] = item
+            return self.invalidate(ids=changes)
+
+    def invalidate(self, ids):
+        """
+        Drop the results of groups, and of every group containing one of them.
+
+        :param ids (iterable): Object ids.
+        :return: (set) ids of the objects and of every group containing one of them.
+        """
+        with self.lock:
+            affected = set(ids)
+            pending = list(affected)
+            while pending:
+                for parent in self.parents.get(pending.pop(), ()):
+                    if parent not in affected:
+                        affected.add(parent)
+                        pending.append(parent)
+            for id in affected:
+                self.results.pop(id, None)
+        return affected
+
+    def changed(self, items):
+        """
+        Note objects the object cache was told changed.  Called by fmc.object_cache.
+
+        :param items (list): Dicts with the "name" and/or "id" of each object.
+        :return: None
+        """
+        with self.lock:
+            self.stale.extend(item["id"] for item in items if item.get("id"))
+
+    def sync(self):
+        """
+        Forget everything once expired, or re-read the objects changed since the last expansion.
+
+        :return: None
+        """
+        with self.lock:
+            if self.expires is not None and time.monotonic() >= self.expires:
+                self.clear()
+                return
+            if not self.stale:
+                return
+            stale = self.stale
+            self.stale = []
+            changes = {}
+            for id in dict.fromkeys(stale):
+                item = self.items.get(id)
+                if item is not None:
+                    api_class = self.TYPES.get(item.get("type"))
+                    changes[id] = (
+                        self.fmc.object_cache.get(api_class=api_class, id=id)
+                        if api_class is not None
+                        else None
+                    )
+                elif id in self.parents:
+                    # A member that couldn't be found before.
+                    changes[id] = None
+            if changes:
+                self.update(changes=changes)
+
+    def clear(self):
+        """
+        Forget everything.
+
+        :return: None
+        """
+        logging.debug("In the GroupExpander clear() class method.")
+        with self.lock:
+            self.items = {}
+            self.loaded = set()
+            self.results = {}
+            self.parents = {}
+            self.stale = []
+            self.expires = None
+
+
+class IntervalIndex(object):
+    """
+    Static interval tree: find the intervals that overlap a range in O(log n + matches).
+
+    The intervals are sorted by low end in an implicit binary tree where each node also holds the highest high end
+    below it, so whole subtrees that end before the range, or start after it, are skipped.
+    """
+
+    logging.debug("In the IntervalIndex class.")
+
+    def __init__(self, intervals):
+        """
+        Build the index.
+
+        :param intervals (list): (low, high, value) tuples.
+        :return: None
+        """
+        logging.debug("In the IntervalIndex __init__() class method.")
+        self.intervals = sorted(intervals, key=lambda item: (item[0], item[1]))
+        size = 1
+        while size < len(self.intervals):
+            size *= 2
+        self.size = size
+        # Leaves at size + i; unused leaves end before anything.
+        self.highest = [-1] * (2 * size)
+        for i, (_, high, _) in enumerate(self.intervals):
+            self.highest[size + i] = high
+        for node in range(size - 1, 0, -1):
+            self.highest[node] = max(self.highest[2 * node], self.highest[2 * node + 1])
+        self.lows = [low for low, _, _ in self.intervals]
+
+    def overlapping(self, low, high):
+        """
+        Find the intervals that have a value in common with [low, high].
+
+        :param low (int): Low end of the range.
+        :param high (int): High end of the range.
+        :return: (list) Values of the overlapping intervals.
+        """
+        # Only intervals starting at or before high can overlap.
+        last = bisect.bisect_right(self.lows, high)
+        if not last:
+            return []
+        values = []
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, first, end = stack.pop()
+            if first >= last or self.highest[node] < low:
+                continue
+            if end - first == 1:
+                values.append(self.intervals[first][2])
+                continue
+            middle = (first + end) // 2
+            stack.append((2 * node + 1, middle, end))
+            stack.append((2 * node, first, middle))
+        return values
+
+
+class MatchEngine(object):
+    """
+    Find the first rule of an AccessPolicy each flow matches, for millions of flows at once.
+
+    Each match criterion (source and destination zone, address and port) is cut into the elementary intervals between
+    the bounds used by any rule, and each interval gets a bit set of the rules that match it.  A flow's rules are the
+    AND of the bit sets of the intervals its values fall in and its match is the lowest set bit.  Ports are keyed by
+    protocol * 65536 + port, so a criterion for TCP/80 does not match UDP/80.
+
+    Rules that also use criteria a flow does not carry (applications, URLs, users, ...) or objects that can't be
+    expanded are treated as matching on those criteria and the flows they match are flagged "uncertain".  So are
+    rules with zone criteria for flows that don't say which zone they are in.
+    """
+
+    logging.debug("In the MatchEngine class.")
+
+    # Flow field: rule fields it is matched against, the AccessRules one first.
+    FLOW_FIELDS = {
+        "source_zone": ["sourceZones", "sourceInterfaces"],
+        "destination_zone": ["destinationZones", "destinationInterfaces"],
+        "source": ["sourceNetworks"],
+        "destination": ["destinationNetworks"],
+        "source_port": ["sourcePorts"],
+        "destination_port": ["destinationPorts"],
+    }
+    # Criteria a 5-tuple and zones can't be matched against.
+    CONDITIONAL_FIELDS = [
+        "applications",
+        "urls",
+        "users",
+        "sourceSecurityGroupTags",
+        "destinationSecurityGroupTags",
+        "sourceDynamicObjects",
+        "destinationDynamicObjects",
+        "vlanTags",
+        "timeRangeObjects",
+    ]
+    # CSV column: flow field.
+    CSV_COLUMNS = {
+        "src_zone": "source_zone",
+        "dst_zone": "destination_zone",
+        "src": "source",
+        "dst": "destination",
+        "proto": "protocol",
+        "sport": "source_port",
+        "dport": "destination_port",
+    }
+    CHUNK_SIZE = 65536
+    PORTS = 65536
+
+    def __init__(self, fmc=None, acp_id=None, acp_name=None, rules=None):
+        """
+        Fetch and compile the rules of an AccessPolicy.
+
+        :param fmc (object): FMC object
+        :param acp_id (str): UUID of the AccessPolicy.
+        :param acp_name (str): Name of the AccessPolicy, if acp_id isn't given.
+        :param rules (list): Rules to compile instead of the ones of the AccessPolicy, in order.
+        :return: None
+        """
+        logging.debug("In the MatchEngine __init__() class method.")
+        if numpy is None:
+            raise ImportError(
+                "MatchEngine needs numpy.  Install it with: pip3 install fmcapi[analytics]"
+            )
+        self.fmc = fmc
+        acp = None
+        if acp_id is not None:
+            acp = self.fmc.object_cache.get(api_class=AccessPolicies, id=acp_id)
+        elif acp_name is not None:
+            acp = self.fmc.object_cache.get(api_class=AccessPolicies, name=acp_name)
+            if acp is None:
+                logging.warning(f"Access Control Policy {acp_name} not found.")
+            else:
+                acp_id = acp["id"]
+        self.default_action = ((acp or {}).get("defaultAction") or {}).get("action")
+        if rules is None:
+            rules = list(AccessRules(fmc=self.fmc, acp_id=acp_id).iter_items())
+        self.compile(rules=rules)
+
+    def compile(self, rules):
+        """
+        Expand the enabled rules and build the bit sets of each criterion.
+
+        :param rules (list): Rules in policy order.
+        :return: None
+        """
+        logging.debug("In the MatchEngine compile() class method.")
+        expander = RuleExpander(fmc=self.fmc)
+        self.rules = [rule for rule in rules if rule.get("enabled", True)]
+        self.actions = [rule.get("action") for rule in self.rules]
+        self.conditional = numpy.zeros(len(self.rules), dtype=bool)
+        self.constrained = {
+            field: numpy.zeros(len(self.rules), dtype=bool)
+            for field in ["source_zone", "destination_zone"]
+        }
+        self.zones = {}
+        criteria = {field: [] for field in self.FLOW_FIELDS}
+        for number, rule in enumerate(self.rules):
+            expanded = expander.expand(rule)
+            if any(rule.get(field) for field in self.CONDITIONAL_FIELDS):
+                self.conditional[number] = True
+            for flow_field, rule_fields in self.FLOW_FIELDS.items():
+                field = next((f for f in rule_fields if rule.get(f)), None)
+                if field is None:
+                    criteria[flow_field].append(None)
+                    continue
+                if expanded[field] is None:
+                    # Set, but not something we can expand.
+                    self.conditional[number] = True
+                    criteria[flow_field].append(None)
+                    continue
+                if flow_field in self.constrained:
+                    self.constrained[flow_field][number] = True
+                criteria[flow_field].append(
+                    self.intervals(
+                        kind=RuleExpander.DIMENSIONS[field],
+                        value=expanded[field],
+                        rule=rule,
+                        field=field,
+                    )
+                )
+        self.words = max(1, (len(self.rules) + 63) // 64)
+        self.dimensions = {
+            field: self.dimension(intervals) for field, intervals in criteria.items()
+        }
+
+    def intervals(self, kind, value, rule, field):
+        """
+        Turn expanded criteria into (low, high) intervals of the numbers flows are keyed by.
+
+        :param kind (str): "zone", "network" or "port".
+        :param value (list): Expanded criteria from RuleExpander.
+        :param rule (dict): The rule, for the names of its zones.
+        :param field (str): The rule field.
+        :return: (list) (low, high) tuples.
+        """
+        if kind == "zone":
+            for item in rule[field].get("objects", []):
+                self.zones.setdefault(item["id"], len(self.zones))
+                if item.get("name"):
+                    self.zones.setdefault(item["name"], self.zones[item["id"]])
+            return [(self.zones[zone], self.zones[zone]) for zone in value]
+        if kind == "port":
+            intervals = []
+            for protocol, low, high in value:
+                protocols = range(256) if protocol is None else [protocol]
+                intervals.extend(
+                    (p * self.PORTS + low, p * self.PORTS + high) for p in protocols
+                )
+            return intervals
+        return list(value)
+
+    def dimension(self, intervals):
+        """
+        Build the elementary intervals of one criterion and the bit set of each.
+
+        :param intervals (list): For each rule a list of (low, high) tuples, or None for any.
+        :return: (dict) "high" and "low" (the 64 bit halves of each interval's first value) and "bits".
+        """
+        bounds = {0}
+        for rule_intervals in intervals:
+            for low, high in rule_intervals or []:
+                bounds.add(low)
+                if high < RuleExpander.MAX_ADDRESS:
+                    # Intervals end where the next one starts.  The last one runs to the top of the address space.
+                    bounds.add(high + 1)
+        bounds = sorted(bounds)
+        position = {bound: i for i, bound in enumerate(bounds)}
+        position[RuleExpander.MAX_ADDRESS + 1] = len(bounds)
+        bits = numpy.zeros((len(bounds), self.words), dtype="uint64")
+        for number, rule_intervals in enumerate(intervals):
+            word, bit = divmod(number, 64)
+            bit = numpy.uint64(1 << bit)
+            if rule_intervals is None:
+                bits[:, word] |= bit
+                continue
+            for low, high in rule_intervals:
+                bits[position[low] : position[high + 1], word] |= bit
+        return {
+            "high": numpy.array([bound >> 64 for bound in bounds], dtype="uint64"),
+            "low": numpy.array(
+                [bound & 0xFFFFFFFFFFFFFFFF for bound in bounds], dtype="uint64"
+            ),
+            "bits": bits,
+        }
+
+    @staticmethod
+    def locate(dimension, high, low):
+        """
+        Find the elementary interval each value falls in.
+
+        Values are 128 bits wide, given as their high and low 64 bit halves, and compared as (high, low) pairs.
+
+        :param dimension (dict): From dimension().
+        :param high (numpy array): High halves of the values.
+        :param low (numpy array): Low halves of the values.
+        :return: (numpy array) Interval numbers.
+        """
+        bounds_high = dimension["high"]
+        bounds_low = dimension["low"]
+        # Bounds <= (high, low) = bounds with a smaller high half + bounds with the same high half and low <= low.
+        count = numpy.searchsorted(bounds_high, high, side="left")
+        for value in numpy.intersect1d(bounds_high, high):
+            first = numpy.searchsorted(bounds_high, value, side="left")
+            last = numpy.searchsorted(bounds_high, value, side="right")
+            selected = high == value
+            count[selected] += numpy.searchsorted(
+                bounds_low[first:last], low[selected], side="right"
+            )
+        return count - 1
+
+    def flows(self, rows):
+        """
+        Turn flows into the arrays classify() works on.
+
+        :param rows (list): Dicts with "source", "destination" (addresses), "protocol" (number or name),
+            "source_port", "destination_port" (ICMP type for ICMP) and optionally "source_zone" and "destination_zone"
+            (names or ids).
+        :return: (dict) numpy arrays.  Zones are kept as given and numbered by each engine's classify().
+        """
+        logging.debug("In the MatchEngine flows() class method.")
+        columns = {
+            "source_high": [],
+            "source_low": [],
+            "destination_high": [],
+            "destination_low": [],
+            "source_port": [],
+            "destination_port": [],
+            "source_zone": [],
+            "destination_zone": [],
+        }
+        for row in rows:
+            for field in ["source", "destination"]:
+                address = RuleExpander.address_number(
+                    ipaddress.ip_address(str(row[field]).strip())
+                )
+                columns[f"{field}_high"].append(address >> 64)
+                columns[f"{field}_low"].append(address & 0xFFFFFFFFFFFFFFFF)
+            protocol = str(row.get("protocol", "")).strip().upper()
+            protocol = int(RuleExpander.PROTOCOLS.get(protocol, protocol or 0))
+            for field in ["source_port", "destination_port"]:
+                port = row.get(field) or 0
+                columns[field].append(protocol * self.PORTS + int(port))
+            for field in ["source_zone", "destination_zone"]:
+                columns[field].append(str(row.get(field) or ""))
+        return {
+            name: numpy.array(
+                values, dtype=object if name.endswith("zone") else "uint64"
+            )
+            for name, values in columns.items()
+        }
+
+    def read_csv(self, path, columns=None):
+        """
+        Read flows from a CSV file with a header line.
+
+        :param path (str): Filename (and optional path).
+        :param columns (dict): CSV column to flow field.  (Default is CSV_COLUMNS: src, dst, proto, sport, dport,
+            src_zone and dst_zone)
+        :return: (dict) numpy arrays for classify().
+        """
+        logging.debug("In the MatchEngine read_csv() class method.")
+        columns = columns or self.CSV_COLUMNS
+        with open(path, newline="") as file:
+            rows = (
+                {field: row.get(column) for column, field in columns.items()}
+                for row in csv.DictReader(file)
+            )
+            return self.flows(rows)
+
+    def zone_numbers(self, zones):
+        """
+        Number zone names or ids the way compile() did.  Zones no rule uses get a number no rule matches.
+
+        Flows without a zone get that number too.  classify() then lets them match any zone.
+
+        :param zones (numpy array): Zone names or ids.
+        :return: (numpy array) Zone numbers.
+        """
+        names, inverse = numpy.unique(zones.astype(str), return_inverse=True)
+        numbers = numpy.array(
+            [self.zones.get(name, len(self.zones)) for name in names.tolist()],
+            dtype="uint64",
+        )
+        return numbers[inverse.reshape(-1)]
+
+    def classify(self, flows):
+        """
+        Find the first rule each flow matches.
+
+        :param flows (dict): numpy arrays from flows() or read_csv().
+        :return: (dict) "rule": number of the matched rule in self.rules, -1 for the default action; "uncertain":
+            True where the matched rule also has criteria the flow couldn't be checked against, zones included for
+            flows without a zone.
+        """
+        logging.debug("In the MatchEngine classify() class method.")
+        total = len(flows["source_low"])
+        matched = numpy.full(total, -1, dtype="int64")
+        zeros = numpy.zeros(total, dtype="uint64")
+        values = {
+            "source_zone": (zeros, self.zone_numbers(flows["source_zone"])),
+            "destination_zone": (zeros, self.zone_numbers(flows["destination_zone"])),
+            "source": (flows["source_high"], flows["source_low"]),
+            "destination": (flows["destination_high"], flows["destination_low"]),
+            "source_port": (zeros, flows["source_port"]),
+            "destination_port": (zeros, flows["destination_port"]),
+        }
+        # Flows that don't say which zone they are in match the zone criteria of every rule.
+        unknown = {field: flows[field].astype(str) == "" for field in self.constrained}
+        for start in range(0, total, self.CHUNK_SIZE):
+            chunk = slice(start, start + self.CHUNK_SIZE)
+            bits = None
+            for field, dimension in self.dimensions.items():
+                high, low = values[field]
+                cells = self.locate(dimension, high[chunk], low[chunk])
+                field_bits = dimension["bits"][cells]
+                if field in unknown:
+                    field_bits[unknown[field][chunk]] = ~numpy.uint64(0)
+                bits = field_bits if bits is None else bits & field_bits
+            nonzero = bits != 0
+            found = nonzero.any(axis=1)
+            word = nonzero.argmax(axis=1)
+            first = bits[numpy.arange(len(word)), word]
+            # Isolate the lowest set bit; it is a power of two, so its log2 is exact.
+            lowest = first & (numpy.uint64(0) - first)
+            bit = numpy.log2(numpy.maximum(lowest, 1).astype("float64")).astype("int64")
+            matched[chunk] = numpy.where(found, word * 64 + bit, -1)
+        uncertain = numpy.zeros(total, dtype=bool)
+        hit = matched >= 0
+        uncertain[hit] = self.conditional[matched[hit]]
+        for field, constrained in self.constrained.items():
+            uncertain[hit] |= unknown[field][hit] & constrained[matched[hit]]
+        return {"rule": matched, "uncertain": uncertain}
+
+    def action(self, result):
+        """
+        Return the action each classified flow gets.
+
+        :param result (dict): From classify().
+        :return: (numpy array) Action names, the AccessPolicy's default action where no rule matched.
+        """
+        actions = numpy.array(self.actions + [self.default_action], dtype=object)
+        return actions[result["rule"]]
+
+    def summary(self, result):
+        """
+        Count the flows matched by each rule.
+
+        :param result (dict): From classify().
+        :return: (list) {"rule", "action", "flows", "uncertain"} per rule that matched any flow, in policy order.
+            "rule" is None for the default action.
+        """
+        counts = numpy.bincount(result["rule"] + 1, minlength=len(self.rules) + 1)
+        uncertain = numpy.bincount(
+            result["rule"] + 1,
+            weights=result["uncertain"],
+            minlength=len(self.rules) + 1,
+        )
+        summary = []
+        for number in numpy.flatnonzero(counts).tolist():
+            rule = self.rules[number - 1] if number else None
+            summary.append(
+                {
+                    "rule": rule.get("name") if rule else None,
+                    "action": rule.get("action") if rule else self.default_action,
+                    "flows": int(counts[number]),
+                    "uncertain": int(uncertain[number]),
+                }
+            )
+        return summary
+
+    def impact(self, other, flows):
+        """
+        Compare how this engine and another (for example, one compiled from proposed rules) treat the same flows.
+
+        :param other (object): MatchEngine
+        :param flows (dict): Flows from flows() or read_csv() of either engine.
+        :return: (dict) {"flows", "changed", "changes": {(old rule, old action, new rule, new action): flows}}.
+        """
+        logging.debug("In the MatchEngine impact() class method.")
+        before = self.classify(flows)
+        after = other.classify(flows)
+        old_actions = self.action(before)
+        new_actions = other.action(after)
+        changed = old_actions != new_actions
+        changes = {}
+        for old, new in set(
+            zip(before["rule"][changed].tolist(), after["rule"][changed].tolist())
+        ):
+            mask = changed & (before["rule"] == old) & (after["rule"] == new)
+            changes[
+                (
+                    self.rules[old].get("name") if old >= 0 else None,
+                    self.actions[old] if old >= 0 else self.default_action,
+                    other.rules[new].get("name") if new >= 0 else None,
+                    other.actions[new] if new >= 0 else other.default_action,
+                )
+            ] = int(mask.sum())
+        return {
+            "flows": len(changed),
+            "changed": int(changed.sum()),
+            "changes": changes,
+        }
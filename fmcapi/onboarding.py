@@ -0,0 +1,219 @@
+"""
+Register a fleet of devices with the FMC concurrently.
+
+This module (onboarding.py) provides DeviceOnboarding.  It resolves the access policies, device groups and licenses
+the devices share once, registers up to 'max_concurrent' devices at a time, follows each registration task through
+the FMC's TaskTracker (instead of DeviceRecords.post()'s fixed wait) and returns one result row per device.
+"""
+
+import datetime
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from .api_objects import AccessPolicies
+from .api_objects import DeviceGroupRecords
+from .api_objects import DeviceRecords
+from .api_objects import TaskStatuses
+
+
+class DeviceOnboarding(object):
+    """
+    Register many devices and put them in their device groups.
+
+    Each device spec is a dict with the DeviceRecords values to POST ("name", "hostName", "regKey", "natID", ...)
+    plus "acp_name" (required), "licenses" (list of DeviceRecords.LICENSES) and "device_group" (name of a
+    DeviceGroupRecords).
+    """
+
+    logging.debug("In the DeviceOnboarding class.")
+
+    # The FMC registers devices one after another in the background; more in flight only queue up there.
+    MAX_CONCURRENT = 5
+    TIMEOUT = 1800
+
+    def __init__(self, fmc, devices, max_concurrent=MAX_CONCURRENT, timeout=TIMEOUT):
+        """
+        Initialize DeviceOnboarding object.
+
+        :param fmc (object): FMC object
+        :param devices (list): Device specs.
+        :param max_concurrent (int): Max number of registrations in flight.  (Default is 5)
+        :param timeout (int): Max seconds to follow each registration.  (Default is 1800)
+        :return: None
+        """
+        logging.debug("In the DeviceOnboarding __init__() class method.")
+        self.fmc = fmc
+        self.devices = devices
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.results = []
+
+    def resolve(self):
+        """
+        Look up every access policy and device group the devices use, once each.
+
+        :return: (tuple) access policy name to {"id", "type"} and device group name to id.  Names not found are None.
+        """
+        logging.debug("In the DeviceOnboarding resolve() class method.")
+        acps = {}
+        groups = {}
+        for spec in self.devices:
+            name = spec.get("acp_name")
+            if name is not None and name not in acps:
+                item = self.fmc.object_cache.get(api_class=AccessPolicies, name=name)
+                acps[name] = {"id": item["id"], "type": item["type"]} if item else None
+            name = spec.get("device_group")
+            if name is not None and name not in groups:
+                item = self.fmc.object_cache.get(
+                    api_class=DeviceGroupRecords, name=name
+                )
+                groups[name] = item["id"] if item else None
+        return acps, groups
+
+    def run(self):
+        """
+        Register every device, wait for the registrations and add the devices to their device groups.
+
+        :return: (list) One row per device, in the order given: {"name", "hostName", "status", "message", "task",
+            "started_at", "seconds", "device_group"}.  "status" is registered, failed or timed out.
+        """
+        logging.debug("In the DeviceOnboarding run() class method.")
+        acps, groups = self.resolve()
+        # Attempting to "Deploy" during Device registration causes issues.
+        autodeploy = self.fmc.autodeploy
+        self.fmc.autodeploy = False
+        logging.info(
+            f"Registering {len(self.devices)} devices, {self.max_concurrent} at a time."
+        )
+        try:
+            self.results = [None] * len(self.devices)
+            with ThreadPoolExecutor(max_workers=self.max_concurrent) as executor:
+                futures = {
+                    executor.submit(self.register, spec, acps, groups): number
+                    for number, spec in enumerate(self.devices)
+                }
+                for future in as_completed(futures):
+                    number = futures[future]
+                    try:
+                        self.results[number] = future.result()
+                    except Exception as e:
+                        row = self.new_row(self.devices[number])
+                        row["message"] = f"Registration could not be followed: {e}"
+                        logging.error(f"Device {row['name']}: {row['message']}")
+                        self.results[number] = row
+            self.join_groups(groups=groups)
+        finally:
+            self.fmc.autodeploy = autodeploy
+        return self.results
+
+    @staticmethod
+    def new_row(spec):
+        """
+        Start the result row of a device, as failed.
+
+        :param spec (dict): Device spec.
+        :return: (dict) Result row of the device.
+        """
+        return {
+            "name": spec.get("name"),
+            "hostName": spec.get("hostName"),
+            "status": "failed",
+            "message": None,
+            "task": None,
+            "started_at": None,
+            "seconds": None,
+            "device_group": spec.get("device_group"),
+        }
+
+    def register(self, spec, acps, groups):
+        """
+        Register one device and follow its registration task.
+
+        :param spec (dict): Device spec.
+        :param acps (dict): Access policies from resolve().
+        :param groups (dict): Device groups from resolve().
+        :return: (dict) Result row of the device.
+        """
+        row = self.new_row(spec)
+        if acps.get(spec.get("acp_name")) is None:
+            row["message"] = f"Access Control Policy {spec.get('acp_name')} not found."
+            return row
+        if "device_group" in spec and groups.get(spec["device_group"]) is None:
+            row["message"] = f"Device group {spec['device_group']} not found."
+            return row
+        invalid = [
+            name
+            for name in spec.get("licenses", [])
+            if name not in DeviceRecords.LICENSES
+        ]
+        if invalid:
+            row["message"] = f"Unknown licenses {invalid}."
+            return row
+        kwargs = {
+            key: value
+            for key, value in spec.items()
+            if key not in ["acp_name", "licenses", "device_group"]
+        }
+        device = DeviceRecords(fmc=self.fmc, **kwargs)
+        device.accessPolicy = acps[spec["acp_name"]]
+        device.license_caps = list(spec.get("licenses", []))
+        row["started_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        start = time.monotonic()
+        response = device.post(post_wait_time=self.timeout, wait=False)
+        if not response:
+            row["message"] = "Registration request failed."
+            return row
+        task = device.__dict__.get("registration_task")
+        final = task.result() if task is not None else None
+        row["seconds"] = time.monotonic() - start
+        row["task"] = (
+            response.get("metadata", {}).get("task", {}).get("id")
+            if task is not None
+            else None
+        )
+        if final is None or final.get("status") in TaskStatuses.COMPLETED_STATES:
+            # A registration task is deleted when the registration is done.
+            row["status"] = "registered"
+        elif final.get("status") in TaskStatuses.FAILED_STATES:
+            row["message"] = final.get("message")
+        else:
+            row["status"] = "timed out"
+        logging.info(f"Device {row['name']}: {row['status']}.")
+        return row
+
+    def join_groups(self, groups):
+        """
+        Add the registered devices to their device groups with one PUT per group.
+
+        :param groups (dict): Device groups from resolve().
+        :return: None
+        """
+        logging.debug("In the DeviceOnboarding join_groups() class method.")
+        rows = [
+            row
+            for row in self.results
+            if row["status"] == "registered" and row["device_group"] is not None
+        ]
+        if not rows:
+            return
+        # One GET for the ids of all the newly registered devices.
+        devices = {
+            item.get("name"): item for item in DeviceRecords(fmc=self.fmc).iter_items()
+        }
+        for name in {row["device_group"] for row in rows}:
+            members = [row for row in rows if row["device_group"] == name]
+            group = DeviceGroupRecords(fmc=self.fmc, id=groups[name])
+            group.get()
+            group.members = group.__dict__.get("members", [])
+            for row in members:
+                device = devices.get(row["name"])
+                if device is None:
+                    row["message"] = f"Registered but not found to add to {name}."
+                    continue
+                group.members.append(
+                    {"id": device["id"], "type": device["type"], "name": row["name"]}
+                )
+            if not group.put():
+                for row in members:
+                    row["message"] = f"Registered but could not be added to {name}."
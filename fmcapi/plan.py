@@ -0,0 +1,478 @@
+"""
+Build a desired state of FMC objects from a document and apply it with as many API calls in flight as is safe.
+
+This module (plan.py) provides Plan.  A desired-state document maps fmcapi API object type names to lists of keyword
+arguments for that type, for example:
+
+    {
+        "Hosts": [{"name": "web1", "value": "10.0.0.1"}],
+        "NetworkGroups": [{"name": "web", "objects": [{"name": "web1"}]}],
+        "AccessPolicies": [{"name": "acp1", "defaultAction": "BLOCK"}],
+        "AccessRules": [
+            {"name": "allow web", "acp_name": "acp1", "action": "ALLOW",
+             "destinationNetworks": {"objects": [{"name": "web"}]}},
+        ],
+    }
+
+References between objects are found in the document itself: any nested {"name": ...} and any "..._name" keyword
+argument (acp_name, device_name, ...) that names another object of the document.  The references form a dependency
+graph which is cut into levels; every object of a level only depends on objects of earlier levels, so each level is
+sent with a pool of workers and bulk POSTs where the FMC supports them.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from . import api_objects
+from .api_objects.apiclasstemplate import APIClassTemplate
+from .fmc import PagingError
+
+
+class Plan(object):
+    """
+    Ordered, levelled list of the objects needed to bring an FMC to a desired state.
+
+    Objects that already exist with the same name (within their parent for child objects such as AccessRules) are
+    marked "exists" and go through APIClassTemplate.apply(), which only sends a PUT if a field differs.  Everything
+    else is marked "create".
+    """
+
+    logging.debug("In the Plan class.")
+
+    WORKERS = 8
+    # Collections searched for references to objects that are not in the document.
+    LOOKUP_API_CLASSES = [
+        "NetworkAddresses",
+        "FQDNS",
+        "NetworkGroups",
+        "Ports",
+        "PortObjectGroups",
+        "SecurityZones",
+        "InterfaceGroups",
+        "VlanTags",
+        "URLs",
+        "URLGroups",
+    ]
+    # Parent keyword arguments given by name: the keyword argument taking the parent's id and the parent's type.
+    PARENTS = {
+        "acp_name": ("acp_id", "AccessPolicies"),
+        "prefilter_name": ("prefilter_id", "PreFilterPolicies"),
+        "device_name": ("device_id", "DeviceRecords"),
+    }
+
+    def __init__(self, fmc, document, workers=WORKERS):
+        """
+        Work out what needs creating and in what order.
+
+        :param fmc (object): FMC object, already logged in.
+        :param document (dict): API object type name to list of keyword arguments for that type.
+        :param workers (int): Max number of API calls in flight while applying.  (Default is 8)
+        :return: None
+        """
+        logging.debug("In the Plan __init__() class method.")
+        self.fmc = fmc
+        self.workers = workers
+        self.resources = {}
+        self.results = {}
+        self.children = {}
+        for api_class, kwargs_list in document.items():
+            for kwargs in kwargs_list:
+                # Child objects (AccessRules, PhysicalInterfaces, ...) are only unique within their parent.
+                parent = tuple(
+                    sorted(
+                        (k, v)
+                        for k, v in kwargs.items()
+                        if k.endswith("_name") or k.endswith("_id")
+                    )
+                )
+                key = (api_class, kwargs.get("name"), parent)
+                if key in self.resources:
+                    logging.warning(
+                        f"{api_class} {key[1]} is in the document more than once.  Using the last one."
+                    )
+                self.resources[key] = {
+                    "api_class": api_class,
+                    "kwargs": kwargs,
+                    "depends_on": set(),
+                    "action": "create",
+                    "id": None,
+                    "type": kwargs.get("type"),
+                }
+        self.names = {}
+        for key in self.resources:
+            self.names.setdefault(key[1], []).append(key)
+        for key, resource in self.resources.items():
+            api_class = getattr(api_objects, resource["api_class"], None)
+            if not (
+                resource["api_class"] in api_objects.__all__
+                and isinstance(api_class, type)
+                and issubclass(api_class, APIClassTemplate)
+            ):
+                self.fail(key, f"Unknown API object type {resource['api_class']}.")
+                continue
+            for name in self.references(resource["kwargs"], top=True):
+                resource["depends_on"].update(
+                    other for other in self.names.get(name, []) if other != key
+                )
+            if key[1] is None:
+                continue
+            if api_class.REQUIRED_FOR_GET == [""]:
+                item = self.fmc.object_cache.get(api_class=api_class, name=key[1])
+            else:
+                try:
+                    item = self.existing_child(api_class, resource["kwargs"], key[1])
+                except PagingError as e:
+                    self.fail(key, f"Could not list the existing objects: {e}")
+                    continue
+            if item is not None:
+                resource["action"] = "exists"
+                resource["id"] = item.get("id")
+                resource["type"] = item.get("type")
+                resource["current"] = item
+        self.keep_rule_order()
+        self.levels = self.build_levels()
+
+    def existing_child(self, api_class, kwargs, name):
+        """
+        Look up an object that only exists within a parent object (an AccessRule within its AccessPolicy, ...).
+
+        The children of each parent are listed once and kept for the other objects of the document.
+
+        :param api_class (class): APIClassTemplate subclass of the object.
+        :param kwargs (dict): The object's keyword arguments from the document.
+        :param name (str): Name of the object.
+        :return: (dict) The object as returned by the FMC or None if it, or its parent, doesn't exist yet.
+        """
+        parent = {
+            k: v
+            for k, v in self.resolve_parents(api_class, kwargs).items()
+            if k in api_class.REQUIRED_FOR_GET
+        }
+        if len(parent) < len(api_class.REQUIRED_FOR_GET):
+            return None
+        children = (api_class.__name__, tuple(sorted(parent.items())))
+        if children not in self.children:
+            self.children[children] = {
+                item.get("name"): item
+                for item in api_class(fmc=self.fmc, **parent).iter_items()
+            }
+        return self.children[children].get(name)
+
+    def resolve_parents(self, api_class, kwargs):
+        """
+        Copy keyword arguments replacing parents given by name (acp_name, ...) with their id (acp_id, ...).
+
+        Parents of the document take the id they were created (or found) with.  Others are looked up in the FMC's
+        object cache, so each parent is looked up once however many children it has.  A parent that can't be found is
+        left as it is.
+
+        :param api_class (class): APIClassTemplate subclass of the object.
+        :param kwargs (dict): The object's keyword arguments.
+        :return: (dict) Copy of kwargs.
+        """
+        resolved = dict(kwargs)
+        for name_field, (id_field, parent_class) in self.PARENTS.items():
+            name = resolved.get(name_field)
+            if (
+                not isinstance(name, str)
+                or id_field in resolved
+                or id_field not in api_class.VALID_FOR_KWARGS
+            ):
+                continue
+            parent_id = None
+            for other in self.names.get(name, []):
+                if other[0] == parent_class and self.resources[other]["id"]:
+                    parent_id = self.resources[other]["id"]
+                    break
+            else:
+                item = self.fmc.object_cache.get(
+                    api_class=getattr(api_objects, parent_class), name=name
+                )
+                if item is not None:
+                    parent_id = item.get("id")
+            if parent_id is not None:
+                del resolved[name_field]
+                resolved[id_field] = parent_id
+        return resolved
+
+    def references(self, value, top=False):
+        """
+        Find the names of the objects a keyword argument value refers to.
+
+        :param value: A keyword argument value (or the whole dict of keyword arguments when top is True).
+        :param top (bool): value is the dict of keyword arguments itself, whose own "name" isn't a reference.
+        :return: (list) Names.
+        """
+        names = []
+        if isinstance(value, dict):
+            for k, v in value.items():
+                if k == "name":
+                    if not top and isinstance(v, str):
+                        names.append(v)
+                elif top and k.endswith("_name") and isinstance(v, str):
+                    names.append(v)
+                else:
+                    names.extend(self.references(v))
+        elif isinstance(value, list):
+            for v in value:
+                names.extend(self.references(v))
+        return names
+
+    def keep_rule_order(self):
+        """
+        Make the access rules of a policy all wait for everything any of them waits for.
+
+        That puts them in the same level, where they are bulk POSTed in the order of the document.
+
+        :return: None
+        """
+        policies = {}
+        for key, resource in self.resources.items():
+            if resource["api_class"] == "AccessRules":
+                policies.setdefault(key[2], []).append(key)
+        for keys in policies.values():
+            depends_on = set().union(
+                *(self.resources[key]["depends_on"] for key in keys)
+            )
+            depends_on.difference_update(keys)
+            for key in keys:
+                self.resources[key]["depends_on"] = set(depends_on)
+
+    def build_levels(self):
+        """
+        Cut the dependency graph into levels.  Objects that are part of a dependency cycle are failed.
+
+        :return: (list) Lists of keys.  Every key depends only on keys of earlier levels.
+        """
+        logging.debug("In the Plan build_levels() class method.")
+        remaining = {
+            key: set(resource["depends_on"])
+            for key, resource in self.resources.items()
+            if key not in self.results
+        }
+        # Anything that already failed is not waited on.
+        for depends_on in remaining.values():
+            depends_on.intersection_update(remaining)
+        levels = []
+        while remaining:
+            level = [key for key, depends_on in remaining.items() if not depends_on]
+            if not level:
+                for key in remaining:
+                    self.fail(key, "Part of a dependency cycle.")
+                break
+            levels.append(level)
+            for key in level:
+                del remaining[key]
+            for depends_on in remaining.values():
+                depends_on.difference_update(level)
+        return levels
+
+    def apply(self):
+        """
+        Create everything marked "create" and update what differs of everything marked "exists", one level at a time.
+
+        Within a level each API object type is sent in bulk if the FMC supports it and otherwise one POST per object,
+        with up to self.workers calls in flight.  Objects that depend on a failed object are not sent.
+
+        :return: (list) One result per object of the document: {"api_class", "name", "id", "action", "changes",
+            "error"}.  "changes" is the per-field change set of an existing object.
+        """
+        logging.debug("In the Plan apply() class method.")
+        for number, level in enumerate(self.levels, start=1):
+            logging.info(
+                f"Applying level {number} of {len(self.levels)}: {len(level)} objects."
+            )
+            batches = {}
+            for key in level:
+                failed = [
+                    other
+                    for other in self.resources[key]["depends_on"]
+                    if self.results.get(other, {}).get("error")
+                ]
+                if failed:
+                    self.fail(
+                        key, f"Depends on {failed[0][0]} {failed[0][1]} which failed."
+                    )
+                    continue
+                api_class = getattr(api_objects, self.resources[key]["api_class"])
+                if self.resources[key]["action"] == "exists":
+                    batches[key] = [key]
+                elif "post" in api_class.BULK_METHODS:
+                    batches.setdefault(api_class, []).append(key)
+                else:
+                    batches[key] = [key]
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(self.create, batches.values()))
+        return [self.results[key] for key in self.resources]
+
+    def create(self, keys):
+        """
+        Build the objects of some keys and POST them, in bulk when there is more than one.  A key marked "exists" comes
+        on its own and is updated instead.
+
+        :param keys (list): Keys of objects of the same API object type.
+        :return: None
+        """
+        objects = []
+        for key in keys:
+            try:
+                objects.append(self.build(key))
+            except Exception as e:
+                self.fail(key, f"Could not build the object: {e}")
+        if not objects:
+            return
+        if self.resources[objects[0][0]]["action"] == "exists":
+            self.update(*objects[0])
+        elif len(objects) == 1:
+            key, obj = objects[0]
+            if obj.post():
+                self.succeed(key, obj)
+            else:
+                self.fail(key, "POST failed.")
+        elif isinstance(objects[0][1], api_objects.AccessRules):
+            self.create_access_rules(objects)
+        else:
+            bulk = api_objects.BulkObjects(
+                fmc=self.fmc, objects=[obj for key, obj in objects]
+            )
+            for (key, obj), result in zip(objects, bulk.post()):
+                if result["error"]:
+                    self.fail(key, result["error"])
+                else:
+                    self.succeed(key, obj)
+
+    def update(self, key, obj):
+        """
+        Bring an existing object in line with the document, sending a PUT only if a field differs.
+
+        :param key (tuple): (API object type name, name, parent)
+        :param obj (object): The APIClassTemplate object built from the document.
+        :return: None
+        """
+        result = obj.apply(current=self.resources[key]["current"])
+        self.resources[key]["changes"] = result["changes"]
+        if result["action"] == "failed":
+            self.fail(key, "PUT failed.")
+        else:
+            self.results[key] = self.result(key)
+
+    def create_access_rules(self, objects):
+        """
+        Bulk POST access rules, one Bulk per ACP (and section/category) so that the rules keep the document's order.
+
+        :param objects (list): (key, AccessRules object) tuples.
+        :return: None
+        """
+        by_url = {}
+        for key, obj in objects:
+            by_url.setdefault(obj.URL, []).append((key, obj))
+        for url, rules in by_url.items():
+            bulk = api_objects.Bulk(fmc=self.fmc, url=url)
+            for key, obj in rules:
+                bulk.add(obj.format_data())
+            response = bulk.post()
+            created = {item.get("name"): item.get("id") for item in response["items"]}
+            for key, obj in rules:
+                if obj.name in created:
+                    obj.id = created[obj.name]
+                    self.succeed(key, obj)
+                else:
+                    self.fail(key, "Bulk POST failed.")
+
+    def build(self, key):
+        """
+        Instantiate the API object of a key with its references resolved to ids.
+
+        :param key (tuple): (API object type name, name, parent)
+        :return: (tuple) key and the APIClassTemplate object.
+        """
+        resource = self.resources[key]
+        api_class = getattr(api_objects, resource["api_class"])
+        kwargs = self.resolve_parents(api_class, resource["kwargs"])
+        return key, api_class(fmc=self.fmc, **self.resolve(kwargs, top=True))
+
+    def resolve(self, value, top=False):
+        """
+        Copy a keyword argument value filling in the "id" (and "type") of every nested {"name": ...} reference.
+
+        References to objects of the document take the id they were created (or found) with.  Other references are
+        looked up in the FMC's object cache and left as they are if they can't be found.
+
+        :param value: A keyword argument value (or the whole dict of keyword arguments when top is True).
+        :param top (bool): value is the dict of keyword arguments itself, whose own "name" isn't a reference.
+        :return: Resolved copy of value.
+        """
+        if isinstance(value, list):
+            return [self.resolve(v) for v in value]
+        if not isinstance(value, dict):
+            return value
+        resolved = {k: self.resolve(v) for k, v in value.items()}
+        if top or "id" in resolved or not isinstance(resolved.get("name"), str):
+            return resolved
+        name = resolved["name"]
+        for other in self.names.get(name, []):
+            if self.resources[other]["id"]:
+                resolved["id"] = self.resources[other]["id"]
+                if self.resources[other]["type"]:
+                    resolved.setdefault("type", self.resources[other]["type"])
+                return resolved
+        item = self.fmc.object_cache.find(
+            api_classes=[getattr(api_objects, c) for c in self.LOOKUP_API_CLASSES],
+            name=name,
+        )
+        if item is not None:
+            resolved["id"] = item["id"]
+            resolved.setdefault("type", item.get("type"))
+        else:
+            logging.warning(f"Could not find an object named {name}.")
+        return resolved
+
+    def succeed(self, key, obj):
+        """
+        Record that an object was created.
+
+        :param key (tuple): (API object type name, name, parent)
+        :param obj (object): The APIClassTemplate object, with the id the FMC gave it.
+        :return: None
+        """
+        self.resources[key]["id"] = obj.__dict__.get("id")
+        self.resources[key]["type"] = obj.__dict__.get("type")
+        self.results[key] = self.result(key)
+
+    def fail(self, key, error):
+        """
+        Record that an object could not be created.
+
+        :param key (tuple): (API object type name, name, parent)
+        :param error (str): Why.
+        :return: None
+        """
+        logging.error(f"{key[0]} {key[1]}: {error}")
+        self.results[key] = self.result(key, error=error)
+
+    def result(self, key, error=None):
+        """
+        :param key (tuple): (API object type name, name, parent)
+        :param error (str): Why the object failed or None.
+        :return: (dict) api_class, name, id, action, changes and error.
+        """
+        resource = self.resources[key]
+        return {
+            "api_class": key[0],
+            "name": key[1],
+            "id": resource["id"],
+            "action": resource["action"],
+            "changes": resource.get("changes"),
+            "error": error,
+        }
+
+    @property
+    def summary(self):
+        """
+        Count what the plan will do (or did).
+
+        :return: (dict) Number of objects per action and the number of levels.
+        """
+        counts = {"create": 0, "exists": 0, "levels": len(self.levels)}
+        for resource in self.resources.values():
+            counts[resource["action"]] += 1
+        return counts
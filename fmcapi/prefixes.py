@@ -0,0 +1,474 @@
+"""
+Find the network objects that contain, overlap or best match an address without asking the FMC.
+
+This module (prefixes.py) provides PrefixTrie, a path compressed binary (Patricia) trie of IP prefixes, and
+NetworkIndex, which loads the Hosts, Networks and Ranges (through NetworkAddresses) and the NetworkGroups of a domain
+into one PrefixTrie per IP version.  Ranges are split into the prefixes that cover them exactly and groups are
+flattened to their addresses, so a query only walks the bits of the address asked about.
+"""
+
+import ipaddress
+import logging
+import threading
+from .api_objects import NetworkAddresses
+from .api_objects import NetworkGroups
+from .matching import GroupExpander
+from .matching import RuleExpander
+
+
+class PrefixTrie(object):
+    """
+    Path compressed binary trie of prefixes of one IP version, each prefix holding a set of values.
+
+    Prefixes are given as (network, length) with network the integer value of the network address.  A node is a list
+    [network, length, zero child, one child, values] and only the nodes prefixes were added at, plus the nodes where
+    two prefixes branch apart, exist.  Every operation walks at most one node per bit of the address.
+    """
+
+    logging.debug("In the PrefixTrie class.")
+
+    def __init__(self, width):
+        """
+        Initialize PrefixTrie object.
+
+        :param width (int): Bits of an address.  32 for IPv4, 128 for IPv6.
+        :return: None
+        """
+        logging.debug("In the PrefixTrie __init__() class method.")
+        self.width = width
+        self.root = [0, 0, None, None, set()]
+
+    def bit(self, value, position):
+        """
+        Return one bit of an address, position 0 being the most significant.
+
+        :param value (int): Address.
+        :param position (int): Bit position.
+        :return: (int) 0 or 1.
+        """
+        return (value >> (self.width - 1 - position)) & 1
+
+    def mask(self, value, length):
+        """
+        Clear the host bits of an address.
+
+        :param value (int): Address.
+        :param length (int): Prefix length.
+        :return: (int) Network address.
+        """
+        return value >> (self.width - length) << (self.width - length)
+
+    def common(self, a, b, limit):
+        """
+        Count the leading bits two addresses have in common.
+
+        :param a (int): Address.
+        :param b (int): Address.
+        :param limit (int): Max count.
+        :return: (int)
+        """
+        return min(self.width - (a ^ b).bit_length(), limit)
+
+    def insert(self, network, length, value):
+        """
+        Add a value to a prefix.
+
+        :param network (int): Network address.  Host bits are ignored.
+        :param length (int): Prefix length.
+        :param value (object): Value to add, for example an object id.
+        :return: None
+        """
+        network = self.mask(network, length)
+        node = self.root
+        while node[1] != length:
+            side = 2 + self.bit(network, node[1])
+            child = node[side]
+            if child is None:
+                node[side] = [network, length, None, None, {value}]
+                return
+            common = self.common(child[0], network, min(child[1], length))
+            if common == child[1]:
+                node = child
+                continue
+            # The new prefix and the child branch apart (or the new prefix contains the child) above the child.
+            middle = [self.mask(network, common), common, None, None, set()]
+            middle[2 + self.bit(child[0], common)] = child
+            node[side] = middle
+            if common == length:
+                middle[4].add(value)
+            else:
+                middle[2 + self.bit(network, common)] = [
+                    network,
+                    length,
+                    None,
+                    None,
+                    {value},
+                ]
+            return
+        node[4].add(value)
+
+    def remove(self, network, length, value):
+        """
+        Remove a value from a prefix, dropping the nodes no longer needed.
+
+        :param network (int): Network address.  Host bits are ignored.
+        :param length (int): Prefix length.
+        :param value (object): Value to remove.
+        :return: (bool) True if the value was there.
+        """
+        network = self.mask(network, length)
+        path = []
+        node = self.root
+        while node is not None and node[1] < length:
+            path.append(node)
+            node = node[2 + self.bit(network, node[1])]
+            if node is not None and self.common(node[0], network, node[1]) < node[1]:
+                return False
+        if node is None or node[1] != length or value not in node[4]:
+            return False
+        node[4].discard(value)
+        while path and not node[4]:
+            parent = path[-1]
+            children = [child for child in node[2:4] if child is not None]
+            if len(children) == 2:
+                break
+            parent[2 + self.bit(node[0], parent[1])] = children[0] if children else None
+            if children:
+                break
+            node = path.pop()
+        return True
+
+    def containing(self, network, length):
+        """
+        Find the prefixes that contain a prefix, itself included.
+
+        :param network (int): Network address.  Host bits are ignored.
+        :param length (int): Prefix length.  The width of the trie for a single address.
+        :return: (list) (network, length, values) from the shortest prefix to the longest.
+        """
+        network = self.mask(network, length)
+        found = []
+        node = self.root
+        while node is not None and node[1] <= length:
+            if self.common(node[0], network, node[1]) < node[1]:
+                break
+            if node[4]:
+                found.append((node[0], node[1], node[4]))
+            if node[1] == length:
+                break
+            node = node[2 + self.bit(network, node[1])]
+        return found
+
+    def within(self, network, length):
+        """
+        Find the prefixes a prefix contains, itself included.
+
+        :param network (int): Network address.  Host bits are ignored.
+        :param length (int): Prefix length.
+        :return: (list) (network, length, values)
+        """
+        network = self.mask(network, length)
+        node = self.root
+        while node is not None and node[1] < length:
+            if self.common(node[0], network, node[1]) < node[1]:
+                return []
+            node = node[2 + self.bit(network, node[1])]
+        if node is None or self.common(node[0], network, length) < length:
+            return []
+        found = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node[4]:
+                found.append((node[0], node[1], node[4]))
+            stack.extend(child for child in node[2:4] if child is not None)
+        return found
+
+    def longest(self, network, length):
+        """
+        Find the longest prefix that contains a prefix.
+
+        :param network (int): Network address.  Host bits are ignored.
+        :param length (int): Prefix length.  The width of the trie for a single address.
+        :return: (tuple) (network, length, values) or None.
+        """
+        found = self.containing(network, length)
+        return found[-1] if found else None
+
+
+class NetworkIndex(object):
+    """
+    Local index of the addresses of the Hosts, Networks, Ranges and NetworkGroups of a domain.
+
+    Objects are loaded through fmc.object_cache on the first query (or by build()).  The index subscribes to the
+    object cache, so objects created, changed or deleted through fmcapi are re-read before the next query, together
+    with the groups that contain them.  Changes made outside fmcapi are only seen after build() is called again.
+    Groups are flattened by a GroupExpander of the objects indexed.  FQDN objects and values that aren't IP
+    addresses are not indexed.
+    """
+
+    logging.debug("In the NetworkIndex class.")
+
+    NETWORK_TYPES = ["Host", "Network", "Range"]
+
+    def __init__(self, fmc=None, items=None):
+        """
+        Initialize NetworkIndex object.
+
+        :param fmc (object): FMC object
+        :param items (list): Objects as returned by NetworkAddresses and NetworkGroups, to index them without an FMC.
+        :return: None
+        """
+        logging.debug("In the NetworkIndex __init__() class method.")
+        self.fmc = fmc
+        self.lock = threading.RLock()
+        self.tries = {4: PrefixTrie(width=32), 6: PrefixTrie(width=128)}
+        self.groups = GroupExpander(items=[])
+        self.items = self.groups.items
+        self.prefixes = {}
+        self.stale = []
+        self.built = False
+        if fmc is not None:
+            fmc.object_cache.subscribe(self.changed)
+        if items is not None:
+            self.build(items=items)
+
+    def build(self, items=None):
+        """
+        (Re)index every object.
+
+        :param items (list): Objects to index.  (Default is the NetworkAddresses and NetworkGroups collections)
+        :return: (int) Number of objects indexed.
+        """
+        logging.debug("In the NetworkIndex build() class method.")
+        if items is None:
+            items = self.fmc.object_cache.load(NetworkAddresses)
+            items = items + self.fmc.object_cache.load(NetworkGroups)
+        with self.lock:
+            self.tries = {4: PrefixTrie(width=32), 6: PrefixTrie(width=128)}
+            self.groups = GroupExpander(items=items)
+            self.items = self.groups.items
+            self.prefixes = {}
+            self.stale = []
+            for item in self.items.values():
+                self.index(item)
+            self.built = True
+        logging.info(f"Indexed the addresses of {len(self.prefixes)} network objects.")
+        return len(self.prefixes)
+
+    @staticmethod
+    def networks(value):
+        """
+        Turn a host, network or range value into the prefixes that cover exactly the same addresses.
+
+        :param value (str): "10.0.0.1", "10.0.0.0/8", "10.0.0.1-10.0.0.9" or the IPv6 equivalents.
+        :return: (list) ipaddress.IPv4Network or IPv6Network.  Empty if the value can't be parsed.
+        """
+        try:
+            if "-" in str(value):
+                first, last = str(value).split("-", 1)
+                return list(
+                    ipaddress.summarize_address_range(
+                        ipaddress.ip_address(first.strip()),
+                        ipaddress.ip_address(last.strip()),
+                    )
+                )
+            return [ipaddress.ip_network(str(value).strip(), strict=False)]
+        except (TypeError, ValueError):
+            logging.debug(f"Unable to parse address {value}.")
+            return []
+
+    def index(self, item):
+        """
+        Add the prefixes of one object to the tries.
+
+        :param item (dict): Host, Network, Range or NetworkGroup.
+        :return: None
+        """
+        if item.get("type") == "NetworkGroup":
+            ranges = self.groups.expand(item["id"])["ranges"]
+        elif item.get("type") in self.NETWORK_TYPES:
+            ranges = [RuleExpander.address_range(item.get("value"))]
+            ranges = ranges if ranges[0] is not None else []
+        else:
+            return
+        prefixes = [
+            (network.version, int(network.network_address), network.prefixlen)
+            for network in GroupExpander.prefixes(ranges)
+        ]
+        for version, network, length in prefixes:
+            self.tries[version].insert(network, length, item["id"])
+        self.prefixes[item["id"]] = prefixes
+
+    def unindex(self, id):
+        """
+        Remove the prefixes of one object from the tries.
+
+        :param id (str): UUID of the object.
+        :return: None
+        """
+        for version, network, length in self.prefixes.pop(id, []):
+            self.tries[version].remove(network, length, id)
+
+    def refresh(self, changes):
+        """
+        Apply changed and deleted objects, re-indexing every group that contains one of them.
+
+        :param changes (dict): Object id to the object as it is now, or None if it was deleted.
+        :return: (int) Number of objects re-indexed.
+        """
+        logging.debug("In the NetworkIndex refresh() class method.")
+        with self.lock:
+            affected = self.groups.update(changes=changes)
+            for id in affected:
+                self.unindex(id)
+                if id in self.items:
+                    self.index(self.items[id])
+        return len(affected)
+
+    def add(self, item):
+        """
+        Index a new or changed object.
+
+        :param item (dict): Host, Network, Range or NetworkGroup as returned by the FMC.
+        :return: None
+        """
+        logging.debug("In the NetworkIndex add() class method.")
+        self.refresh(changes={item["id"]: item})
+
+    def remove(self, id):
+        """
+        Drop a deleted object.
+
+        :param id (str): UUID of the object.
+        :return: None
+        """
+        logging.debug("In the NetworkIndex remove() class method.")
+        self.refresh(changes={id: None})
+
+    def changed(self, items):
+        """
+        Note objects the object cache was told changed.  Called by fmc.object_cache.
+
+        :param items (list): Dicts with the "name" and/or "id" of each object.
+        :return: None
+        """
+        with self.lock:
+            self.stale.extend(
+                (item.get("name"), item.get("id"))
+                for item in items
+                if item.get("name") or item.get("id")
+            )
+
+    def sync(self):
+        """
+        Build the index if needed and re-read the objects changed since the last query.
+
+        :return: None
+        """
+        with self.lock:
+            if not self.built:
+                self.build()
+                return
+            if not self.stale:
+                return
+            stale = self.stale
+            self.stale = []
+            changes = {}
+            for name, id in dict.fromkeys(stale):
+                if id:
+                    item = self.fmc.object_cache.find(
+                        api_classes=[NetworkAddresses, NetworkGroups], id=id
+                    )
+                else:
+                    item = self.fmc.object_cache.find(
+                        api_classes=[NetworkAddresses, NetworkGroups], name=name
+                    )
+                if item is not None:
+                    changes[item["id"]] = item
+                elif id in self.items:
+                    changes[id] = None
+            if changes:
+                self.refresh(changes=changes)
+
+    @staticmethod
+    def parse(address):
+        """
+        Parse an address or prefix.
+
+        :param address (str): "10.1.2.3", "10.1.0.0/16", "2001:db8::1", ...
+        :return: (tuple) (version, network, length)
+        """
+        network = ipaddress.ip_network(str(address).strip(), strict=False)
+        return network.version, int(network.network_address), network.prefixlen
+
+    def describe(self, version, network, length, ids):
+        """
+        List the objects found at one prefix.
+
+        :param version (int): 4 or 6.
+        :param network (int): Network address.
+        :param length (int): Prefix length.
+        :param ids (set): ids of the objects.
+        :return: (list) {"id", "name", "type", "prefix"}
+        """
+        address = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+        prefix = f"{address(network)}/{length}"
+        return [
+            {
+                "id": id,
+                "name": self.items[id].get("name"),
+                "type": self.items[id].get("type"),
+                "prefix": prefix,
+            }
+            for id in sorted(ids)
+        ]
+
+    def containing(self, address):
+        """
+        Find the objects that contain every address of an address or prefix.
+
+        :param address (str): "10.1.2.3", "10.1.0.0/16", ...
+        :return: (list) {"id", "name", "type", "prefix"}, the objects with the longest matching prefix first.
+        """
+        self.sync()
+        version, network, length = self.parse(address)
+        with self.lock:
+            found = self.tries[version].containing(network, length)
+            objects = []
+            for network, length, ids in reversed(found):
+                objects.extend(self.describe(version, network, length, ids))
+        return objects
+
+    def overlapping(self, address):
+        """
+        Find the objects that have at least one address in common with an address or prefix.
+
+        :param address (str): "10.1.0.0/16", "2001:db8::/32", ...
+        :return: (list) {"id", "name", "type", "prefix"}, one per object.
+        """
+        self.sync()
+        version, network, length = self.parse(address)
+        with self.lock:
+            trie = self.tries[version]
+            found = trie.containing(network, length) + trie.within(network, length)
+            objects = {}
+            for network, length, ids in found:
+                for item in self.describe(version, network, length, ids):
+                    objects.setdefault(item["id"], item)
+        return list(objects.values())
+
+    def longest_prefix(self, address):
+        """
+        Find the objects with the longest prefix that contains an address or prefix.
+
+        :param address (str): "10.1.2.3", "10.1.2.0/24", ...
+        :return: (list) {"id", "name", "type", "prefix"}, empty if no object contains the address.
+        """
+        self.sync()
+        version, network, length = self.parse(address)
+        with self.lock:
+            found = self.tries[version].longest(network, length)
+            if found is None:
+                return []
+            return self.describe(version, *found)
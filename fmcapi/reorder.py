@@ -0,0 +1,311 @@
+"""
+Propose a faster order for the rules of an AccessPolicy based on their hit counts.
+
+This module (reorder.py) provides RuleReorderAdvisor.  A device checks the rules of an AccessPolicy from the top and
+stops at the first match, so the hottest rules should be near the top.  The advisor moves rules with many hits ahead
+of rules with fewer, but a rule is only moved past rules that can match none of the same traffic (see
+matching.RuleExpander), so every connection still matches the rule it matched before.
+"""
+
+import heapq
+import logging
+from .api_objects import AccessPolicies
+from .api_objects import AccessRules
+from .api_objects import Bulk
+from .api_objects import DeviceGroupRecords
+from .api_objects import HitCounts
+from .api_objects import PolicyAssignments
+from .matching import RuleExpander
+
+
+class RuleReorderAdvisor(object):
+    """
+    Reorder the rules of one AccessPolicy, section by section and category by category, by hit count.
+
+    The order is built greedily: at each position the rule with the most hits among the rules that no longer have an
+    overlapping rule above them is placed next.  The result is a list of moves, each a run of rules to PUT with
+    insertBefore or insertAfter, in the order they must be applied.
+    """
+
+    logging.debug("In the RuleReorderAdvisor class.")
+
+    # Policy assignment targets hit counts can be fetched for.  Device groups are expanded to their members.
+    DEVICE_TYPES = ["Device", "DeviceHAPair", "DeviceCluster"]
+    # Not sent back to the FMC when a rule is moved.
+    READ_ONLY_FIELDS = ["metadata", "links"]
+
+    def __init__(self, fmc, acp_id=None, acp_name=None, hitcounts=None):
+        """
+        Initialize RuleReorderAdvisor object.
+
+        :param fmc (object): FMC object
+        :param acp_id (str): UUID of the AccessPolicy.
+        :param acp_name (str): Name of the AccessPolicy, if acp_id isn't given.
+        :param hitcounts (dict): Rule id to hit count, for example HitCountStore().totals(acp_id).  (Default is the
+            sum of HitCounts().get() over each device the AccessPolicy is assigned to)
+        :return: None
+        """
+        logging.debug("In the RuleReorderAdvisor __init__() class method.")
+        self.fmc = fmc
+        if acp_id is None and acp_name is not None:
+            acp = self.fmc.object_cache.get(api_class=AccessPolicies, name=acp_name)
+            if acp is None:
+                logging.warning(f"Access Control Policy {acp_name} not found.")
+            else:
+                acp_id = acp["id"]
+        self.acp_id = acp_id
+        self.hitcounts = hitcounts
+        self.rules = []
+
+    def hit_counts(self):
+        """
+        Add up the hit counts of each rule over the devices the AccessPolicy is assigned to.
+
+        :return: (dict) Rule id to hit count.
+        """
+        logging.debug("In the RuleReorderAdvisor hit_counts() class method.")
+        assignment = self.fmc.object_cache.get(
+            api_class=PolicyAssignments, id=self.acp_id
+        )
+        devices = []
+        for target in (assignment or {}).get("targets", []):
+            if target.get("type") in self.DEVICE_TYPES:
+                devices.append(target["id"])
+            elif target.get("type") == "DeviceGroup":
+                group = self.fmc.object_cache.get(
+                    api_class=DeviceGroupRecords, id=target["id"]
+                )
+                devices.extend(
+                    member["id"] for member in (group or {}).get("members", [])
+                )
+        totals = {}
+        for device_id in dict.fromkeys(devices):
+            hitcounts = HitCounts(fmc=self.fmc, acp_id=self.acp_id, device_id=device_id)
+            for item in hitcounts.get() or []:
+                rule_id = item.get("rule", {}).get("id")
+                totals[rule_id] = totals.get(rule_id, 0) + item.get("hitCount", 0)
+        return totals
+
+    @staticmethod
+    def blocks(rules):
+        """
+        Split the rules into the runs that share a section and category.  Rules never move from one to another.
+
+        :param rules (list): Rules in policy order.
+        :return: (list) Lists of rules.
+        """
+        blocks = []
+        last = None
+        for rule in rules:
+            metadata = rule.get("metadata", {})
+            key = (metadata.get("section"), metadata.get("category"))
+            if not blocks or key != last:
+                blocks.append([])
+                last = key
+            blocks[-1].append(rule)
+        return blocks
+
+    def advise(self):
+        """
+        Work out the new order of the rules and the moves that get there.
+
+        :return: (dict) {"moves": [...], "moved": number of rules moved, "depth": {"before", "after", "reduction"}}.
+            Each move is {"rules": [{"id", "name"}, ...], "insertBefore" or "insertAfter": rule index,
+            "anchor": {"id", "name"}}.  The index is the one the anchor rule has when the move is applied, so moves
+            must be applied in the order given.  "depth" is the average number of rules checked per hit.
+        """
+        logging.debug("In the RuleReorderAdvisor advise() class method.")
+        self.rules = list(AccessRules(fmc=self.fmc, acp_id=self.acp_id).iter_items())
+        hitcounts = self.hitcounts if self.hitcounts is not None else self.hit_counts()
+        expander = RuleExpander(fmc=self.fmc)
+        moves = []
+        new_order = []
+        start = 1
+        for block in self.blocks(self.rules):
+            order = self.order(block=block, expander=expander, hitcounts=hitcounts)
+            moves.extend(self.moves(block=block, order=order, start=start))
+            new_order.extend(order)
+            start += len(block)
+        before = self.depth(rules=self.rules, hitcounts=hitcounts)
+        after = self.depth(rules=new_order, hitcounts=hitcounts)
+        return {
+            "moves": moves,
+            "moved": sum(len(move["rules"]) for move in moves),
+            "depth": {
+                "before": before,
+                "after": after,
+                "reduction": (before - after) / before if before else 0.0,
+            },
+        }
+
+    @staticmethod
+    def order(block, expander, hitcounts):
+        """
+        Order one block of rules by hits, keeping every pair of overlapping rules in its current order.
+
+        :param block (list): Rules in policy order.
+        :param expander (object): RuleExpander
+        :param hitcounts (dict): Rule id to hit count.
+        :return: (list) The rules in their new order.
+        """
+        # Disabled rules match nothing, so nothing has to stay on either side of them.
+        criteria = [
+            expander.expand(rule) if rule.get("enabled", True) else None
+            for rule in block
+        ]
+        successors = [[] for _ in block]
+        waiting = [0] * len(block)
+        for i in range(len(block)):
+            if criteria[i] is None:
+                continue
+            for j in range(i + 1, len(block)):
+                if criteria[j] is not None and expander.overlaps(
+                    criteria[i], criteria[j]
+                ):
+                    successors[i].append(j)
+                    waiting[j] += 1
+        # Most hits first, then the current order.
+        ready = [
+            (-hitcounts.get(rule.get("id"), 0), i)
+            for i, rule in enumerate(block)
+            if waiting[i] == 0
+        ]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            _, i = heapq.heappop(ready)
+            order.append(block[i])
+            for j in successors[i]:
+                waiting[j] -= 1
+                if waiting[j] == 0:
+                    heapq.heappush(ready, (-hitcounts.get(block[j].get("id"), 0), j))
+        return order
+
+    @staticmethod
+    def moves(block, order, start):
+        """
+        Turn the new order of a block into moves.
+
+        The rules on a longest run that is already in order stay put and each other rule is moved right after the
+        rule that precedes it in the new order (or to the top of the block).  Consecutive moved rules are one move.
+
+        :param block (list): Rules in their current order.
+        :param order (list): The same rules in their new order.
+        :param start (int): Rule index of the first rule of the block.
+        :return: (list) Moves.
+        """
+        position = {rule["id"]: i for i, rule in enumerate(block)}
+        stays = RuleReorderAdvisor.longest_increasing(
+            [position[rule["id"]] for rule in order]
+        )
+        current = [rule["id"] for rule in block]
+        names = {rule["id"]: rule.get("name") for rule in block}
+        moves = []
+        k = 0
+        while k < len(order):
+            if k in stays:
+                k += 1
+                continue
+            first = k
+            run = []
+            while k < len(order) and k not in stays:
+                run.append(order[k]["id"])
+                k += 1
+            if first == 0:
+                anchor = current[0]
+                move = {"insertBefore": start + current.index(anchor)}
+                current = [rule for rule in current if rule not in run]
+                current[0:0] = run
+            else:
+                anchor = order[first - 1]["id"]
+                move = {"insertAfter": start + current.index(anchor)}
+                current = [rule for rule in current if rule not in run]
+                at = current.index(anchor) + 1
+                current[at:at] = run
+            move["rules"] = [{"id": rule, "name": names[rule]} for rule in run]
+            move["anchor"] = {"id": anchor, "name": names[anchor]}
+            moves.append(move)
+        return moves
+
+    @staticmethod
+    def longest_increasing(values):
+        """
+        Find the positions of a longest strictly increasing subsequence.
+
+        :param values (list): Numbers.
+        :return: (set) Positions in values.
+        """
+        tails = []
+        tail_positions = []
+        previous = [None] * len(values)
+        for i, value in enumerate(values):
+            low, high = 0, len(tails)
+            while low < high:
+                middle = (low + high) // 2
+                if tails[middle] < value:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low == len(tails):
+                tails.append(value)
+                tail_positions.append(i)
+            else:
+                tails[low] = value
+                tail_positions[low] = i
+            previous[i] = tail_positions[low - 1] if low else None
+        positions = set()
+        i = tail_positions[-1] if tail_positions else None
+        while i is not None:
+            positions.add(i)
+            i = previous[i]
+        return positions
+
+    @staticmethod
+    def depth(rules, hitcounts):
+        """
+        Average number of rules checked per hit, each hit counting the position of the rule it matched.
+
+        :param rules (list): Rules in policy order.
+        :param hitcounts (dict): Rule id to hit count.
+        :return: (float)
+        """
+        hits = [hitcounts.get(rule.get("id"), 0) for rule in rules]
+        total = sum(hits)
+        if not total:
+            return 0.0
+        return (
+            sum(position * count for position, count in enumerate(hits, start=1))
+            / total
+        )
+
+    def apply(self, moves):
+        """
+        Send the moves to the FMC, one bulk PUT per move, stopping at the first failure.
+
+        :param moves (list): Moves from advise().
+        :return: (list) The moves applied.
+        """
+        logging.debug("In the RuleReorderAdvisor apply() class method.")
+        rules = {rule["id"]: rule for rule in self.rules}
+        url = AccessRules(fmc=self.fmc, acp_id=self.acp_id).URL.split("?")[0]
+        applied = []
+        for move in moves:
+            position = {
+                key: move[key] for key in ["insertBefore", "insertAfter"] if key in move
+            }
+            bulk = Bulk(fmc=self.fmc, url=url, **position)
+            for rule in move["rules"]:
+                bulk.add(
+                    {
+                        key: value
+                        for key, value in rules[rule["id"]].items()
+                        if key not in self.READ_ONLY_FIELDS
+                    }
+                )
+            if bulk.put()["failed"]:
+                logging.error(
+                    f"Moving {[rule['name'] for rule in move['rules']]} failed.  Not applying the remaining moves."
+                )
+                break
+            applied.append(move)
+        return applied
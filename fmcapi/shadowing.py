@@ -0,0 +1,295 @@
+"""
+Find access and prefilter rules that can never match, or never matter.
+
+This module (shadowing.py) provides RuleAnalyzer.  It expands the rules of each AccessPolicy and PrefilterPolicy with
+matching.RuleExpander and, for every rule, only compares it with the earlier rules that overlap it on one of its
+criteria, instead of with every earlier rule.  Destination and source addresses and ports each get an IntervalIndex
+and each rule is looked up in the one, among those it constrains, that leaves the fewest candidates.
+"""
+
+import bisect
+import logging
+from .api_objects import AccessPolicies
+from .api_objects import AccessRules
+from .api_objects import PreFilterPolicies
+from .api_objects import PreFilterRules
+from .matching import IntervalIndex
+from .matching import MatchEngine
+from .matching import RuleExpander
+
+
+class RuleAnalyzer(object):
+    """
+    Report shadowed, redundant and correlated rules.
+
+    * shadowed: an earlier rule with a different action matches all of the rule's traffic, so the rule never matches.
+    * redundant: an earlier rule with the same action matches all of the rule's traffic, so the rule can be removed.
+    * correlated: an earlier rule with a different action matches part, but not all, of the rule's traffic and the
+      rule doesn't match all of the earlier rule's traffic either, so the order of the two decides what happens.
+
+    Only earlier rules whose every criterion could be expanded and that don't also depend on applications, URLs,
+    users, ... count as matching all of a rule's traffic.  Coverage by several earlier rules together is not found.
+    """
+
+    logging.debug("In the RuleAnalyzer class.")
+
+    # Actions after which the device goes on to the next rule.
+    NON_TERMINAL_ACTIONS = ["MONITOR"]
+    # Criteria the candidate earlier rules are looked up by.
+    INDEXED_FIELDS = [
+        "destinationNetworks",
+        "sourceNetworks",
+        "destinationPorts",
+        "sourcePorts",
+    ]
+
+    def __init__(self, fmc):
+        """
+        Initialize RuleAnalyzer object.
+
+        :param fmc (object): FMC object
+        :return: None
+        """
+        logging.debug("In the RuleAnalyzer __init__() class method.")
+        self.fmc = fmc
+        self.expander = RuleExpander(fmc=fmc)
+
+    def prepare(self, rules):
+        """
+        Expand the enabled rules.
+
+        :param rules (list): Rules in policy order.
+        :return: (list) {"rule", "index" (1 based position in the policy), "criteria", "certain", "terminal"}
+        """
+        entries = []
+        for index, rule in enumerate(rules, start=1):
+            if not rule.get("enabled", True):
+                continue
+            criteria = self.expander.expand(rule)
+            certain = (
+                not any(rule.get(field) for field in MatchEngine.CONDITIONAL_FIELDS)
+                and rule.get("ruleType") != "TUNNEL"
+                and all(
+                    criteria[field] is not None or not rule.get(field)
+                    for field in RuleExpander.DIMENSIONS
+                )
+            )
+            entries.append(
+                {
+                    "rule": rule,
+                    "index": index,
+                    "criteria": criteria,
+                    "certain": certain,
+                    "terminal": rule.get("action") not in self.NON_TERMINAL_ACTIONS,
+                }
+            )
+        return entries
+
+    def analyze(self, rules):
+        """
+        Find the shadowed, redundant and correlated rules of one policy.
+
+        :param rules (list): Rules in policy order, as returned by AccessRules or PreFilterRules with expanded=true.
+        :return: (dict) {"rules": number of enabled rules, "shadowed": [...], "redundant": [...], "correlated": [...]}.
+            Shadowed and redundant rules are {"rule": {"id", "name", "index"}, "by": [earlier rules matching all of
+            its traffic, first one first]}; correlated rules are {"rule": ..., "with": [earlier rules]}.
+        """
+        logging.debug("In the RuleAnalyzer analyze() class method.")
+        entries = self.prepare(rules=rules)
+        indexes = {}
+        unconstrained = {}
+        for field in self.INDEXED_FIELDS:
+            indexes[field] = IntervalIndex(
+                [
+                    (low, high, number)
+                    for number, entry in enumerate(entries)
+                    for low, high in self.keys(field, entry["criteria"][field])
+                ]
+            )
+            unconstrained[field] = [
+                number
+                for number, entry in enumerate(entries)
+                if entry["criteria"][field] is None
+            ]
+        report = {
+            "rules": len(entries),
+            "shadowed": [],
+            "redundant": [],
+            "correlated": [],
+        }
+        for number, entry in enumerate(entries):
+            candidates = self.candidates(
+                number=number,
+                entry=entry,
+                indexes=indexes,
+                unconstrained=unconstrained,
+            )
+            covering = []
+            correlated = []
+            for earlier in candidates:
+                other = entries[earlier]
+                if not other["terminal"]:
+                    continue
+                if not RuleExpander.overlaps(other["criteria"], entry["criteria"]):
+                    continue
+                if other["certain"] and RuleExpander.covers(
+                    other["criteria"], entry["criteria"]
+                ):
+                    covering.append(other)
+                elif other["rule"].get("action") != entry["rule"].get(
+                    "action"
+                ) and not RuleExpander.covers(entry["criteria"], other["criteria"]):
+                    correlated.append(other)
+            if covering:
+                kind = (
+                    "redundant"
+                    if covering[0]["rule"].get("action") == entry["rule"].get("action")
+                    else "shadowed"
+                )
+                report[kind].append(
+                    {
+                        "rule": self.describe(entry),
+                        "by": [self.describe(other) for other in covering],
+                    }
+                )
+            elif correlated:
+                report["correlated"].append(
+                    {
+                        "rule": self.describe(entry),
+                        "with": [self.describe(other) for other in correlated],
+                    }
+                )
+        return report
+
+    @staticmethod
+    def keys(field, ranges):
+        """
+        Turn the expanded criteria of an indexed field into (low, high) integer intervals.
+
+        Ports are keyed by protocol * 65536 + port like in MatchEngine.  Any protocol spans every protocol's ports.
+
+        :param field (str): One of INDEXED_FIELDS.
+        :param ranges (list): Ranges from RuleExpander.expand(), or None for any.
+        :return: (list) (low, high) tuples.  Empty for None.
+        """
+        if not ranges:
+            return []
+        if RuleExpander.DIMENSIONS[field] != "port":
+            return ranges
+        ports = MatchEngine.PORTS
+        return [
+            (
+                (0 if protocol is None else protocol) * ports + low,
+                (255 if protocol is None else protocol) * ports + high,
+            )
+            for protocol, low, high in ranges
+        ]
+
+    def candidates(self, number, entry, indexes, unconstrained):
+        """
+        Find the earlier rules that may overlap a rule.
+
+        Each indexed field the rule constrains gives the earlier rules that don't constrain it plus those its index
+        says overlap the rule.  The field giving the fewest is used.  The others are abandoned once all the values of
+        one of their keys give at least as many.
+
+        :param number (int): Position of the rule in entries.
+        :param entry (dict): The rule, from prepare().
+        :param indexes (dict): IntervalIndex per indexed field.
+        :param unconstrained (dict): Per indexed field, the numbers of the rules that don't constrain it, in order.
+        :return: (list) Numbers of the earlier rules, in order.
+        """
+        fields = sorted(
+            (
+                bisect.bisect_left(unconstrained[field], number),
+                field,
+            )
+            for field in self.INDEXED_FIELDS
+            if entry["criteria"][field] is not None
+        )
+        best = None
+        for count, field in fields:
+            if best is not None and count >= len(best):
+                break
+            found = set(unconstrained[field][:count])
+            for low, high in self.keys(field, entry["criteria"][field]):
+                found.update(indexes[field].overlapping(low, high))
+                if best is not None and len(found) >= len(best):
+                    break
+            else:
+                best = found
+        if best is None:
+            return range(number)
+        return sorted(earlier for earlier in best if earlier < number)
+
+    @staticmethod
+    def describe(entry):
+        """
+        Identify a rule in a report.
+
+        :param entry (dict): From prepare().
+        :return: (dict) {"id", "name", "index"}
+        """
+        return {
+            "id": entry["rule"].get("id"),
+            "name": entry["rule"].get("name"),
+            "index": entry["index"],
+        }
+
+    def access_policy(self, acp_id):
+        """
+        Analyze the AccessRules of one AccessPolicy.
+
+        :param acp_id (str): UUID of the AccessPolicy.
+        :return: (dict) See analyze().
+        """
+        logging.debug("In the RuleAnalyzer access_policy() class method.")
+        return self.analyze(
+            rules=list(AccessRules(fmc=self.fmc, acp_id=acp_id).iter_items())
+        )
+
+    def prefilter_policy(self, prefilter_id):
+        """
+        Analyze the PreFilterRules of one PrefilterPolicy.
+
+        :param prefilter_id (str): UUID of the PrefilterPolicy.
+        :return: (dict) See analyze().
+        """
+        logging.debug("In the RuleAnalyzer prefilter_policy() class method.")
+        return self.analyze(
+            rules=list(
+                PreFilterRules(fmc=self.fmc, prefilter_id=prefilter_id).iter_items()
+            )
+        )
+
+    def report(self, prefilter=True):
+        """
+        Analyze every AccessPolicy and, optionally, every PrefilterPolicy of the domain.
+
+        :param prefilter (bool): Also analyze the PrefilterPolicies.  (Default is True)
+        :return: (list) One analyze() result per policy with "policy": {"id", "name", "type"} added.
+        """
+        logging.debug("In the RuleAnalyzer report() class method.")
+        policies = [
+            (policy, self.access_policy)
+            for policy in self.fmc.object_cache.load(AccessPolicies)
+        ]
+        if prefilter:
+            policies.extend(
+                (policy, self.prefilter_policy)
+                for policy in self.fmc.object_cache.load(PreFilterPolicies)
+            )
+        reports = []
+        for policy, analyze in policies:
+            report = analyze(policy["id"])
+            report["policy"] = {
+                "id": policy["id"],
+                "name": policy.get("name"),
+                "type": policy.get("type"),
+            }
+            logging.info(
+                f"{policy.get('name')}: {len(report['shadowed'])} shadowed, {len(report['redundant'])} redundant and "
+                f"{len(report['correlated'])} correlated rules."
+            )
+            reports.append(report)
+        return reports
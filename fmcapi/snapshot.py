@@ -0,0 +1,615 @@
+"""
+Take an offline snapshot of an FMC domain and read it back without touching the FMC.
+
+This module (snapshot.py) provides Snapshot, which GETs every listable API object type of a domain concurrently and
+stores the objects in a local SQLite file along with a manifest, and SnapshotFMC, a stand in for the FMC class that
+answers the GETs of API objects from a Snapshot.  Reporting and audit jobs can then run get() against the snapshot as
+often as they like with no network I/O.  Snapshot.sync() keeps a snapshot current by re-fetching only the object
+types the FMC's audit log says were changed since the last take() or sync().
+"""
+
+import datetime
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from . import api_objects
+from .api_objects.apiclasstemplate import APIClassTemplate
+from .api_objects import AuditRecords
+from .fmc import FMC
+
+
+class Snapshot(object):
+    """
+    Local SQLite copy of the objects in one FMC domain.
+
+    The "objects" table has one row per object with its collection URL, id, name, type and metadata timestamp as
+    columns and the full JSON of the object.  The "collections" table is the manifest: one row per API object type
+    with the number of objects fetched, how long it took and any error.  The "meta" table records which FMC, domain
+    and version the snapshot was taken from, and the watermark (epoch seconds) up to which the snapshot is current.
+    """
+
+    logging.debug("In the Snapshot class.")
+
+    # A log rather than a collection of objects.
+    SKIPPED_API_CLASSES = ["AuditRecords"]
+    WORKERS = 4
+    # Audit records are read from this many seconds before the watermark to allow for clock skew between this host
+    # and the FMC.  Re-reading a record is harmless.
+    SYNC_OVERLAP = 60
+
+    def __init__(self, path="fmcapi_snapshot.sqlite3"):
+        """
+        Open (or create) a snapshot file.
+
+        :param path (str): Filename (and optional path) of the SQLite file.  (Default is fmcapi_snapshot.sqlite3)
+        :return: None
+        """
+        logging.debug("In the Snapshot __init__() class method.")
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS collections (url TEXT PRIMARY KEY, api_class TEXT, items INTEGER, "
+                "seconds REAL, fetched_at TEXT, error TEXT)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS objects (url TEXT, id TEXT, name TEXT, type TEXT, timestamp INTEGER, "
+                "data TEXT, PRIMARY KEY (url, id))"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS objects_name ON objects (url, name)"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Close the SQLite file.
+
+        :return: None
+        """
+        logging.debug("In the Snapshot close() class method.")
+        self.connection.close()
+
+    @staticmethod
+    def api_classes():
+        """
+        Find every API object type in fmcapi.api_objects whose whole collection can be listed with a plain GET.
+
+        Types that need a parent object (AccessRules needs an ACP, PhysicalInterfaces a device, ...) and deprecated
+        aliases of another type (IPHost for Hosts, ...) are left out.
+
+        :return: (list) APIClassTemplate subclasses.
+        """
+        exported = [getattr(api_objects, name) for name in api_objects.__all__]
+        exported = [
+            api_class
+            for api_class in exported
+            if isinstance(api_class, type) and issubclass(api_class, APIClassTemplate)
+        ]
+        api_classes = []
+        for api_class in exported:
+            if api_class.__name__ in Snapshot.SKIPPED_API_CLASSES:
+                continue
+            if not isinstance(api_class.URL_SUFFIX, str) or not api_class.URL_SUFFIX:
+                continue
+            if api_class.REQUIRED_FOR_GET != [""]:
+                continue
+            if any(
+                other is not api_class and issubclass(api_class, other)
+                for other in exported
+            ):
+                continue
+            api_classes.append(api_class)
+        return api_classes
+
+    def take(self, fmc, api_classes=None, workers=WORKERS):
+        """
+        Replace the contents of the snapshot with everything currently in the FMC's domain.
+
+        :param fmc (object): FMC object, already logged in.
+        :param api_classes (list): APIClassTemplate subclasses to fetch.  (Default is all of api_classes())
+        :param workers (int): Max number of collections fetched concurrently.  (Default is 4)
+        :return: (dict) The manifest.
+        """
+        logging.debug("In the Snapshot take() class method.")
+        if api_classes is None:
+            api_classes = self.api_classes()
+        collections = {}
+        for api_class in api_classes:
+            if fmc.serverVersion < api_class.FIRST_SUPPORTED_FMC_VERSION:
+                continue
+            api_object = api_class(fmc=fmc)
+            # Several types can share one URL (ListApplicableDevices and UpgradePackages).  Fetch it once.
+            collections.setdefault(api_object.URL, api_object)
+        # Changes made while the collections are being fetched are picked up by the next sync().
+        watermark = int(time.time())
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM meta")
+            self.connection.execute("DELETE FROM collections")
+            self.connection.execute("DELETE FROM objects")
+            self.connection.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("host", fmc.host),
+                    ("uuid", fmc.uuid),
+                    ("serverVersion", fmc.serverVersion),
+                    ("configuration_url", fmc.configuration_url),
+                    ("platform_url", fmc.platform_url),
+                    ("limit", str(fmc.limit)),
+                    ("watermark", str(watermark)),
+                    (
+                        "taken_at",
+                        datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    ),
+                ],
+            )
+        logging.info(
+            f"Taking a snapshot of {len(collections)} object types into {self.path}."
+        )
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(self.fetch, url=url, api_object=api_object)
+                for url, api_object in collections.items()
+            ]
+            for future in as_completed(futures):
+                url, api_object, items, seconds, error = future.result()
+                self.store(
+                    url=url,
+                    api_class=type(api_object).__name__,
+                    items=items,
+                    seconds=seconds,
+                    error=error,
+                )
+        return self.manifest
+
+    def sync(self, fmc, workers=WORKERS):
+        """
+        Bring the snapshot up to date with what changed in the FMC since the last take() or sync().
+
+        The audit records logged since the watermark say which object types were changed.  Only those collections are
+        fetched again, and within them only objects that are new, gone, or whose metadata timestamp is past the
+        watermark (or whose JSON differs) are rewritten.  When nothing was changed this costs a single GET.  Audit
+        records that don't name a type in the snapshot (logins, deployments, ...) are ignored, so take() a fresh
+        snapshot now and then to catch changes the audit log doesn't describe.
+
+        :param fmc (object): FMC object, already logged in to the same domain the snapshot was taken from.
+        :param workers (int): Max number of collections fetched concurrently.  (Default is 4)
+        :return: (dict) Number of audit records read and, per collection fetched again, the ids of the objects
+            created, modified and deleted plus who last modified them.  If the audit records can't be read nothing is
+            synced and the summary has an "error" instead.
+        """
+        logging.debug("In the Snapshot sync() class method.")
+        meta = self.meta
+        if meta.get("uuid") != fmc.uuid:
+            logging.error(
+                "This snapshot was taken from a different domain.  Use take() instead of sync()."
+            )
+            return None
+        watermark = int(meta.get("watermark", 0))
+        since = max(watermark - self.SYNC_OVERLAP, 0)
+        response = AuditRecords(fmc=fmc, starttime=since).get()
+        if response is None:
+            # Without them we can't tell what changed.  Leave the watermark and synced_at as they are.
+            logging.error("Could not read the audit records.  Nothing was synced.")
+            return {
+                "records": 0,
+                "collections": {},
+                "error": "Could not read the audit records.",
+            }
+        records = response.get("items", [])
+        summary = {"records": len(records), "collections": {}}
+        collections = {}
+        for url, api_class in self.changed_collections(records=records).items():
+            collections[url] = getattr(api_objects, api_class)(fmc=fmc)
+        if collections:
+            logging.info(
+                f"Syncing {len(collections)} object types changed by {len(records)} audit records."
+            )
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self.fetch, url=url, api_object=api_object)
+                    for url, api_object in collections.items()
+                ]
+                for future in as_completed(futures):
+                    url, api_object, items, seconds, error = future.result()
+                    if error is not None:
+                        # Keep what we have.  The watermark isn't moved so the next sync() tries again.
+                        summary["collections"][url] = {"error": error}
+                        continue
+                    summary["collections"][url] = self.apply(
+                        url=url,
+                        api_class=type(api_object).__name__,
+                        items=items,
+                        since=since,
+                        seconds=seconds,
+                    )
+        failed = any("error" in changes for changes in summary["collections"].values())
+        if records and not failed:
+            watermark = max(
+                [watermark] + [int(record.get("time", 0)) for record in records]
+            )
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("watermark", str(watermark)),
+                    (
+                        "synced_at",
+                        datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    ),
+                ],
+            )
+        return summary
+
+    def changed_collections(self, records):
+        """
+        Work out which collections the audit records touched.
+
+        A record touches a collection when its message or subsystem mentions the collection's type name (singular or
+        plural) or the "type" of one of its objects.  Case, spaces and punctuation are ignored, so "Network Group"
+        matches NetworkGroups.  This errs on the side of fetching a collection too many.
+
+        :param records (list): Audit records as returned by the FMC.
+        :return: (dict) Collection URL to name of its APIClassTemplate subclass.
+        """
+        if not records:
+            return {}
+        with self.lock:
+            collections = self.connection.execute(
+                "SELECT url, api_class FROM collections"
+            ).fetchall()
+            types = self.connection.execute(
+                "SELECT DISTINCT url, type FROM objects WHERE type IS NOT NULL"
+            ).fetchall()
+        keywords = {}
+        for url, api_class in collections:
+            name = self.normalize(api_class)
+            keywords[url] = {name, name[:-1] if name.endswith("s") else name}
+        for url, type_name in types:
+            keywords[url].add(self.normalize(type_name))
+        texts = [
+            self.normalize(f"{record.get('message', '')} {record.get('subsystem', '')}")
+            for record in records
+        ]
+        return {
+            url: api_class
+            for url, api_class in collections
+            if any(
+                keyword in text
+                for keyword in keywords[url]
+                if keyword
+                for text in texts
+            )
+        }
+
+    @staticmethod
+    def normalize(text):
+        """
+        :param text (str): Type name or audit message.
+        :return: (str) Lower case letters and digits only.
+        """
+        return re.sub(r"[^a-z0-9]", "", str(text).lower())
+
+    def apply(self, url, api_class, items, since, seconds=0):
+        """
+        Rewrite only the objects of one collection that differ from what the FMC has now.
+
+        :param url (str): Collection URL.
+        :param api_class (str): Name of the APIClassTemplate subclass.
+        :param items (list): Every object of the collection as returned by the FMC.
+        :param since (int): Epoch seconds.  Objects whose metadata timestamp is older are known to be unchanged.
+        :param seconds (float): Time taken to fetch them.
+        :return: (dict) ids of the objects created, modified and deleted and the lastUser of each change.
+        """
+        with self.lock:
+            local = {
+                id: (timestamp, data)
+                for id, timestamp, data in self.connection.execute(
+                    "SELECT id, timestamp, data FROM objects WHERE url = ?", (url,)
+                )
+            }
+        changes = {"created": [], "modified": [], "deleted": [], "users": []}
+        rows = []
+        for item in items:
+            row = self.row(url=url, item=item)
+            id, timestamp, data = row[1], row[4], row[5]
+            if id not in local:
+                changes["created"].append(id)
+            elif timestamp is not None and timestamp < since * 1000:
+                # Not touched since the watermark.  No need to compare the JSON.
+                local.pop(id)
+                continue
+            elif data == local.pop(id)[1]:
+                continue
+            else:
+                changes["modified"].append(id)
+            rows.append(row)
+            user = item.get("metadata", {}).get("lastUser", {}).get("name")
+            if user and user not in changes["users"]:
+                changes["users"].append(user)
+        changes["deleted"] = list(local)
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO objects (url, id, name, type, timestamp, data) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.connection.executemany(
+                "DELETE FROM objects WHERE url = ? AND id = ?",
+                [(url, id) for id in changes["deleted"]],
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO collections (url, api_class, items, seconds, fetched_at, error) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    api_class,
+                    len(items),
+                    seconds,
+                    datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    None,
+                ),
+            )
+        return changes
+
+    @staticmethod
+    def fetch(url, api_object):
+        """
+        GET every object of one type.
+
+        A collection is only good if every page arrived: a failed page raises PagingError and fewer items than the
+        first page's paging "count" is an error too, so sync() doesn't record the missing objects as deleted.
+
+        :param url (str): Collection URL.
+        :param api_object (object): APIClassTemplate object for the collection.
+        :return: (tuple) url, api_object, items, seconds taken and error (or None).
+        """
+        start = time.monotonic()
+        items = []
+        error = None
+        try:
+            # Walk the pages rather than iter_items() so that a failed GET isn't mistaken for an empty collection.
+            pages = api_object.fmc.iter_pages(
+                url=f"{url}?expanded=true&limit={api_object.limit}"
+            )
+            count = None
+            for page in pages:
+                if count is None:
+                    count = int(page.get("paging", {}).get("count", 0))
+                items.extend(page.get("items", []))
+            if count is None:
+                error = "No response from the FMC."
+            elif len(items) < count:
+                error = f"Only {len(items)} of {count} objects were fetched."
+        except Exception as e:
+            logging.warning(f"Snapshot could not fetch {url}: {e}")
+            items = []
+            error = str(e)
+        return url, api_object, items, time.monotonic() - start, error
+
+    def store(self, url, api_class, items, seconds=0, error=None):
+        """
+        Write the objects of one collection and its manifest row.
+
+        :param url (str): Collection URL.
+        :param api_class (str): Name of the APIClassTemplate subclass.
+        :param items (list): Objects as returned by the FMC.
+        :param seconds (float): Time taken to fetch them.
+        :param error (str): Why fetching failed or None.
+        :return: None
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO objects (url, id, name, type, timestamp, data) VALUES (?, ?, ?, ?, ?, ?)",
+                [self.row(url=url, item=item) for item in items],
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO collections (url, api_class, items, seconds, fetched_at, error) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    api_class,
+                    len(items),
+                    seconds,
+                    datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    error,
+                ),
+            )
+
+    @staticmethod
+    def row(url, item):
+        """
+        Flatten an object into a row of the objects table.
+
+        :param url (str): Collection URL.
+        :param item (dict): Object as returned by the FMC.
+        :return: (tuple) url, id, name, type, timestamp and JSON.
+        """
+        return (
+            url,
+            item.get("id", item.get("name")),
+            item.get("name"),
+            item.get("type"),
+            item.get("metadata", {}).get("timestamp"),
+            json.dumps(item),
+        )
+
+    @property
+    def meta(self):
+        """
+        Which FMC, domain and version the snapshot was taken from.
+
+        :return: (dict)
+        """
+        with self.lock:
+            return dict(self.connection.execute("SELECT key, value FROM meta"))
+
+    @property
+    def manifest(self):
+        """
+        Describe the snapshot.
+
+        :return: (dict) meta plus one entry per collection URL with its type, number of items, fetch time and error.
+        """
+        manifest = self.meta
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT url, api_class, items, seconds, fetched_at, error FROM collections ORDER BY url"
+            ).fetchall()
+        manifest["collections"] = {
+            url: {
+                "api_class": api_class,
+                "items": items,
+                "seconds": seconds,
+                "fetched_at": fetched_at,
+                "error": error,
+            }
+            for url, api_class, items, seconds, fetched_at, error in rows
+        }
+        return manifest
+
+    def items(self, url, name=None):
+        """
+        Read the objects of one collection.
+
+        :param url (str): Collection URL.
+        :param name (str): Only return objects with this name.  (Default is all objects)
+        :return: (list) Objects as returned by the FMC.
+        """
+        query = "SELECT data FROM objects WHERE url = ?"
+        parameters = [url]
+        if name is not None:
+            query = f"{query} AND name = ?"
+            parameters.append(name)
+        with self.lock:
+            rows = self.connection.execute(query, parameters).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+    def item(self, url, id):
+        """
+        Read one object.
+
+        :param url (str): Collection URL.
+        :param id (str): UUID of the object.
+        :return: (dict) Object as returned by the FMC or None.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT data FROM objects WHERE url = ? AND id = ?", (url, id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def has_collection(self, url):
+        """
+        :param url (str): Collection URL.
+        :return: (boolean) Whether the collection was fetched into the snapshot.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM collections WHERE url = ?", (url,)
+            ).fetchone()
+        return row is not None
+
+    def response(self, url):
+        """
+        Answer a GET the way the FMC would have, from the snapshot.
+
+        :param url (str): URL of the GET, with or without a query string.
+        :return: (dict) JSON response or None if the URL isn't in the snapshot.
+        """
+        path, _, query = url.partition("?")
+        name = urllib.parse.parse_qs(query).get("name", [None])[0]
+        if self.has_collection(path):
+            return {"items": self.items(url=path, name=name)}
+        collection, _, id = path.rpartition("/")
+        if self.has_collection(collection):
+            return self.item(url=collection, id=id)
+        logging.warning(f"{path} is not in the snapshot.")
+        return None
+
+    def fmc(self, **kwargs):
+        """
+        Build an FMC stand in whose API calls are answered from this snapshot.
+
+        :return: (SnapshotFMC)
+        """
+        return SnapshotFMC(snapshot=self, **kwargs)
+
+
+class SnapshotFMC(FMC):
+    """
+    Read-only, offline FMC answered from a Snapshot.
+
+    Use it in place of an FMC object: fmcapi.Hosts(fmc=SnapshotFMC(snapshot=snapshot), name="host1").get()
+    """
+
+    logging.debug("In the SnapshotFMC class.")
+
+    def __init__(self, snapshot, **kwargs):
+        """
+        Set up the URLs and version the snapshot was taken with.
+
+        :param snapshot (object): Snapshot to answer from.
+        :param kwargs: Any of the FMC() parameters.
+        :return: None
+        """
+        kwargs.setdefault("autodeploy", False)
+        super().__init__(**kwargs)
+        logging.debug("In the SnapshotFMC __init__() class method.")
+        self.snapshot = snapshot
+        meta = snapshot.meta
+        self.host = meta.get("host")
+        self.uuid = meta.get("uuid")
+        self.serverVersion = meta.get("serverVersion")
+        self.configuration_url = meta.get("configuration_url")
+        self.platform_url = meta.get("platform_url")
+
+    def __enter__(self):
+        """
+        Nothing to log in to.
+
+        :return: self
+        """
+        logging.debug("In the SnapshotFMC __enter__() class method.")
+        return self
+
+    def __exit__(self, *args):
+        """
+        Nothing to deploy or close.
+
+        :param args:
+        :return: None
+        """
+        logging.debug("In the SnapshotFMC __exit__() class method.")
+
+    def send_request(self, method="", url="", headers="", json_data=None):
+        """
+        Answer a GET from the snapshot.  Everything else is refused since the snapshot is read-only.
+
+        :param method (str): GET, POST, PUT, or DELETE
+        :param url (str): URL for API call.
+        :param headers (str):  Ignored.
+        :param json_data (str):  Ignored.
+        :return: JSON response from the snapshot.
+        """
+        logging.debug("In the SnapshotFMC send_request() class method.")
+        if method != "get":
+            logging.error(
+                f"The snapshot is read-only.  Not sending {method.upper()} {url}."
+            )
+            return None
+        return self.snapshot.response(url=url)
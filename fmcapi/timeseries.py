@@ -0,0 +1,405 @@
+"""
+Keep hit counts as compact, array backed time series and query them in bulk.
+
+This module (timeseries.py) provides HitCountStore.  Each hit count returned by HitCounts().get() (or stored by a
+HitCountCollector) becomes one sample in a set of numpy columns, with the policies, devices and rules stored once and
+referred to by number.  Queries such as "rules not hit on any device in 90 days" or "hottest rules per policy" are
+answered with whole column operations rather than loops over dicts.  It needs the optional numpy package
+(pip3 install fmcapi[analytics]).
+"""
+
+import datetime
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class HitCountStore(object):
+    """
+    Columnar store of hit count samples.
+
+    Every sample is one rule on one device at one lastFetchTimeStamp: "rule" and "device" are numbers into the rules
+    and devices tables, "fetched", "first_hit" and "last_hit" are epoch seconds (-1 when the rule was never hit) and
+    "hit_count" is the count.  Each rule belongs to one policy (AccessPolicy or PrefilterPolicy).
+    """
+
+    logging.debug("In the HitCountStore class.")
+
+    COLUMNS = {
+        "rule": "int32",
+        "device": "int32",
+        "fetched": "int64",
+        "hit_count": "int64",
+        "first_hit": "int64",
+        "last_hit": "int64",
+    }
+    NEVER = -1
+
+    def __init__(self):
+        """
+        Create an empty store.
+
+        :return: None
+        """
+        logging.debug("In the HitCountStore __init__() class method.")
+        if numpy is None:
+            raise ImportError(
+                "HitCountStore needs numpy.  Install it with: pip3 install fmcapi[analytics]"
+            )
+        self.policies = []
+        self.devices = []
+        self.rules = []
+        self.rule_names = []
+        self.indexes = {"policy": {}, "device": {}, "rule": {}}
+        self.rule_policy = numpy.zeros(0, dtype="int32")
+        self.columns = {
+            name: numpy.zeros(0, dtype=dtype) for name, dtype in self.COLUMNS.items()
+        }
+        self.pending = []
+        self.fetches = set()
+        self._latest = None
+
+    def __len__(self):
+        self.compact()
+        return len(self.columns["rule"])
+
+    @staticmethod
+    def seconds(value):
+        """
+        Convert an FMC timestamp ("2020-01-02T03:04:05Z") to epoch seconds.
+
+        :param value (str): Timestamp.  Rules never hit have an empty or blank one.
+        :return: (int) Epoch seconds or NEVER.
+        """
+        if not value or not str(value).strip():
+            return HitCountStore.NEVER
+        try:
+            timestamp = datetime.datetime.fromisoformat(
+                str(value).strip().replace("Z", "+00:00")
+            )
+        except ValueError:
+            logging.debug(f"Unable to parse timestamp {value}.")
+            return HitCountStore.NEVER
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=datetime.timezone.utc)
+        return int(timestamp.timestamp())
+
+    def code(self, table, key):
+        """
+        Return the number of key in one of the lookup tables, adding it if needed.
+
+        :param table (str): "policy", "device" or "rule".
+        :param key: Policy id, device id or (policy number, rule id).
+        :return: (int)
+        """
+        index = self.indexes[table]
+        if key not in index:
+            index[key] = len(index)
+            {"policy": self.policies, "device": self.devices, "rule": self.rules}[
+                table
+            ].append(key)
+            if table == "rule":
+                self.rule_names.append(None)
+        return index[key]
+
+    def add(self, policy_id, device_id, items):
+        """
+        Add the hit counts of one policy on one device.
+
+        Fetches already in the store (same policy, device and lastFetchTimeStamp) are skipped.
+
+        :param policy_id (str): UUID of the AccessPolicy or PrefilterPolicy.
+        :param device_id (str): UUID of the device.
+        :param items (list): Hit counts as returned by HitCounts().get().
+        :return: (int) Number of samples added.
+        """
+        logging.debug("In the HitCountStore add() class method.")
+        rows = {name: [] for name in self.COLUMNS}
+        policy = self.code("policy", policy_id)
+        device = self.code("device", device_id)
+        seen = set()
+        for item in items:
+            fetched = self.seconds(item.get("lastFetchTimeStamp"))
+            if (policy, device, fetched) in self.fetches:
+                continue
+            seen.add((policy, device, fetched))
+            rule = self.code("rule", (policy, item.get("rule", {}).get("id")))
+            self.rule_names[rule] = item.get("rule", {}).get("name")
+            rows["rule"].append(rule)
+            rows["device"].append(device)
+            rows["fetched"].append(fetched)
+            rows["hit_count"].append(item.get("hitCount", 0))
+            rows["first_hit"].append(self.seconds(item.get("firstHitTimeStamp")))
+            rows["last_hit"].append(self.seconds(item.get("lastHitTimeStamp")))
+        self.fetches.update(seen)
+        if rows["rule"]:
+            self.pending.append(
+                {
+                    name: numpy.array(values, dtype=self.COLUMNS[name])
+                    for name, values in rows.items()
+                }
+            )
+            self._latest = None
+        return len(rows["rule"])
+
+    def load(self, collector):
+        """
+        Add everything a HitCountCollector has stored.
+
+        :param collector (object): HitCountCollector
+        :return: (int) Number of samples added.
+        """
+        logging.debug("In the HitCountStore load() class method.")
+        with collector.lock:
+            rows = collector.connection.execute(
+                "SELECT policy_id, device_id, last_fetch, rule_id, rule_name, hit_count, first_hit, last_hit "
+                "FROM hitcounts ORDER BY policy_id, device_id, last_fetch"
+            ).fetchall()
+        fetches = {}
+        for row in rows:
+            fetches.setdefault((row[0], row[1]), []).append(
+                {
+                    "lastFetchTimeStamp": row[2],
+                    "rule": {"id": row[3], "name": row[4]},
+                    "hitCount": row[5],
+                    "firstHitTimeStamp": row[6],
+                    "lastHitTimeStamp": row[7],
+                }
+            )
+        return sum(
+            self.add(policy_id=policy_id, device_id=device_id, items=items)
+            for (policy_id, device_id), items in fetches.items()
+        )
+
+    def compact(self):
+        """
+        Append the samples added since the last query to the columns.
+
+        :return: None
+        """
+        if not self.pending:
+            return
+        for name in self.COLUMNS:
+            self.columns[name] = numpy.concatenate(
+                [self.columns[name]] + [chunk[name] for chunk in self.pending]
+            )
+        self.pending = []
+        self.rule_policy = numpy.array(
+            [policy for policy, _ in self.rules], dtype="int32"
+        )
+
+    def latest(self):
+        """
+        Select the newest sample of each rule on each device.
+
+        :return: (numpy array) Boolean mask over the samples.
+        """
+        self.compact()
+        if self._latest is None:
+            columns = self.columns
+            # One series per (rule, device).  Sorting the samples keeps memory in line with their number rather
+            # than with rules x devices, most of which have no sample.
+            series = columns["rule"].astype("int64") * len(self.devices) + columns[
+                "device"
+            ].astype("int64")
+            order = numpy.lexsort((columns["fetched"], series))
+            series = series[order]
+            fetched = columns["fetched"][order]
+            # Each series is a run of rows ending with its newest sample.
+            first = numpy.ones(len(series), dtype=bool)
+            first[1:] = series[1:] != series[:-1]
+            last = numpy.ones(len(series), dtype=bool)
+            last[:-1] = first[1:]
+            run = numpy.cumsum(first) - 1
+            self._latest = numpy.zeros(len(series), dtype=bool)
+            self._latest[order] = fetched == fetched[last][run]
+        return self._latest
+
+    def policy_mask(self, policy_id=None):
+        """
+        Select the rules of one policy.
+
+        :param policy_id (str): UUID of the policy.  (Default is every policy)
+        :return: (numpy array) Boolean mask over the rules.
+        """
+        self.compact()
+        if policy_id is None:
+            return numpy.ones(len(self.rules), dtype=bool)
+        return self.rule_policy == self.indexes["policy"].get(policy_id, -1)
+
+    def describe(self, rules, **columns):
+        """
+        Turn rule numbers (and per rule values) into dicts.
+
+        :param rules (numpy array): Rule numbers.
+        :param columns: Per rule values to add, as numpy arrays indexed by rule number.
+        :return: (list) {"policy_id", "rule_id", "rule_name", ...}
+        """
+        results = []
+        for rule in rules.tolist():
+            policy, rule_id = self.rules[rule]
+            result = {
+                "policy_id": self.policies[policy],
+                "rule_id": rule_id,
+                "rule_name": self.rule_names[rule],
+            }
+            for name, values in columns.items():
+                result[name] = values[rule].item()
+            results.append(result)
+        return results
+
+    def totals(self, policy_id):
+        """
+        Add up the newest sample of each device for every rule of one policy.
+
+        :param policy_id (str): UUID of the policy.
+        :return: (dict) rule id to hit count.
+        """
+        logging.debug("In the HitCountStore totals() class method.")
+        mask = self.latest()
+        columns = self.columns
+        totals = numpy.zeros(len(self.rules), dtype="int64")
+        numpy.add.at(totals, columns["rule"][mask], columns["hit_count"][mask])
+        return {
+            self.rules[rule][1]: totals[rule].item()
+            for rule in numpy.flatnonzero(self.policy_mask(policy_id)).tolist()
+        }
+
+    def unused(self, days=90, now=None, policy_id=None):
+        """
+        Find the rules not hit on any device in the last 'days' days.
+
+        Each device counts with its newest sample of the rule.
+
+        :param days (int): Size of the window.  None finds the rules never hit at all.  (Default is 90)
+        :param now (int): Epoch seconds the window ends at.  (Default is now)
+        :param policy_id (str): Only look at the rules of this policy.  (Default is every policy)
+        :return: (list) {"policy_id", "rule_id", "rule_name", "last_hit"}, last_hit being epoch seconds or -1.
+        """
+        logging.debug("In the HitCountStore unused() class method.")
+        mask = self.latest()
+        columns = self.columns
+        last_hit = numpy.full(len(self.rules), self.NEVER, dtype="int64")
+        numpy.maximum.at(last_hit, columns["rule"][mask], columns["last_hit"][mask])
+        hits = numpy.zeros(len(self.rules), dtype="int64")
+        numpy.add.at(hits, columns["rule"][mask], columns["hit_count"][mask])
+        if days is None:
+            cold = hits == 0
+        else:
+            if now is None:
+                now = int(datetime.datetime.now(datetime.timezone.utc).timestamp())
+            cold = last_hit < now - days * 86400
+        selected = numpy.flatnonzero(cold & self.policy_mask(policy_id))
+        return self.describe(selected, last_hit=last_hit)
+
+    def hottest(self, n=10, policy_id=None):
+        """
+        Find the N most hit rules of each policy, adding up the newest sample of each device.
+
+        :param n (int): Rules per policy.  (Default is 10)
+        :param policy_id (str): Only look at this policy.  (Default is every policy)
+        :return: (dict) policy id to a list of {"policy_id", "rule_id", "rule_name", "hitCount"}, most hit first.
+        """
+        logging.debug("In the HitCountStore hottest() class method.")
+        mask = self.latest()
+        columns = self.columns
+        totals = numpy.zeros(len(self.rules), dtype="int64")
+        numpy.add.at(totals, columns["rule"][mask], columns["hit_count"][mask])
+        candidates = numpy.flatnonzero(self.policy_mask(policy_id))
+        # Sort by policy, then by total descending, and keep the first n of each policy.
+        order = candidates[
+            numpy.lexsort((-totals[candidates], self.rule_policy[candidates]))
+        ]
+        policies = self.rule_policy[order]
+        starts = numpy.searchsorted(policies, policies, side="left")
+        rank = numpy.arange(len(order)) - starts
+        selected = order[rank < n]
+        results = {}
+        for result in self.describe(selected, hitCount=totals):
+            results.setdefault(result["policy_id"], []).append(result)
+        return results
+
+    def series(self, policy_id, rule_id, device_id=None):
+        """
+        Return the samples of one rule in time order.
+
+        :param policy_id (str): UUID of the policy.
+        :param rule_id (str): UUID of the rule.
+        :param device_id (str): Only this device.  (Default is every device)
+        :return: (dict) numpy arrays "fetched", "device", "hit_count", "first_hit" and "last_hit".
+        """
+        logging.debug("In the HitCountStore series() class method.")
+        self.compact()
+        policy = self.indexes["policy"].get(policy_id, -1)
+        rule = self.indexes["rule"].get((policy, rule_id), -1)
+        mask = self.columns["rule"] == rule
+        if device_id is not None:
+            mask &= self.columns["device"] == self.indexes["device"].get(device_id, -1)
+        order = numpy.argsort(self.columns["fetched"][mask], kind="stable")
+        return {
+            name: self.columns[name][mask][order]
+            for name in ["fetched", "device", "hit_count", "first_hit", "last_hit"]
+        }
+
+    def save(self, path):
+        """
+        Write the store to a compressed numpy (.npz) file.
+
+        :param path (str): Filename (and optional path).
+        :return: None
+        """
+        logging.debug("In the HitCountStore save() class method.")
+        self.compact()
+        numpy.savez_compressed(
+            path,
+            policies=numpy.array(self.policies, dtype=str),
+            devices=numpy.array(self.devices, dtype=str),
+            rule_policy=self.rule_policy,
+            rule_ids=numpy.array(
+                [str(rule_id) for _, rule_id in self.rules], dtype=str
+            ),
+            rule_names=numpy.array(
+                ["" if name is None else name for name in self.rule_names], dtype=str
+            ),
+            **self.columns,
+        )
+
+    @classmethod
+    def open(cls, path):
+        """
+        Read a store written by save().
+
+        :param path (str): Filename (and optional path).
+        :return: (object) HitCountStore
+        """
+        logging.debug("In the HitCountStore open() class method.")
+        store = cls()
+        with numpy.load(path) as data:
+            for policy_id in data["policies"].tolist():
+                store.code("policy", policy_id)
+            for device_id in data["devices"].tolist():
+                store.code("device", device_id)
+            for policy, rule_id, name in zip(
+                data["rule_policy"].tolist(),
+                data["rule_ids"].tolist(),
+                data["rule_names"].tolist(),
+            ):
+                rule = store.code("rule", (policy, rule_id))
+                store.rule_names[rule] = name
+            store.columns = {
+                name: data[name].astype(dtype) for name, dtype in cls.COLUMNS.items()
+            }
+        store.rule_policy = numpy.array(
+            [policy for policy, _ in store.rules], dtype="int32"
+        )
+        store.fetches = set(
+            zip(
+                store.rule_policy[store.columns["rule"]].tolist(),
+                store.columns["device"].tolist(),
+                store.columns["fetched"].tolist(),
+            )
+        )
+        return store
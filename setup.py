@@ -39,6 +39,7 @@ setup(
     keywords="fmcapi fmc ftd security cisco ngfw api firepower",
     packages=find_packages(exclude=["docs", "tests*"]),
     install_requires=["requests", "datetime", "ipaddress"],
+    extras_require={"async": ["aiohttp"], "analytics": ["numpy"]},
     python_requires=">=3",
     package_data={},
     data_files=None,
@@ -1,10 +1,13 @@
 """
 Test api_objects.py
 """
+
+import json
 import mock
 import unittest
 
 from fmcapi import api_objects
+from fmcapi.api_objects import helper_functions
 
 
 class TestApiObjects(unittest.TestCase):
@@ -1330,3 +1333,273 @@ class TestApiObjects(unittest.TestCase):
         self.assertEqual(
             [{"type": "host", "value": "10.0.0.1"}], data["sourceNetworks"]["literals"]
         )
+
+    def test_api_class_template_iter_items_yields_each_page(self):
+        mock_fmc = mock.Mock()
+        mock_fmc.serverVersion = "6.7.0"
+        mock_fmc.iter_pages.return_value = iter(
+            [{"items": [{"id": "1"}, {"id": "2"}]}, {"items": [{"id": "3"}]}]
+        )
+        api = api_objects.Hosts(fmc=mock_fmc)
+        self.assertEqual([item["id"] for item in api.iter_items()], ["1", "2", "3"])
+
+    def test_api_class_template_get_all_and_failed_get(self):
+        mock_fmc = mock.Mock()
+        mock_fmc.serverVersion = "6.7.0"
+        response = {
+            "items": [{"id": "1"}, {"id": "2"}],
+            "paging": {"count": 2, "pages": 2},
+        }
+        mock_fmc.send_to_api.return_value = response
+        self.assertEqual(api_objects.Hosts(fmc=mock_fmc).get(), response)
+        # send_to_api() returns None when the GET or one of its pages failed.
+        mock_fmc.send_to_api.return_value = None
+        self.assertIsNone(api_objects.Hosts(fmc=mock_fmc).get())
+        self.assertIsNone(api_objects.Hosts(fmc=mock_fmc, name="h1").get())
+        self.assertIsNone(api_objects.Hosts(fmc=mock_fmc, id="h1").get())
+
+    def test_chunk_json_items_limits_count_and_serialized_bytes(self):
+        items = [{"name": f"host{i}", "value": "10.0.0.1"} for i in range(10)]
+        item_bytes = len(json.dumps(items[0]))
+        chunks = list(
+            helper_functions.chunk_json_items(
+                items, max_items=4, max_bytes=2 + 3 * item_bytes + 2 * 2
+            )
+        )
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 3, 1])
+        self.assertEqual(sum(chunks, []), items)
+        chunks = list(helper_functions.chunk_json_items(items, max_items=4))
+        self.assertEqual([len(chunk) for chunk in chunks], [4, 4, 2])
+
+    def test_bulk_objects_post_returns_ids_and_isolates_bad_chunk(self):
+        mock_fmc = mock.Mock()
+        mock_fmc.serverVersion = "6.7.0"
+        mock_fmc.FMC_MAX_PAYLOAD = 2048000
+
+        def send_to_api(method, url, json_data=None):
+            if isinstance(json_data, list):
+                if any(item["name"] == "bad" for item in json_data):
+                    return None
+                return {"items": [{"id": f"id-{item['name']}"} for item in json_data]}
+            if json_data["name"] == "bad":
+                return None
+            return {"id": f"id-{json_data['name']}"}
+
+        mock_fmc.send_to_api.side_effect = send_to_api
+        bulk = api_objects.BulkObjects(fmc=mock_fmc)
+        bulk.MAX_SIZE_QTY = 2
+        for name in ["a", "b", "bad", "c", "d"]:
+            bulk.add(api_objects.Hosts(fmc=mock_fmc, name=name, value="10.0.0.1"))
+        bulk.add(api_objects.Networks(fmc=mock_fmc, name="n", value="10.0.0.0/8"))
+        results = bulk.post()
+        self.assertEqual(
+            [(result["id"], result["error"]) for result in results],
+            [
+                ("id-a", None),
+                ("id-b", None),
+                (None, "POST failed."),
+                ("id-c", None),
+                ("id-d", None),
+            ],
+        )
+        # Two good chunks, one rejected chunk and the two objects of that chunk one at a time.
+        self.assertEqual(mock_fmc.send_to_api.call_count, 5)
+        self.assertFalse(bulk.put())
+
+    def test_bulk_post_sends_every_chunk_under_byte_limit(self):
+        mock_fmc = mock.Mock()
+        mock_fmc.send_to_api.side_effect = lambda method, url, json_data: {
+            "items": [{"name": item["name"], "id": item["name"]} for item in json_data]
+        }
+        bulk = api_objects.Bulk(fmc=mock_fmc, url="https://fmc/accessrules")
+        rules = [{"name": f"rule{i}", "action": "ALLOW"} for i in range(10)]
+        for rule in rules:
+            bulk.add(rule)
+        bulk.MAX_SIZE_IN_BYTES = len(json.dumps(rules[:3]))
+        response = bulk.post()
+        self.assertEqual(mock_fmc.send_to_api.call_count, 4)
+        for call in mock_fmc.send_to_api.call_args_list:
+            self.assertLessEqual(
+                len(json.dumps(call.kwargs["json_data"])), bulk.MAX_SIZE_IN_BYTES
+            )
+            self.assertEqual(call.kwargs["url"], "https://fmc/accessrules?bulk=true")
+        self.assertEqual(
+            [item["id"] for item in response["items"]], [r["name"] for r in rules]
+        )
+        self.assertEqual(response["failed"], [])
+
+    def test_bulk_put_concurrent_keeps_order_and_reports_failed(self):
+        mock_fmc = mock.Mock()
+
+        def send_to_api(method, url, json_data=None):
+            if json_data[0]["id"] == "2":
+                return None
+            return {"items": json_data}
+
+        mock_fmc.send_to_api.side_effect = send_to_api
+        bulk = api_objects.Bulk(fmc=mock_fmc, url="https://fmc/accessrules")
+        bulk.MAX_SIZE_QTY = 2
+        for i in range(7):
+            bulk.add({"id": str(i), "name": f"rule{i}"})
+        response = bulk.put(workers=3)
+        self.assertEqual(
+            [item["id"] for item in response["items"]], ["0", "1", "4", "5", "6"]
+        )
+        self.assertEqual([item["id"] for item in response["failed"]], ["2", "3"])
+        mock_fmc.send_to_api.side_effect = None
+        mock_fmc.send_to_api.return_value = {"items": []}
+        bulk.delete()
+        mock_fmc.send_to_api.assert_called_with(
+            method="delete",
+            url="https://fmc/accessrules?bulk=true&filter=ids:0,1,2,3,4,5,6",
+        )
+
+    def test_bulk_with_position_places_chunks_in_order(self):
+        mock_fmc = mock.Mock()
+        mock_fmc.send_to_api.side_effect = lambda method, url, json_data: {
+            "items": json_data
+        }
+        bulk = api_objects.Bulk(
+            fmc=mock_fmc, url="https://fmc/accessrules", insertBefore=5
+        )
+        bulk.MAX_SIZE_QTY = 2
+        for i in range(5):
+            bulk.add({"name": f"rule{i}"})
+        bulk.post()
+        self.assertEqual(
+            [call.kwargs["url"] for call in mock_fmc.send_to_api.call_args_list],
+            [
+                f"https://fmc/accessrules?insertBefore={index}&bulk=true"
+                for index in [5, 7, 9]
+            ],
+        )
+
+        # The FMC's ruleIndex wins, and chunks are never sent concurrently.
+        mock_fmc.send_to_api.reset_mock()
+        mock_fmc.send_to_api.side_effect = lambda method, url, json_data: {
+            "items": [
+                dict(item, metadata={"ruleIndex": 20 + int(item["id"])})
+                for item in json_data
+            ]
+        }
+        bulk = api_objects.Bulk(
+            fmc=mock_fmc, url="https://fmc/accessrules", insertAfter=20
+        )
+        bulk.MAX_SIZE_QTY = 2
+        for i in range(1, 6):
+            bulk.add({"id": str(i), "name": f"rule{i}"})
+        response = bulk.put(workers=3)
+        self.assertEqual(
+            [call.kwargs["url"] for call in mock_fmc.send_to_api.call_args_list],
+            [
+                f"https://fmc/accessrules?insertAfter={index}&bulk=true"
+                for index in [20, 22, 24]
+            ],
+        )
+        self.assertEqual(len(response["items"]), 5)
+
+    def test_json_matches_ignores_extra_keys_and_order(self):
+        desired = {"objects": [{"id": "b"}, {"id": "a", "type": "Host"}]}
+        current = {
+            "objects": [
+                {"id": "a", "type": "Host", "name": "host-a"},
+                {"id": "b", "type": "Host", "name": "host-b"},
+            ],
+            "links": {"self": "https://fmc"},
+        }
+        self.assertFalse(helper_functions.json_matches(desired, current))
+        desired["objects"][0]["type"] = "Host"
+        self.assertTrue(helper_functions.json_matches(desired, current))
+        current["objects"].pop()
+        self.assertFalse(helper_functions.json_matches(desired, current))
+
+    def test_apply_skips_put_when_nothing_changed(self):
+        mock_fmc = mock.Mock()
+        mock_fmc.serverVersion = "6.7.0"
+        current = {
+            "id": "h1",
+            "name": "host1",
+            "type": "Host",
+            "value": "10.0.0.1",
+            "description": "Created by fmcapi.",
+            "overridable": False,
+            "metadata": {"timestamp": 1},
+        }
+        mock_fmc.object_cache.get.return_value = current
+        mock_fmc.send_to_api.return_value = dict(current, value="10.0.0.2")
+
+        host = api_objects.Hosts(fmc=mock_fmc, name="host1", value="10.0.0.1")
+        self.assertEqual(host.apply(), {"action": "unchanged", "changes": {}})
+        mock_fmc.send_to_api.assert_not_called()
+
+        host = api_objects.Hosts(fmc=mock_fmc, name="host1", value="10.0.0.2")
+        result = host.apply()
+        self.assertEqual(result["action"], "updated")
+        self.assertEqual(
+            result["changes"], {"value": {"from": "10.0.0.1", "to": "10.0.0.2"}}
+        )
+        self.assertEqual(mock_fmc.send_to_api.call_args[1]["method"], "put")
+
+        mock_fmc.object_cache.get.return_value = None
+        mock_fmc.send_to_api.return_value = {"id": "h2", "name": "host2"}
+        result = api_objects.Hosts(fmc=mock_fmc, name="host2", value="10.0.0.3").apply()
+        self.assertEqual(result["action"], "created")
+        self.assertEqual(mock_fmc.send_to_api.call_args[1]["method"], "post")
+
+    def test_apply_keeps_fields_left_at_their_defaults(self):
+        mock_fmc = mock.Mock()
+        mock_fmc.serverVersion = "6.7.0"
+        current = {
+            "id": "h1",
+            "name": "host1",
+            "type": "Host",
+            "value": "10.0.0.1",
+            "description": "web server",
+        }
+        mock_fmc.object_cache.get.return_value = current
+        mock_fmc.send_to_api.return_value = dict(current, value="10.0.0.2")
+
+        host = api_objects.Hosts(fmc=mock_fmc, name="host1", value="10.0.0.1")
+        self.assertEqual(host.apply(), {"action": "unchanged", "changes": {}})
+        mock_fmc.send_to_api.assert_not_called()
+
+        host = api_objects.Hosts(fmc=mock_fmc, name="host1", value="10.0.0.2")
+        self.assertEqual(list(host.apply()["changes"]), ["value"])
+        self.assertEqual(
+            mock_fmc.send_to_api.call_args[1]["json_data"]["description"],
+            "web server",
+        )
+
+        host = api_objects.Hosts(
+            fmc=mock_fmc,
+            name="host1",
+            value="10.0.0.1",
+            description="Created by fmcapi.",
+        )
+        self.assertEqual(
+            host.apply()["changes"],
+            {"description": {"from": "web server", "to": "Created by fmcapi."}},
+        )
+
+    def test_ACPRule_ports_use_object_cache(self):
+        mock_fmc = mock.Mock()
+        mock_fmc.serverVersion = "6.7.0"
+        mock_fmc.object_cache.find.return_value = {
+            "name": "http",
+            "id": "p1",
+            "type": "ProtocolPortObject",
+        }
+        rule_obj = api_objects.AccessRules(fmc=mock_fmc)
+        rule_obj.source_port(action="add", name="http")
+        rule_obj.destination_port(action="add", name="http")
+        rule_obj.destination_port(action="add", name="http")
+        self.assertEqual(
+            rule_obj.sourcePorts,
+            {"objects": [{"name": "http", "id": "p1", "type": "ProtocolPortObject"}]},
+        )
+        self.assertEqual(len(rule_obj.destinationPorts["objects"]), 1)
+        self.assertEqual(
+            mock_fmc.object_cache.find.call_args[1]["api_classes"],
+            [api_objects.ProtocolPortObjects, api_objects.PortObjectGroups],
+        )
+        mock_fmc.send_to_api.assert_not_called()
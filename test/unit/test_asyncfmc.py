@@ -0,0 +1,65 @@
+"""
+Test asyncfmc.py
+"""
+
+import mock
+import unittest
+
+from fmcapi import api_objects
+from fmcapi import asyncfmc
+
+
+@unittest.skipIf(asyncfmc.aiohttp is None, "aiohttp is not installed")
+class TestAsyncFMC(unittest.IsolatedAsyncioTestCase):
+    async def test_asend_to_api_fetches_remaining_pages_in_order(self):
+        async def fake_asend_request(method="", url="", headers="", json_data=None):
+            offset = int(url.split("offset=")[1].split("&")[0])
+            page = {"items": [{"id": str(offset)}]}
+            if offset == 0:
+                page["paging"] = {
+                    "offset": 0,
+                    "limit": 1,
+                    "count": 5,
+                    "next": ["https://fmc/object/hosts?offset=1&limit=1"],
+                }
+            return page
+
+        f = asyncfmc.AsyncFMC(paging_workers=2)
+        with mock.patch.object(f, "asend_request", side_effect=fake_asend_request):
+            response = await f.asend_to_api(
+                method="get", url="https://fmc/object/hosts?offset=0&limit=1"
+            )
+        self.assertEqual(
+            [item["id"] for item in response["items"]], ["0", "1", "2", "3", "4"]
+        )
+
+    async def test_aget_by_id_and_apost(self):
+        mock_fmc = mock.Mock()
+        mock_fmc.serverVersion = "6.7.0"
+        mock_fmc.asend_to_api = mock.AsyncMock(
+            return_value={"id": "abc", "name": "host1", "value": "10.0.0.1"}
+        )
+        host = api_objects.Hosts(fmc=mock_fmc, id="abc")
+        response = await host.aget()
+        self.assertEqual(response["name"], "host1")
+        self.assertEqual(host.value, "10.0.0.1")
+
+        new_host = api_objects.Hosts(fmc=mock_fmc, name="host1", value="10.0.0.1")
+        await new_host.apost()
+        self.assertEqual(new_host.id, "abc")
+        self.assertEqual(mock_fmc.asend_to_api.call_args[1]["method"], "post")
+
+    @mock.patch("fmcapi.fmc.Token.generate_tokens")
+    async def test_arenew_token_only_once_for_same_expired_token(self, *_):
+        token = asyncfmc.AsyncToken()
+        token.access_token = "old"
+
+        async def agenerate():
+            token.access_token = "new"
+
+        with mock.patch.object(
+            token, "agenerate_tokens", side_effect=agenerate
+        ) as mock_generate:
+            self.assertEqual(await token.arenew_token(expired_token="old"), "new")
+            self.assertEqual(await token.arenew_token(expired_token="old"), "new")
+        mock_generate.assert_called_once()
@@ -0,0 +1,149 @@
+"""
+Test collector.py
+"""
+
+import mock
+import threading
+import unittest
+
+import fmcapi
+from fmcapi import collector
+
+
+class TestHitCountCollector(unittest.TestCase):
+    def setUp(self):
+        self.fmc = fmcapi.FMC(host="fmc")
+        self.fmc.serverVersion = "6.7.0"
+        self.fmc.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        self.last_fetch = {"d1": "2020-01-01T00:00:00Z", "d2": "2020-01-01T00:00:00Z"}
+        self.calls = []
+        lock = threading.Lock()
+
+        def send_request(method="", url="", headers="", json_data=None):
+            path = url.split("?")[0][len(self.fmc.configuration_url) :]
+            with lock:
+                self.calls.append((method, url))
+            if path == "/assignment/policyassignments":
+                return {
+                    "items": [
+                        {
+                            "id": "acp1",
+                            "policy": {
+                                "id": "acp1",
+                                "name": "acp",
+                                "type": "AccessPolicy",
+                            },
+                            "targets": [
+                                {"id": "d1", "name": "ftd1", "type": "Device"},
+                                {"id": "g1", "name": "grp", "type": "DeviceGroup"},
+                            ],
+                        },
+                        {
+                            "id": "nat1",
+                            "policy": {"id": "nat1", "type": "FTDNatPolicy"},
+                            "targets": [{"id": "d1", "type": "Device"}],
+                        },
+                    ]
+                }
+            if path == "/policy/accesspolicies":
+                return {
+                    "items": [
+                        {
+                            "id": "acp1",
+                            "name": "acp",
+                            "type": "AccessPolicy",
+                            "prefilterPolicySetting": {"id": "pf1", "name": "pf"},
+                        }
+                    ]
+                }
+            if path == "/devicegroups/devicegrouprecords":
+                return {
+                    "items": [
+                        {
+                            "id": "g1",
+                            "name": "grp",
+                            "members": [
+                                {"id": "d1", "type": "Device"},
+                                {"id": "d2", "type": "Device"},
+                            ],
+                        }
+                    ]
+                }
+            device = url.split("deviceId:")[1][:2]
+            if method == "put":
+                self.last_fetch[device] = "2020-01-02T00:00:00Z"
+                return {"items": []}
+            items = [
+                {
+                    "rule": {"id": f"r{n}", "name": f"rule{n}"},
+                    "hitCount": n * 10,
+                    "lastFetchTimeStamp": self.last_fetch[device],
+                }
+                for n in range(3)
+            ]
+            return {
+                "items": (
+                    items[:1] if "limit=1&" in url or url.endswith("limit=1") else items
+                )
+            }
+
+        self.fmc.send_request = mock.Mock(side_effect=send_request)
+        self.collector = collector.HitCountCollector(fmc=self.fmc, path=":memory:")
+
+    def test_pairs_include_prefilter_and_group_members(self):
+        pairs = self.collector.pairs()
+        self.assertEqual(
+            [(p["policy"]["id"], p["device"]["id"]) for p in pairs],
+            [("acp1", "d1"), ("pf1", "d1"), ("acp1", "d2"), ("pf1", "d2")],
+        )
+        self.assertEqual(pairs[1]["policy"]["type"], "PrefilterPolicy")
+
+    def test_collect_is_incremental(self):
+        results = self.collector.collect()
+        self.assertEqual([r["status"] for r in results], ["fetched"] * 4)
+        self.assertEqual(
+            [c["hitCount"] for c in self.collector.counts("acp1", "d2")], [0, 10, 20]
+        )
+        self.assertTrue(
+            any(
+                "prefilterpolicies/pf1/operational/hitcounts" in url
+                for _, url in self.calls
+            )
+        )
+        # Nothing changed: only the one count probes are sent.
+        self.calls.clear()
+        results = self.collector.collect()
+        self.assertEqual([r["status"] for r in results], ["unchanged"] * 4)
+        self.assertFalse(
+            any("hitcounts" in url and "limit=1000" in url for _, url in self.calls)
+        )
+        # A refresh changes the lastFetchTimeStamp, so every pair is fetched again and kept next to the old one.
+        results = self.collector.collect(refresh=True)
+        self.assertEqual([r["status"] for r in results], ["fetched"] * 4)
+        self.assertEqual(self.collector.latest("acp1", "d1"), "2020-01-02T00:00:00Z")
+        self.assertEqual(
+            len(self.collector.counts("acp1", "d1", last_fetch="2020-01-01T00:00:00Z")),
+            3,
+        )
+
+    def test_collect_reports_failed_get(self):
+        send_request = self.fmc.send_request.side_effect
+
+        def failing(method="", url="", headers="", json_data=None):
+            if "hitcounts" in url and "limit=1000" in url:
+                return None
+            return send_request(method=method, url=url, headers=headers)
+
+        self.fmc.send_request.side_effect = failing
+        results = self.collector.collect()
+        self.assertEqual(
+            [r["error"] for r in results], ["GET of the hit counts failed."] * 4
+        )
+        self.assertEqual(self.collector.counts("acp1", "d1"), [])
+
+    def test_collect_reports_failed_refresh(self):
+        with mock.patch.object(collector.HitCounts, "put", return_value=False):
+            results = self.collector.collect(refresh=True)
+        self.assertEqual(
+            [r["error"] for r in results], ["Refresh of the hit counts failed."] * 4
+        )
@@ -0,0 +1,111 @@
+"""
+Test compaction.py
+"""
+
+import mock
+import unittest
+
+import fmcapi
+from fmcapi import compaction
+
+
+class TestNetworkGroupCompactor(unittest.TestCase):
+    def setUp(self):
+        self.fmc = fmcapi.FMC(host="fmc")
+        self.fmc.serverVersion = "6.7.0"
+        self.fmc.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        self.group = {
+            "id": "g1",
+            "name": "imported",
+            "type": "NetworkGroup",
+            "objects": [
+                {"id": "h1", "type": "Host", "name": "host"},
+                {"id": "n1", "type": "Network", "name": "net"},
+                {"id": "inner", "type": "NetworkGroup", "name": "inner"},
+                {"id": "f1", "type": "FQDN", "name": "fqdn"},
+            ],
+            "literals": [{"type": "Host", "value": f"10.0.0.{i}"} for i in range(256)]
+            + [
+                {"type": "Host", "value": "192.168.1.1"},
+                {"type": "Host", "value": "not-an-address"},
+            ],
+            "metadata": {"readOnly": {"state": False}},
+        }
+        self.objects = {
+            "/object/hosts": [
+                {"id": "h1", "name": "host", "type": "Host", "value": "10.0.1.0"}
+            ],
+            "/object/networks": [
+                {"id": "n1", "name": "net", "type": "Network", "value": "10.0.2.0/24"}
+            ],
+            "/object/networkgroups": [
+                self.group,
+                {
+                    "id": "inner",
+                    "name": "inner",
+                    "type": "NetworkGroup",
+                    "literals": [{"type": "Network", "value": "192.168.0.0/16"}],
+                },
+                {
+                    "id": "small",
+                    "name": "small",
+                    "type": "NetworkGroup",
+                    "literals": [{"type": "Range", "value": "10.1.0.1-10.1.0.6"}],
+                },
+            ],
+            "/object/fqdns": [
+                {"id": "f1", "name": "fqdn", "type": "FQDN", "value": "a.example"}
+            ],
+        }
+
+        def send_request(method="", url="", headers="", json_data=None):
+            path = url.split("?")[0][len(self.fmc.configuration_url) :]
+            if method == "put":
+                return dict(json_data)
+            return {"items": self.objects.get(path, [])}
+
+        self.fmc.send_request = mock.Mock(side_effect=send_request)
+        self.compactor = compaction.NetworkGroupCompactor(fmc=self.fmc)
+
+    def test_propose(self):
+        proposal = self.compactor.propose(self.group)
+        self.assertTrue(proposal["changed"])
+        self.assertEqual(proposal["before"]["entries"], 262)
+        self.assertEqual(proposal["after"]["entries"], 7)
+        self.assertLess(proposal["after"]["bytes"], proposal["before"]["bytes"] / 10)
+        data = proposal["data"]
+        self.assertNotIn("metadata", data)
+        self.assertEqual(
+            [item["id"] for item in data["objects"]], ["inner", "f1", "h1", "n1"]
+        )
+        self.assertEqual(
+            data["literals"],
+            [
+                {"type": "Host", "value": "not-an-address"},
+                {"type": "network", "value": "10.0.0.0/24"},
+                {"type": "host", "value": "192.168.1.1"},
+            ],
+        )
+
+    def test_propose_drop_nested(self):
+        # 192.168.1.1 is also in the nested group "inner".
+        proposal = self.compactor.propose(self.group, drop_nested=True)
+        self.assertEqual(proposal["after"]["entries"], 6)
+        self.assertNotIn(
+            "192.168.1.1",
+            [literal["value"] for literal in proposal["data"]["literals"]],
+        )
+
+    def test_compact_and_apply(self):
+        proposals = self.compactor.compact(apply=True)
+        self.assertEqual([p["group"]["id"] for p in proposals], ["g1"])
+        self.assertTrue(proposals[0]["applied"])
+        puts = [
+            call.kwargs
+            for call in self.fmc.send_request.call_args_list
+            if call.kwargs["method"] == "put"
+        ]
+        self.assertEqual(len(puts), 1)
+        self.assertTrue(puts[0]["url"].endswith("/object/networkgroups/g1"))
+        self.assertEqual(len(puts[0]["json_data"]["literals"]), 3)
+        self.assertIn("g1", self.fmc.group_expander.stale)
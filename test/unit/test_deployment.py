@@ -0,0 +1,72 @@
+"""
+Test deployment.py
+"""
+
+import mock
+import unittest
+
+import fmcapi
+from fmcapi import deployment
+
+
+def deployable(id):
+    return {"canBeDeployed": True, "version": "1", "device": {"id": id, "name": id}}
+
+
+class TestDeploymentPipeline(unittest.TestCase):
+    def setUp(self):
+        self.fmc = fmcapi.FMC(host="fmc")
+        self.fmc.serverVersion = "6.7.0"
+        self.fmc.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        self.tasks = {}
+        self.calls = []
+
+        def send_request(method="", url="", json_data=None, **kwargs):
+            self.calls.append((method, url))
+            if "deployabledevices" in url:
+                return {"items": [deployable("d1"), deployable("d2"), deployable("d3")]}
+            if "devicegrouprecords" in url:
+                return {
+                    "items": [{"id": "g1", "name": "canary", "members": [{"id": "d2"}]}]
+                }
+            if "deploymentrequests" in url:
+                device = json_data["deviceList"][0]
+                return {"metadata": {"task": {"id": f"task-{device}"}}}
+            task = url.rsplit("/", 1)[1]
+            # Each task reports "Deploying" once, then its final state.
+            states = self.tasks.setdefault(
+                task, ["Deploying", "Failed" if task == "task-d2" else "Deployed"]
+            )
+            return {
+                "id": task,
+                "status": states.pop(0) if len(states) > 1 else states[0],
+            }
+
+        self.fmc.send_request = mock.Mock(side_effect=send_request)
+
+    @mock.patch.object(fmcapi.TaskStatuses, "POLL_INTERVAL", 0.01)
+    def test_waves_stop_on_failure_and_time_each_device(self):
+        timings = deployment.DeploymentPipeline(
+            fmc=self.fmc, groups=["canary"], max_concurrent=2
+        ).run()
+        self.assertEqual(
+            [(t["name"], t["wave"], t["status"]) for t in timings],
+            [("d2", 1, "failed"), ("d1", 2, "skipped"), ("d3", 2, "skipped")],
+        )
+        self.assertEqual(timings[0]["task"], "task-d2")
+        self.assertIsNotNone(timings[0]["seconds"])
+        # Polled twice: "Deploying", then "Failed".
+        self.assertEqual(
+            [url for method, url in self.calls if url.endswith("task-d2")],
+            [f"{self.fmc.configuration_url}/job/taskstatuses/task-d2"] * 2,
+        )
+
+    @mock.patch.object(fmcapi.TaskStatuses, "POLL_INTERVAL", 0.01)
+    @mock.patch("fmcapi.api_objects.deployment_services.deployabledevices.time.sleep")
+    def test_no_wait_for_deployable_devices_without_changes(self, deployable_sleep):
+        timings = deployment.DeploymentPipeline(fmc=self.fmc, max_concurrent=3).run()
+        self.assertEqual(
+            [t["status"] for t in timings], ["succeeded", "failed", "succeeded"]
+        )
+        self.assertEqual({t["wave"] for t in timings}, {1})
+        deployable_sleep.assert_not_called()
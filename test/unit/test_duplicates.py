@@ -0,0 +1,159 @@
+"""
+Test duplicates.py
+"""
+
+import mock
+import unittest
+
+import fmcapi
+from fmcapi import duplicates
+
+
+class TestDuplicateObjectFinder(unittest.TestCase):
+    def setUp(self):
+        self.fmc = fmcapi.FMC(host="fmc")
+        self.fmc.serverVersion = "6.7.0"
+        self.fmc.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        collections = {
+            "/object/hosts": [
+                {"id": "h1", "name": "host-a", "type": "Host", "value": "1.1.1.1"},
+                {"id": "h2", "name": "host-b", "type": "Host", "value": "2.2.2.2"},
+                {
+                    "id": "h3",
+                    "name": "host-c",
+                    "type": "Host",
+                    "value": "1.1.1.1",
+                    "description": "imported",
+                    "metadata": {"lastUser": {"name": "admin"}},
+                },
+            ],
+            "/object/networks": [
+                {"id": "n1", "name": "net-a", "type": "Network", "value": "1.1.1.1/32"},
+                {"id": "n2", "name": "net-b", "type": "Network", "value": "10.0.0.0/8"},
+            ],
+            "/object/ranges": [
+                {
+                    "id": "r1",
+                    "name": "range-a",
+                    "type": "Range",
+                    "value": "2.2.2.2-2.2.2.2",
+                },
+            ],
+            "/object/fqdns": [
+                {"id": "f1", "name": "fqdn-a", "type": "FQDN", "value": "Example.com"},
+                {"id": "f2", "name": "fqdn-b", "type": "FQDN", "value": "example.com."},
+                {
+                    "id": "f3",
+                    "name": "fqdn-c",
+                    "type": "FQDN",
+                    "value": "example.com",
+                    "dnsResolution": "IPV4_ONLY",
+                },
+            ],
+            "/object/protocolportobjects": [
+                {
+                    "id": "p1",
+                    "name": "http",
+                    "type": "ProtocolPortObject",
+                    "protocol": "TCP",
+                    "port": "80",
+                },
+                {
+                    "id": "p2",
+                    "name": "www",
+                    "type": "ProtocolPortObject",
+                    "protocol": "6",
+                    "port": "80-80",
+                },
+                {
+                    "id": "p3",
+                    "name": "dns",
+                    "type": "ProtocolPortObject",
+                    "protocol": "UDP",
+                    "port": "53",
+                },
+            ],
+            "/object/networkgroups": [
+                {
+                    "id": "g1",
+                    "name": "group",
+                    "type": "NetworkGroup",
+                    "objects": [
+                        {"id": "h3", "type": "Host"},
+                        {"id": "n1", "type": "Network"},
+                    ],
+                },
+            ],
+            "/policy/accesspolicies": [
+                {"id": "acp1", "name": "acp", "type": "AccessPolicy"}
+            ],
+            "/policy/accesspolicies/acp1/accessrules": [
+                {
+                    "id": "rule1",
+                    "name": "rule",
+                    "sourceNetworks": {"objects": [{"id": "n1", "type": "Network"}]},
+                    "destinationNetworks": {
+                        "objects": [{"id": "n1", "type": "Network"}]
+                    },
+                    "destinationPorts": {
+                        "objects": [{"id": "p2", "type": "ProtocolPortObject"}]
+                    },
+                },
+            ],
+            "/policy/ftdnatpolicies": [
+                {"id": "nat1", "name": "nat", "type": "FTDNatPolicy"}
+            ],
+            "/policy/ftdnatpolicies/nat1/manualnatrules": [
+                {
+                    "id": "nat-rule1",
+                    "originalSource": {"id": "h2", "type": "Host"},
+                },
+            ],
+        }
+
+        def send_request(method="", url="", headers="", json_data=None):
+            path = url.split("?")[0][len(self.fmc.configuration_url) :]
+            return {"items": collections.get(path, [])}
+
+        self.fmc.send_request = mock.Mock(side_effect=send_request)
+
+    def test_find(self):
+        found = duplicates.DuplicateObjectFinder(fmc=self.fmc).find()
+        groups = {
+            group["value"]["kind"]
+            + str(group["value"]["value"]): sorted(
+                item["id"] for item in group["objects"]
+            )
+            for group in found
+        }
+        self.assertEqual(
+            groups,
+            {
+                "network['1.1.1.1/32']": ["h1", "h3", "n1"],
+                "network['2.2.2.2/32']": ["h2", "r1"],
+                "fqdnexample.com": ["f1", "f2"],
+                "port[6, 80, 80]": ["p1", "p2"],
+            },
+        )
+        self.assertEqual(len(found[0]["objects"]), 3)
+        self.assertEqual(found[0]["keep"]["id"], "n1")
+        self.assertEqual(found[0]["keep"]["references"], 2)
+        self.assertEqual(
+            [(item["id"], item["references"]) for item in found[0]["merge"]],
+            [("h3", 1), ("h1", 0)],
+        )
+        hosts = {group["keep"]["id"]: group for group in found}
+        self.assertEqual(hosts["h2"]["merge"][0]["id"], "r1")
+        self.assertEqual(hosts["p2"]["merge"][0]["id"], "p1")
+
+    def test_find_without_references(self):
+        finder = duplicates.DuplicateObjectFinder(
+            fmc=self.fmc, api_classes=[fmcapi.Hosts]
+        )
+        found = finder.find(references=False)
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0]["keep"]["id"], "h1")
+        self.assertIsNone(found[0]["keep"]["references"])
+        self.assertEqual(len(finder.groups), 2)
+        urls = [call.kwargs["url"] for call in self.fmc.send_request.call_args_list]
+        self.assertFalse(any("accessrules" in url for url in urls))
@@ -0,0 +1,347 @@
+"""
+Test fmc.py
+"""
+
+import mock
+import requests
+import threading
+import unittest
+
+import fmcapi
+from fmcapi import fmc
+
+
+class TestFMC(unittest.TestCase):
+    def test_build_session_mounts_pooled_adapter(self):
+        f = fmc.FMC(pool_connections=4, pool_maxsize=8, max_retries=2)
+        session = f.build_session()
+        adapter = session.get_adapter("https://192.168.45.45")
+        self.assertIs(adapter, f.adapter)
+        self.assertEqual(adapter._pool_connections, 4)
+        self.assertEqual(adapter._pool_maxsize, 8)
+        self.assertEqual(adapter.max_retries.total, 2)
+        self.assertEqual(session.headers["Connection"], "keep-alive")
+
+    def test_build_session_uses_custom_adapter(self):
+        custom_adapter = mock.Mock()
+        f = fmc.FMC(adapter=custom_adapter, keep_alive=False)
+        session = f.build_session()
+        self.assertIs(session.get_adapter("https://192.168.45.45"), custom_adapter)
+        self.assertEqual(session.headers["Connection"], "close")
+
+    def test_connection_stats_without_pools(self):
+        f = fmc.FMC()
+        f.build_session()
+        self.assertEqual(
+            f.connection_stats,
+            {"requests": 0, "connections": 0, "reused": 0, "pools": {}},
+        )
+
+    def test_send_to_api_uses_shared_session(self):
+        f = fmc.FMC()
+        f.mytoken = mock.Mock()
+        f.mytoken.get_token.return_value = "token"
+        f.session = mock.Mock()
+        f.session.get.return_value.status_code = 200
+        f.session.get.return_value.text = '{"name": "obj1"}'
+        self.assertEqual(
+            f.send_to_api(method="get", url="https://fmc/object"), {"name": "obj1"}
+        )
+        f.session.get.assert_called_once()
+
+    @mock.patch("fmcapi.fmc.Token.generate_tokens")
+    def test_token_uses_given_session(self, *_):
+        session = mock.Mock()
+        token = fmc.Token(session=session)
+        self.assertIs(token.session, session)
+
+    def test_page_url_sets_offset_and_limit(self):
+        self.assertEqual(
+            fmc.Pager.page_url(
+                "https://fmc/object/hosts?offset=1000&limit=1000&expanded=true",
+                offset=3000,
+                limit=1000,
+            ),
+            "https://fmc/object/hosts?offset=3000&limit=1000&expanded=true",
+        )
+        self.assertEqual(
+            fmc.Pager.page_url("https://fmc/object/hosts", offset=5, limit=5),
+            "https://fmc/object/hosts?offset=5&limit=5",
+        )
+
+    @mock.patch("fmcapi.fmc.time.sleep")
+    def test_send_to_api_fetches_remaining_pages_in_order(self, *_):
+        def fake_send_request(method="", url="", headers="", json_data=None):
+            offset = int(url.split("offset=")[1].split("&")[0])
+            if offset == 0:
+                return {
+                    "items": [{"id": "0"}],
+                    "paging": {
+                        "offset": 0,
+                        "limit": 1,
+                        "count": 4,
+                        "next": ["https://fmc/object/hosts?offset=1&limit=1"],
+                    },
+                }
+            return {"items": [{"id": str(offset)}], "paging": {"offset": offset}}
+
+        f = fmc.FMC(paging_workers=3)
+        with mock.patch.object(f, "send_request", side_effect=fake_send_request):
+            response = f.send_to_api(
+                method="get", url="https://fmc/object/hosts?offset=0&limit=1"
+            )
+        self.assertEqual(
+            [item["id"] for item in response["items"]], ["0", "1", "2", "3"]
+        )
+
+    @mock.patch("fmcapi.fmc.time.sleep")
+    def test_failed_middle_page_is_not_dropped(self, *_):
+        counted = [True]
+
+        def fake_send_request(method="", url="", headers="", json_data=None):
+            offset = (
+                int(url.split("offset=")[1].split("&")[0]) if "offset=" in url else 0
+            )
+            if offset == 2:
+                return None
+            paging = {
+                "offset": offset,
+                "limit": 1,
+                "next": [f"https://fmc/object/hosts?offset={offset + 1}&limit=1"],
+            }
+            if counted[0]:
+                paging["count"] = 4
+            return {"items": [{"id": str(offset)}], "paging": paging}
+
+        f = fmc.FMC(paging_workers=3)
+        f.serverVersion = "6.7.0"
+        with mock.patch.object(f, "send_request", side_effect=fake_send_request):
+            self.assertIsNone(
+                f.send_to_api(
+                    method="get", url="https://fmc/object/hosts?offset=0&limit=1"
+                )
+            )
+            with self.assertRaises(fmc.PagingError):
+                list(fmcapi.Hosts(fmc=f, limit=1).iter_items())
+            # Without a "count" the pages are walked through their "next" links.
+            counted[0] = False
+            pages = f.iter_pages(url="https://fmc/object/hosts?offset=0&limit=1")
+            with self.assertRaises(fmc.PagingError):
+                for page in pages:
+                    pass
+            self.assertEqual(pages.page_counter, 2)
+
+    @mock.patch("fmcapi.fmc.time.sleep")
+    def test_concurrent_pagers_do_not_share_state(self, *_):
+        def fake_send_request(method="", url="", headers="", json_data=None):
+            collection = url.split("/")[-1].split("?")[0]
+            offset = int(url.split("offset=")[1].split("&")[0])
+            page = {"items": [{"id": f"{collection}{offset}"}]}
+            if offset == 0:
+                page["paging"] = {
+                    "offset": 0,
+                    "limit": 1,
+                    "count": 20,
+                    "next": [f"https://fmc/{collection}?offset=1&limit=1"],
+                }
+            return page
+
+        f = fmc.FMC()
+        results = {}
+
+        def worker(collection):
+            results[collection] = f.send_to_api(
+                method="get", url=f"https://fmc/{collection}?offset=0&limit=1"
+            )["items"]
+
+        with mock.patch.object(f, "send_request", side_effect=fake_send_request):
+            threads = [
+                threading.Thread(target=worker, args=(collection,))
+                for collection in ("hosts", "networks")
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        for collection in ("hosts", "networks"):
+            self.assertEqual(
+                [item["id"] for item in results[collection]],
+                [f"{collection}{offset}" for offset in range(20)],
+            )
+
+    @mock.patch("fmcapi.fmc.Token.generate_tokens")
+    def test_renew_token_only_once_for_same_expired_token(self, mock_generate):
+        token = fmc.Token()
+        token.access_token = "old"
+
+        def generate():
+            token.access_token = "new"
+
+        mock_generate.side_effect = generate
+        self.assertEqual(token.renew_token(expired_token="old"), "new")
+        self.assertEqual(token.renew_token(expired_token="old"), "new")
+        self.assertEqual(mock_generate.call_count, 2)
+
+    def test_rate_limiter_allows_burst_then_paces(self):
+        limiter = fmc.RateLimiter(rate=120, per=60, burst=2)
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertAlmostEqual(limiter.reserve(), 0.5, places=2)
+        self.assertAlmostEqual(limiter.reserve(), 1.0, places=2)
+
+    def test_rate_limiter_throttle_pauses_and_slows(self):
+        limiter = fmc.RateLimiter(rate=120, per=60, burst=10)
+        limiter.throttle(5)
+        self.assertEqual(limiter.rate, 1)
+        self.assertAlmostEqual(limiter.reserve(), 6, places=1)
+        limiter.recover()
+        self.assertGreater(limiter.rate, 1)
+
+    def test_too_many_connections_backoff(self):
+        f = fmc.FMC()
+        self.assertEqual(f.too_many_connections_backoff(retry_after="3"), 3)
+        for attempt in range(10):
+            wait = f.too_many_connections_backoff(attempt=attempt)
+            self.assertLessEqual(wait, min(30, 2**attempt))
+
+    def test_send_request_retries_429_with_retry_after(self):
+        f = fmc.FMC()
+        f.mytoken = mock.Mock()
+        f.session = mock.Mock()
+        f.rate_limiter = mock.Mock()
+        too_many = mock.Mock(status_code=429, headers={"Retry-After": "2"})
+        ok = mock.Mock(status_code=200, text='{"id": "1"}')
+        f.session.get.side_effect = [too_many, ok]
+        self.assertEqual(f.send_request(method="get", url="https://fmc/x"), {"id": "1"})
+        f.rate_limiter.throttle.assert_called_once_with(2.0)
+        self.assertEqual(f.rate_limiter.acquire.call_count, 2)
+
+    def _cache_with_collections(self, **collections):
+        f = fmc.FMC()
+        api_classes = {}
+        for name, items in collections.items():
+            api_class = mock.Mock()
+            api_class.__name__ = name
+            api_class.return_value.iter_items.side_effect = lambda items=items: iter(
+                items
+            )
+            api_classes[name] = api_class
+        return f.object_cache, api_classes
+
+    def test_object_cache_loads_each_collection_once(self):
+        cache, classes = self._cache_with_collections(
+            NetworkAddresses=[{"name": "h1", "id": "1", "type": "Host"}],
+            NetworkGroups=[{"name": "g1", "id": "2", "type": "NetworkGroup"}],
+        )
+        api_classes = [classes["NetworkAddresses"], classes["NetworkGroups"]]
+        for _ in range(3):
+            self.assertEqual(cache.find(api_classes=api_classes, name="g1")["id"], "2")
+            self.assertEqual(cache.find(api_classes=api_classes, id="1")["name"], "h1")
+            self.assertIsNone(cache.find(api_classes=api_classes, name="missing"))
+        self.assertEqual(cache.loads, 2)
+
+    def test_object_cache_invalidate_forgets_renamed_object(self):
+        cache, classes = self._cache_with_collections(
+            Hosts=[{"name": "old", "id": "1", "type": "Host"}]
+        )
+        self.assertEqual(cache.get(api_class=classes["Hosts"], name="old")["id"], "1")
+        cache.invalidate(name="new", id="1")
+        self.assertNotIn(("Hosts", "name", "old"), cache.entries)
+        cache.get(api_class=classes["Hosts"], name="old")
+        self.assertEqual(cache.loads, 2)
+
+    def test_object_cache_evicts_least_recently_used_and_expires(self):
+        cache, classes = self._cache_with_collections(
+            Hosts=[{"name": f"h{i}", "id": str(i)} for i in range(3)],
+            Networks=[{"name": f"n{i}", "id": f"n{i}"} for i in range(5)],
+        )
+        cache.maxsize = 4
+        cache.get(api_class=classes["Hosts"], name="h0")
+        self.assertIn("Hosts", cache.loaded)
+        # A collection larger than maxsize is kept whole, the others make room.
+        cache.get(api_class=classes["Networks"], name="n0")
+        self.assertEqual(len(cache.entries), 10)
+        self.assertNotIn(("Hosts", "name", "h0"), cache.entries)
+        self.assertNotIn("Hosts", cache.loaded)
+        self.assertIn("Networks", cache.loaded)
+        self.assertIsNone(cache.get(api_class=classes["Networks"], name="missing"))
+        self.assertEqual(cache.loads, 2)
+        cache.ttl = 0
+        cache.clear()
+        cache.get(api_class=classes["Hosts"], name="h2")
+        cache.get(api_class=classes["Hosts"], name="h2")
+        self.assertEqual(cache.loads, 4)
+
+    def test_object_cache_does_not_trust_failed_load(self):
+        cache, classes = self._cache_with_collections(Hosts=[], Networks=[])
+
+        def partial():
+            yield {"name": "h0", "id": "0"}
+            raise fmc.PagingError("GET of page 2 failed.")
+
+        classes["Hosts"].return_value.iter_items.side_effect = partial
+        self.assertEqual(cache.get(api_class=classes["Hosts"], id="0")["name"], "h0")
+        self.assertIsNone(cache.get(api_class=classes["Hosts"], name="h1"))
+        self.assertIsNone(cache.get(api_class=classes["Networks"], name="n0"))
+        self.assertIsNone(cache.get(api_class=classes["Networks"], name="n0"))
+        self.assertEqual(cache.loaded, {})
+        self.assertEqual(cache.loads, 4)
+
+    def test_group_expander_is_created_on_first_use(self):
+        f = fmc.FMC()
+        self.assertEqual(f.object_cache.listeners, [])
+        expander = f.group_expander
+        self.assertIs(f.group_expander, expander)
+        self.assertEqual(f.object_cache.listeners, [expander.changed])
+
+    @mock.patch.object(fmc.TaskStatuses, "POLL_INTERVAL", 0.01)
+    def test_task_tracker_follows_many_tasks_at_once(self):
+        f = fmc.FMC()
+        f.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        states = {
+            "t1": ["Pending", "Running", "COMPLETED"],
+            "t2": ["Failed"],
+            "t3": [404],
+            "t4": [500, "Running", 503, "COMPLETED"],
+        }
+        polls = []
+
+        def send_request(method, url, raise_for_status=False):
+            task_id = url.rsplit("/", 1)[1]
+            polls.append(task_id)
+            status = states[task_id].pop(0)
+            if isinstance(status, int):
+                raise requests.exceptions.HTTPError(
+                    response=mock.Mock(status_code=status)
+                )
+            return {"id": task_id, "status": status}
+
+        f.send_request = mock.Mock(side_effect=send_request)
+        futures = {task_id: f.task_tracker.track(task_id) for task_id in states}
+        self.assertIs(f.task_tracker.track("t1"), futures["t1"])
+        self.assertEqual(futures["t1"].result(timeout=5)["status"], "COMPLETED")
+        self.assertEqual(futures["t2"].result(timeout=5)["status"], "Failed")
+        self.assertIsNone(futures["t3"].result(timeout=5))
+        self.assertEqual(futures["t4"].result(timeout=5)["status"], "COMPLETED")
+        self.assertEqual(polls.count("t1"), 3)
+        self.assertEqual(polls.count("t4"), 4)
+        self.assertEqual(f.task_tracker.pending, [])
+        self.assertIsNone(f.task_tracker.track_response({"id": "no task"}))
+
+    @mock.patch.object(fmc.TaskStatuses, "POLL_INTERVAL", 0.01)
+    def test_task_tracker_times_out_with_last_status(self):
+        f = fmc.FMC()
+        f.send_request = mock.Mock(return_value={"status": "Running"})
+        future = f.task_tracker.track_response(
+            {"metadata": {"task": {"id": "t1"}}}, timeout=0.05
+        )
+        self.assertEqual(future.result(timeout=5), {"status": "Running"})
+
+    @mock.patch.object(fmc.TaskStatuses, "POLL_INTERVAL", 0.01)
+    def test_task_tracker_never_takes_a_failed_get_for_success(self):
+        f = fmc.FMC()
+        error = requests.exceptions.ConnectionError("FMC unreachable")
+        f.send_request = mock.Mock(side_effect=error)
+        future = f.task_tracker.track("t1", timeout=0.05)
+        self.assertIs(future.exception(timeout=5), error)
+        self.assertGreater(f.send_request.call_count, 1)
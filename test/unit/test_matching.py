@@ -0,0 +1,463 @@
+"""
+Test matching.py
+"""
+
+import ipaddress
+import mock
+import os
+import random
+import tempfile
+import time
+import unittest
+
+import fmcapi
+from fmcapi import matching
+
+
+def literal_rule(name, action="ALLOW", src=None, dst=None, dport=None, zone=None):
+    rule = {"id": name, "name": name, "action": action, "enabled": True}
+    if src:
+        rule["sourceNetworks"] = {"literals": [{"type": "Network", "value": src}]}
+    if dst:
+        rule["destinationNetworks"] = {"literals": [{"type": "Network", "value": dst}]}
+    if dport:
+        protocol, port = dport.split("/")
+        rule["destinationPorts"] = {
+            "literals": [{"type": "PortLiteral", "protocol": protocol, "port": port}]
+        }
+    if zone:
+        rule["sourceZones"] = {
+            "objects": [{"id": f"id-{zone}", "name": zone, "type": "SecurityZone"}]
+        }
+    return rule
+
+
+class TestRuleExpander(unittest.TestCase):
+    def setUp(self):
+        self.fmc = fmcapi.FMC(host="fmc")
+        self.fmc.serverVersion = "6.7.0"
+        self.fmc.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        objects = {
+            "/object/networkgroups": [
+                {
+                    "id": "g1",
+                    "type": "NetworkGroup",
+                    "objects": [{"id": "g2", "type": "NetworkGroup"}],
+                    "literals": [{"type": "Host", "value": "10.0.0.1"}],
+                },
+                {
+                    "id": "g2",
+                    "type": "NetworkGroup",
+                    "objects": [{"id": "g1", "type": "NetworkGroup"}],
+                    "literals": [{"type": "Host", "value": "10.0.0.2"}],
+                },
+            ],
+            "/object/fqdns": [{"id": "f1", "type": "FQDN", "value": "a.example"}],
+        }
+
+        def send_request(method="", url="", headers="", json_data=None):
+            path = url.split("?")[0][len(self.fmc.configuration_url) :]
+            return {"items": objects.get(path, [])}
+
+        self.fmc.send_request = mock.Mock(side_effect=send_request)
+        self.expander = matching.RuleExpander(fmc=self.fmc)
+
+    def test_groups_cycles_and_unknown_objects(self):
+        mapped = matching.RuleExpander.IPV4_MAPPED
+        self.assertEqual(
+            self.expander.networks({"objects": [{"id": "g1", "type": "NetworkGroup"}]}),
+            [(mapped + 0x0A000001, mapped + 0x0A000002)],
+        )
+        self.assertIsNone(
+            self.expander.networks({"objects": [{"id": "f1", "type": "FQDN"}]})
+        )
+        self.assertEqual(
+            self.expander.ports(
+                {
+                    "literals": [
+                        {"type": "PortLiteral", "protocol": "6", "port": "80-90"},
+                        {"type": "PortLiteral", "protocol": "6", "port": "91"},
+                        {"type": "ICMPv4PortLiteral", "protocol": "1", "icmpType": "8"},
+                    ]
+                }
+            ),
+            [(1, 8, 8), (6, 80, 91)],
+        )
+
+    def test_overlaps(self):
+        web = self.expander.expand(literal_rule("a", dst="10.0.0.0/24", dport="6/80"))
+        dns = self.expander.expand(literal_rule("b", dst="10.0.0.0/16", dport="17/53"))
+        anything = self.expander.expand(literal_rule("c"))
+        self.assertFalse(self.expander.overlaps(web, dns))
+        self.assertTrue(self.expander.overlaps(web, anything))
+
+
+class TestGroupExpander(unittest.TestCase):
+    def test_nested_groups_are_expanded_once(self):
+        mapped = matching.RuleExpander.IPV4_MAPPED
+        items = [
+            {"id": "h1", "type": "Host", "value": "10.0.0.1"},
+            {"id": "n1", "type": "Network", "value": "10.0.0.0/30"},
+            {"id": "f1", "type": "FQDN", "value": "a.example"},
+            {
+                "id": "inner",
+                "type": "NetworkGroup",
+                "objects": [{"id": "h1", "type": "Host"}],
+            },
+            {
+                "id": "middle",
+                "type": "NetworkGroup",
+                "objects": [
+                    {"id": "inner", "type": "NetworkGroup"},
+                    {"id": "n1", "type": "Network"},
+                ],
+                "literals": [{"type": "Network", "value": "2001:db8::/64"}],
+            },
+            {
+                "id": "outer",
+                "type": "NetworkGroup",
+                "objects": [
+                    {"id": "middle", "type": "NetworkGroup"},
+                    {"id": "inner", "type": "NetworkGroup"},
+                    {"id": "f1", "type": "FQDN"},
+                ],
+                "literals": [{"type": "Range", "value": "10.0.0.4-10.0.0.6"}],
+            },
+            {
+                "id": "ports",
+                "type": "PortObjectGroup",
+                "objects": [{"id": "p1", "type": "ProtocolPortObject"}],
+                "literals": [{"type": "PortLiteral", "protocol": "6", "port": "81"}],
+            },
+            {"id": "p1", "type": "ProtocolPortObject", "protocol": "TCP", "port": "80"},
+        ]
+        expander = matching.GroupExpander(items=items)
+        outer = expander.expand("outer")
+        self.assertEqual(expander.expansions, 3)
+        self.assertEqual(
+            outer["ranges"],
+            [
+                (mapped + 0x0A000000, mapped + 0x0A000006),
+                (0x20010DB8 << 96, (0x20010DB8 << 96) + 2**64 - 1),
+            ],
+        )
+        self.assertEqual(outer["unresolved"], [{"id": "f1", "type": "FQDN"}])
+        self.assertEqual(
+            [str(n) for n in expander.prefixes(outer["ranges"])],
+            ["10.0.0.0/30", "10.0.0.4/31", "10.0.0.6/32", "2001:db8::/64"],
+        )
+        self.assertEqual(expander.expand("middle")["unresolved"], [])
+        self.assertEqual(expander.expansions, 3)
+        self.assertEqual(expander.expand("ports")["ranges"], [(6, 80, 81)])
+        self.assertIsNone(expander.expand("h1"))
+        self.assertEqual(
+            expander.update({"h1": {"id": "h1", "type": "Host", "value": "10.0.0.9"}}),
+            {"h1", "inner", "middle", "outer"},
+        )
+        self.assertEqual(
+            expander.expand("inner")["ranges"], [(mapped + 0x0A000009,) * 2]
+        )
+        self.assertEqual(len(expander.results), 2)
+
+    def test_cycles(self):
+        items = [
+            {
+                "id": "g1",
+                "name": "one",
+                "type": "NetworkGroup",
+                "objects": [{"id": "g2", "type": "NetworkGroup"}],
+                "literals": [{"type": "Host", "value": "10.0.0.1"}],
+            },
+            {
+                "id": "g2",
+                "name": "two",
+                "type": "NetworkGroup",
+                "objects": [{"id": "g1", "type": "NetworkGroup"}],
+                "literals": [{"type": "Host", "value": "10.0.0.3"}],
+            },
+        ]
+        expander = matching.GroupExpander(items=items)
+        for id in ["g1", "g2", "g1", "g2"]:
+            self.assertEqual(len(expander.expand(id)["ranges"]), 2)
+        self.assertEqual(expander.cycles, [["g1", "g2", "g1"]])
+        self.assertEqual(sorted(expander.results), ["g1", "g2"])
+
+    def test_changes_through_the_object_cache(self):
+        fmc = fmcapi.FMC(host="fmc")
+        fmc.serverVersion = "6.7.0"
+        fmc.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        objects = {
+            "/object/hosts": [{"id": "h1", "type": "Host", "value": "10.0.0.1"}],
+            "/object/networkgroups": [
+                {
+                    "id": "g1",
+                    "type": "NetworkGroup",
+                    "objects": [{"id": "h1", "type": "Host"}],
+                },
+                {
+                    "id": "g2",
+                    "type": "NetworkGroup",
+                    "objects": [{"id": "g1", "type": "NetworkGroup"}],
+                },
+                {
+                    "id": "g3",
+                    "type": "NetworkGroup",
+                    "literals": [{"value": "10.0.0.7"}],
+                },
+            ],
+        }
+
+        def send_request(method="", url="", headers="", json_data=None):
+            path = url.split("?")[0][len(fmc.configuration_url) :]
+            return {"items": objects.get(path, [])}
+
+        fmc.send_request = mock.Mock(side_effect=send_request)
+        expander = fmc.group_expander
+        self.assertEqual(len(expander.expand_all()), 3)
+        self.assertEqual(expander.expansions, 3)
+        loads = fmc.send_request.call_count
+        self.assertEqual(
+            expander.expand("g2")["ranges"], expander.results["g1"]["ranges"]
+        )
+        self.assertEqual(fmc.send_request.call_count, loads)
+        objects["/object/hosts"][0]["value"] = "10.0.0.2"
+        fmc.object_cache.invalidate(id="h1")
+        self.assertEqual(
+            expander.expand("g2")["ranges"],
+            [(matching.RuleExpander.IPV4_MAPPED + 0x0A000002,) * 2],
+        )
+        self.assertEqual(expander.expansions, 5)
+        self.assertIn("g3", expander.results)
+
+    def test_expand_all_is_linear(self):
+        count = 30000
+        items = [
+            {
+                "id": str(i),
+                "type": "NetworkGroup",
+                "objects": [
+                    {"id": str(child), "type": "NetworkGroup"}
+                    for child in [2 * i + 1, 2 * i + 2]
+                    if child < count
+                ],
+                "literals": [{"type": "Host", "value": str(ipaddress.IPv4Address(i))}],
+            }
+            for i in range(count)
+        ]
+        expander = matching.GroupExpander(items=items)
+        start = time.perf_counter()
+        results = expander.expand_all()
+        self.assertLess(time.perf_counter() - start, 20)
+        self.assertEqual(expander.expansions, count)
+        mapped = matching.RuleExpander.IPV4_MAPPED
+        self.assertEqual(results["0"]["ranges"], [(mapped, mapped + count - 1)])
+
+
+@unittest.skipIf(matching.numpy is None, "numpy is not installed.")
+class TestMatchEngine(unittest.TestCase):
+    def setUp(self):
+        self.rules = [
+            literal_rule("web", dst="10.0.0.0/24", dport="TCP/80"),
+            literal_rule("block-dmz", action="BLOCK", zone="dmz"),
+            literal_rule("v6", dst="2001:db8::/32"),
+            literal_rule("dns", dst="10.0.0.0/8", dport="17/53"),
+            dict(literal_rule("apps", dst="192.168.0.0/16"), applications={"a": 1}),
+            dict(literal_rule("off", action="BLOCK"), enabled=False),
+        ]
+        self.engine = matching.MatchEngine(rules=self.rules)
+        self.engine.default_action = "BLOCK"
+
+    def test_first_match(self):
+        flows = self.engine.flows(
+            [
+                {
+                    "source": "1.1.1.1",
+                    "destination": "10.0.0.5",
+                    "protocol": "6",
+                    "destination_port": 80,
+                    "source_zone": "inside",
+                },
+                {
+                    "source": "1.1.1.1",
+                    "destination": "10.0.0.5",
+                    "protocol": "17",
+                    "destination_port": 80,
+                    "source_zone": "inside",
+                },
+                {
+                    "source": "1.1.1.1",
+                    "destination": "10.1.0.5",
+                    "protocol": "UDP",
+                    "destination_port": 53,
+                    "source_zone": "inside",
+                },
+                {
+                    "source": "1.1.1.1",
+                    "destination": "10.0.0.5",
+                    "protocol": "6",
+                    "destination_port": 80,
+                    "source_zone": "dmz",
+                },
+                {
+                    "source": "::1",
+                    "destination": "2001:db8::1",
+                    "protocol": "6",
+                    "destination_port": 443,
+                    "source_zone": "inside",
+                },
+                {
+                    "source": "1.1.1.1",
+                    "destination": "192.168.1.1",
+                    "protocol": "6",
+                    "destination_port": 22,
+                    "source_zone": "inside",
+                },
+                {
+                    "source": "1.1.1.1",
+                    "destination": "8.8.8.8",
+                    "protocol": "6",
+                    "destination_port": 22,
+                    "source_zone": "dmz",
+                },
+                {
+                    "source": "1.1.1.1",
+                    "destination": "8.8.8.8",
+                    "protocol": "6",
+                    "destination_port": 22,
+                    "source_zone": "inside",
+                },
+            ]
+        )
+        result = self.engine.classify(flows)
+        names = [
+            self.engine.rules[r]["name"] if r >= 0 else None
+            for r in result["rule"].tolist()
+        ]
+        self.assertEqual(
+            names, ["web", None, "dns", "web", "v6", "apps", "block-dmz", None]
+        )
+        self.assertEqual(
+            result["uncertain"].tolist(), [False] * 5 + [True, False, False]
+        )
+        self.assertEqual(self.engine.action(result).tolist()[-2:], ["BLOCK", "BLOCK"])
+
+    def test_flows_without_zones_and_the_whole_address_space(self):
+        engine = matching.MatchEngine(
+            rules=[
+                literal_rule("block-dmz", action="BLOCK", zone="dmz"),
+                literal_rule("all-v6", dst="::/0"),
+                literal_rule("multicast", dst="ff00::/8"),
+            ]
+        )
+        flows = engine.flows(
+            [
+                {"source": "::1", "destination": "ffff::1", "protocol": "6"},
+                {
+                    "source": "::1",
+                    "destination": "ffff::1",
+                    "protocol": "6",
+                    "source_zone": "inside",
+                },
+                {
+                    "source": "::1",
+                    "destination": "ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff",
+                    "protocol": "6",
+                    "source_zone": "inside",
+                },
+                {
+                    "source": "::1",
+                    "destination": "1.1.1.1",
+                    "protocol": "6",
+                    "source_zone": "inside",
+                },
+            ]
+        )
+        result = engine.classify(flows)
+        # A flow without a zone may be in dmz, so block-dmz matches it but isn't sure to.
+        self.assertEqual(result["rule"].tolist(), [0, 1, 1, 1])
+        self.assertEqual(result["uncertain"].tolist(), [True, False, False, False])
+
+    def test_csv_and_impact(self):
+        proposed = matching.MatchEngine(
+            rules=[literal_rule("dmz-first", action="BLOCK", zone="dmz")] + self.rules
+        )
+        proposed.default_action = "BLOCK"
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "flows.csv")
+            with open(path, "w") as file:
+                file.write("src,dst,proto,sport,dport,src_zone,dst_zone\n")
+                file.write("1.1.1.1,10.0.0.5,6,1024,80,dmz,inside\n")
+                file.write("1.1.1.1,10.0.0.5,6,1024,80,outside,inside\n")
+            flows = self.engine.read_csv(path)
+        impact = self.engine.impact(proposed, flows)
+        self.assertEqual(impact["changed"], 1)
+        self.assertEqual(impact["changes"], {("web", "ALLOW", "dmz-first", "BLOCK"): 1})
+        self.assertEqual(
+            [
+                (s["rule"], s["flows"])
+                for s in self.engine.summary(self.engine.classify(flows))
+            ],
+            [("web", 2)],
+        )
+
+    def test_many_rules_against_brute_force(self):
+        rng = random.Random(1)
+        rules = [
+            literal_rule(
+                f"r{n}",
+                dst=f"10.{rng.randrange(4)}.{rng.randrange(4)}.0/{rng.choice([16, 24])}",
+                dport=f"6/{rng.randrange(1000, 1010)}",
+            )
+            for n in range(150)
+        ]
+        engine = matching.MatchEngine(rules=rules)
+        rows = [
+            {
+                "source": "1.1.1.1",
+                "destination": f"10.{rng.randrange(4)}.{rng.randrange(4)}.9",
+                "protocol": "6",
+                "destination_port": rng.randrange(1000, 1012),
+            }
+            for _ in range(2000)
+        ]
+        expander = matching.RuleExpander(fmc=None)
+        criteria = [expander.expand(rule) for rule in rules]
+
+        def brute_force(row):
+            flow = {
+                "destinationNetworks": [
+                    (matching.RuleExpander.address_range(row["destination"])[0],) * 2
+                ],
+                "destinationPorts": [
+                    (6, row["destination_port"], row["destination_port"])
+                ],
+            }
+            for number, rule in enumerate(criteria):
+                if matching.RuleExpander.overlaps(rule, flow):
+                    return number
+            return -1
+
+        self.assertEqual(
+            engine.classify(engine.flows(rows))["rule"].tolist(),
+            [brute_force(row) for row in rows],
+        )
+
+    def test_a_million_flows(self):
+        numpy = matching.numpy
+        size = 1000000
+        rng = numpy.random.default_rng(0)
+        flows = {
+            "source_high": numpy.zeros(size, dtype="uint64"),
+            "source_low": matching.RuleExpander.IPV4_MAPPED
+            + rng.integers(0, 2**32, size, dtype="uint64"),
+            "destination_high": numpy.zeros(size, dtype="uint64"),
+            "destination_low": matching.RuleExpander.IPV4_MAPPED
+            + rng.integers(0x0A000000, 0x0A0000FF, size, dtype="uint64"),
+            "source_port": 6 * 65536 + rng.integers(1024, 65535, size, dtype="uint64"),
+            "destination_port": 6 * 65536 + rng.integers(79, 82, size, dtype="uint64"),
+            "source_zone": numpy.full(size, "", dtype=object),
+            "destination_zone": numpy.full(size, "", dtype=object),
+        }
+        result = self.engine.classify(flows)
+        expected = flows["destination_port"] == 6 * 65536 + 80
+        self.assertEqual((result["rule"] == 0).tolist(), expected.tolist())
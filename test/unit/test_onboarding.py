@@ -0,0 +1,128 @@
+"""
+Test onboarding.py
+"""
+
+import mock
+import requests
+import threading
+import unittest
+
+import fmcapi
+from fmcapi import onboarding
+
+
+class TestDeviceOnboarding(unittest.TestCase):
+    def setUp(self):
+        self.fmc = fmcapi.FMC(host="fmc")
+        self.fmc.serverVersion = "6.7.0"
+        self.fmc.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        self.registered = []
+        self.puts = []
+        self.gets = []
+        lock = threading.Lock()
+
+        def send_request(method="", url="", headers="", json_data=None, **kwargs):
+            path = url.split("?")[0][len(self.fmc.configuration_url) :]
+            with lock:
+                if method == "get":
+                    self.gets.append(path)
+                if path == "/policy/accesspolicies":
+                    return {
+                        "items": [{"id": "acp1", "name": "acp", "type": "AccessPolicy"}]
+                    }
+                if path == "/devicegroups/devicegrouprecords":
+                    return {
+                        "items": [
+                            {"id": "g1", "name": "branches", "type": "DeviceGroup"}
+                        ]
+                    }
+                if path == "/devicegroups/devicegrouprecords/g1":
+                    if method == "put":
+                        self.puts.append(json_data)
+                        return json_data
+                    return {"id": "g1", "name": "branches", "members": [{"id": "old"}]}
+                if path == "/devices/devicerecords" and method == "post":
+                    self.registered.append(json_data)
+                    name = json_data["name"]
+                    return {"metadata": {"task": {"id": f"task-{name}"}}}
+                if path == "/devices/devicerecords":
+                    return {
+                        "items": [
+                            {
+                                "id": f"id-{d['name']}",
+                                "name": d["name"],
+                                "type": "Device",
+                            }
+                            for d in self.registered
+                        ]
+                    }
+                task = path.rsplit("/", 1)[1]
+                if task == "task-unreachable":
+                    raise requests.exceptions.ConnectionError("FMC unreachable")
+                return {
+                    "id": task,
+                    "status": "Failed" if task == "task-bad" else "Success",
+                    "message": "Registration failed." if task == "task-bad" else "",
+                }
+
+        self.fmc.send_request = mock.Mock(side_effect=send_request)
+
+    @mock.patch.object(fmcapi.TaskStatuses, "POLL_INTERVAL", 0.01)
+    def test_register_devices_and_join_groups(self):
+        common = {"regKey": "key", "acp_name": "acp", "licenses": ["BASE"]}
+        devices = [
+            dict(common, name="ftd1", hostName="10.0.0.1", device_group="branches"),
+            dict(common, name="ftd2", hostName="10.0.0.2", device_group="branches"),
+            dict(common, name="bad", hostName="10.0.0.3", device_group="branches"),
+            dict(common, name="nogroup", hostName="10.0.0.4", device_group="nope"),
+            dict(common, name="noacp", hostName="10.0.0.5", acp_name="nope"),
+        ]
+        results = onboarding.DeviceOnboarding(
+            fmc=self.fmc, devices=devices, max_concurrent=3
+        ).run()
+        self.assertEqual(
+            [(r["name"], r["status"]) for r in results],
+            [
+                ("ftd1", "registered"),
+                ("ftd2", "registered"),
+                ("bad", "failed"),
+                ("nogroup", "failed"),
+                ("noacp", "failed"),
+            ],
+        )
+        self.assertEqual(results[1]["task"], "task-ftd2")
+        self.assertEqual(results[2]["message"], "Registration failed.")
+        self.assertEqual(results[3]["message"], "Device group nope not found.")
+        self.assertEqual(
+            sorted(d["name"] for d in self.registered), ["bad", "ftd1", "ftd2"]
+        )
+        self.assertEqual(
+            self.registered[0]["accessPolicy"], {"id": "acp1", "type": "AccessPolicy"}
+        )
+        # The access policies and device groups were each listed once.
+        self.assertEqual(self.gets.count("/policy/accesspolicies"), 1)
+        self.assertEqual(self.gets.count("/devicegroups/devicegrouprecords"), 1)
+        # One PUT adds both registered devices to the group, keeping its members.
+        self.assertEqual(len(self.puts), 1)
+        self.assertEqual(
+            [m["id"] for m in self.puts[0]["members"]], ["old", "id-ftd1", "id-ftd2"]
+        )
+
+    @mock.patch.object(fmcapi.TaskStatuses, "POLL_INTERVAL", 0.01)
+    def test_a_failed_task_does_not_stop_the_others(self):
+        common = {"regKey": "key", "acp_name": "acp", "device_group": "branches"}
+        devices = [
+            dict(common, name="unreachable", hostName="10.0.0.1"),
+            dict(common, name="ftd1", hostName="10.0.0.2"),
+        ]
+        self.fmc.autodeploy = True
+        results = onboarding.DeviceOnboarding(
+            fmc=self.fmc, devices=devices, timeout=0.05
+        ).run()
+        self.assertEqual(
+            [(r["name"], r["status"]) for r in results],
+            [("unreachable", "failed"), ("ftd1", "registered")],
+        )
+        self.assertIn("FMC unreachable", results[0]["message"])
+        self.assertEqual([m["id"] for m in self.puts[0]["members"]], ["old", "id-ftd1"])
+        self.assertTrue(self.fmc.autodeploy)
@@ -0,0 +1,130 @@
+"""
+Test plan.py
+"""
+
+import itertools
+import mock
+import threading
+import unittest
+
+import fmcapi
+from fmcapi import plan
+
+
+class TestPlan(unittest.TestCase):
+    def setUp(self):
+        self.fmc = fmcapi.FMC(host="fmc")
+        self.fmc.uuid = "uuid"
+        self.fmc.serverVersion = "6.7.0"
+        self.fmc.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        self.existing = {
+            "/object/hosts": [
+                {
+                    "id": "h0",
+                    "name": "old",
+                    "type": "Host",
+                    "value": "10.0.0.9",
+                    "description": "Created by fmcapi.",
+                    "overridable": False,
+                }
+            ],
+            "/object/networkgroups": [],
+        }
+        self.posts = []
+        ids = itertools.count(1)
+        lock = threading.Lock()
+
+        def fake_send_request(method="", url="", headers="", json_data=None):
+            path = url.split("?")[0][len(self.fmc.configuration_url) :]
+            if method == "get":
+                return {"items": self.existing[path]}
+            with lock:
+                self.posts.append((path, json_data))
+                if isinstance(json_data, list):
+                    return {
+                        "items": [dict(item, id=f"id{next(ids)}") for item in json_data]
+                    }
+                return dict(json_data, id=f"id{next(ids)}")
+
+        self.fmc.send_request = mock.Mock(side_effect=fake_send_request)
+
+    def test_levels_follow_references(self):
+        document = {
+            "NetworkGroups": [
+                {"name": "grp", "objects": [{"name": "web1"}, {"name": "old"}]}
+            ],
+            "Hosts": [
+                {"name": "web1", "value": "10.0.0.1"},
+                {"name": "web2", "value": "10.0.0.2"},
+                {"name": "old", "value": "10.0.0.9"},
+            ],
+        }
+        p = plan.Plan(fmc=self.fmc, document=document)
+        self.assertEqual(p.summary, {"create": 3, "exists": 1, "levels": 2})
+        self.assertEqual(
+            [sorted(key[1] for key in level) for level in p.levels],
+            [["old", "web1", "web2"], ["grp"]],
+        )
+        results = {result["name"]: result for result in p.apply()}
+        self.assertTrue(all(result["error"] is None for result in results.values()))
+        self.assertEqual(results["old"]["action"], "exists")
+        self.assertEqual(results["old"]["changes"], {})
+        # Both hosts went in one bulk POST, then the group.
+        self.assertEqual(
+            [path for path, _ in self.posts], ["/object/hosts", "/object/networkgroups"]
+        )
+        group = self.posts[1][1]
+        self.assertEqual(
+            sorted(obj["id"] for obj in group["objects"]),
+            sorted([results["web1"]["id"], "h0"]),
+        )
+
+    def test_cycles_and_failed_dependencies(self):
+        document = {
+            "NetworkGroups": [
+                {"name": "a", "objects": [{"name": "b"}]},
+                {"name": "b", "objects": [{"name": "a"}]},
+                {"name": "c", "objects": [{"name": "d"}]},
+            ],
+            "NoSuchType": [{"name": "d"}],
+        }
+        results = {
+            result["name"]: result["error"]
+            for result in plan.Plan(fmc=self.fmc, document=document).apply()
+        }
+        self.assertEqual(results["a"], "Part of a dependency cycle.")
+        self.assertEqual(results["d"], "Unknown API object type NoSuchType.")
+        self.assertEqual(results["c"], "Depends on NoSuchType d which failed.")
+        self.assertEqual(self.posts, [])
+
+    def test_existing_access_rules_are_found_in_their_policy(self):
+        self.existing["/policy/accesspolicies"] = [
+            {"id": "acp1", "name": "acp", "type": "AccessPolicy"}
+        ]
+        self.existing["/policy/accesspolicies/acp1/accessrules"] = [
+            {"id": "r0", "name": "old", "type": "AccessRule", "action": "ALLOW"}
+        ]
+        document = {
+            "AccessRules": [
+                {"name": "old", "acp_name": "acp", "action": "ALLOW"},
+                {"name": "new1", "acp_name": "acp", "action": "BLOCK"},
+                {"name": "new2", "acp_name": "acp", "action": "BLOCK"},
+            ],
+        }
+        p = plan.Plan(fmc=self.fmc, document=document)
+        self.assertEqual(p.summary, {"create": 2, "exists": 1, "levels": 1})
+        results = {result["name"]: result for result in p.apply()}
+        self.assertTrue(all(result["error"] is None for result in results.values()))
+        self.assertEqual(results["old"]["id"], "r0")
+        self.assertEqual(
+            [path for path, _ in self.posts],
+            ["/policy/accesspolicies/acp1/accessrules"],
+        )
+        self.assertEqual([rule["name"] for rule in self.posts[0][1]], ["new1", "new2"])
+        gets = [
+            call[1]["url"].split("?")[0][len(self.fmc.configuration_url) :]
+            for call in self.fmc.send_request.call_args_list
+            if call[1]["method"] == "get"
+        ]
+        self.assertEqual(gets.count("/policy/accesspolicies"), 1)
+        self.assertEqual(gets.count("/policy/accesspolicies/acp1/accessrules"), 1)
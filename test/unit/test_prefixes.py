@@ -0,0 +1,192 @@
+"""
+Test prefixes.py
+"""
+
+import ipaddress
+import mock
+import random
+import time
+import unittest
+
+import fmcapi
+from fmcapi import prefixes
+
+
+class TestPrefixTrie(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.trie = prefixes.PrefixTrie(width=32)
+        self.networks = {}
+        for value in range(2000):
+            length = rng.choice([8, 12, 16, 20, 24, 28, 32])
+            network = ipaddress.ip_network(
+                (rng.randrange(2**32) & 0x0AFFFFFF, length), strict=False
+            )
+            self.networks[value] = network
+            self.trie.insert(int(network.network_address), length, value)
+
+    def found(self, entries):
+        return sorted(value for _, _, values in entries for value in values)
+
+    def test_queries_match_brute_force(self):
+        rng = random.Random(1)
+        for _ in range(300):
+            length = rng.choice([16, 24, 32])
+            query = ipaddress.ip_network(
+                (rng.randrange(2**32) & 0x0AFFFFFF, length), strict=False
+            )
+            network = int(query.network_address)
+            self.assertEqual(
+                self.found(self.trie.containing(network, length)),
+                sorted(v for v, n in self.networks.items() if query.subnet_of(n)),
+            )
+            self.assertEqual(
+                self.found(self.trie.within(network, length)),
+                sorted(v for v, n in self.networks.items() if n.subnet_of(query)),
+            )
+            longest = self.trie.longest(network, length)
+            containing = [n for n in self.networks.values() if query.subnet_of(n)]
+            if containing:
+                self.assertEqual(longest[1], max(n.prefixlen for n in containing))
+            else:
+                self.assertIsNone(longest)
+
+    def test_remove(self):
+        for value in range(0, 2000, 2):
+            network = self.networks.pop(value)
+            self.assertTrue(
+                self.trie.remove(int(network.network_address), network.prefixlen, value)
+            )
+        self.assertFalse(self.trie.remove(0x0A000000, 8, "missing"))
+        for value, network in list(self.networks.items())[:200]:
+            self.assertIn(
+                value,
+                self.found(self.trie.containing(int(network.network_address), 32)),
+            )
+        for value, network in self.networks.items():
+            self.trie.remove(int(network.network_address), network.prefixlen, value)
+        self.assertEqual(self.trie.root[2:], [None, None, set()])
+
+
+class TestNetworkIndex(unittest.TestCase):
+    def setUp(self):
+        self.fmc = fmcapi.FMC(host="fmc")
+        self.items = [
+            {"id": "h1", "name": "host1", "type": "Host", "value": "10.1.2.3"},
+            {"id": "n1", "name": "net1", "type": "Network", "value": "10.1.0.0/16"},
+            {"id": "n2", "name": "net2", "type": "Network", "value": "10.0.0.0/8"},
+            {
+                "id": "r1",
+                "name": "range1",
+                "type": "Range",
+                "value": "10.1.2.0-10.1.2.9",
+            },
+            {"id": "h6", "name": "host6", "type": "Host", "value": "2001:db8::1"},
+            {
+                "id": "g1",
+                "name": "group1",
+                "type": "NetworkGroup",
+                "objects": [
+                    {"id": "h1", "type": "Host"},
+                    {"id": "g2", "type": "NetworkGroup"},
+                ],
+                "literals": [{"type": "Network", "value": "172.16.0.0/12"}],
+            },
+            {
+                "id": "g2",
+                "name": "group2",
+                "type": "NetworkGroup",
+                "objects": [
+                    {"id": "h6", "type": "Host"},
+                    {"id": "g1", "type": "NetworkGroup"},
+                ],
+                "literals": [{"type": "Host", "value": "192.168.1.1"}],
+            },
+            {"id": "f1", "name": "fqdn1", "type": "FQDN", "value": "example.com"},
+        ]
+        self.index = prefixes.NetworkIndex(fmc=self.fmc, items=self.items)
+
+    def ids(self, objects):
+        return [item["id"] for item in objects]
+
+    def test_containing(self):
+        found = self.index.containing("10.1.2.3")
+        self.assertEqual(self.ids(found), ["g1", "g2", "h1", "r1", "n1", "n2"])
+        self.assertEqual(found[0]["prefix"], "10.1.2.3/32")
+        self.assertEqual(self.ids(self.index.containing("10.1.2.12")), ["n1", "n2"])
+        self.assertEqual(self.ids(self.index.containing("10.1.0.0/16")), ["n1", "n2"])
+        self.assertEqual(
+            self.ids(self.index.containing("2001:db8::1")), ["g1", "g2", "h6"]
+        )
+        self.assertEqual(self.index.containing("11.0.0.1"), [])
+
+    def test_longest_prefix(self):
+        self.assertEqual(
+            self.ids(self.index.longest_prefix("10.1.2.3")), ["g1", "g2", "h1"]
+        )
+        found = self.index.longest_prefix("10.1.2.8")
+        self.assertEqual(self.ids(found), ["r1"])
+        self.assertEqual(found[0]["prefix"], "10.1.2.8/31")
+        self.assertEqual(self.index.longest_prefix("8.8.8.8"), [])
+
+    def test_overlapping(self):
+        self.assertEqual(
+            sorted(self.ids(self.index.overlapping("10.1.2.0/24"))),
+            ["g1", "g2", "h1", "n1", "n2", "r1"],
+        )
+        self.assertEqual(
+            sorted(self.ids(self.index.overlapping("192.168.0.0/16"))), ["g1", "g2"]
+        )
+
+    def test_follows_changes(self):
+        changed = {"id": "h1", "name": "host1", "type": "Host", "value": "10.9.9.9"}
+        with mock.patch.object(
+            self.fmc.object_cache,
+            "find",
+            side_effect=lambda api_classes, name=None, id=None: (
+                changed if id == "h1" else None
+            ),
+        ):
+            self.fmc.object_cache.invalidate(name="host1", id="h1")
+            self.fmc.object_cache.invalidate(name="other", id="not-a-network")
+            self.assertEqual(
+                self.ids(self.index.containing("10.1.2.3")), ["r1", "n1", "n2"]
+            )
+            self.assertEqual(
+                self.ids(self.index.containing("10.9.9.9")), ["g1", "g2", "h1", "n2"]
+            )
+        with mock.patch.object(self.fmc.object_cache, "find", return_value=None):
+            self.fmc.object_cache.invalidate(id="h6")
+            self.assertEqual(self.index.containing("2001:db8::1"), [])
+        self.index.remove("g2")
+        self.assertEqual(self.ids(self.index.containing("192.168.1.1")), [])
+        self.index.add(
+            {"id": "n3", "name": "net3", "type": "Network", "value": "10.9.0.0/16"}
+        )
+        self.assertEqual(
+            self.ids(self.index.containing("10.9.9.9")), ["g1", "h1", "n3", "n2"]
+        )
+
+    def test_query_speed(self):
+        rng = random.Random(2)
+        items = [
+            {
+                "id": str(value),
+                "name": str(value),
+                "type": "Network",
+                "value": str(
+                    ipaddress.ip_network(
+                        (rng.randrange(2**32), rng.randrange(8, 33)), strict=False
+                    )
+                ),
+            }
+            for value in range(20000)
+        ]
+        index = prefixes.NetworkIndex(items=items)
+        addresses = [
+            str(ipaddress.IPv4Address(rng.randrange(2**32))) for _ in range(5000)
+        ]
+        start = time.perf_counter()
+        for address in addresses:
+            index.longest_prefix(address)
+        self.assertLess((time.perf_counter() - start) / len(addresses), 0.0002)
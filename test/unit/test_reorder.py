@@ -0,0 +1,113 @@
+"""
+Test reorder.py
+"""
+
+import mock
+import unittest
+
+import fmcapi
+from fmcapi import reorder
+
+
+def rule(id, enabled=True, network=None, port=None, network_object=None):
+    item = {"id": id, "name": f"name-{id}", "type": "AccessRule", "enabled": enabled}
+    item["metadata"] = {"section": "Mandatory", "category": "--Undefined--"}
+    if network:
+        item["destinationNetworks"] = {
+            "literals": [{"type": "Network", "value": network}]
+        }
+    if network_object:
+        item["destinationNetworks"] = {
+            "objects": [{"id": network_object, "type": "Host"}]
+        }
+    if port:
+        protocol, number = port.split("/")
+        item["destinationPorts"] = {
+            "literals": [{"type": "PortLiteral", "protocol": protocol, "port": number}]
+        }
+    return item
+
+
+class TestRuleReorderAdvisor(unittest.TestCase):
+    def setUp(self):
+        self.fmc = fmcapi.FMC(host="fmc")
+        self.fmc.serverVersion = "6.7.0"
+        self.fmc.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        self.rules = [
+            rule("r1", network="10.0.0.0/24", port="6/80"),
+            rule("r2", network="10.0.1.0/24"),
+            rule("r3", network_object="h1", port="17/53"),
+            rule("r4"),
+        ]
+        self.puts = []
+
+        def send_request(method="", url="", headers="", json_data=None):
+            if method == "put":
+                self.puts.append((url, json_data))
+                return {"items": json_data}
+            if "/object/hosts" in url:
+                return {"items": [{"id": "h1", "type": "Host", "value": "10.0.0.5"}]}
+            return {"items": self.rules}
+
+        self.fmc.send_request = mock.Mock(side_effect=send_request)
+        self.hitcounts = {"r1": 1, "r2": 5, "r3": 100, "r4": 50}
+
+    def test_hot_rules_only_move_past_disjoint_rules(self):
+        advisor = reorder.RuleReorderAdvisor(
+            fmc=self.fmc, acp_id="acp1", hitcounts=self.hitcounts
+        )
+        advice = advisor.advise()
+        # r3 overlaps r1 on addresses but not on ports, and overlaps r4, which stays last.
+        self.assertEqual(
+            advice["moves"],
+            [
+                {
+                    "insertBefore": 1,
+                    "rules": [
+                        {"id": "r3", "name": "name-r3"},
+                        {"id": "r2", "name": "name-r2"},
+                    ],
+                    "anchor": {"id": "r1", "name": "name-r1"},
+                }
+            ],
+        )
+        self.assertAlmostEqual(advice["depth"]["before"], 511 / 156)
+        self.assertAlmostEqual(advice["depth"]["after"], 313 / 156)
+        self.assertEqual(advisor.apply(advice["moves"]), advice["moves"])
+        url, items = self.puts[0]
+        self.assertTrue(
+            url.endswith("/accesspolicies/acp1/accessrules?insertBefore=1&bulk=true")
+        )
+        self.assertEqual([item["id"] for item in items], ["r3", "r2"])
+        self.assertNotIn("metadata", items[0])
+
+    def test_overlapping_rules_keep_their_order(self):
+        self.rules[2] = rule("r3", network="10.0.0.0/16")
+        self.rules[1]["enabled"] = False
+        self.hitcounts.update(r2=0, r4=0)
+        advice = reorder.RuleReorderAdvisor(
+            fmc=self.fmc, acp_id="acp1", hitcounts=self.hitcounts
+        ).advise()
+        # r3 can't pass r1, but can pass the disabled r2.
+        self.assertEqual(
+            [(move["insertAfter"], move["rules"][0]["id"]) for move in advice["moves"]],
+            [(1, "r3")],
+        )
+
+    def test_moves_reach_the_new_order(self):
+        block = [{"id": name} for name in "abcdef"]
+        order = [{"id": name} for name in "fbadce"]
+        current = [rule["id"] for rule in block]
+        for move in reorder.RuleReorderAdvisor.moves(block, order, start=10):
+            run = [rule["id"] for rule in move["rules"]]
+            if "insertBefore" in move:
+                anchor = current[move["insertBefore"] - 10]
+                current = [r for r in current if r not in run]
+                at = current.index(anchor)
+            else:
+                anchor = current[move["insertAfter"] - 10]
+                current = [r for r in current if r not in run]
+                at = current.index(anchor) + 1
+            self.assertEqual(anchor, move["anchor"]["id"])
+            current[at:at] = run
+        self.assertEqual(current, list("fbadce"))
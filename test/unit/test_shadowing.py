@@ -0,0 +1,191 @@
+"""
+Test shadowing.py
+"""
+
+import mock
+import random
+import time
+import unittest
+
+import fmcapi
+from fmcapi import matching
+from fmcapi import shadowing
+
+
+def rule(id, action, dst=None, dport=None, src=None, **kwargs):
+    item = dict({"id": id, "name": f"name-{id}", "action": action}, **kwargs)
+    if src:
+        item["sourceNetworks"] = {"literals": [{"type": "Network", "value": src}]}
+    if dst:
+        item["destinationNetworks"] = {"literals": [{"type": "Network", "value": dst}]}
+    if dport:
+        item["destinationPorts"] = {
+            "literals": [{"type": "PortLiteral", "protocol": "6", "port": dport}]
+        }
+    return item
+
+
+class TestIntervalIndex(unittest.TestCase):
+    def test_overlapping_matches_brute_force(self):
+        rng = random.Random(0)
+        intervals = []
+        for value in range(500):
+            low = rng.randrange(10000)
+            intervals.append((low, low + rng.randrange(300), value))
+        index = matching.IntervalIndex(intervals)
+        for _ in range(200):
+            low = rng.randrange(10000)
+            high = low + rng.randrange(50)
+            self.assertEqual(
+                sorted(index.overlapping(low, high)),
+                sorted(v for l, h, v in intervals if l <= high and low <= h),
+            )
+        self.assertEqual(matching.IntervalIndex([]).overlapping(0, 10), [])
+
+
+class TestRuleAnalyzer(unittest.TestCase):
+    def setUp(self):
+        self.fmc = fmcapi.FMC(host="fmc")
+        self.fmc.serverVersion = "6.7.0"
+        self.fmc.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        self.access_rules = [
+            rule("1", "ALLOW", "10.0.0.0/16", "80"),
+            rule("2", "BLOCK", "10.0.1.0/24", "80"),
+            rule("3", "ALLOW", "10.0.1.5", "80"),
+            rule("4", "BLOCK", "10.0.0.0/8", "443"),
+            rule("5", "ALLOW", "10.1.0.0/16"),
+            rule("6", "MONITOR"),
+            rule("7", "BLOCK"),
+            rule("8", "ALLOW", "10.0.0.0/16", "80", applications={"applications": []}),
+            rule("9", "ALLOW", "192.168.0.0/16"),
+            rule("10", "ALLOW", "192.168.0.0/16", enabled=False),
+        ]
+        self.prefilter_rules = [
+            rule("p1", "FASTPATH", "10.0.0.0/8", ruleType="PREFILTER"),
+            rule("p2", "BLOCK", "10.0.0.0/24", ruleType="PREFILTER"),
+        ]
+
+        def send_request(method="", url="", headers="", json_data=None):
+            path = url.split("?")[0][len(self.fmc.configuration_url) :]
+            if path == "/policy/accesspolicies":
+                return {
+                    "items": [{"id": "acp1", "name": "acp", "type": "AccessPolicy"}]
+                }
+            if path == "/policy/prefilterpolicies":
+                return {
+                    "items": [{"id": "pf1", "name": "pf", "type": "PrefilterPolicy"}]
+                }
+            if path.endswith("/accessrules"):
+                return {"items": self.access_rules}
+            if path.endswith("/prefilterrules"):
+                return {"items": self.prefilter_rules}
+            return {"items": []}
+
+        self.fmc.send_request = mock.Mock(side_effect=send_request)
+
+    def test_report(self):
+        reports = shadowing.RuleAnalyzer(fmc=self.fmc).report()
+        acp, prefilter = reports
+        self.assertEqual(acp["policy"]["name"], "acp")
+        self.assertEqual(acp["rules"], 9)
+        found = {
+            kind: [(r["rule"]["id"], [o["id"] for o in r["by"]]) for r in acp[kind]]
+            for kind in ["shadowed", "redundant"]
+        }
+        self.assertEqual(found["shadowed"], [("2", ["1"]), ("9", ["7"])])
+        self.assertEqual(found["redundant"], [("3", ["1", "2"]), ("8", ["1", "7"])])
+        self.assertEqual(
+            [
+                (r["rule"]["id"], [o["id"] for o in r["with"]])
+                for r in acp["correlated"]
+            ],
+            [("5", ["4"])],
+        )
+        self.assertEqual(acp["shadowed"][0]["rule"]["index"], 2)
+        self.assertEqual(prefilter["policy"]["type"], "PrefilterPolicy")
+        self.assertEqual(
+            [(r["rule"]["id"], r["by"][0]["id"]) for r in prefilter["shadowed"]],
+            [("p2", "p1")],
+        )
+
+    def random_rules(self, count, seed, any_destination=0.9, any_source=0.1):
+        rng = random.Random(seed)
+        rules = []
+        for n in range(count):
+            dst = None
+            if rng.random() >= any_destination:
+                dst = f"10.{rng.randrange(4)}.0.0/16"
+            src = None
+            if rng.random() >= any_source:
+                src = f"172.{rng.randrange(16, 32)}.{rng.randrange(256)}.0/{rng.choice([24, 28])}"
+            dport = str(rng.randrange(1, 65536)) if rng.random() < 0.5 else None
+            rules.append(
+                rule(str(n), rng.choice(["ALLOW", "BLOCK"]), dst, dport, src=src)
+            )
+        return rules
+
+    def test_candidates_match_brute_force(self):
+        rules = self.random_rules(count=400, seed=0)
+        analyzer = shadowing.RuleAnalyzer(fmc=self.fmc)
+        indexed = analyzer.analyze(rules)
+        with mock.patch.object(
+            shadowing.RuleAnalyzer,
+            "candidates",
+            lambda self, number, **kwargs: range(number),
+        ):
+            brute_force = analyzer.analyze(rules)
+        self.assertEqual(indexed, brute_force)
+        self.assertTrue(indexed["redundant"] or indexed["shadowed"])
+
+    def test_multi_range_candidates_match_brute_force(self):
+        rng = random.Random(2)
+
+        def networks():
+            return {
+                "literals": [
+                    {
+                        "type": "Network",
+                        "value": f"10.{rng.randrange(4)}.{rng.randrange(4)}.0/{rng.choice([22, 24])}",
+                    }
+                    for _ in range(rng.randrange(1, 4))
+                ]
+            }
+
+        def ports():
+            literals = []
+            for _ in range(rng.randrange(1, 4)):
+                literal = {"type": "PortLiteral", "port": str(rng.randrange(1, 8))}
+                if rng.random() < 0.5:
+                    literal["protocol"] = rng.choice(["6", "17"])
+                literals.append(literal)
+            return {"literals": literals}
+
+        analyzer = shadowing.RuleAnalyzer(fmc=self.fmc)
+        for policy in range(30):
+            rules = []
+            for n in range(40):
+                item = rule(str(n), rng.choice(["ALLOW", "BLOCK"]))
+                for field, make in [
+                    ("sourceNetworks", networks),
+                    ("destinationNetworks", networks),
+                    ("destinationPorts", ports),
+                ]:
+                    if rng.random() < 0.7:
+                        item[field] = make()
+                rules.append(item)
+            indexed = analyzer.analyze(rules)
+            with mock.patch.object(
+                shadowing.RuleAnalyzer,
+                "candidates",
+                lambda self, number, **kwargs: range(number),
+            ):
+                brute_force = analyzer.analyze(rules)
+            self.assertEqual(indexed, brute_force)
+
+    def test_any_destination_rules_are_not_quadratic(self):
+        rules = self.random_rules(count=4000, seed=1, any_destination=1, any_source=0)
+        start = time.monotonic()
+        report = shadowing.RuleAnalyzer(fmc=self.fmc).analyze(rules)
+        self.assertEqual(report["rules"], 4000)
+        # Comparing each rule with every earlier one took about 28 seconds.
+        self.assertLess(time.monotonic() - start, 3)
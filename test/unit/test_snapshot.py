@@ -0,0 +1,190 @@
+"""
+Test snapshot.py
+"""
+
+import mock
+import os
+import tempfile
+import unittest
+
+import fmcapi
+from fmcapi import snapshot
+
+COLLECTIONS = {
+    "/object/hosts": [
+        {"id": "h1", "name": "host1", "type": "Host", "value": "10.0.0.1"},
+        {"id": "h2", "name": "host2", "type": "Host", "value": "10.0.0.2"},
+    ],
+    "/object/networks": [
+        {"id": "n1", "name": "net1", "type": "Network", "value": "10.0.0.0/8"}
+    ],
+}
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "snapshot.sqlite3")
+        self.fmc = fmcapi.FMC(host="fmc")
+        self.fmc.uuid = "uuid"
+        self.fmc.serverVersion = "6.7.0"
+        self.fmc.configuration_url = "https://fmc/api/fmc_config/v1/domain/uuid"
+        self.fmc.platform_url = "https://fmc/api/fmc_platform/v1"
+
+        def fake_send_request(method="", url="", headers="", json_data=None):
+            path = url.split("?")[0][len(self.fmc.configuration_url) :]
+            if path == "/object/broken":
+                raise ValueError("boom")
+            return {"items": COLLECTIONS[path]}
+
+        self.fmc.send_request = mock.Mock(side_effect=fake_send_request)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_api_classes_skip_aliases_and_child_objects(self):
+        names = [api_class.__name__ for api_class in snapshot.Snapshot.api_classes()]
+        self.assertIn("Hosts", names)
+        self.assertIn("NetworkGroups", names)
+        self.assertNotIn("IPHost", names)
+        self.assertNotIn("AccessRules", names)
+        self.assertNotIn("AuditRecords", names)
+
+    def test_take_writes_objects_and_manifest(self):
+        broken = type(
+            "Broken", (snapshot.APIClassTemplate,), {"URL_SUFFIX": "/object/broken"}
+        )
+        with snapshot.Snapshot(path=self.path) as snap:
+            manifest = snap.take(
+                fmc=self.fmc, api_classes=[fmcapi.Hosts, fmcapi.Networks, broken]
+            )
+        collections = manifest["collections"]
+        self.assertEqual(manifest["serverVersion"], "6.7.0")
+        self.assertEqual(
+            collections[f"{self.fmc.configuration_url}/object/hosts"]["items"], 2
+        )
+        self.assertEqual(
+            collections[f"{self.fmc.configuration_url}/object/broken"]["error"], "boom"
+        )
+
+    def test_snapshot_fmc_answers_get_without_network(self):
+        with snapshot.Snapshot(path=self.path) as snap:
+            snap.take(fmc=self.fmc, api_classes=[fmcapi.Hosts, fmcapi.Networks])
+        with snapshot.Snapshot(path=self.path) as snap:
+            offline = snap.fmc()
+            host = fmcapi.Hosts(fmc=offline, name="host2")
+            host.get()
+            self.assertEqual(host.id, "h2")
+            self.assertEqual(
+                fmcapi.Networks(fmc=offline, id="n1").get()["name"], "net1"
+            )
+            self.assertEqual(len(fmcapi.Hosts(fmc=offline).get()["items"]), 2)
+            self.assertIsNone(
+                offline.send_to_api(
+                    method="post", url=host.URL, json_data=host.format_data()
+                )
+            )
+            self.assertIsNone(offline.session)
+
+    def test_sync_refetches_only_changed_collections(self):
+        with snapshot.Snapshot(path=self.path) as snap:
+            snap.take(fmc=self.fmc, api_classes=[fmcapi.Hosts, fmcapi.Networks])
+            watermark = int(snap.meta["watermark"])
+            changed = {
+                "/object/hosts": [
+                    {
+                        "id": "h1",
+                        "name": "host1",
+                        "type": "Host",
+                        "value": "10.0.0.11",
+                        "metadata": {
+                            "timestamp": (watermark + 5) * 1000,
+                            "lastUser": {"name": "admin"},
+                        },
+                    },
+                    {"id": "h3", "name": "host3", "type": "Host", "value": "10.0.0.3"},
+                ],
+                "/object/networks": COLLECTIONS["/object/networks"],
+            }
+            records = [
+                {
+                    "time": watermark + 5,
+                    "message": "Objects > Object Management > Host > host1",
+                }
+            ]
+            urls = []
+
+            def fake_send_request(method="", url="", headers="", json_data=None):
+                urls.append(url)
+                if url.startswith(f"{self.fmc.platform_url}/domain/uuid/audit"):
+                    return {"items": records}
+                path = url.split("?")[0][len(self.fmc.configuration_url) :]
+                return {"items": changed[path]}
+
+            self.fmc.send_request = mock.Mock(side_effect=fake_send_request)
+            summary = snap.sync(fmc=self.fmc)
+            hosts = summary["collections"][f"{self.fmc.configuration_url}/object/hosts"]
+            self.assertEqual(hosts["created"], ["h3"])
+            self.assertEqual(hosts["modified"], ["h1"])
+            self.assertEqual(hosts["deleted"], ["h2"])
+            self.assertEqual(hosts["users"], ["admin"])
+            self.assertNotIn("starttime", urls[0].split("?")[0])
+            self.assertEqual(len(urls), 2)
+            self.assertEqual(int(snap.meta["watermark"]), watermark + 5)
+            offline = snap.fmc()
+            self.assertEqual(
+                fmcapi.Hosts(fmc=offline, id="h1").get()["value"], "10.0.0.11"
+            )
+
+            urls.clear()
+            records.clear()
+            self.assertEqual(snap.sync(fmc=self.fmc)["collections"], {})
+            self.assertEqual(len(urls), 1)
+
+    def test_sync_keeps_collection_when_a_page_is_missing(self):
+        with snapshot.Snapshot(path=self.path) as snap:
+            snap.take(fmc=self.fmc, api_classes=[fmcapi.Hosts, fmcapi.Networks])
+            watermark = int(snap.meta["watermark"])
+            records = [
+                {
+                    "time": watermark + 5,
+                    "message": "Objects > Object Management > Host > host1",
+                }
+            ]
+            hosts = f"{self.fmc.configuration_url}/object/hosts"
+            paging = {
+                "offset": 0,
+                "limit": 1,
+                "count": 3,
+                "next": [f"{hosts}?offset=1"],
+            }
+
+            def fake_send_request(method="", url="", headers="", json_data=None):
+                if url.startswith(f"{self.fmc.platform_url}/domain/uuid/audit"):
+                    return {"items": records}
+                if "offset=" in url:
+                    return None
+                return {"items": COLLECTIONS["/object/hosts"][:1], "paging": paging}
+
+            self.fmc.send_request = mock.Mock(side_effect=fake_send_request)
+            summary = snap.sync(fmc=self.fmc)
+            self.assertIn("error", summary["collections"][hosts])
+            # No "next" link but fewer objects than "count".
+            del paging["next"]
+            summary = snap.sync(fmc=self.fmc)
+            self.assertEqual(
+                summary["collections"][hosts]["error"],
+                "Only 1 of 3 objects were fetched.",
+            )
+            self.assertEqual(len(snap.items(hosts)), 2)
+            self.assertEqual(int(snap.meta["watermark"]), watermark)
+
+    def test_sync_stops_when_the_audit_records_cannot_be_read(self):
+        with snapshot.Snapshot(path=self.path) as snap:
+            snap.take(fmc=self.fmc, api_classes=[fmcapi.Hosts])
+            meta = snap.meta
+            self.fmc.send_request = mock.Mock(return_value=None)
+            summary = snap.sync(fmc=self.fmc)
+            self.assertEqual(summary["error"], "Could not read the audit records.")
+            self.assertEqual(snap.meta, meta)
+            self.fmc.send_request.assert_called_once()
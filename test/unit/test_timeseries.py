@@ -0,0 +1,143 @@
+"""
+Test timeseries.py
+"""
+
+import os
+import random
+import tempfile
+import time
+import unittest
+
+from fmcapi import timeseries
+
+
+def hitcount(rule, hits, fetched, last_hit=" "):
+    return {
+        "rule": {"id": rule, "name": f"name-{rule}"},
+        "hitCount": hits,
+        "firstHitTimeStamp": last_hit,
+        "lastHitTimeStamp": last_hit,
+        "lastFetchTimeStamp": fetched,
+    }
+
+
+@unittest.skipIf(timeseries.numpy is None, "numpy is not installed.")
+class TestHitCountStore(unittest.TestCase):
+    def setUp(self):
+        self.store = timeseries.HitCountStore()
+        old = "2020-01-01T00:00:00Z"
+        new = "2020-06-01T00:00:00Z"
+        self.now = timeseries.HitCountStore.seconds(new)
+        self.store.add(
+            "acp1",
+            "d1",
+            [
+                hitcount("r1", 5, old, "2019-12-31T00:00:00Z"),
+                hitcount("r2", 0, old),
+                hitcount("r3", 9, old, "2019-12-01T00:00:00Z"),
+            ],
+        )
+        self.store.add(
+            "acp1",
+            "d1",
+            [
+                hitcount("r1", 50, new, "2020-05-31T00:00:00Z"),
+                hitcount("r2", 0, new),
+                hitcount("r3", 9, new, "2019-12-01T00:00:00Z"),
+            ],
+        )
+        self.store.add("acp1", "d2", [hitcount("r1", 7, new, "2020-05-30T00:00:00Z")])
+        self.store.add("pf1", "d1", [hitcount("p1", 3, new, "2020-05-01T00:00:00Z")])
+
+    def test_unused_and_hottest_use_newest_sample_per_device(self):
+        self.assertEqual(len(self.store), 8)
+        # The same fetch is not stored twice.
+        self.assertEqual(
+            self.store.add("pf1", "d1", [hitcount("p1", 3, "2020-06-01T00:00:00Z")]),
+            0,
+        )
+        self.assertEqual(
+            [r["rule_id"] for r in self.store.unused(days=90, now=self.now)],
+            ["r2", "r3"],
+        )
+        self.assertEqual([r["rule_id"] for r in self.store.unused(days=None)], ["r2"])
+        hottest = self.store.hottest(n=2)
+        self.assertEqual(
+            [(r["rule_id"], r["hitCount"]) for r in hottest["acp1"]],
+            [("r1", 57), ("r3", 9)],
+        )
+        self.assertEqual([r["rule_id"] for r in hottest["pf1"]], ["p1"])
+        self.assertEqual(self.store.totals("acp1"), {"r1": 57, "r2": 0, "r3": 9})
+        series = self.store.series("acp1", "r1", device_id="d1")
+        self.assertEqual(series["hit_count"].tolist(), [5, 50])
+
+    def test_latest_matches_newest_sample_per_rule_and_device(self):
+        rng = random.Random(0)
+        store = timeseries.HitCountStore()
+        for day in rng.sample(range(1, 29), 6):
+            fetched = f"2020-02-{day:02d}T00:00:00Z"
+            for device in range(30):
+                rules = rng.sample(range(500), 20)
+                store.add(
+                    "acp1",
+                    f"d{device}",
+                    [hitcount(f"r{rule}", 1, fetched) for rule in rules],
+                )
+        latest = store.latest()
+        columns = store.columns
+        newest = {}
+        for rule, device, fetched in zip(
+            columns["rule"].tolist(),
+            columns["device"].tolist(),
+            columns["fetched"].tolist(),
+        ):
+            newest[rule, device] = max(newest.get((rule, device), fetched), fetched)
+        self.assertEqual(
+            latest.tolist(),
+            [
+                fetched == newest[rule, device]
+                for rule, device, fetched in zip(
+                    columns["rule"].tolist(),
+                    columns["device"].tolist(),
+                    columns["fetched"].tolist(),
+                )
+            ],
+        )
+
+    def test_save_and_open(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hitcounts.npz")
+            self.store.save(path)
+            store = timeseries.HitCountStore.open(path)
+        self.assertEqual(len(store), 8)
+        self.assertEqual(
+            store.hottest(n=1, policy_id="acp1")["acp1"][0]["rule_name"], "name-r1"
+        )
+        self.assertEqual(
+            store.add("acp1", "d2", [hitcount("r1", 7, "2020-06-01T00:00:00Z")]), 0
+        )
+
+    def test_queries_over_a_million_samples_are_fast(self):
+        numpy = timeseries.numpy
+        store = timeseries.HitCountStore()
+        for device in range(300):
+            store.code("device", f"d{device}")
+        for rule in range(1000):
+            store.code("rule", (store.code("policy", f"acp{rule % 12}"), f"r{rule}"))
+        size = 1200000
+        rng = numpy.random.default_rng(0)
+        store.pending.append(
+            {
+                "rule": rng.integers(0, 1000, size, dtype="int32"),
+                "device": rng.integers(0, 300, size, dtype="int32"),
+                "fetched": rng.integers(0, 10, size),
+                "hit_count": rng.integers(0, 1000, size),
+                "first_hit": rng.integers(-1, 10**9, size),
+                "last_hit": rng.integers(-1, 10**9, size),
+            }
+        )
+        store.compact()
+        start = time.perf_counter()
+        store.unused(days=90, now=10**9)
+        store.hottest(n=10)
+        self.assertLess(time.perf_counter() - start, 1.0)
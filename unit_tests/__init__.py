@@ -7,6 +7,7 @@ from .manualnat import test__manualnat
 from .autonat import test__autonat
 from .port_object_group import test__port_object_group
 from .acprule import test__acp_rule
+from .bulk import test__bulk
 from .acp import test__access_control_policy
 from .intrusion_policy import test__intrusion_policy
 from .interfaces_subinterfaces import test__subinterfaces
@@ -126,6 +127,7 @@ __all__ = [
     "test__autonat",
     "test__port_object_group",
     "test__acp_rule",
+    "test__bulk",
     "test__access_control_policy",
     "test__intrusion_policy",
     "test__prefilter_policy",
@@ -0,0 +1,45 @@
+import logging
+import fmcapi
+import time
+
+
+def test__bulk(fmc):
+    logging.info(
+        "Test Bulk and BulkObjects.  Bulk post, put, delete Host Objects and ACP Rules."
+    )
+
+    starttime = str(int(time.time()))
+    namer = f"_fmcapi_test_{starttime}"
+
+    hosts = fmcapi.BulkObjects(fmc=fmc)
+    for i in range(1, 51):
+        hosts.add(fmcapi.Hosts(fmc=fmc, name=f"{namer}_host{i}", value=f"10.7.7.{i}"))
+    logging.info(hosts.post())
+
+    acp1 = fmcapi.AccessPolicies(fmc=fmc, name=namer)
+    acp1.post()
+    time.sleep(1)
+
+    bulk = fmcapi.Bulk(fmc=fmc, url=fmcapi.AccessRules(fmc=fmc, acp_id=acp1.id).URL)
+    for obj in hosts.objects:
+        rule = fmcapi.AccessRules(fmc=fmc, acp_id=acp1.id, name=obj.name)
+        rule.action = "ALLOW"
+        rule.sourceNetworks = {
+            "objects": [{"name": obj.name, "id": obj.id, "type": "Host"}]
+        }
+        bulk.add(rule.format_data())
+    response = bulk.post()
+    logging.info(f"Bulk post created {len(response['items'])} rules.")
+
+    bulk.clear()
+    for item in response["items"]:
+        rule = fmcapi.AccessRules(fmc=fmc, acp_id=acp1.id, **item)
+        rule.enabled = False
+        bulk.add(rule.format_data())
+    bulk.put(workers=4)
+    time.sleep(1)
+    bulk.delete(workers=4)
+
+    acp1.delete()
+    logging.info(hosts.delete())
+    logging.info("Test Bulk done.\n")